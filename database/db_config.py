@@ -1,14 +1,29 @@
 """
 Database configuration and connection management for CE49X Final Project.
-Supports PostgreSQL via psycopg2 or asyncpg.
+Supports PostgreSQL via psycopg2 through a thread-safe pool, shared by scripts
+and by the thread-pool workers asyncio collectors run their writes on
+(collection_engine.run_blocking).
+
+The pool hands out connections through a context manager that commits on exit,
+pings connections that sat idle before reuse, replaces connections older than
+DB_POOL_MAX_LIFETIME seconds and keeps counters readable via pool_metrics().
+
+Usage:
+    with get_db_cursor() as cur:
+        cur.execute("SELECT COUNT(*) AS count FROM articles")
 """
 
+import io
 import os
+import threading
+import time
+import uuid
+from datetime import date, datetime
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 import psycopg2
-from psycopg2.extras import RealDictCursor
-from psycopg2.pool import SimpleConnectionPool
+from psycopg2.extras import RealDictCursor, execute_batch
+from psycopg2.pool import PoolError, ThreadedConnectionPool
 from contextlib import contextmanager
 
 # Database configuration from environment variables
@@ -20,19 +35,131 @@ DB_CONFIG = {
     'password': os.getenv('DB_PASSWORD', 'ce49x_password'),
 }
 
+# Pool settings
+POOL_MIN_CONN = int(os.getenv('DB_POOL_MIN', 1))
+POOL_MAX_CONN = int(os.getenv('DB_POOL_MAX', 10))
+POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))  # Seconds to wait for a free connection
+MAX_LIFETIME = float(os.getenv('DB_POOL_MAX_LIFETIME', 1800))  # Seconds before a connection is replaced
+HEALTH_CHECK_IDLE = 30.0  # Connections idle longer than this are pinged before reuse
+
+
+class ConnectionPool:
+    """
+    Thread-safe psycopg2 connection pool.
+    
+    Wraps ThreadedConnectionPool: callers block (up to `timeout`) instead of
+    failing when all connections are in use, idle connections are health
+    checked before they are handed out and connections older than
+    `max_lifetime` are closed and replaced.
+    """
+    
+    def __init__(self, minconn: int, maxconn: int, timeout: float = POOL_TIMEOUT,
+                 max_lifetime: float = MAX_LIFETIME, **kwargs):
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self._pool = ThreadedConnectionPool(minconn, maxconn, **kwargs)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._created: Dict[int, float] = {}
+        self._released: Dict[int, float] = {}
+        self.metrics = {"checkouts": 0, "wait_seconds": 0.0, "timeouts": 0,
+                        "recycled": 0, "failed_health_checks": 0}
+    
+    def _count(self, name: str, amount: float = 1):
+        with self._lock:
+            self.metrics[name] += amount
+    
+    def _forget(self, conn):
+        with self._lock:
+            self._created.pop(id(conn), None)
+            self._released.pop(id(conn), None)
+    
+    def _discard(self, conn):
+        self._forget(conn)
+        self._pool.putconn(conn, close=True)
+    
+    @staticmethod
+    def _ping(conn) -> bool:
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+    
+    def getconn(self):
+        """Check out a healthy connection (blocks while the pool is exhausted)."""
+        started = time.monotonic()
+        if not self._slots.acquire(timeout=self.timeout):
+            self._count("timeouts")
+            raise PoolError(f"no database connection free after {self.timeout:.0f}s")
+        try:
+            while True:
+                conn = self._pool.getconn()
+                now = time.monotonic()
+                with self._lock:
+                    created = self._created.setdefault(id(conn), now)
+                    released = self._released.get(id(conn))
+                if now - created > self.max_lifetime:
+                    self._count("recycled")
+                    self._discard(conn)
+                    continue
+                if conn.closed or (released is not None and now - released > HEALTH_CHECK_IDLE
+                                   and not self._ping(conn)):
+                    self._count("failed_health_checks")
+                    self._discard(conn)
+                    continue
+                self._count("checkouts")
+                self._count("wait_seconds", now - started)
+                return conn
+        except Exception:
+            self._slots.release()
+            raise
+    
+    def putconn(self, conn):
+        """Return a connection; closed or expired connections are dropped."""
+        now = time.monotonic()
+        with self._lock:
+            expired = now - self._created.get(id(conn), now) > self.max_lifetime
+            self._released[id(conn)] = now
+        try:
+            if conn.closed or expired:
+                if expired:
+                    self._count("recycled")
+                self._discard(conn)
+            else:
+                self._pool.putconn(conn)
+        finally:
+            self._slots.release()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Pool metrics: counters plus connections open, idle and in use."""
+        with self._lock:
+            metrics = dict(self.metrics)
+        idle, in_use = len(self._pool._pool), len(self._pool._used)
+        return {**metrics, "open": idle + in_use, "idle": idle, "in_use": in_use, "max": self.maxconn}
+    
+    def closeall(self):
+        self._pool.closeall()
+
+
 # Connection pool
-_pool: Optional[SimpleConnectionPool] = None
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
 
 
-def init_pool(minconn=1, maxconn=10):
+def init_pool(minconn=POOL_MIN_CONN, maxconn=POOL_MAX_CONN):
     """Initialize connection pool."""
     global _pool
-    if _pool is None:
-        _pool = SimpleConnectionPool(
-            minconn=minconn,
-            maxconn=maxconn,
-            **DB_CONFIG
-        )
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(
+                minconn=minconn,
+                maxconn=maxconn,
+                **DB_CONFIG
+            )
     return _pool
 
 
@@ -49,6 +176,14 @@ def return_connection(conn):
         _pool.putconn(conn)
 
 
+def pool_metrics() -> Dict[str, Dict[str, Any]]:
+    """Metrics of the open pool ({"sync": ...})."""
+    metrics = {}
+    if _pool:
+        metrics["sync"] = _pool.stats()
+    return metrics
+
+
 @contextmanager
 def get_db_cursor(dict_cursor=True):
     """
@@ -86,6 +221,236 @@ def test_connection() -> bool:
         return False
 
 
+def _copy_value(value: Any) -> str:
+    """Render a value in COPY text format."""
+    if value is None or (isinstance(value, (float, datetime)) and value != value):  # None, NaN, NaT
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (datetime, date)):
+        text = value.isoformat()
+    elif isinstance(value, (list, tuple)):
+        # Array literal; elements quoted so commas and braces stay inside them
+        items = []
+        for item in value:
+            if item is None:
+                items.append("NULL")
+            else:
+                items.append('"' + str(item).replace("\\", "\\\\").replace('"', '\\"') + '"')
+        text = "{" + ",".join(items) + "}"
+    else:
+        text = str(value)
+    return (text.replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+class _CopyStream(io.TextIOBase):
+    """File-like object that renders rows as COPY text lines on demand."""
+
+    def __init__(self, rows: Iterable[Sequence[Any]]):
+        self._rows = iter(rows)
+        self._buffer = ""
+        self.count = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self._buffer) < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            self._buffer += "\t".join(_copy_value(value) for value in row) + "\n"
+            self.count += 1
+        if size < 0:
+            size = len(self._buffer)
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+
+class BulkInsertResult:
+    """Outcome of bulk_insert()."""
+
+    def __init__(self, rows: int, ids: List[Optional[int]]):
+        self.rows = rows
+        self.ids = ids  # New row id per input row, None for skipped rows
+        self.inserted = sum(1 for row_id in ids if row_id is not None)
+        self.skipped = rows - self.inserted
+
+    def __repr__(self) -> str:
+        return f"BulkInsertResult(inserted={self.inserted}, skipped={self.skipped})"
+
+
+def bulk_insert(
+    table: str,
+    columns: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    conflict_column: Optional[str] = "url",
+    cur=None
+) -> BulkInsertResult:
+    """
+    Insert many rows with COPY instead of one INSERT per row.
+    
+    Rows are streamed with COPY ... FROM STDIN into a temporary staging table
+    and merged with a single INSERT ... SELECT ... ON CONFLICT DO NOTHING
+    RETURNING id; rows conflicting with stored rows (or with an earlier row of
+    the same batch) are skipped.
+    
+    Usage:
+        result = bulk_insert("articles", ["title", "url"], rows)
+        print(result.inserted, result.skipped)
+    
+    Args:
+        table: Target table (must have an id column)
+        columns: Target columns, in the order of each row's values
+        rows: Row value sequences (lists become arrays, None NULL)
+        conflict_column: Unique column whose duplicates are skipped, or None
+            to insert every row
+        cur: Cursor of an open transaction to use (default: a new
+            get_db_cursor() transaction committed on return)
+    
+    Returns:
+        BulkInsertResult with inserted/skipped counts and new ids per row
+    """
+    if cur is None:
+        with get_db_cursor(dict_cursor=False) as new_cur:
+            return bulk_insert(table, columns, rows, conflict_column, new_cur)
+    
+    stage = f"_stage_{table}_{uuid.uuid4().hex[:8]}"
+    column_list = ", ".join(columns)
+    cur.execute(f"""
+        CREATE TEMP TABLE {stage} ON COMMIT DROP AS
+        SELECT {column_list} FROM {table} WITH NO DATA
+    """)
+    cur.execute(f"ALTER TABLE {stage} ADD COLUMN _ord BIGSERIAL")
+    stream = _CopyStream(rows)
+    cur.copy_expert(f"COPY {stage} ({column_list}) FROM STDIN", stream)
+    
+    if conflict_column is None:
+        cur.execute(f"""
+            INSERT INTO {table} ({column_list})
+            SELECT {column_list} FROM {stage} ORDER BY _ord
+            RETURNING id
+        """)
+        ids = [row[0] for row in cur.fetchall()]
+    else:
+        cur.execute(f"""
+            INSERT INTO {table} ({column_list})
+            SELECT {column_list} FROM {stage} ORDER BY _ord
+            ON CONFLICT ({conflict_column}) DO NOTHING
+            RETURNING id, {conflict_column}
+        """)
+        new_ids: Dict[Any, int] = {key: row_id for row_id, key in cur.fetchall()}
+        cur.execute(f"SELECT {conflict_column} FROM {stage} ORDER BY _ord")
+        ids = [new_ids.pop(key, None) for (key,) in cur.fetchall()]
+    cur.execute(f"DROP TABLE {stage}")
+    return BulkInsertResult(stream.count, ids)
+
+
+class BatchWriter:
+    """
+    Unit-of-work writer: buffers parameterized statements and commits them in
+    batches instead of one transaction per row.
+    
+    Buffered statements are flushed every `flush_rows` statements, when the
+    oldest buffered statement is `flush_interval` seconds old (checked on
+    add()) and on exit. Consecutive statements with the same SQL go to the
+    server with execute_batch. If a batch fails, it is rolled back to its
+    savepoint and replayed row by row, each row under its own savepoint, so
+    one bad row only loses itself (reported to `on_error`).
+    
+    Usage:
+        with BatchWriter() as writer:
+            for article_id, summary in results:
+                writer.add("UPDATE newsapi_articles SET summary = %s WHERE id = %s", (summary, article_id))
+        print(writer.written, writer.failed)
+    """
+    
+    def __init__(
+        self,
+        flush_rows: int = 500,
+        flush_interval: float = 2.0,
+        on_error: Optional[Callable[[Sequence[Any], Exception], None]] = None
+    ):
+        """
+        Args:
+            flush_rows: Buffered statements that trigger a flush
+            flush_interval: Seconds a statement may wait in the buffer
+            on_error: Called with (params, exception) for every failed row
+                (default: print it)
+        """
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.on_error = on_error or (lambda params, e: print(f"  Database error: {str(e).strip()}"))
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+        self._buffer: List[Tuple[str, Sequence[Any]]] = []
+        self._oldest: Optional[float] = None
+        self._conn = None
+    
+    def __enter__(self) -> "BatchWriter":
+        self._conn = get_connection()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.flush()
+        except Exception:
+            self._conn.rollback()
+            raise
+        finally:
+            return_connection(self._conn)
+            self._conn = None
+    
+    def add(self, sql: str, params: Sequence[Any]):
+        """Buffer one statement; flushes when the buffer is full or old enough."""
+        if not self._buffer:
+            self._oldest = time.monotonic()
+        self._buffer.append((sql, params))
+        if len(self._buffer) >= self.flush_rows or time.monotonic() - self._oldest >= self.flush_interval:
+            self.flush()
+    
+    def flush(self):
+        """Write and commit all buffered statements."""
+        if not self._buffer:
+            return
+        buffer, self._buffer = self._buffer, []
+        
+        # Runs of consecutive statements with the same SQL
+        runs: List[Tuple[str, List[Sequence[Any]]]] = []
+        for sql, params in buffer:
+            if runs and runs[-1][0] == sql:
+                runs[-1][1].append(params)
+            else:
+                runs.append((sql, [params]))
+        
+        with self._conn.cursor() as cur:
+            for sql, rows in runs:
+                cur.execute("SAVEPOINT batch_writer")
+                try:
+                    execute_batch(cur, sql, rows, page_size=self.flush_rows)
+                    cur.execute("RELEASE SAVEPOINT batch_writer")
+                    self.written += len(rows)
+                except psycopg2.Error:
+                    cur.execute("ROLLBACK TO SAVEPOINT batch_writer")
+                    self._replay(cur, sql, rows)
+        self._conn.commit()
+        self.flushes += 1
+    
+    def _replay(self, cur, sql: str, rows: List[Sequence[Any]]):
+        for params in rows:
+            cur.execute("SAVEPOINT batch_writer_row")
+            try:
+                cur.execute(sql, params)
+                cur.execute("RELEASE SAVEPOINT batch_writer_row")
+                self.written += 1
+            except psycopg2.Error as e:
+                cur.execute("ROLLBACK TO SAVEPOINT batch_writer_row")
+                self.failed += 1
+                self.on_error(params, e)
+
+
 def close_pool():
     """Close all connections in the pool."""
     global _pool
@@ -12,6 +12,8 @@ CREATE TABLE IF NOT EXISTS articles (
     published_at TIMESTAMP,
     source TEXT,
     url TEXT UNIQUE NOT NULL,
+    canonical_url TEXT, -- scripts/url_canonical.py
+    url_hash BIGINT GENERATED ALWAYS AS (('x' || substr(md5(COALESCE(canonical_url, url)), 1, 16))::bit(64)::bigint) STORED, -- 64-bit canonical URL fingerprint (scripts/url_index.py)
     content TEXT,
     description TEXT,
     full_text TEXT,
@@ -66,8 +68,24 @@ CREATE TABLE IF NOT EXISTS sources (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Near-duplicate index (scripts/near_duplicates.py): MinHash signature and
+-- story cluster id per article, LSH band keys for candidate lookup
+CREATE TABLE IF NOT EXISTS articles_minhash (
+    article_id BIGINT PRIMARY KEY,
+    cluster_id BIGINT NOT NULL, -- id of the first article of the story
+    signature BYTEA NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS articles_lsh (
+    band_key BIGINT NOT NULL,
+    article_id BIGINT NOT NULL
+);
+
 -- Indexes for performance
 CREATE INDEX IF NOT EXISTS idx_articles_url ON articles(url);
+CREATE INDEX IF NOT EXISTS idx_articles_url_hash ON articles(url_hash);
+CREATE INDEX IF NOT EXISTS idx_articles_canonical_url ON articles(canonical_url);
+CREATE INDEX IF NOT EXISTS idx_articles_title_trgm ON articles USING GIN(title gin_trgm_ops); -- fuzzy title search (scripts/title_search.py)
 CREATE INDEX IF NOT EXISTS idx_articles_published_at ON articles(published_at);
 CREATE INDEX IF NOT EXISTS idx_articles_source ON articles(source);
 CREATE INDEX IF NOT EXISTS idx_articles_created_at ON articles(created_at);
@@ -77,6 +95,8 @@ CREATE INDEX IF NOT EXISTS idx_classifications_ai_technologies ON classification
 CREATE INDEX IF NOT EXISTS idx_cooccurrence_matrix_ce_area ON cooccurrence_matrix(ce_area);
 CREATE INDEX IF NOT EXISTS idx_cooccurrence_matrix_ai_tech ON cooccurrence_matrix(ai_technology);
 CREATE INDEX IF NOT EXISTS idx_temporal_trends_period ON temporal_trends(period);
+CREATE INDEX IF NOT EXISTS idx_articles_lsh_band_key ON articles_lsh(band_key);
+CREATE INDEX IF NOT EXISTS idx_articles_minhash_cluster_id ON articles_minhash(cluster_id);
 
 -- Full-text search index
 CREATE INDEX IF NOT EXISTS idx_articles_content_fts ON articles USING GIN(to_tsvector('english', COALESCE(title, '') || ' ' || COALESCE(content, '') || ' ' || COALESCE(description, '')));
@@ -13,7 +13,9 @@ from typing import Optional
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from database.db_config import get_db_cursor, test_connection
+from database.db_config import BatchWriter, get_db_cursor, test_connection
+from scripts.near_duplicates import NearDuplicateIndex
+from scripts.url_index import ensure_canonical_urls
 
 # Fix Windows encoding issue
 if sys.platform == 'win32':
@@ -45,12 +47,22 @@ def ensure_summary_column():
 
 
 def get_articles_without_summary() -> list:
-    """Summary'si olmayan newsapi_articles makalelerini getir"""
+    """Summary'si olmayan newsapi_articles makalelerini getir (aynı canonical URL'nin ve haberin kopyaları hariç)"""
+    ensure_canonical_urls("newsapi_articles")
+    NearDuplicateIndex.postgres("newsapi_articles")  # newsapi_articles_minhash yoksa oluşturur
     with get_db_cursor() as cur:
         query = """
             SELECT id, title, description, full_text, url
-            FROM newsapi_articles
-            WHERE summary IS NULL OR summary = ''
+            FROM newsapi_articles a
+            WHERE (summary IS NULL OR summary = '')
+              AND NOT EXISTS (
+                  SELECT 1 FROM newsapi_articles d
+                  WHERE d.canonical_url = a.canonical_url AND d.id < a.id
+              )
+              AND NOT EXISTS (
+                  SELECT 1 FROM newsapi_articles_minhash m
+                  WHERE m.article_id = a.id AND m.cluster_id <> a.id
+              )
             ORDER BY id
         """
         cur.execute(query)
@@ -136,14 +148,13 @@ Write only the summary text, no explanations. The summary can be in English or T
         return None
 
 
-def save_summary(article_id: int, summary: str):
-    """Summary'yi veritabanına kaydet"""
-    with get_db_cursor() as cur:
-        cur.execute("""
-            UPDATE newsapi_articles 
-            SET summary = %s 
-            WHERE id = %s
-        """, (summary, article_id))
+def save_summary(writer: BatchWriter, article_id: int, summary: str):
+    """Summary'yi veritabanına kaydet (writer'ın bir sonraki batch'inde)"""
+    writer.add("""
+        UPDATE newsapi_articles 
+        SET summary = %s 
+        WHERE id = %s
+    """, (summary, article_id))
 
 
 def main():
@@ -184,34 +195,36 @@ def main():
     success_count = 0
     fail_count = 0
     
-    for idx, article in enumerate(articles, 1):
-        article_id = article['id']
-        title = article['title'] or 'No title'
-        description = article.get('description') or ''
-        full_text = article.get('full_text') or ''
-        url = article.get('url', '')
-        
-        print(f"[{idx}/{len(articles)}] Processing (ID: {article_id}): {title[:60]}...")
-        
-        # Summary oluştur
-        summary = generate_summary(title, description, full_text)
-        
-        if summary:
-            word_count = count_words(summary)
-            # Veritabanına kaydet
-            save_summary(article_id, summary)
-            print(f"  [OK] Summary created and saved ({word_count} words)")
-            print(f"  Summary: {summary[:100]}...")
-            success_count += 1
-        else:
-            print(f"  [ERROR] Failed to create summary")
-            fail_count += 1
-        
-        print()
-        
-        # Rate limiting
-        if idx < len(articles):
-            time.sleep(REQUEST_DELAY)
+    # Summary'ler tek tek değil, batch'ler halinde commit edilir
+    with BatchWriter(flush_rows=20, flush_interval=30.0) as writer:
+        for idx, article in enumerate(articles, 1):
+            article_id = article['id']
+            title = article['title'] or 'No title'
+            description = article.get('description') or ''
+            full_text = article.get('full_text') or ''
+            url = article.get('url', '')
+            
+            print(f"[{idx}/{len(articles)}] Processing (ID: {article_id}): {title[:60]}...")
+            
+            # Summary oluştur
+            summary = generate_summary(title, description, full_text)
+            
+            if summary:
+                word_count = count_words(summary)
+                # Veritabanına kaydet
+                save_summary(writer, article_id, summary)
+                print(f"  [OK] Summary created and saved ({word_count} words)")
+                print(f"  Summary: {summary[:100]}...")
+                success_count += 1
+            else:
+                print(f"  [ERROR] Failed to create summary")
+                fail_count += 1
+            
+            print()
+            
+            # Rate limiting
+            if idx < len(articles):
+                time.sleep(REQUEST_DELAY)
     
     # Özet
     print("=" * 70)
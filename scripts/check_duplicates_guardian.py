@@ -4,6 +4,11 @@ import pandas as pd
 from pathlib import Path
 sys.stdout.reconfigure(encoding='utf-8')
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from scripts.disjoint_set import DisjointSet
+from scripts.near_duplicates import NearDuplicateIndex, minhash_signature
+from scripts.url_canonical import canonicalize_url
+
 PROJECT_ROOT = Path(__file__).parent
 DATA_DIR = PROJECT_ROOT / "data"
 
@@ -68,6 +73,42 @@ else:
 
 print()
 
+# URL, title and near-copy passes merged into one cluster assignment
+print("Cluster kontrolü (canonical URL + title + near-duplicate metin):")
+clusters = DisjointSet(range(len(df)))
+first_by_url = {}
+first_by_title = {}
+near_dups = NearDuplicateIndex.memory()
+for i, row in enumerate(df.to_dict('records')):
+    url = canonicalize_url(str(row['url'])) if pd.notna(row.get('url')) else ''
+    title = str(row['title']) if pd.notna(row.get('title')) else ''
+    description = str(row['description']) if pd.notna(row.get('description')) else ''
+    
+    if url:
+        clusters.union(first_by_url.setdefault(url, i), i)
+    normalized_title = ' '.join(title.lower().split())
+    if normalized_title:
+        # Title only counts when the URL is missing (same rule as collect_newsapi)
+        first = first_by_title.setdefault(normalized_title, i)
+        if not url:
+            clusters.union(first, i)
+    
+    signature = minhash_signature(f"{title} {description}")
+    near_copy = near_dups.find(signature)
+    if near_copy:
+        clusters.union(near_copy[0], i)
+    near_dups.add(i, signature)
+
+duplicate_clusters = clusters.groups(min_size=2)
+if duplicate_clusters:
+    print(f"  [BULUNDU] {len(duplicate_clusters)} cluster'da {sum(len(g) for g in duplicate_clusters)} makale")
+    for group in duplicate_clusters[:10]:
+        print(f"  - {len(group)} makale: {df.iloc[group[0]]['title'][:60]}...")
+else:
+    print("  [OK] Cluster bazında duplicate yok")
+
+print()
+
 # Summary
 print("="*70)
 print("ÖZET")
@@ -76,8 +117,9 @@ print(f"Toplam makale: {len(df)}")
 print(f"Unique URL'ler: {df['url'].nunique()}")
 print(f"Unique title'lar: {df['title'].nunique()}")
 
-if len(url_duplicates) > 0:
-    unique_df = df.drop_duplicates(subset=['url'], keep='first')
+if duplicate_clusters:
+    # First article of every cluster
+    unique_df = df[[clusters.is_representative(i) for i in range(len(df))]]
     print(f"\nDuplicate'ler çıkarıldıktan sonra: {len(unique_df)} makale")
     print(f"Çıkarılan duplicate: {len(df) - len(unique_df)} makale")
     
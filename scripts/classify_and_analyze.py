@@ -14,14 +14,14 @@ Course: CE49X - Introduction to Data Science for Civil Engineering
 Date: Fall 2025
 """
 
+import argparse
 import os
 import sys
 import pandas as pd
 import numpy as np
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Set
-import re
+from typing import Iterable, Iterator, List, Dict, Set, Tuple
 
 # Check and import required libraries
 try:
@@ -32,6 +32,10 @@ except ImportError:
     print("Please install it using: pip install matplotlib seaborn")
     sys.exit(1)
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from scripts.keyword_matcher import compile_keywords
+from scripts.parallel_chunks import DEFAULT_WORKERS, map_chunks
+
 # ============================================================================
 # CONFIGURATION
 # ============================================================================
@@ -43,6 +47,13 @@ OUTPUT_DIR = PROJECT_ROOT / "data"
 OUTPUT_FILE = OUTPUT_DIR / "classified_articles.csv"
 RESULTS_DIR = PROJECT_ROOT / "results"
 
+# Text fields combined for classification
+TEXT_FIELDS = ['title', 'description', 'full_text', 'processed_text']
+
+# Parallel classification
+CHUNK_SIZE = 5000  # Articles per chunk handed to a worker
+WORKERS = DEFAULT_WORKERS  # Worker processes (1: classify in this process)
+
 # ============================================================================
 # KEYWORD DICTIONARIES FOR CLASSIFICATION
 # ============================================================================
@@ -114,30 +125,13 @@ AI_TECHNOLOGIES = {
 # CLASSIFICATION FUNCTIONS
 # ============================================================================
 
-def normalize_text_for_matching(text: str) -> str:
-    """
-    Normalize text for keyword matching.
-    
-    Args:
-        text: Input text string
-        
-    Returns:
-        Normalized text string
-    """
-    if pd.isna(text):
-        return ""
-    
-    text = str(text).lower()
-    # Remove special characters but keep spaces
-    text = re.sub(r'[^a-zA-Z0-9\s]', ' ', text)
-    text = re.sub(r'\s+', ' ', text)
-    return text.strip()
-
-
 def classify_text(text: str, keyword_dict: Dict[str, List[str]]) -> List[str]:
     """
     Classify text based on keyword dictionary.
     
+    Keywords match as whole words or phrases, case-insensitive (see
+    scripts/keyword_matcher.py); the compiled dictionary is cached.
+    
     Args:
         text: Input text to classify
         keyword_dict: Dictionary mapping categories to keyword lists
@@ -145,27 +139,7 @@ def classify_text(text: str, keyword_dict: Dict[str, List[str]]) -> List[str]:
     Returns:
         List of matching categories
     """
-    normalized_text = normalize_text_for_matching(text)
-    if not normalized_text:
-        return []
-    
-    matches = []
-    for category, keywords in keyword_dict.items():
-        for keyword in keywords:
-            # Check for exact phrase match (for multi-word keywords)
-            if ' ' in keyword:
-                pattern = r'\b' + re.escape(keyword.lower()) + r'\b'
-                if re.search(pattern, normalized_text):
-                    matches.append(category)
-                    break
-            else:
-                # Single word match
-                pattern = r'\b' + re.escape(keyword.lower()) + r'\b'
-                if re.search(pattern, normalized_text):
-                    matches.append(category)
-                    break
-    
-    return list(set(matches))  # Remove duplicates
+    return compile_keywords(keyword_dict).find(text)
 
 
 def classify_article(row: pd.Series) -> Dict:
@@ -180,7 +154,7 @@ def classify_article(row: pd.Series) -> Dict:
     """
     # Combine all text fields for classification
     text_fields = []
-    for field in ['title', 'description', 'full_text', 'processed_text']:
+    for field in TEXT_FIELDS:
         if field in row and pd.notna(row[field]):
             text_fields.append(str(row[field]))
     
@@ -201,6 +175,223 @@ def classify_article(row: pd.Series) -> Dict:
     }
 
 
+def combine_text_fields(df: pd.DataFrame) -> pd.Series:
+    """
+    Combined text of each article (the TEXT_FIELDS present in the DataFrame).
+    
+    Args:
+        df: DataFrame of articles
+        
+    Returns:
+        Series of combined texts, aligned with df
+    """
+    combined = pd.Series('', index=df.index, dtype=object)
+    for field in TEXT_FIELDS:
+        if field in df.columns:
+            combined = combined + ' ' + df[field].where(df[field].notna(), '').astype(str)
+    return combined
+
+
+def classify_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Classify all articles by CE area and AI technology in one batch.
+    
+    Each article's text is tokenized once and matched against both keyword
+    dictionaries together (one compiled taxonomy, one pass over the corpus).
+    
+    Args:
+        df: DataFrame of articles
+        
+    Returns:
+        Multi-hot DataFrame aligned with df: one bool column per CE area
+        followed by one per AI technology
+    """
+    matcher = compile_keywords({**CE_AREAS, **AI_TECHNOLOGIES})
+    matrix = matcher.label_matrix(combine_text_fields(df))
+    return pd.DataFrame(matrix, index=df.index, columns=matcher.labels)
+
+
+def category_labels(hits: pd.DataFrame) -> List[List[str]]:
+    """Labels of the True columns of each row of a multi-hot DataFrame."""
+    labels = np.array(hits.columns, dtype=object)
+    return [list(labels[row]) for row in hits.to_numpy(dtype=bool)]
+
+
+def classification_columns(categories: pd.DataFrame) -> pd.DataFrame:
+    """
+    Classification result columns (as classify_article()) from the
+    multi-hot matrix of classify_dataframe().
+    
+    Args:
+        categories: Multi-hot DataFrame of CE area and AI technology columns
+        
+    Returns:
+        DataFrame with ce_areas, ai_technologies (comma-separated),
+        ce_area_count, ai_tech_count and is_classified columns
+    """
+    ce_hits = categories[list(CE_AREAS)]
+    ai_hits = categories[list(AI_TECHNOLOGIES)]
+    ce_count = ce_hits.sum(axis=1)
+    ai_count = ai_hits.sum(axis=1)
+    return pd.DataFrame({
+        'ce_areas': [', '.join(labels) for labels in category_labels(ce_hits)],
+        'ai_technologies': [', '.join(labels) for labels in category_labels(ai_hits)],
+        'ce_area_count': ce_count,
+        'ai_tech_count': ai_count,
+        'is_classified': (ce_count > 0) & (ai_count > 0)
+    }, index=categories.index)
+
+
+# ============================================================================
+# PARALLEL CLASSIFICATION
+# ============================================================================
+
+class ClassificationTotals:
+    """
+    Running totals over classified chunks: article counts per category and
+    the CE area x AI technology co-occurrence matrix.
+    """
+    
+    def __init__(self):
+        self.articles = 0
+        self.with_ce = 0
+        self.with_ai = 0
+        self.with_both = 0
+        self.ce_counts = pd.Series(0, index=list(CE_AREAS))
+        self.ai_counts = pd.Series(0, index=list(AI_TECHNOLOGIES))
+        self.cooccurrence = np.zeros((len(CE_AREAS), len(AI_TECHNOLOGIES)), dtype=np.int64)
+    
+    def add(self, categories: pd.DataFrame):
+        """Add the multi-hot categories of one chunk."""
+        ce_hits = categories[list(CE_AREAS)].to_numpy(dtype=np.int64)
+        ai_hits = categories[list(AI_TECHNOLOGIES)].to_numpy(dtype=np.int64)
+        has_ce = ce_hits.any(axis=1)
+        has_ai = ai_hits.any(axis=1)
+        self.articles += len(categories)
+        self.with_ce += int(has_ce.sum())
+        self.with_ai += int(has_ai.sum())
+        self.with_both += int((has_ce & has_ai).sum())
+        self.ce_counts += ce_hits.sum(axis=0)
+        self.ai_counts += ai_hits.sum(axis=0)
+        self.cooccurrence += ce_hits.T @ ai_hits
+    
+    def cooccurrence_matrix(self) -> pd.DataFrame:
+        """Co-occurrence matrix as create_cooccurrence_matrix() returns it."""
+        return pd.DataFrame(self.cooccurrence.astype(float), index=list(CE_AREAS), columns=list(AI_TECHNOLOGIES))
+
+
+def _init_worker():
+    """Process pool initializer: compile the keyword taxonomy once per worker."""
+    compile_keywords({**CE_AREAS, **AI_TECHNOLOGIES})
+
+
+def classify_chunks(chunks: Iterable[pd.DataFrame], workers: int = WORKERS) -> Iterator[Tuple[pd.DataFrame, pd.DataFrame]]:
+    """
+    Classify a stream of article chunks on a process pool, in input order.
+    
+    At most two chunks per worker are read ahead, so memory stays bounded
+    by the chunk size rather than the corpus size.
+    
+    Args:
+        chunks: DataFrames of articles (e.g. pd.read_csv(..., chunksize=...))
+        workers: Worker processes (1: classify in this process)
+        
+    Yields:
+        (chunk, multi-hot categories of the chunk) in input order
+    """
+    return map_chunks(classify_dataframe, chunks, workers, initializer=_init_worker)
+
+
+def classify_csv(input_file: Path, output_file: Path, workers: int = WORKERS,
+                 chunksize: int = CHUNK_SIZE) -> ClassificationTotals:
+    """
+    Classify a CSV of articles chunk by chunk into a classified CSV.
+    
+    Classified chunks are appended to a temporary file that replaces
+    output_file once all chunks are written.
+    
+    Returns:
+        ClassificationTotals of all articles
+    """
+    totals = ClassificationTotals()
+    temp_file = output_file.with_name(output_file.name + '.tmp')
+    header = True
+    for chunk, categories in classify_chunks(pd.read_csv(input_file, chunksize=chunksize), workers):
+        for column, values in classification_columns(categories).items():
+            chunk[column] = values
+        chunk.to_csv(temp_file, mode='w' if header else 'a', header=header, index=False, encoding='utf-8')
+        header = False
+        totals.add(categories)
+        print(f"  Classified {totals.articles} articles...")
+    if header:
+        pd.read_csv(input_file, nrows=0).to_csv(temp_file, index=False, encoding='utf-8')
+    temp_file.replace(output_file)
+    return totals
+
+
+def iter_db_articles(chunksize: int = CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """Stored articles in chunks of `chunksize`, in id order (keyset pagination)."""
+    from database.db_config import get_db_cursor
+    
+    last_id = 0
+    while True:
+        with get_db_cursor() as cur:
+            cur.execute(f"""
+                SELECT id, {', '.join(TEXT_FIELDS)}
+                FROM articles
+                WHERE id > %s
+                ORDER BY id
+                LIMIT %s
+            """, (last_id, chunksize))
+            rows = cur.fetchall()
+        if not rows:
+            return
+        chunk = pd.DataFrame(rows)
+        last_id = int(chunk['id'].iloc[-1])
+        yield chunk
+
+
+def classify_db(workers: int = WORKERS, chunksize: int = CHUNK_SIZE) -> ClassificationTotals:
+    """
+    Classify stored articles chunk by chunk into the classifications table.
+    
+    Each chunk replaces the keyword classifications of its articles in one
+    transaction; articles without any category get no row (as in
+    migrate_to_postgres.py).
+    
+    Returns:
+        ClassificationTotals of all articles
+    """
+    from database.db_config import bulk_insert, get_db_cursor
+    
+    totals = ClassificationTotals()
+    for chunk, categories in classify_chunks(iter_db_articles(chunksize), workers):
+        rows = [
+            (int(article_id), ce_areas, ai_techs, 'keyword')
+            for article_id, ce_areas, ai_techs in zip(
+                chunk['id'],
+                category_labels(categories[list(CE_AREAS)]),
+                category_labels(categories[list(AI_TECHNOLOGIES)])
+            )
+            if ce_areas or ai_techs
+        ]
+        with get_db_cursor(dict_cursor=False) as cur:
+            cur.execute(
+                "DELETE FROM classifications WHERE classification_method = 'keyword' AND article_id = ANY(%s)",
+                ([int(article_id) for article_id in chunk['id']],)
+            )
+            bulk_insert(
+                "classifications",
+                ["article_id", "ce_areas", "ai_technologies", "classification_method"],
+                rows,
+                conflict_column=None,
+                cur=cur
+            )
+        totals.add(categories)
+        print(f"  Classified {totals.articles} articles...")
+    return totals
+
+
 # ============================================================================
 # ANALYSIS FUNCTIONS
 # ============================================================================
@@ -317,22 +508,16 @@ def create_heatmap(cooccurrence_df: pd.DataFrame, output_path: Path):
     print(f"[OK] Saved heatmap to {output_path}")
 
 
-def create_bar_chart(df: pd.DataFrame, output_path: Path):
+def create_bar_chart(ce_counts: Dict[str, int], output_path: Path):
     """
     Create bar chart showing number of articles per CE area.
     
     Args:
-        df: DataFrame with classified articles
+        ce_counts: Number of articles per CE area
         output_path: Path to save the chart
     """
-    # Count articles by CE area
-    ce_counts = {}
-    for ce_area in CE_AREAS.keys():
-        count = df['ce_areas'].astype(str).str.contains(ce_area, na=False).sum()
-        ce_counts[ce_area] = count
-    
     # Sort by count
-    sorted_areas = sorted(ce_counts.items(), key=lambda x: x[1], reverse=True)
+    sorted_areas = sorted(dict(ce_counts).items(), key=lambda x: x[1], reverse=True)
     areas, counts = zip(*sorted_areas)
     
     plt.figure(figsize=(12, 6))
@@ -355,22 +540,16 @@ def create_bar_chart(df: pd.DataFrame, output_path: Path):
     print(f"[OK] Saved bar chart to {output_path}")
 
 
-def create_ai_tech_chart(df: pd.DataFrame, output_path: Path):
+def create_ai_tech_chart(ai_counts: Dict[str, int], output_path: Path):
     """
     Create bar chart showing number of articles per AI technology.
     
     Args:
-        df: DataFrame with classified articles
+        ai_counts: Number of articles per AI technology
         output_path: Path to save the chart
     """
-    # Count articles by AI technology
-    ai_counts = {}
-    for ai_tech in AI_TECHNOLOGIES.keys():
-        count = df['ai_technologies'].astype(str).str.contains(ai_tech, na=False).sum()
-        ai_counts[ai_tech] = count
-    
     # Sort by count
-    sorted_techs = sorted(ai_counts.items(), key=lambda x: x[1], reverse=True)
+    sorted_techs = sorted(dict(ai_counts).items(), key=lambda x: x[1], reverse=True)
     techs, counts = zip(*sorted_techs)
     
     plt.figure(figsize=(12, 6))
@@ -401,13 +580,20 @@ def main():
     """
     Main function to classify articles and analyze trends.
     """
+    parser = argparse.ArgumentParser(description="Keyword classification and trend analysis of articles.")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Worker processes (1: no process pool).")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE, help="Articles per chunk.")
+    parser.add_argument("--db", action="store_true",
+                        help="Classify stored articles into the classifications table instead of the CSV files.")
+    args = parser.parse_args()
+    
     print("=" * 70)
     print("CE49X Final Project - Task 3: Classification & Trend Analysis")
     print("=" * 70)
     print()
     
     # Check if input file exists
-    if not INPUT_FILE.exists():
+    if not args.db and not INPUT_FILE.exists():
         print(f"ERROR: Input file not found: {INPUT_FILE}")
         return
     
@@ -415,50 +601,42 @@ def main():
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
     RESULTS_DIR.mkdir(parents=True, exist_ok=True)
     
-    # Load data
-    print(f"Loading data from {INPUT_FILE}...")
-    try:
-        df = pd.read_csv(INPUT_FILE)
-        print(f"Loaded {len(df)} articles")
-    except Exception as e:
-        print(f"ERROR: Failed to load CSV file: {e}")
-        return
-    
-    # Classify articles
-    print("\nClassifying articles...")
-    classification_results = []
-    
-    for idx, row in df.iterrows():
-        if (idx + 1) % 200 == 0:
-            print(f"  Classified {idx + 1}/{len(df)} articles...")
+    # Classify articles (streamed in chunks, one process per core)
+    print(f"\nClassifying articles ({args.workers} workers, {args.chunksize} articles per chunk)...")
+    if args.db:
+        from database.db_config import test_connection
         
-        result = classify_article(row)
-        classification_results.append(result)
-    
-    # Add classification columns to dataframe
-    df['ce_areas'] = [', '.join(r['ce_areas']) if r['ce_areas'] else '' for r in classification_results]
-    df['ai_technologies'] = [', '.join(r['ai_technologies']) if r['ai_technologies'] else '' for r in classification_results]
-    df['ce_area_count'] = [r['ce_area_count'] for r in classification_results]
-    df['ai_tech_count'] = [r['ai_tech_count'] for r in classification_results]
-    df['is_classified'] = [r['is_classified'] for r in classification_results]
+        if not test_connection():
+            print("ERROR: Cannot connect to PostgreSQL database.")
+            return
+        try:
+            totals = classify_db(args.workers, args.chunksize)
+        except Exception as e:
+            print(f"ERROR: Failed to classify stored articles: {e}")
+            return
+    else:
+        print(f"Loading data from {INPUT_FILE}...")
+        try:
+            totals = classify_csv(INPUT_FILE, OUTPUT_FILE, args.workers, args.chunksize)
+        except Exception as e:
+            print(f"ERROR: Failed to classify CSV file: {e}")
+            return
     
     print(f"\n[OK] Classification complete")
-    print(f"  Articles with CE area classification: {df['ce_area_count'].gt(0).sum()}")
-    print(f"  Articles with AI tech classification: {df['ai_tech_count'].gt(0).sum()}")
-    print(f"  Articles with both classifications: {df['is_classified'].sum()}")
-    
-    # Save classified data
-    print(f"\nSaving classified data to {OUTPUT_FILE}...")
-    try:
-        df.to_csv(OUTPUT_FILE, index=False, encoding='utf-8')
-        print(f"[OK] Saved {len(df)} classified articles")
-    except Exception as e:
-        print(f"ERROR: Failed to save file: {e}")
+    print(f"  Articles with CE area classification: {totals.with_ce}")
+    print(f"  Articles with AI tech classification: {totals.with_ai}")
+    print(f"  Articles with both classifications: {totals.with_both}")
+    if args.db:
+        print(f"[OK] Saved keyword classifications of {totals.articles} articles to the classifications table")
+    else:
+        print(f"[OK] Saved {totals.articles} classified articles to {OUTPUT_FILE}")
+    
+    if not totals.articles:
         return
     
     # Create co-occurrence matrix
     print("\nCreating co-occurrence matrix...")
-    cooccurrence_df = create_cooccurrence_matrix(df)
+    cooccurrence_df = totals.cooccurrence_matrix()
     print("\nCo-occurrence Matrix (CE Areas vs AI Technologies):")
     print(cooccurrence_df)
     
@@ -476,11 +654,11 @@ def main():
     
     # Bar chart for CE areas
     bar_chart_path = RESULTS_DIR / "bar_chart_ce_areas.png"
-    create_bar_chart(df, bar_chart_path)
+    create_bar_chart(totals.ce_counts, bar_chart_path)
     
     # Bar chart for AI technologies
     ai_chart_path = RESULTS_DIR / "bar_chart_ai_technologies.png"
-    create_ai_tech_chart(df, ai_chart_path)
+    create_ai_tech_chart(totals.ai_counts, ai_chart_path)
     
     # Print summary statistics
     print("\n" + "=" * 70)
@@ -488,36 +666,22 @@ def main():
     print("=" * 70)
     
     print("\nTop Civil Engineering Areas by Article Count:")
-    ce_summary = {}
-    for ce_area in CE_AREAS.keys():
-        count = df['ce_areas'].astype(str).str.contains(ce_area, na=False).sum()
-        ce_summary[ce_area] = count
-    
-    for area, count in sorted(ce_summary.items(), key=lambda x: x[1], reverse=True):
-        percentage = (count / len(df)) * 100
+    for area, count in totals.ce_counts.sort_values(ascending=False, kind='stable').items():
+        percentage = (count / totals.articles) * 100
         print(f"  {area}: {count} articles ({percentage:.1f}%)")
     
     print("\nTop AI Technologies by Article Count:")
-    ai_summary = {}
-    for ai_tech in AI_TECHNOLOGIES.keys():
-        count = df['ai_technologies'].astype(str).str.contains(ai_tech, na=False).sum()
-        ai_summary[ai_tech] = count
-    
-    for tech, count in sorted(ai_summary.items(), key=lambda x: x[1], reverse=True):
-        percentage = (count / len(df)) * 100
+    for tech, count in totals.ai_counts.sort_values(ascending=False, kind='stable').items():
+        percentage = (count / totals.articles) * 100
         print(f"  {tech}: {count} articles ({percentage:.1f}%)")
     
-    # Find most common combinations
+    # Find most common combinations (pairs of the co-occurrence matrix)
     print("\nTop 10 CE Area + AI Technology Combinations:")
-    combinations = {}
-    for idx, row in df.iterrows():
-        if row['is_classified']:
-            ce_areas = row['ce_areas'].split(', ') if row['ce_areas'] else []
-            ai_techs = row['ai_technologies'].split(', ') if row['ai_technologies'] else []
-            for ce in ce_areas:
-                for ai in ai_techs:
-                    combo = f"{ce} + {ai}"
-                    combinations[combo] = combinations.get(combo, 0) + 1
+    combinations = {
+        f"{ce} + {ai}": int(count)
+        for (ce, ai), count in cooccurrence_df.stack().items()
+        if count > 0
+    }
     
     for combo, count in sorted(combinations.items(), key=lambda x: x[1], reverse=True)[:10]:
         print(f"  {combo}: {count} articles")
@@ -526,7 +690,8 @@ def main():
     print("Analysis Complete!")
     print("=" * 70)
     print(f"\nOutput files saved to:")
-    print(f"  - Classified data: {OUTPUT_FILE}")
+    if not args.db:
+        print(f"  - Classified data: {OUTPUT_FILE}")
     print(f"  - Co-occurrence matrix: {cooccurrence_file}")
     print(f"  - Heatmap: {heatmap_path}")
     print(f"  - CE Areas bar chart: {bar_chart_path}")
@@ -11,21 +11,33 @@ from typing import List, Dict
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from database.db_config import get_db_cursor, test_connection
+from database.db_config import BatchWriter, get_db_cursor, test_connection
 from scripts.llm_api import get_classifier
+from scripts.near_duplicates import NearDuplicateIndex
+from scripts.url_index import ensure_canonical_urls
 
 SCRIPT_DIR = Path(__file__).parent.resolve()
 PROJECT_ROOT = SCRIPT_DIR.parent
 
 
 def get_unclassified_articles(limit: int = None) -> List[Dict]:
-    """Get articles that haven't been classified yet."""
+    """Get articles that haven't been classified yet (one copy per canonical URL and story)."""
+    ensure_canonical_urls("articles")
+    NearDuplicateIndex.postgres("articles")  # creates articles_minhash if missing
     with get_db_cursor() as cur:
         query = """
             SELECT a.id, a.title, a.content, a.description, a.full_text, a.url
             FROM articles a
             LEFT JOIN classifications c ON a.id = c.article_id
             WHERE c.id IS NULL
+              AND NOT EXISTS (
+                  SELECT 1 FROM articles d
+                  WHERE d.canonical_url = a.canonical_url AND d.id < a.id
+              )
+              AND NOT EXISTS (
+                  SELECT 1 FROM articles_minhash m
+                  WHERE m.article_id = a.id AND m.cluster_id <> a.id
+              )
             ORDER BY a.created_at DESC
         """
         if limit:
@@ -35,27 +47,27 @@ def get_unclassified_articles(limit: int = None) -> List[Dict]:
         return cur.fetchall()
 
 
-def save_classification(article_id: int, classification: Dict):
-    """Save classification result to database."""
-    with get_db_cursor() as cur:
-        # Delete old classifications for this article
-        cur.execute("DELETE FROM classifications WHERE article_id = %s", (article_id,))
-        
-        # Insert new classification
-        cur.execute("""
-            INSERT INTO classifications 
-            (article_id, ce_areas, ai_technologies, classification_method, 
-             llm_model, confidence_score, raw_llm_response)
-            VALUES (%s, %s, %s, %s, %s, %s, %s::jsonb)
-        """, (
-            article_id,
-            classification['ce_areas'],
-            classification['ai_technologies'],
-            'llm',
-            classification.get('model', 'unknown'),
-            classification.get('confidence', 0.0),
-            classification.get('raw_response', '{}')
-        ))
+def save_classification(writer: BatchWriter, article_id: int, classification: Dict):
+    """Queue a classification result for the writer's next batch."""
+    # Replace old classifications for this article in one statement
+    writer.add("""
+        WITH deleted AS (
+            DELETE FROM classifications WHERE article_id = %s
+        )
+        INSERT INTO classifications 
+        (article_id, ce_areas, ai_technologies, classification_method, 
+         llm_model, confidence_score, raw_llm_response)
+        VALUES (%s, %s, %s, %s, %s, %s, %s::jsonb)
+    """, (
+        article_id,
+        article_id,
+        classification['ce_areas'],
+        classification['ai_technologies'],
+        'llm',
+        classification.get('model', 'unknown'),
+        classification.get('confidence', 0.0),
+        classification.get('raw_response', '{}')
+    ))
 
 
 def main():
@@ -107,31 +119,33 @@ def main():
     classified = 0
     failed = 0
     
-    for idx, article in enumerate(articles_to_classify, 1):
-        print(f"\n[{idx}/{len(articles_to_classify)}] Classifying: {article['title'][:60]}...")
-        
-        # Combine content fields
-        content = article.get('full_text') or article.get('content') or article.get('description') or ''
-        
-        try:
-            classification = classifier.classify_article(
-                title=article['title'],
-                content=content
-            )
-            
-            # Save to database
-            save_classification(article['id'], classification)
-            
-            print(f"  CE Areas: {', '.join(classification['ce_areas']) or 'None'}")
-            print(f"  AI Technologies: {', '.join(classification['ai_technologies']) or 'None'}")
-            print(f"  Confidence: {classification.get('confidence', 0.0):.2f}")
+    # Results are committed in batches rather than one transaction per article
+    with BatchWriter(flush_rows=50, flush_interval=30.0) as writer:
+        for idx, article in enumerate(articles_to_classify, 1):
+            print(f"\n[{idx}/{len(articles_to_classify)}] Classifying: {article['title'][:60]}...")
             
-            classified += 1
+            # Combine content fields
+            content = article.get('full_text') or article.get('content') or article.get('description') or ''
             
-        except Exception as e:
-            print(f"  ERROR: {e}")
-            failed += 1
-            continue
+            try:
+                classification = classifier.classify_article(
+                    title=article['title'],
+                    content=content
+                )
+                
+                # Save to database
+                save_classification(writer, article['id'], classification)
+                
+                print(f"  CE Areas: {', '.join(classification['ce_areas']) or 'None'}")
+                print(f"  AI Technologies: {', '.join(classification['ai_technologies']) or 'None'}")
+                print(f"  Confidence: {classification.get('confidence', 0.0):.2f}")
+                
+                classified += 1
+                
+            except Exception as e:
+                print(f"  ERROR: {e}")
+                failed += 1
+                continue
     
     print("\n" + "=" * 70)
     print(f"Classification complete!")
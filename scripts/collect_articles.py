@@ -15,18 +15,28 @@ import datetime as dt
 import pathlib
 import re
 import sqlite3
-from typing import Iterable, List, Optional, Tuple
+import sys
+from typing import List, Optional, Tuple
 
-import aiohttp
 import feedparser
 import trafilatura
 
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+from scripts.http_client import HttpClient  # noqa: E402
+from scripts.keyword_matcher import contains_any_keyword  # noqa: E402
+from scripts.near_duplicates import NearDuplicateIndex, minhash_signature  # noqa: E402
+from scripts.response_cache import ResponseCache  # noqa: E402
+from scripts.url_canonical import resolve_canonical_url  # noqa: E402
+from scripts.url_index import SeenUrlIndex  # noqa: E402
 
 ROOT = pathlib.Path(__file__).resolve().parents[1]
 DATA_DIR = ROOT / "data"
 DB_PATH = DATA_DIR / "articles.sqlite"
 CSV_PATH = DATA_DIR / "articles.csv"
 
+USER_AGENT = "Mozilla/5.0 (CE49X scraper)"
+PER_HOST_LIMIT = 4  # Concurrent requests per domain
+
 # Expandable list of feeds focused on construction / civil / ConTech / AI.
 FEEDS: List[str] = [
     # Civil / ConTech news
@@ -89,7 +99,8 @@ def init_db() -> None:
             source TEXT,
             url TEXT UNIQUE,
             content TEXT,
-            retrieved_at TEXT
+            retrieved_at TEXT,
+            canonical_url TEXT
         );
         """
     )
@@ -97,24 +108,8 @@ def init_db() -> None:
     conn.close()
 
 
-def soft_match(text: str, keywords: Iterable[str]) -> bool:
-    """Return True if any keyword appears in text (case-insensitive)."""
-    lowered = text.lower()
-    return any(k in lowered for k in keywords)
-
-
-async def fetch_html(session: aiohttp.ClientSession, url: str) -> Optional[str]:
-    try:
-        async with session.get(
-            url,
-            timeout=aiohttp.ClientTimeout(total=25),
-            headers={"user-agent": "Mozilla/5.0 (CE49X scraper)"},
-        ) as resp:
-            if resp.status != 200:
-                return None
-            return await resp.text()
-    except Exception:
-        return None
+async def fetch_html(client: HttpClient, url: str) -> Optional[str]:
+    return await client.get_text(url)
 
 
 def normalize_source(url: str) -> str:
@@ -134,7 +129,7 @@ def parse_date(entry) -> str:
 
 
 async def process_entry(
-    session: aiohttp.ClientSession, entry, min_len: int
+    client: HttpClient, entry, min_len: int
 ) -> Optional[Tuple[str, str, str, str, str, str]]:
     url = entry.get("link")
     title = (entry.get("title") or "").strip()
@@ -143,10 +138,10 @@ async def process_entry(
         return None
 
     # Soft filter to stay on-topic.
-    if not (soft_match(title + " " + summary, AI_KEYWORDS) and soft_match(title + " " + summary, CE_KEYWORDS)):
+    if not (contains_any_keyword(title + " " + summary, AI_KEYWORDS) and contains_any_keyword(title + " " + summary, CE_KEYWORDS)):
         return None
 
-    html = await fetch_html(session, url)
+    html = await fetch_html(client, url)
     if not html:
         return None
 
@@ -163,37 +158,45 @@ async def process_entry(
 async def collect_articles(max_articles: int, min_len: int, concurrency: int) -> int:
     sem = asyncio.Semaphore(concurrency)
     conn = sqlite3.connect(DB_PATH)
-    seen_urls = set(
-        row[0] for row in conn.execute("SELECT url FROM articles").fetchall()
-    )
-
-    entries = []
-    for feed in FEEDS:
-        parsed = feedparser.parse(feed)
-        entries.extend(parsed.entries)
+    seen_urls = SeenUrlIndex.sqlite(conn, DB_PATH)
+    # Fetched pages are cached; their rel=canonical decides the canonical URL
+    cache = ResponseCache()
+    # Near-copies of stored stories are saved under the story's cluster id
+    near_dups = NearDuplicateIndex.sqlite(conn)
+
+    async with HttpClient(max_connections=concurrency, per_host=PER_HOST_LIMIT, timeout=25,
+                          user_agent=USER_AGENT, cache=cache) as client:
+        entries = []
+        feed_bodies = await asyncio.gather(*(client.get_bytes(feed, revalidate=True) for feed in FEEDS))
+        for body in feed_bodies:
+            if body:
+                entries.extend(feedparser.parse(body).entries)
 
-    async with aiohttp.ClientSession() as session:
         tasks = []
 
         async def run(entry):
             nonlocal conn
             async with sem:
-                row = await process_entry(session, entry, min_len)
+                row = await process_entry(client, entry, min_len)
                 if not row:
                     return
                 url = row[3]
                 if url in seen_urls:
                     return
+                signature = minhash_signature(f"{row[0]} {row[4]}")
+                near_copy = near_dups.find(signature)
                 try:
-                    conn.execute(
+                    cur = conn.execute(
                         """
                         INSERT OR IGNORE INTO articles
-                        (title, published_at, source, url, content, retrieved_at)
-                        VALUES (?, ?, ?, ?, ?, ?)
+                        (title, published_at, source, url, content, retrieved_at, canonical_url)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
                         """,
-                        row,
+                        (*row, resolve_canonical_url(url, cache=cache)),
                     )
                     conn.commit()
+                    if cur.rowcount:
+                        near_dups.add(cur.lastrowid, signature, cluster_id=near_copy[1] if near_copy else None)
                     seen_urls.add(url)
                 except sqlite3.Error:
                     # Ignore insertion errors; continue collecting.
@@ -206,6 +209,8 @@ async def collect_articles(max_articles: int, min_len: int, concurrency: int) ->
 
         await asyncio.gather(*tasks)
 
+    print(near_dups.summary())
+    cache.close()
     conn.close()
     return len(seen_urls)
 
@@ -4,7 +4,7 @@ Advanced pipeline to collect 500+ civil-engineering + AI articles.
 Features:
 - RSS feed harvesting (civil/ConTech + AI).
 - Optional Google News via SerpAPI (set SERPAPI_KEY env var).
-- Optional sitemap crawling for selected domains.
+- Incremental sitemap crawling for selected domains.
 - Full-text extraction with trafilatura.
 - SQLite storage + CSV export.
 
@@ -23,17 +23,30 @@ import os
 import pathlib
 import re
 import sqlite3
-import xml.etree.ElementTree as ET
-from typing import Iterable, List, Optional, Set, Tuple
+import sys
+from typing import Dict, List, Optional, Set, Tuple
 
-import aiohttp
-import feedparser
 import trafilatura
 
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+from scripts.feed_poller import FeedEntry, FeedPoller  # noqa: E402
+from scripts.http_client import HttpClient  # noqa: E402
+from scripts.keyword_matcher import contains_any_keyword  # noqa: E402
+from scripts.near_duplicates import NearDuplicateIndex, minhash_signature  # noqa: E402
+from scripts.response_cache import ResponseCache  # noqa: E402
+from scripts.sitemap_crawler import SitemapCrawler, SitemapEntry  # noqa: E402
+from scripts.url_canonical import resolve_canonical_url  # noqa: E402
+from scripts.url_index import SeenUrlIndex  # noqa: E402
+
 ROOT = pathlib.Path(__file__).resolve().parents[1]
 DATA_DIR = ROOT / "data"
 DB_PATH = DATA_DIR / "articles.sqlite"
 CSV_PATH = DATA_DIR / "articles.csv"
+# Seen feed entries of this collector (not shared with the PostgreSQL collector)
+FEED_STATE_PATH = DATA_DIR / "feed_state_advanced.sqlite"
+
+USER_AGENT = "Mozilla/5.0 (CE49X advanced scraper)"
+PER_HOST_LIMIT = 4  # Concurrent requests per domain
 
 # RSS feeds (extendable).
 FEEDS: List[str] = [
@@ -51,7 +64,7 @@ FEEDS: List[str] = [
     "https://www.mitre.org/rss/artificial-intelligence",
 ]
 
-# Domains to sitemap-scan (shallow).
+# Domains to sitemap-scan (incremental, see sitemap_crawler.py).
 SITEMAP_DOMAINS = [
     "www.enr.com",
     "www.constructiondive.com",
@@ -102,7 +115,8 @@ def init_db() -> None:
             source TEXT,
             url TEXT UNIQUE,
             content TEXT,
-            retrieved_at TEXT
+            retrieved_at TEXT,
+            canonical_url TEXT
         );
         """
     )
@@ -110,11 +124,6 @@ def init_db() -> None:
     conn.close()
 
 
-def soft_match(text: str, keywords: Iterable[str]) -> bool:
-    lowered = text.lower()
-    return any(k in lowered for k in keywords)
-
-
 def normalize_source(url: str) -> str:
     host = re.sub(r"^https?://(www\.)?", "", url).split("/")[0]
     return host
@@ -131,31 +140,30 @@ def parse_date(entry) -> str:
     return ""
 
 
-async def fetch_text(session: aiohttp.ClientSession, url: str, as_bytes: bool = False) -> Optional[str]:
-    try:
-        async with session.get(
-            url,
-            timeout=aiohttp.ClientTimeout(total=25),
-            headers={"user-agent": "Mozilla/5.0 (CE49X advanced scraper)"},
-        ) as resp:
-            if resp.status != 200:
-                return None
-            return await (resp.read() if as_bytes else resp.text())
-    except Exception:
-        return None
+async def fetch_text(client: HttpClient, url: str, as_bytes: bool = False) -> Optional[str]:
+    if as_bytes:
+        return await client.get_bytes(url)
+    return await client.get_text(url)
 
 
-async def process_entry(
-    session: aiohttp.ClientSession, entry, min_len: int
-) -> Optional[Tuple[str, str, str, str, str, str]]:
+def is_candidate(entry) -> bool:
+    """Feed entry with a link and title whose title/summary mention both AI and CE."""
     url = entry.get("link")
     title = (entry.get("title") or "").strip()
     summary = (entry.get("summary") or "").strip()
     if not url or not title:
+        return False
+    return contains_any_keyword(title + " " + summary, AI_KEYWORDS) and contains_any_keyword(title + " " + summary, CE_KEYWORDS)
+
+
+async def process_entry(
+    client: HttpClient, entry, min_len: int
+) -> Optional[Tuple[str, str, str, str, str, str]]:
+    if not is_candidate(entry):
         return None
-    if not (soft_match(title + " " + summary, AI_KEYWORDS) and soft_match(title + " " + summary, CE_KEYWORDS)):
-        return None
-    html = await fetch_text(session, url)
+    url = entry.get("link")
+    title = (entry.get("title") or "").strip()
+    html = await fetch_text(client, url)
     if not html:
         return None
     text = trafilatura.extract(html, url=url, include_comments=False)
@@ -167,51 +175,52 @@ async def process_entry(
     return (title, published_iso, source, url, text, retrieved)
 
 
-async def harvest_feeds(session: aiohttp.ClientSession, min_len: int, sem: asyncio.Semaphore) -> List[Tuple[str, str, str, str, str, str]]:
-    entries = []
-    for feed in FEEDS:
-        parsed = feedparser.parse(feed)
-        entries.extend(parsed.entries)
+async def harvest_feeds(
+    client: HttpClient, poller: FeedPoller, min_len: int, sem: asyncio.Semaphore
+) -> Tuple[List[Tuple[str, str, str, str, str, str]], Dict[str, FeedEntry]]:
+    """
+    Poll the feeds and extract the relevant new entries.
+
+    Entries rejected by the keyword filter are acknowledged right away; the
+    others stay unacknowledged (and come back on the next poll) until their
+    row is saved, so fetch failures and unsaved rows are retried.
+
+    Returns:
+        (rows, {row url: feed entry to acknowledge once the row is saved})
+    """
+    # Conditional polling: unchanged feeds cost a 304, and only unseen entries come back
+    entries = await poller.poll_once()
+    print(poller.summary())
+    poller.mark_seen(item for item in entries if not is_candidate(item[1]))
 
     tasks = []
     rows: List[Tuple[str, str, str, str, str, str]] = []
+    pending: Dict[str, FeedEntry] = {}
 
-    async def run(entry):
+    async def run(item: FeedEntry):
         async with sem:
-            row = await process_entry(session, entry, min_len)
+            row = await process_entry(client, item[1], min_len)
             if row:
                 rows.append(row)
+                pending[row[3]] = item
 
-    for entry in entries:
-        tasks.append(asyncio.create_task(run(entry)))
+    for item in entries:
+        if is_candidate(item[1]):
+            tasks.append(asyncio.create_task(run(item)))
     await asyncio.gather(*tasks)
-    return rows
-
-
-async def fetch_sitemap_urls(session: aiohttp.ClientSession, domain: str) -> Set[str]:
-    urls: Set[str] = set()
-    for candidate in (f"https://{domain}/sitemap.xml", f"https://{domain}/sitemap_index.xml"):
-        content = await fetch_text(session, candidate)
-        if not content:
-            continue
-        try:
-            root = ET.fromstring(content)
-        except ET.ParseError:
-            continue
-        for loc in root.iter():
-            if loc.tag.endswith("loc") and loc.text:
-                urls.add(loc.text.strip())
-        if urls:
-            break
-    return urls
+    return rows, pending
 
 
 async def process_url(
-    session: aiohttp.ClientSession, url: str, min_len: int
+    client: HttpClient, url: str, min_len: int
 ) -> Optional[Tuple[str, str, str, str, str, str]]:
-    html = await fetch_text(session, url)
+    html = await fetch_text(client, url)
     if not html:
         return None
+    return extract_row(url, html, min_len)
+
+
+def extract_row(url: str, html: str, min_len: int) -> Optional[Tuple[str, str, str, str, str, str]]:
     text = trafilatura.extract(html, url=url, include_comments=False)
     if not text or len(text) < min_len:
         return None
@@ -223,28 +232,47 @@ async def process_url(
     return (title, "", source, url, text, retrieved)
 
 
-async def harvest_sitemaps(session: aiohttp.ClientSession, min_len: int, sem: asyncio.Semaphore) -> List[Tuple[str, str, str, str, str, str]]:
-    rows: List[Tuple[str, str, str, str, str, str]] = []
-    url_candidates: Set[str] = set()
-    for domain in SITEMAP_DOMAINS:
-        urls = await fetch_sitemap_urls(session, domain)
-        url_candidates.update(urls)
+async def harvest_sitemaps(
+    client: HttpClient, crawler: SitemapCrawler, min_len: int, sem: asyncio.Semaphore, known_urls: Set[str]
+) -> Tuple[List[Tuple[str, str, str, str, str, str]], Dict[str, Tuple[str, SitemapEntry]]]:
+    """
+    Crawl the domains' sitemaps and extract the relevant new pages.
 
-    tasks = []
+    Pages rejected by the length or keyword filter are committed right away;
+    the others stay uncommitted (and come back on the next crawl) until their
+    row is saved, so fetch failures and unsaved rows are retried.
 
-    async def run(url: str):
+    Returns:
+        (rows, {row url: (domain, sitemap entry) to commit once the row is saved})
+    """
+    # Incremental: only URLs newer than each domain's lastmod watermark and not yet stored
+    rows: List[Tuple[str, str, str, str, str, str]] = []
+    pending: Dict[str, Tuple[str, SitemapEntry]] = {}
+
+    async def run(domain: str, entry: SitemapEntry, rejected: List[SitemapEntry]):
         async with sem:
-            row = await process_url(session, url, min_len)
-            if row and soft_match(row[0] + " " + row[4], AI_KEYWORDS) and soft_match(row[0] + " " + row[4], CE_KEYWORDS):
+            html = await fetch_text(client, entry[0])
+            if not html:
+                return
+            row = extract_row(entry[0], html, min_len)
+            if row and contains_any_keyword(row[0] + " " + row[4], AI_KEYWORDS) and contains_any_keyword(row[0] + " " + row[4], CE_KEYWORDS):
                 rows.append(row)
+                pending[row[3]] = (domain, entry)
+            else:
+                rejected.append(entry)
 
-    for url in list(url_candidates)[:800]:  # limit for politeness
-        tasks.append(asyncio.create_task(run(url)))
-    await asyncio.gather(*tasks)
-    return rows
+    async def crawl_domain(domain: str):
+        candidates = await crawler.crawl(domain, known_urls)
+        rejected: List[SitemapEntry] = []
+        await asyncio.gather(*(run(domain, entry, rejected) for entry in candidates))
+        crawler.commit(domain, rejected)
 
+    await asyncio.gather(*(crawl_domain(domain) for domain in SITEMAP_DOMAINS))
+    print(crawler.summary())
+    return rows, pending
 
-async def harvest_serpapi(session: aiohttp.ClientSession, min_len: int, sem: asyncio.Semaphore, queries: List[str]) -> List[Tuple[str, str, str, str, str, str]]:
+
+async def harvest_serpapi(client: HttpClient, min_len: int, sem: asyncio.Semaphore, queries: List[str]) -> List[Tuple[str, str, str, str, str, str]]:
     key = os.getenv("SERPAPI_KEY")
     if not key:
         return []
@@ -258,24 +286,20 @@ async def harvest_serpapi(session: aiohttp.ClientSession, min_len: int, sem: asy
             "hl": "en",
             "api_key": key,
         }
-        try:
-            async with session.get(url, params=params, timeout=20) as resp:
-                if resp.status != 200:
-                    continue
-                data = await resp.json()
-                for item in data.get("news_results", []):
-                    link = item.get("link")
-                    if link:
-                        serp_urls.add(link)
-        except Exception:
+        data = await client.get_json(url, params=params)
+        if not data:
             continue
+        for item in data.get("news_results", []):
+            link = item.get("link")
+            if link:
+                serp_urls.add(link)
 
     tasks = []
 
     async def run(url: str):
         async with sem:
-            row = await process_url(session, url, min_len)
-            if row and soft_match(row[0] + " " + row[4], AI_KEYWORDS) and soft_match(row[0] + " " + row[4], CE_KEYWORDS):
+            row = await process_url(client, url, min_len)
+            if row and contains_any_keyword(row[0] + " " + row[4], AI_KEYWORDS) and contains_any_keyword(row[0] + " " + row[4], CE_KEYWORDS):
                 rows.append(row)
 
     for url in list(serp_urls)[:400]:  # cap to avoid over-fetch
@@ -286,13 +310,20 @@ async def harvest_serpapi(session: aiohttp.ClientSession, min_len: int, sem: asy
 
 async def collect_all(max_articles: int, min_len: int, concurrency: int, use_serpapi: bool) -> int:
     conn = sqlite3.connect(DB_PATH)
-    seen = {row[0] for row in conn.execute("SELECT url FROM articles")}
+    seen = SeenUrlIndex.sqlite(conn, DB_PATH)
+    # Fetched pages are cached; their rel=canonical decides the canonical URL
+    cache = ResponseCache()
+    # Near-copies of stored stories are saved under the story's cluster id
+    near_dups = NearDuplicateIndex.sqlite(conn)
 
     sem = asyncio.Semaphore(concurrency)
-    async with aiohttp.ClientSession() as session:
+    async with HttpClient(max_connections=concurrency, per_host=PER_HOST_LIMIT, timeout=25,
+                          user_agent=USER_AGENT, cache=cache) as client:
         # Parallel harvesting
-        feed_task = asyncio.create_task(harvest_feeds(session, min_len, sem))
-        sitemap_task = asyncio.create_task(harvest_sitemaps(session, min_len, sem))
+        poller = FeedPoller(FEEDS, client, state_path=FEED_STATE_PATH)
+        crawler = SitemapCrawler(client)
+        feed_task = asyncio.create_task(harvest_feeds(client, poller, min_len, sem))
+        sitemap_task = asyncio.create_task(harvest_sitemaps(client, crawler, min_len, sem, seen))
 
         serp_task = None
         serp_queries = [
@@ -301,37 +332,60 @@ async def collect_all(max_articles: int, min_len: int, concurrency: int, use_ser
             '(BIM OR "building information modeling") AND AI',
         ]
         if use_serpapi and os.getenv("SERPAPI_KEY"):
-            serp_task = asyncio.create_task(harvest_serpapi(session, min_len, sem, serp_queries))
+            serp_task = asyncio.create_task(harvest_serpapi(client, min_len, sem, serp_queries))
 
-        rows = []
-        rows.extend(await feed_task)
-        rows.extend(await sitemap_task)
+        rows, pending = await feed_task
+        sitemap_rows, sitemap_pending = await sitemap_task
+        rows.extend(sitemap_rows)
         if serp_task:
             rows.extend(await serp_task)
+        print(client.summary())
 
     # Insert with dedupe
     inserted = 0
+    stored: Set[str] = set()  # URLs of rows that are in the database now
     for row in rows:
         url = row[3]
         if url in seen:
+            stored.add(url)
             continue
+        signature = minhash_signature(f"{row[0]} {row[4]}")
+        near_copy = near_dups.find(signature)
         try:
-            conn.execute(
+            cur = conn.execute(
                 """
                 INSERT OR IGNORE INTO articles
-                (title, published_at, source, url, content, retrieved_at)
-                VALUES (?, ?, ?, ?, ?, ?)
+                (title, published_at, source, url, content, retrieved_at, canonical_url)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
                 """,
-                row,
+                (*row, resolve_canonical_url(url, cache=cache)),
             )
             conn.commit()
+            if cur.rowcount:
+                near_dups.add(cur.lastrowid, signature, cluster_id=near_copy[1] if near_copy else None)
             seen.add(url)
+            stored.add(url)
             inserted += 1
             if len(seen) >= max_articles:
                 break
         except sqlite3.Error:
             continue
 
+    # Only feed entries whose article is stored are never polled again
+    poller.mark_seen(pending[url] for url in stored if url in pending)
+    poller.close()
+    # Likewise, sitemap pages are committed (and pass the watermark) once stored
+    saved: Dict[str, List[SitemapEntry]] = {}
+    for url in stored:
+        if url in sitemap_pending:
+            domain, entry = sitemap_pending[url]
+            saved.setdefault(domain, []).append(entry)
+    for domain, entries in saved.items():
+        crawler.commit(domain, entries)
+    crawler.close()
+
+    print(near_dups.summary())
+    cache.close()
     conn.close()
     return len(seen)
 
@@ -10,19 +10,31 @@ import os
 import pathlib
 import re
 import sys
-from typing import Iterable, List, Optional, Set, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 
 # Add parent directory to path
 sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
 
 from database.db_config import get_db_cursor, test_connection
+from scripts.collection_engine import run_blocking
+from scripts.feed_poller import FeedEntry, FeedPoller
+from scripts.http_client import HttpClient
+from scripts.keyword_matcher import contains_any_keyword
+from scripts.near_duplicates import NearDuplicateIndex, minhash_signature
+from scripts.response_cache import ResponseCache
+from scripts.url_canonical import resolve_canonical_url
+from scripts.url_index import SeenUrlIndex
 
-import aiohttp
-import feedparser
 import trafilatura
 
 ROOT = pathlib.Path(__file__).resolve().parents[1]
 
+# Seen feed entries of this collector (not shared with the CSV collector)
+FEED_STATE_PATH = ROOT / "data" / "feed_state_db.sqlite"
+
+USER_AGENT = "Mozilla/5.0 (CE49X advanced scraper)"
+PER_HOST_LIMIT = 4  # Concurrent requests per domain
+
 # RSS feeds
 FEEDS: List[str] = [
     "https://www.enr.com/rss/articles",
@@ -60,11 +72,6 @@ CE_KEYWORDS = [
 ]
 
 
-def soft_match(text: str, keywords: Iterable[str]) -> bool:
-    lowered = text.lower()
-    return any(k in lowered for k in keywords)
-
-
 def normalize_source(url: str) -> str:
     host = re.sub(r"^https?://(www\.)?", "", url).split("/")[0]
     return host
@@ -81,31 +88,30 @@ def parse_date(entry) -> str:
     return ""
 
 
-async def fetch_text(session: aiohttp.ClientSession, url: str, as_bytes: bool = False) -> Optional[str]:
-    try:
-        async with session.get(
-            url,
-            timeout=aiohttp.ClientTimeout(total=25),
-            headers={"user-agent": "Mozilla/5.0 (CE49X advanced scraper)"},
-        ) as resp:
-            if resp.status != 200:
-                return None
-            return await (resp.read() if as_bytes else resp.text())
-    except Exception:
-        return None
+async def fetch_text(client: HttpClient, url: str, as_bytes: bool = False) -> Optional[str]:
+    if as_bytes:
+        return await client.get_bytes(url)
+    return await client.get_text(url)
 
 
-async def process_entry(
-    session: aiohttp.ClientSession, entry, min_len: int
-) -> Optional[Tuple[str, str, str, str, str, str]]:
+def is_candidate(entry) -> bool:
+    """Feed entry with a link and title whose title/summary mention both AI and CE."""
     url = entry.get("link")
     title = (entry.get("title") or "").strip()
     summary = (entry.get("summary") or "").strip()
     if not url or not title:
+        return False
+    return contains_any_keyword(title + " " + summary, AI_KEYWORDS) and contains_any_keyword(title + " " + summary, CE_KEYWORDS)
+
+
+async def process_entry(
+    client: HttpClient, entry, min_len: int
+) -> Optional[Tuple[str, str, str, str, str, str]]:
+    if not is_candidate(entry):
         return None
-    if not (soft_match(title + " " + summary, AI_KEYWORDS) and soft_match(title + " " + summary, CE_KEYWORDS)):
-        return None
-    html = await fetch_text(session, url)
+    url = entry.get("link")
+    title = (entry.get("title") or "").strip()
+    html = await fetch_text(client, url)
     if not html:
         return None
     text = trafilatura.extract(html, url=url, include_comments=False)
@@ -117,53 +123,82 @@ async def process_entry(
     return (title, published_iso, source, url, text, retrieved)
 
 
-async def harvest_feeds(session: aiohttp.ClientSession, min_len: int, sem: asyncio.Semaphore) -> List[Tuple[str, str, str, str, str, str]]:
-    entries = []
-    for feed in FEEDS:
-        parsed = feedparser.parse(feed)
-        entries.extend(parsed.entries)
+async def harvest_feeds(
+    client: HttpClient, poller: FeedPoller, min_len: int, sem: asyncio.Semaphore
+) -> Tuple[List[Tuple[str, str, str, str, str, str]], Dict[str, FeedEntry]]:
+    """
+    Poll the feeds and extract the relevant new entries.
+
+    Entries rejected by the keyword filter are acknowledged right away; the
+    others stay unacknowledged (and come back on the next poll) until their
+    row is saved, so fetch failures and unsaved rows are retried.
+
+    Returns:
+        (rows, {row url: feed entry to acknowledge once the row is saved})
+    """
+    # Conditional polling: unchanged feeds cost a 304, and only unseen entries come back
+    entries = await poller.poll_once()
+    print(poller.summary())
+    poller.mark_seen(item for item in entries if not is_candidate(item[1]))
 
     tasks = []
     rows: List[Tuple[str, str, str, str, str, str]] = []
+    pending: Dict[str, FeedEntry] = {}
 
-    async def run(entry):
+    async def run(item: FeedEntry):
         async with sem:
-            row = await process_entry(session, entry, min_len)
+            row = await process_entry(client, item[1], min_len)
             if row:
                 rows.append(row)
+                pending[row[3]] = item
 
-    for entry in entries:
-        tasks.append(asyncio.create_task(run(entry)))
+    for item in entries:
+        if is_candidate(item[1]):
+            tasks.append(asyncio.create_task(run(item)))
     await asyncio.gather(*tasks)
-    return rows
+    return rows, pending
 
 
-def save_to_db(rows: List[Tuple[str, str, str, str, str, str]], max_articles: int) -> int:
-    """Save articles to PostgreSQL database."""
+def save_to_db(rows: List[Tuple[str, str, str, str, str, str]], max_articles: int) -> Tuple[int, Set[str]]:
+    """
+    Save articles to PostgreSQL database.
+    
+    Returns:
+        (inserted rows, URLs of the rows that are stored now: inserted or
+        already in the database)
+    """
     if not test_connection():
         print("ERROR: Cannot connect to PostgreSQL database.")
-        return 0
+        return 0, set()
     
     inserted = 0
     skipped = 0
+    stored: Set[str] = set()
+    
+    # Fingerprint index of the stored URLs
+    seen = SeenUrlIndex.postgres("articles")
+    # Harvested pages are cached; their rel=canonical decides the canonical URL
+    cache = ResponseCache()
+    # Near-copies of stored stories are saved under the story's cluster id
+    near_dups = NearDuplicateIndex.postgres("articles")
     
     with get_db_cursor() as cur:
-        # Get existing URLs
-        cur.execute("SELECT url FROM articles")
-        seen = {row['url'] for row in cur.fetchall()}
-        
         for row in rows:
             title, published_at, source, url, content, retrieved_at = row
             
             if url in seen:
                 skipped += 1
+                stored.add(url)
                 continue
             
+            signature = minhash_signature(f"{title} {content}")
+            near_copy = near_dups.find(signature)
+            
             try:
                 cur.execute("""
                     INSERT INTO articles
-                    (title, published_at, source, url, content, retrieved_at)
-                    VALUES (%s, %s, %s, %s, %s, %s)
+                    (title, published_at, source, url, canonical_url, content, retrieved_at)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
                     ON CONFLICT (url) DO NOTHING
                     RETURNING id
                 """, (
@@ -171,13 +206,17 @@ def save_to_db(rows: List[Tuple[str, str, str, str, str, str]], max_articles: in
                     published_at if published_at else None,
                     source,
                     url,
+                    resolve_canonical_url(url, cache=cache),
                     content,
                     retrieved_at
                 ))
                 
-                if cur.fetchone():
+                result = cur.fetchone()
+                stored.add(url)
+                if result:
                     inserted += 1
                     seen.add(url)
+                    near_dups.add(result['id'], signature, cluster_id=near_copy[1] if near_copy else None)
                     
                     if len(seen) >= max_articles:
                         break
@@ -187,24 +226,39 @@ def save_to_db(rows: List[Tuple[str, str, str, str, str, str]], max_articles: in
                 skipped += 1
                 continue
     
-    return inserted
+    print(near_dups.summary())
+    cache.close()
+    return inserted, stored
+
+
+def count_articles() -> int:
+    """Number of articles in the database."""
+    with get_db_cursor() as cur:
+        cur.execute("SELECT COUNT(*) AS count FROM articles")
+        return cur.fetchone()['count']
 
 
 async def collect_all(max_articles: int, min_len: int, concurrency: int) -> int:
     """Collect articles from all sources."""
     sem = asyncio.Semaphore(concurrency)
     
-    async with aiohttp.ClientSession() as session:
-        feed_task = asyncio.create_task(harvest_feeds(session, min_len, sem))
-        rows = await feed_task
-    
-    inserted = save_to_db(rows, max_articles)
-    
-    with get_db_cursor() as cur:
-        cur.execute("SELECT COUNT(*) as count FROM articles")
-        total = cur.fetchone()['count']
+    async with HttpClient(max_connections=concurrency, per_host=PER_HOST_LIMIT, timeout=25,
+                          user_agent=USER_AGENT, cache=ResponseCache()) as client:
+        poller = FeedPoller(FEEDS, client, state_path=FEED_STATE_PATH)
+        try:
+            feed_task = asyncio.create_task(harvest_feeds(client, poller, min_len, sem))
+            rows, pending = await feed_task
+            print(client.summary())
+            
+            # Blocking psycopg2 writes run on a thread-pool worker (the pool is thread-safe)
+            inserted, stored = await run_blocking(save_to_db, rows, max_articles)
+            print(f"Inserted {inserted} new articles")
+            # Only entries whose article is stored are never polled again
+            poller.mark_seen(pending[url] for url in stored if url in pending)
+        finally:
+            poller.close()
     
-    return total
+    return await run_blocking(count_articles)
 
 
 def main():
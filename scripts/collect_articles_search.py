@@ -29,17 +29,27 @@ import os
 import pathlib
 import re
 import sqlite3
-from typing import Iterable, List, Optional, Set, Tuple
+import sys
+from typing import List, Optional, Set, Tuple
 
-import aiohttp
 import trafilatura
 
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+from scripts.http_client import HttpClient  # noqa: E402
+from scripts.keyword_matcher import contains_any_keyword  # noqa: E402
+from scripts.near_duplicates import NearDuplicateIndex, minhash_signature  # noqa: E402
+from scripts.response_cache import ResponseCache  # noqa: E402
+from scripts.url_canonical import resolve_canonical_url  # noqa: E402
+from scripts.url_index import SeenUrlIndex  # noqa: E402
 
 ROOT = pathlib.Path(__file__).resolve().parents[1]
 DATA_DIR = ROOT / "data"
 DB_PATH = DATA_DIR / "articles.sqlite"
 CSV_PATH = DATA_DIR / "articles.csv"
 
+USER_AGENT = "Mozilla/5.0 (CE49X search scraper)"
+PER_HOST_LIMIT = 4  # Concurrent requests per domain
+
 AI_KEYWORDS = [
     "artificial intelligence",
     "machine learning",
@@ -89,7 +99,8 @@ def init_db() -> None:
             source TEXT,
             url TEXT UNIQUE,
             content TEXT,
-            retrieved_at TEXT
+            retrieved_at TEXT,
+            canonical_url TEXT
         );
         """
     )
@@ -97,34 +108,19 @@ def init_db() -> None:
     conn.close()
 
 
-def soft_match(text: str, keywords: Iterable[str]) -> bool:
-    lowered = text.lower()
-    return any(k in lowered for k in keywords)
-
-
 def normalize_source(url: str) -> str:
     host = re.sub(r"^https?://(www\.)?", "", url).split("/")[0]
     return host
 
 
-async def fetch_text(session: aiohttp.ClientSession, url: str) -> Optional[str]:
-    try:
-        async with session.get(
-            url,
-            timeout=aiohttp.ClientTimeout(total=25),
-            headers={"user-agent": "Mozilla/5.0 (CE49X search scraper)"},
-        ) as resp:
-            if resp.status != 200:
-                return None
-            return await resp.text()
-    except Exception:
-        return None
+async def fetch_text(client: HttpClient, url: str) -> Optional[str]:
+    return await client.get_text(url)
 
 
 async def process_url(
-    session: aiohttp.ClientSession, url: str, min_len: int, enforce_topic: bool
+    client: HttpClient, url: str, min_len: int, enforce_topic: bool
 ) -> Optional[Tuple[str, str, str, str, str, str]]:
-    html = await fetch_text(session, url)
+    html = await fetch_text(client, url)
     if not html:
         return None
     text = trafilatura.extract(html, url=url, include_comments=False)
@@ -136,12 +132,12 @@ async def process_url(
     source = normalize_source(url)
     retrieved = dt.datetime.utcnow().isoformat()
     # Soft topic filter to stay on theme; can be disabled.
-    if enforce_topic and not (soft_match(title + " " + text, AI_KEYWORDS) and soft_match(title + " " + text, CE_KEYWORDS)):
+    if enforce_topic and not (contains_any_keyword(title + " " + text, AI_KEYWORDS) and contains_any_keyword(title + " " + text, CE_KEYWORDS)):
         return None
     return (title, "", source, url, text, retrieved)
 
 
-async def harvest_serpapi(session: aiohttp.ClientSession, sem: asyncio.Semaphore) -> Set[str]:
+async def harvest_serpapi(client: HttpClient) -> Set[str]:
     key = os.getenv("SERPAPI_KEY")
     if not key:
         return set()
@@ -153,21 +149,17 @@ async def harvest_serpapi(session: aiohttp.ClientSession, sem: asyncio.Semaphore
             "hl": "en",
             "api_key": key,
         }
-        try:
-            async with sem, session.get("https://serpapi.com/search", params=params, timeout=20) as resp:
-                if resp.status != 200:
-                    continue
-                data = await resp.json()
-                for item in data.get("news_results", []):
-                    link = item.get("link")
-                    if link:
-                        urls.add(link)
-        except Exception:
+        data = await client.get_json("https://serpapi.com/search", params=params)
+        if not data:
             continue
+        for item in data.get("news_results", []):
+            link = item.get("link")
+            if link:
+                urls.add(link)
     return urls
 
 
-async def harvest_gdelt(session: aiohttp.ClientSession, sem: asyncio.Semaphore) -> Set[str]:
+async def harvest_gdelt(client: HttpClient) -> Set[str]:
     # Using the documents API; limited to maxrecords per call.
     urls: Set[str] = set()
     for q in SEARCH_QUERIES:
@@ -177,21 +169,17 @@ async def harvest_gdelt(session: aiohttp.ClientSession, sem: asyncio.Semaphore)
             "format": "json",
             "timespan": "90days",
         }
-        try:
-            async with sem, session.get("https://api.gdeltproject.org/api/v2/doc/doc", params=params, timeout=20) as resp:
-                if resp.status != 200:
-                    continue
-                data = await resp.json()
-                for item in data.get("articles", []):
-                    link = item.get("url")
-                    if link:
-                        urls.add(link)
-        except Exception:
+        data = await client.get_json("https://api.gdeltproject.org/api/v2/doc/doc", params=params)
+        if not data:
             continue
+        for item in data.get("articles", []):
+            link = item.get("url")
+            if link:
+                urls.add(link)
     return urls
 
 
-async def harvest_newsapi(session: aiohttp.ClientSession, sem: asyncio.Semaphore, key: Optional[str]) -> Set[str]:
+async def harvest_newsapi(client: HttpClient, key: Optional[str]) -> Set[str]:
     # NewsAPI limits: everything endpoint allows up to 100 results per request, 30-day window.
     if not key:
         return set()
@@ -206,17 +194,13 @@ async def harvest_newsapi(session: aiohttp.ClientSession, sem: asyncio.Semaphore
             "pageSize": 100,
             "apiKey": key,
         }
-        try:
-            async with sem, session.get("https://newsapi.org/v2/everything", params=params, timeout=20) as resp:
-                if resp.status != 200:
-                    continue
-                data = await resp.json()
-                for item in data.get("articles", []):
-                    link = item.get("url")
-                    if link:
-                        urls.add(link)
-        except Exception:
+        data = await client.get_json("https://newsapi.org/v2/everything", params=params)
+        if not data:
             continue
+        for item in data.get("articles", []):
+            link = item.get("url")
+            if link:
+                urls.add(link)
     return urls
 
 
@@ -231,23 +215,28 @@ async def collect_all(
     concurrency: int,
 ) -> int:
     conn = sqlite3.connect(DB_PATH)
-    seen = {row[0] for row in conn.execute("SELECT url FROM articles")}
+    seen = SeenUrlIndex.sqlite(conn, DB_PATH)
+    # Fetched pages are cached; their rel=canonical decides the canonical URL
+    cache = ResponseCache()
+    # Near-copies of stored stories are saved under the story's cluster id
+    near_dups = NearDuplicateIndex.sqlite(conn)
 
     sem = asyncio.Semaphore(concurrency)
-    async with aiohttp.ClientSession() as session:
+    async with HttpClient(max_connections=concurrency, per_host=PER_HOST_LIMIT, timeout=25,
+                          user_agent=USER_AGENT, cache=cache) as client:
         url_candidates: Set[str] = set()
         tasks = []
         labels: List[str] = []
 
         if use_serpapi:
-            tasks.append(asyncio.create_task(harvest_serpapi(session, sem)))
+            tasks.append(asyncio.create_task(harvest_serpapi(client)))
             labels.append("serpapi")
         if use_gdelt:
-            tasks.append(asyncio.create_task(harvest_gdelt(session, sem)))
+            tasks.append(asyncio.create_task(harvest_gdelt(client)))
             labels.append("gdelt")
         if use_newsapi:
             key = newsapi_key or os.getenv("NEWSAPI_KEY")
-            tasks.append(asyncio.create_task(harvest_newsapi(session, sem, key)))
+            tasks.append(asyncio.create_task(harvest_newsapi(client, key)))
             labels.append("newsapi")
 
         if tasks:
@@ -265,7 +254,7 @@ async def collect_all(
 
         async def run(url: str):
             async with sem:
-                row = await process_url(session, url, min_len, enforce_topic)
+                row = await process_url(client, url, min_len, enforce_topic)
                 if row:
                     rows.append(row)
 
@@ -275,22 +264,27 @@ async def collect_all(
             process_tasks.append(asyncio.create_task(run(url)))
 
         await asyncio.gather(*process_tasks)
+        print(client.summary())
 
     inserted = 0
     for row in rows:
         url = row[3]
         if url in seen:
             continue
+        signature = minhash_signature(f"{row[0]} {row[4]}")
+        near_copy = near_dups.find(signature)
         try:
-            conn.execute(
+            cur = conn.execute(
                 """
                 INSERT OR IGNORE INTO articles
-                (title, published_at, source, url, content, retrieved_at)
-                VALUES (?, ?, ?, ?, ?, ?)
+                (title, published_at, source, url, content, retrieved_at, canonical_url)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
                 """,
-                row,
+                (*row, resolve_canonical_url(url, cache=cache)),
             )
             conn.commit()
+            if cur.rowcount:
+                near_dups.add(cur.lastrowid, signature, cluster_id=near_copy[1] if near_copy else None)
             seen.add(url)
             inserted += 1
             if len(seen) >= max_articles:
@@ -298,6 +292,8 @@ async def collect_all(
         except sqlite3.Error:
             continue
 
+    print(near_dups.summary())
+    cache.close()
     conn.close()
     return len(seen)
 
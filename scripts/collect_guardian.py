@@ -8,6 +8,7 @@ Strict filtreleme ile sadece relevant makaleleri CSV'ye kaydeder (API limit koru
 Requirements:
 - Python 3.8+
 - requests library
+- aiohttp library (concurrent API collection)
 - trafilatura library (full text için)
 - pandas library (CSV için)
 - Valid Guardian API key (get one free at https://open-platform.theguardian.com/)
@@ -21,9 +22,10 @@ Make sure to set your GUARDIAN_API_KEY environment variable or add it to the scr
 import os
 import sys
 import re
+import html
+import asyncio
 from datetime import datetime, timedelta
 from typing import List, Dict, Set, Tuple, Optional
-import time
 from pathlib import Path
 
 # Add parent directory to path for database imports
@@ -31,21 +33,21 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 # Check and import required libraries
 try:
-    import requests
+    from scripts.collection_engine import CollectionEngine
+    from scripts.extraction_pipeline import ExtractionPipeline
+    from scripts.http_client import HttpClient
+    from scripts.keyword_matcher import find_keywords
+    from scripts.query_planner import QueryPlanner
+    from scripts.response_cache import ResponseCache
+    from scripts.run_journal import RunJournal
 except ImportError:
-    print("ERROR: 'requests' library is not installed.")
-    print("Please install it using: pip install requests")
+    print("ERROR: 'aiohttp' library is not installed.")
+    print("Please install it using: pip install aiohttp")
     sys.exit(1)
 
 try:
-    import trafilatura
-except ImportError:
-    print("ERROR: 'trafilatura' library is not installed.")
-    print("Please install it using: pip install trafilatura")
-    sys.exit(1)
-
-try:
-    from database.db_config import get_db_cursor, test_connection
+    from database.db_config import test_connection
+    from scripts.url_index import SeenUrlIndex
 except ImportError:
     print("ERROR: Database module not found.")
     print("Make sure you're running from the project root directory.")
@@ -68,13 +70,18 @@ PROJECT_ROOT = SCRIPT_DIR.parent
 
 # Guardian API key - can also be set via environment variable GUARDIAN_API_KEY
 API_KEY = os.getenv("GUARDIAN_API_KEY", "bd0dc9a2-498e-4afa-b22f-2cf296eb144a")
+# Extra keys (comma-separated GUARDIAN_API_KEYS) add their own daily budget
+API_KEYS = [key.strip() for key in os.getenv("GUARDIAN_API_KEYS", "").split(",") if key.strip()] or [API_KEY]
 
 # Guardian Open Platform API endpoint
 GUARDIAN_URL = "https://content.guardianapis.com/search"
 
 # Search parameters
-MAX_PAGES = 10  # Limit pages to save API quota (Guardian API returns 10 articles per page)
-REQUEST_DELAY = 1.2  # Delay between requests (Guardian: 1 call/second, so 1.2s to be safe)
+MAX_PAGES = 2  # Deepest page the query planner may allocate (2 x 50 = first 100 results per query)
+PAGE_SIZE = 50  # Articles per page (Guardian API maximum)
+REQUESTS_PER_SECOND = 1.0  # Guardian free tier: 1 call/second, 500 calls/day
+MAX_REQUESTS_PER_DAY = 500  # Daily quota per API key
+MAX_PARALLEL_QUERIES = 4  # Queries paginated concurrently (rate is still bounded by the quota)
 
 # ============================================================================
 # KEYWORD DEFINITIONS (same as other collectors)
@@ -219,65 +226,77 @@ def create_search_queries() -> List[str]:
     return unique_queries
 
 
-def fetch_articles_page(query: str, page: int, from_date: str, to_date: str, api_key: str) -> Dict:
+async def fetch_articles_page(
+    engine: CollectionEngine,
+    planner: QueryPlanner,
+    query: str,
+    page: int,
+    from_date: str,
+    to_date: str
+) -> Optional[Dict]:
     """
-    Fetch a single page of articles from Guardian API.
+    Fetch a single page of articles from Guardian API through the collection engine.
+    
+    The API key is drawn from the query planner only if the request is not
+    served from cache.
     
     Args:
+        engine: Rate-limited collection engine for Guardian
+        planner: Query planner handing out API keys within the daily budget
         query: Search query string
         page: Page number (1-indexed for Guardian)
         from_date: Start date in YYYY-MM-DD format
         to_date: End date in YYYY-MM-DD format
-        api_key: Guardian API key
         
     Returns:
-        JSON response from Guardian API as a dictionary
+        JSON response from Guardian API as a dictionary, {"rate_limit": True}
+        when the rate limit is hit on every key, or None on error
     """
     params = {
         "q": query,
         "from-date": from_date,
         "to-date": to_date,
         "page": page,
-        "page-size": 10,  # Guardian API default is 10, max is 50
-        "api-key": api_key,
-        "show-fields": "headline,trailText,body",  # Get headline, summary, and body
+        "page-size": PAGE_SIZE,
+        "show-fields": "headline,trailText,bodyText",  # Headline, summary and plain-text body
         "order-by": "newest"  # Sort by newest first
     }
-    
-    try:
-        response = requests.get(GUARDIAN_URL, params=params, timeout=30)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        if hasattr(e, 'response') and e.response is not None:
-            if e.response.status_code == 429:
-                print(f"    [RATE LIMIT] Guardian API rate limit reached!")
-                print(f"    [INFO] Guardian free tier: 500 calls/day, 1 call/second")
-                return {"rate_limit": True}
-            try:
-                error_data = e.response.json()
-                print(f"    API Error: {error_data}")
-            except:
-                print(f"    HTTP Status: {e.response.status_code}")
-        else:
-            print(f"    Error fetching page {page} for query '{query}': {e}")
+    key_used = []
+    
+    def credentials() -> Optional[Dict[str, str]]:
+        grant = planner.acquire()
+        if grant is None:
+            return None
+        key_used.append(grant[0])
+        return {"api-key": grant[1]}
+    
+    status, data = await engine.get_json(GUARDIAN_URL, params, credentials)
+    if status is None:
+        if planner.remaining() <= 0:
+            if not engine.stopped:
+                print(f"    [RATE LIMIT] Günlük istek bütçesi doldu!")
+            engine.stop()
+            return {"rate_limit": True}
         return None
-
-
-def find_keywords_in_text(text: str, keywords: List[str]) -> List[str]:
-    """Find which keywords appear in the text (case-insensitive)."""
-    if not text:
-        return []
-    
-    text_lower = text.lower()
-    found = []
-    
-    for keyword in keywords:
-        keyword_lower = keyword.lower()
-        if keyword_lower in text_lower:
-            found.append(keyword)
-    
-    return list(set(found))  # Remove duplicates
+    if status == 200 and data is not None:
+        return data
+    
+    if status == 429:
+        if key_used:
+            # This key is rate limited for the day; retry with the next key if one is left
+            planner.exhaust(key_used[0])
+            if planner.remaining() > 0:
+                return await fetch_articles_page(engine, planner, query, page, from_date, to_date)
+        if not engine.stopped:
+            print(f"    [RATE LIMIT] Guardian API rate limit reached!")
+            print(f"    [INFO] Guardian free tier: 500 calls/day, 1 call/second")
+        engine.stop()
+        return {"rate_limit": True}
+    if data is not None:
+        print(f"    API Error: {data}")
+    else:
+        print(f"    HTTP Status: {status}")
+    return None
 
 
 def has_both_ai_and_ce(text: str) -> Tuple[bool, List[str], List[str]]:
@@ -295,27 +314,45 @@ def has_both_ai_and_ce(text: str) -> Tuple[bool, List[str], List[str]]:
         return (False, [], [])
     
     # Use only base keywords for filtering (not synonyms)
-    ai_found = find_keywords_in_text(text, AI_KEYWORDS)
-    ce_found = find_keywords_in_text(text, CE_KEYWORDS)
+    ai_found = find_keywords(text, AI_KEYWORDS)
+    ce_found = find_keywords(text, CE_KEYWORDS)
     
     has_both = len(ai_found) >= 1 and len(ce_found) >= 1
     
     return (has_both, ai_found, ce_found)
 
 
-def fetch_full_text(url: str) -> Optional[str]:
-    """Fetch full text content from article URL using trafilatura."""
-    try:
-        html = requests.get(
-            url,
-            timeout=30,
-            headers={"user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
-        ).text
+BATCH_SEPARATOR = "\x00"  # Never occurs in API text
+# A tag never spans the separator, so a stray "<" in one text and ">" in a
+# later one cannot swallow the texts between them
+HTML_TAG_RE = re.compile(r"<[^>\x00]+>")
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+def strip_html_batch(texts: List[str]) -> List[str]:
+    """
+    Strip HTML tags and entities from many texts in one pass.
+    
+    The texts are joined with a separator, cleaned with a single regex and
+    unescape pass over the joined string, then split back, instead of one
+    pass per field and article.
+    
+    Args:
+        texts: Texts that may contain HTML (trailText, headline, ...)
         
-        full_text = trafilatura.extract(html, url=url, include_comments=False)
-        return full_text
-    except Exception as e:
-        return None
+    Returns:
+        Plain texts in the same order (one per input text)
+    
+    Example (unmatched "<" and ">" in different texts):
+        >>> strip_html_batch(['Costs < budget for bridge', 'AI builds > 50 <b>homes</b>', 'x', 'y'])
+        ['Costs < budget for bridge', 'AI builds > 50 homes', 'x', 'y']
+    """
+    if not texts:
+        return []
+    joined = BATCH_SEPARATOR.join(text.replace(BATCH_SEPARATOR, " ") for text in texts)
+    joined = html.unescape(HTML_TAG_RE.sub(" ", joined))
+    joined = WHITESPACE_RE.sub(" ", joined)
+    return [text.strip() for text in joined.split(BATCH_SEPARATOR)]
 
 
 def extract_article_metadata(article: Dict) -> Dict:
@@ -331,8 +368,8 @@ def extract_article_metadata(article: Dict) -> Dict:
     fields = article.get("fields", {})
     
     title = fields.get("headline", article.get("webTitle", ""))
-    trail_text = fields.get("trailText", "")  # Summary/description
-    body = fields.get("body", "")  # Full text if available
+    trail_text = fields.get("trailText", "")  # Summary/description (may contain HTML)
+    body = fields.get("bodyText", "")  # Plain-text full text (empty for some content types)
     
     # Get publication date
     web_publication_date = article.get("webPublicationDate", "")
@@ -350,52 +387,113 @@ def extract_article_metadata(article: Dict) -> Dict:
         "source": source,
         "url": web_url,
         "description": trail_text,
-        "body": body  # Guardian API sometimes provides body text
+        "body": body  # Canonical full text; the page is only scraped without it
     }
 
 
-def collect_articles_for_query(
+async def collect_articles_for_query(
+    engine: CollectionEngine,
+    pipeline: ExtractionPipeline,
     query: str,
     from_date: str,
     to_date: str,
-    api_key: str,
+    planner: QueryPlanner,
     min_length: int = 800,
     existing_urls: Set[str] = None,
-    strict_filter: bool = True
+    strict_filter: bool = True,
+    max_pages: int = MAX_PAGES,
+    journal: Optional[RunJournal] = None
 ) -> List[Dict]:
     """
     Collect all articles for a given search query, handling pagination.
     
+    Pages are fetched in order and every page's share of new URLs is
+    reported to the query planner; paging stops once it falls below the
+    planner's novelty threshold. The API's bodyText field is the full text,
+    so article pages are only scraped (through the extraction pipeline) for
+    results that come without a body.
+    
     Args:
+        engine: Rate-limited collection engine for Guardian
+        pipeline: Full-text extraction pipeline
         query: Search query string
         from_date: Start date in YYYY-MM-DD format
         to_date: End date in YYYY-MM-DD format
-        api_key: Guardian API key
+        planner: Query planner (API keys, page yields)
         min_length: Minimum text length for articles
         existing_urls: Set of URLs already in database
         strict_filter: If True, both keywords must be in title/description
+        max_pages: Maximum pages to fetch for this query (planner allocation)
+        journal: Run journal; journaled pages are replayed instead of fetched
         
     Returns:
         List of article dictionaries with full text and keyword matches
+        (still growing until the pipeline has drained)
     """
     if existing_urls is None:
         existing_urls = set()
     
     articles = []
-    page = 1  # Guardian uses 1-indexed pages
-    total_results = None
     processed = 0
     filtered_out = 0
     
     print(f"  Collecting articles for query: '{query}'")
     
-    while page <= MAX_PAGES:
-        # Fetch one page
-        response_data = fetch_articles_page(query, page, from_date, to_date, api_key)
-        
-        if response_data is None:
-            break
-        
+    def accept(metadata: Dict, ai_found: List[str], ce_found: List[str]):
+        metadata['ai_keywords_found'] = ai_found
+        metadata['ce_keywords_found'] = ce_found
+        metadata['has_both'] = True
+        articles.append(metadata)
+        if journal is not None:
+            journal.record_article(query, metadata)
+        existing_urls.add(metadata['url'])
+    
+    def check_full_text(metadata: Dict, title_desc: str):
+        """Build the pipeline callback: keywords must be found with the full text."""
+        def on_text(full_text: Optional[str]):
+            nonlocal filtered_out
+            if not full_text:
+                filtered_out += 1
+                return
+            has_both, ai_found, ce_found = has_both_ai_and_ce(f"{title_desc} {full_text}".strip())
+            if not has_both or len(full_text) < min_length:
+                filtered_out += 1
+                return
+            metadata['full_text'] = full_text
+            accept(metadata, ai_found, ce_found)
+        return on_text
+    
+    def total_of(response_data: Dict) -> Optional[int]:
+        response_obj = response_data.get("response", {})
+        if response_obj.get("status") != "ok":
+            return None
+        total = response_obj.get("total", 0)
+        print(f"    Total results available: {total}")
+        planner.record_total(query, total)
+        return total
+    
+    def keep_paging(page: int, response_data: Dict) -> bool:
+        results = response_data.get("response", {}).get("results", [])
+        replayed = journal is not None and journal.replayed(query, page)
+        return planner.record_page(query, page - 1, [r.get("webUrl", "") for r in results], existing_urls,
+                                   replayed=replayed)
+    
+    def fetch_page(page: int):
+        fetch = lambda: fetch_articles_page(engine, planner, query, page, from_date, to_date)
+        if journal is None:
+            return fetch()
+        return journal.fetch_page(query, page, fetch)
+    
+    pages = await engine.fetch_pages(
+        fetch_page,
+        total_of,
+        first_page=1,  # Guardian uses 1-indexed pages
+        max_pages=max_pages,
+        page_size=PAGE_SIZE,
+        keep_paging=keep_paging
+    )
+    
+    for page, response_data in pages:
         # Check for rate limit
         if response_data.get("rate_limit"):
             break
@@ -407,11 +505,6 @@ def collect_articles_for_query(
             print(f"    API Error: {error_message}")
             break
         
-        # Get total results (only available on first page)
-        if total_results is None:
-            total_results = response_obj.get("total", 0)
-            print(f"    Total results available: {total_results}")
-        
         # Extract articles from this page
         page_articles = response_obj.get("results", [])
         
@@ -419,84 +512,134 @@ def collect_articles_for_query(
             print(f"    No more articles found (stopped at page {page})")
             break
         
+        # Extract metadata of the new articles, then strip HTML from all
+        # headlines and summaries of the page in one pass
+        page_metadata = [
+            extract_article_metadata(article) for article in page_articles
+            if article.get("webUrl") and article["webUrl"] not in existing_urls
+        ]
+        plain = strip_html_batch(
+            [m['title'] for m in page_metadata] + [m['description'] for m in page_metadata]
+        )
+        for i, metadata in enumerate(page_metadata):
+            metadata['title'] = plain[i]
+            metadata['description'] = plain[len(page_metadata) + i]
+        
         # Process each article
-        for article in page_articles:
-            url = article.get("webUrl", "")
-            if not url or url in existing_urls:
+        for metadata in page_metadata:
+            url = metadata['url']
+            if url in existing_urls:
                 continue
             
             processed += 1
             if processed % 10 == 0:
                 print(f"    Processed {processed} articles, found {len(articles)} valid, filtered {filtered_out}")
             
-            # Extract metadata
-            metadata = extract_article_metadata(article)
-            
-            # Combine title, description, and body for keyword checking
-            title_desc = f"{metadata['title']} {metadata.get('description', '')} {metadata.get('body', '')}".strip()
-            
-            # STRICT FILTERING: Check if title/description has both keywords (saves API calls)
-            has_both_title_desc, ai_found_title, ce_found_title = has_both_ai_and_ce(title_desc)
+            body = metadata.get('body', '')
+            title_desc = f"{metadata['title']} {metadata.get('description', '')}".strip()
             
-            if strict_filter:
-                # Strict mode: Both keywords must be in title/description/body
-                if not has_both_title_desc:
+            if not body:
+                # No body from the API: only now is the article page scraped
+                has_both_title_desc, _, _ = has_both_ai_and_ce(title_desc)
+                if strict_filter and not has_both_title_desc:
+                    # Strict mode: Both keywords must be in title/description
                     filtered_out += 1
                     continue
-                # If found in title/desc/body, use those keywords
-                ai_found = ai_found_title
-                ce_found = ce_found_title
-                combined_text = title_desc
-                metadata['full_text'] = metadata.get('body', '') or title_desc
-            else:
-                # Flexible mode: Check full text if not in title/desc
-                has_both = has_both_title_desc
-                ai_found = ai_found_title
-                ce_found = ce_found_title
-                combined_text = title_desc
-                
-                if not has_both:
-                    # Try fetching full text if available
-                    full_text = fetch_full_text(url)
-                    if full_text:
-                        combined_text = f"{combined_text} {full_text}".strip()
-                        has_both, ai_found, ce_found = has_both_ai_and_ce(combined_text)
-                        metadata['full_text'] = full_text
-                    else:
-                        metadata['full_text'] = metadata.get('body', '') or title_desc
-                    
-                    if not has_both:
-                        filtered_out += 1
-                        continue
+                existing_urls.add(url)
+                await pipeline.submit(url, check_full_text(metadata, title_desc))
+                continue
             
-            # Check minimum length
-            full_text = metadata.get('full_text', combined_text)
-            if len(full_text) < min_length:
+            # Fast path: keywords and length are checked on the API body itself
+            has_both, ai_found, ce_found = has_both_ai_and_ce(f"{title_desc} {body}")
+            if not has_both or len(body) < min_length:
                 filtered_out += 1
                 continue
             
-            # Add keyword information
-            metadata['ai_keywords_found'] = ai_found
-            metadata['ce_keywords_found'] = ce_found
-            metadata['has_both'] = True
-            
-            articles.append(metadata)
-            existing_urls.add(url)
+            metadata['full_text'] = body
+            accept(metadata, ai_found, ce_found)
         
         print(f"    Page {page}: Processed {processed} articles, found {len(articles)} valid (filtered: {filtered_out})")
         
         # Check if we've reached the end
-        if len(page_articles) < 10:  # Last page has fewer than 10 articles
+        if len(page_articles) < PAGE_SIZE:  # Last page has fewer articles
             break
-        
-        page += 1
-        
-        # Rate limiting: delay between requests (Guardian: 1 call/second)
-        time.sleep(REQUEST_DELAY)
     
     return articles
 
 
+async def collect_all_queries(
+    queries: List[str],
+    from_date: str,
+    to_date: str,
+    planner: QueryPlanner,
+    min_length: int,
+    existing_urls: Set[str],
+    strict_filter: bool,
+    target: Optional[int] = None,
+    journal: Optional[RunJournal] = None
+) -> List[Dict]:
+    """
+    Run the planned search queries concurrently under the Guardian rate limit.
+    
+    The query planner decides which queries run and how many pages each may
+    use, spending the remaining daily budget on the queries with the highest
+    expected yield of new articles.
+    
+    Returns:
+        Collected articles in query order
+    """
+    query_articles: List[List[Dict]] = []
+    
+    def collected_count() -> int:
+        return sum(len(articles) for articles in query_articles)
+    
+    def target_reached() -> bool:
+        return bool(target) and collected_count() >= target
+    
+    async with HttpClient(cache=ResponseCache()) as client, \
+            CollectionEngine("guardian", rate=REQUESTS_PER_SECOND, client=client) as engine, \
+            ExtractionPipeline(client=client, seen=existing_urls) as pipeline:
+        async def run_query(i: int, query: str, max_pages: int) -> List[Dict]:
+            print(f"Query {i}/{len(queries)} ({max_pages} pages planned)")
+            articles = await collect_articles_for_query(
+                engine,
+                pipeline,
+                query,
+                from_date,
+                to_date,
+                planner,
+                min_length=min_length,
+                existing_urls=existing_urls,
+                strict_filter=strict_filter,
+                max_pages=max_pages,
+                journal=journal
+            )
+            query_articles.append(articles)
+            print(f"  Total articles collected so far: {collected_count()}")
+            print()
+            return articles
+        
+        results = await engine.run_plan(
+            planner,
+            queries,
+            run_query,
+            max_parallel_queries=MAX_PARALLEL_QUERIES,
+            should_stop=target_reached,
+            journal=journal
+        )
+        print(f"Guardian API requests used: {engine.requests_made}")
+        print("Waiting for full-text extraction to finish...")
+    print(pipeline.summary())
+    print(client.summary())
+    print(planner.summary())
+    if journal is not None:
+        print(journal.summary())
+    
+    if target_reached():
+        print(f"\nHedef sayıya ulaşıldı: {collected_count()}/{target}")
+    return [article for articles in results for article in articles]
+
+
 def save_to_csv(articles: List[Dict], output_path: Path):
     """
     Save articles to a CSV file.
@@ -600,6 +743,17 @@ def main():
         default=True,  # Default olarak strict filtreleme
         help="Sıkı filtreleme: title/description'da her iki keyword grubu da olmalı (default: True)"
     )
+    parser.add_argument(
+        "--max-requests",
+        type=int,
+        default=None,
+        help="Bu çalışmada kullanılacak en fazla API isteği (default: günlük kalan bütçe)"
+    )
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="Yarım kalan çalışmayı devam ettirme, yeni çalışma başlat"
+    )
     
     args = parser.parse_args()
     
@@ -617,7 +771,7 @@ def main():
     print()
     
     # Check API key
-    if not API_KEY:
+    if not any(API_KEYS):
         print("ERROR: Guardian API key not found!")
         print("Please set the GUARDIAN_API_KEY environment variable or add it to the script.")
         print("Get your free API key at: https://open-platform.theguardian.com/")
@@ -646,49 +800,54 @@ def main():
     # Get existing URLs from database
     existing_urls = set()
     if not args.no_db:
-        with get_db_cursor() as cur:
-            cur.execute("SELECT url FROM articles")
-            existing_urls = {row['url'] for row in cur.fetchall()}
+        existing_urls = SeenUrlIndex.postgres("articles")
         print(f"Mevcut database'de: {len(existing_urls)} makale var")
+        print(existing_urls.summary())
         print()
     
-    # Generate search queries (limit to save API quota)
-    all_queries = create_search_queries()
-    # Limit queries to save API quota - prioritize core combinations
-    # Take first 20 core queries (CE x AI combinations) + 5 broader queries
-    core_queries = [q for q in all_queries if ' AND "' in q or (' AND ' in q and not '(' in q)][:20]
-    broader_queries = [q for q in all_queries if q not in core_queries][:5]
-    queries = core_queries + broader_queries
-    
-    print(f"Generated {len(queries)} search queries (API limit koruması için {len(all_queries)}'den sınırlandırıldı)")
-    print(f"  Core queries: {len(core_queries)}")
-    print(f"  Broader queries: {len(broader_queries)}")
-    print()
+    # Generate search queries; the query planner spends the daily quota on
+    # the queries and pages that yielded the most new articles before
+    queries = create_search_queries()
+    planner = QueryPlanner(
+        "guardian",
+        {f"Key {i}": key for i, key in enumerate(API_KEYS, 1)},
+        daily_limit=MAX_REQUESTS_PER_DAY,
+        page_size=PAGE_SIZE,
+        max_pages=MAX_PAGES,
+        max_requests=args.max_requests
+    )
     
-    # Collect articles for each query
-    all_articles = []
+    print(f"Generated {len(queries)} search queries")
+    print(f"  API keys: {len(API_KEYS)} ({MAX_REQUESTS_PER_DAY} requests/day each)")
+    print(f"  Requests available for this run: {planner.remaining()}")
+    print()
     
-    for i, query in enumerate(queries, 1):
-        if args.target and len(all_articles) >= args.target:
-            print(f"\nHedef sayıya ulaşıldı: {len(all_articles)}/{args.target}")
-            break
-        
-        print(f"Query {i}/{len(queries)}")
-        articles = collect_articles_for_query(
-            query,
-            from_date_str,
-            to_date_str,
-            API_KEY,
-            min_length=args.min_len,
-            existing_urls=existing_urls,
-            strict_filter=args.strict_filter
-        )
-        all_articles.extend(articles)
-        print(f"  Total articles collected so far: {len(all_articles)}")
+    # Resume an interrupted run with the same settings (journaled pages cost no quota)
+    journal = RunJournal(
+        "guardian",
+        settings={"queries": queries, "days_back": args.days_back, "page_size": PAGE_SIZE,
+                  "min_length": args.min_len, "strict_filter": args.strict_filter},
+        window={"from_date": from_date_str, "to_date": to_date_str},
+        resume=not args.no_resume
+    )
+    if journal.resumed:
+        from_date_str, to_date_str = journal.window["from_date"], journal.window["to_date"]
+        print(f"Yarım kalan çalışma devam ettiriliyor: {from_date_str} - {to_date_str} "
+              f"({len(journal.articles())} makale kayıtlı)")
         print()
-        
-        # Rate limiting between queries (Guardian: 1 call/second)
-        time.sleep(REQUEST_DELAY)
+    
+    # Collect articles for all queries (concurrent, rate-limited)
+    all_articles = asyncio.run(collect_all_queries(
+        queries,
+        from_date_str,
+        to_date_str,
+        planner,
+        min_length=args.min_len,
+        existing_urls=existing_urls,
+        strict_filter=args.strict_filter,
+        target=args.target,
+        journal=journal
+    ))
     
     # Remove duplicates (just in case)
     print("Removing duplicate articles...")
@@ -733,6 +892,14 @@ def main():
     print("=" * 70)
     print(f"Toplam bulunan makale: {len(unique_articles)}")
     print("=" * 70 + "\n")
+    
+    if planner.remaining() > 0:
+        journal.finish()
+    else:
+        # Stopped by the daily quota: keep the run so the next run resumes it
+        print("Daily quota used up; run journal kept, re-run to resume.")
+    journal.close()
+    planner.close()
 
 
 if __name__ == "__main__":
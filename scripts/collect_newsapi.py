@@ -13,6 +13,7 @@ Date: Fall 2025
 Requirements:
 - Python 3.8+
 - requests library
+- aiohttp library (concurrent API collection)
 - pandas library
 - Valid NewsAPI key (get one free at https://newsapi.org/)
 
@@ -24,19 +25,15 @@ Make sure to set your NEWSAPI_KEY environment variable or modify the API_KEY var
 
 import os
 import sys
+import asyncio
 from datetime import datetime, timedelta
 from typing import List, Dict, Set, Tuple, Optional
-import time
 from pathlib import Path
 
-# Check and import required libraries
-try:
-    import requests
-except ImportError:
-    print("ERROR: 'requests' library is not installed.")
-    print("Please install it using: pip install requests")
-    sys.exit(1)
+# Add parent directory to path for shared module imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
 
+# Check and import required libraries
 try:
     import pandas as pd
 except ImportError:
@@ -45,10 +42,19 @@ except ImportError:
     sys.exit(1)
 
 try:
-    import trafilatura
+    from scripts.collection_engine import CollectionEngine
+    from scripts.disjoint_set import DisjointSet
+    from scripts.extraction_pipeline import ExtractionPipeline
+    from scripts.http_client import HttpClient
+    from scripts.keyword_matcher import find_keywords
+    from scripts.near_duplicates import NearDuplicateIndex, minhash_signature
+    from scripts.query_planner import QueryPlanner
+    from scripts.response_cache import ResponseCache
+    from scripts.run_journal import RunJournal
+    from scripts.url_canonical import canonicalize_url
 except ImportError:
-    print("ERROR: 'trafilatura' library is not installed.")
-    print("Please install it using: pip install trafilatura")
+    print("ERROR: 'aiohttp' library is not installed.")
+    print("Please install it using: pip install aiohttp")
     sys.exit(1)
 
 # ============================================================================
@@ -57,10 +63,9 @@ except ImportError:
 
 # NewsAPI keys - can also be set via environment variable NEWSAPI_KEY
 # Get your free API key at: https://newsapi.org/register
-API_KEY_1 = os.getenv("NEWSAPI_KEY_1", "9005640feba648b991e3b028bd2dbc5f")  # First key (queries 1-24)
-API_KEY_2 = os.getenv("NEWSAPI_KEY_2", "6a13e6c421694262985150291959e9d4")  # Second key (queries 25+)
-SWITCH_QUERY_NUMBER = 25  # Switch to second key after this query number
-SWITCH_QUERY_NUMBER = 25  # Switch to second key after this query number
+API_KEY_1 = os.getenv("NEWSAPI_KEY_1", "9005640feba648b991e3b028bd2dbc5f")
+API_KEY_2 = os.getenv("NEWSAPI_KEY_2", "6a13e6c421694262985150291959e9d4")
+API_KEYS = {"Key 1": API_KEY_1, "Key 2": API_KEY_2}  # Each key has its own daily budget
 
 # NewsAPI endpoint
 NEWSAPI_URL = "https://newsapi.org/v2/everything"
@@ -77,13 +82,14 @@ OUTPUT_FILE_DATA = "articles.csv"
 # Search parameters
 LANGUAGE = "en"  # English only
 DAYS_BACK = 30  # NewsAPI free tier allows up to 1 month of historical data
-REQUEST_DELAY = 0.5  # Delay between requests to respect rate limits (seconds) - reduced for speed
+REQUESTS_PER_SECOND = 2.0  # Request rate across both keys (NewsAPI has no per-second limit, stay polite)
+MAX_PARALLEL_QUERIES = 4  # Queries paginated concurrently
+PAGE_SIZE = 100  # Maximum articles per page (NewsAPI limit)
 
 # NewsAPI Rate Limits (Free Tier)
-MAX_REQUESTS_PER_DAY = 100  # Free tier limit: 100 requests per day
-REQUESTS_PER_PAGE = 1  # Each page fetch = 1 request
-MIN_PAGES_PER_QUERY = 1  # Minimum pages to fetch per query (to ensure coverage)
-MAX_PAGES_PER_QUERY = 3  # Maximum pages per query (to distribute limit evenly)
+MAX_REQUESTS_PER_DAY = 100  # Free tier limit: 100 requests per day (per key)
+SAFETY_RESERVE = 5  # Requests per key left unused
+MAX_PAGES_PER_QUERY = 3  # Deepest page the query planner may allocate
 
 # ============================================================================
 # KEYWORD DEFINITIONS
@@ -206,52 +212,63 @@ def create_search_queries() -> List[str]:
     return queries
 
 
-def fetch_articles_page(query: str, page: int, from_date: str, api_key: str) -> Dict:
+async def fetch_articles_page(
+    engine: CollectionEngine,
+    planner: QueryPlanner,
+    query: str,
+    page: int,
+    from_date: str
+) -> Optional[Dict]:
     """
-    Fetch a single page of articles from NewsAPI.
+    Fetch a single page of articles from NewsAPI through the collection engine.
+    
+    The API key is drawn from the query planner only if the request is not
+    served from cache.
     
     Args:
+        engine: Rate-limited collection engine for NewsAPI
+        planner: Query planner handing out API keys within the daily budget
         query: Search query string
         page: Page number (1-indexed)
         from_date: Start date in YYYY-MM-DD format
-        api_key: NewsAPI API key
         
     Returns:
-        JSON response from NewsAPI as a dictionary
+        JSON response from NewsAPI as a dictionary (error responses included,
+        they carry status/message fields), or None on network error or when
+        every key's budget is used up
     """
     params = {
         "q": query,
         "language": LANGUAGE,
         "from": from_date,
         "sortBy": "publishedAt",  # Sort by publication date
-        "pageSize": 100,  # Maximum articles per page (NewsAPI limit)
-        "page": page,
-        "apiKey": api_key
+        "pageSize": PAGE_SIZE,
+        "page": page
     }
-    
-    try:
-        response = requests.get(NEWSAPI_URL, params=params, timeout=30)
-        response.raise_for_status()  # Raise an exception for bad status codes
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching page {page} for query '{query}': {e}")
+    key_used = []
+    
+    def credentials() -> Optional[Dict[str, str]]:
+        grant = planner.acquire()
+        if grant is None:
+            return None
+        key_used.append(grant[0])
+        return {"apiKey": grant[1]}
+    
+    status, data = await engine.get_json(NEWSAPI_URL, params, credentials)
+    if status is None:
+        if planner.remaining() <= 0 and not engine.stopped:
+            print("    [RATE LIMIT] Daily request budget used up on all API keys")
+            engine.stop()
         return None
-
-
-def find_keywords_in_text(text: str, keywords: List[str]) -> List[str]:
-    """Find which keywords appear in the text (case-insensitive)."""
-    if not text:
-        return []
-    
-    text_lower = str(text).lower()
-    found = []
-    
-    for keyword in keywords:
-        keyword_lower = keyword.lower()
-        if keyword_lower in text_lower:
-            found.append(keyword)
-    
-    return list(set(found))  # Remove duplicates
+    if status == 429 and key_used:
+        # This key hit its daily limit; retry with the next key if one is left
+        planner.exhaust(key_used[0])
+        if planner.remaining() > 0:
+            return await fetch_articles_page(engine, planner, query, page, from_date)
+    if data is None:
+        print(f"Error fetching page {page} for query '{query}': HTTP {status}")
+        return None
+    return data
 
 
 def has_both_ai_and_ce(text: str) -> Tuple[bool, List[str], List[str]]:
@@ -269,29 +286,14 @@ def has_both_ai_and_ce(text: str) -> Tuple[bool, List[str], List[str]]:
         return (False, [], [])
     
     # Use only base keywords for filtering (not synonyms)
-    ai_found = find_keywords_in_text(text, AI_KEYWORDS)
-    ce_found = find_keywords_in_text(text, CE_KEYWORDS)
+    ai_found = find_keywords(text, AI_KEYWORDS)
+    ce_found = find_keywords(text, CE_KEYWORDS)
     
     has_both = len(ai_found) >= 1 and len(ce_found) >= 1
     
     return (has_both, ai_found, ce_found)
 
 
-def fetch_full_text(url: str) -> Optional[str]:
-    """Fetch full text content from article URL using trafilatura."""
-    try:
-        html = requests.get(
-            url,
-            timeout=10,  # Reduced timeout for faster skipping of slow sites
-            headers={"user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
-        ).text
-        
-        full_text = trafilatura.extract(html, url=url, include_comments=False)
-        return full_text
-    except Exception as e:
-        return None
-
-
 def extract_article_metadata(article: Dict) -> Dict:
     """
     Extract relevant metadata from a NewsAPI article object.
@@ -312,62 +314,125 @@ def extract_article_metadata(article: Dict) -> Dict:
     }
 
 
-def collect_articles_for_query(
+async def collect_articles_for_query(
+    engine: CollectionEngine,
+    pipeline: ExtractionPipeline,
+    planner: QueryPlanner,
     query: str, 
     from_date: str, 
-    api_key: str,
     min_length: int = 500,
     strict_filter: bool = True,
     existing_urls: Set[str] = None,
-    max_pages: int = MAX_PAGES_PER_QUERY  # Dynamic page limit
+    max_pages: int = MAX_PAGES_PER_QUERY,  # Pages allocated by the query planner
+    journal: Optional[RunJournal] = None
 ) -> List[Dict]:
     """
     Collect all articles for a given search query, handling pagination and strict filtering.
     
+    Pages are fetched in order and every page's share of new URLs is
+    reported to the query planner; paging stops once it falls below the
+    planner's novelty threshold. Articles that need their full text are
+    handed to the extraction pipeline and appended to the returned list once
+    extracted, so paging never waits on page downloads.
+    
     Args:
+        engine: Rate-limited collection engine for NewsAPI
+        pipeline: Full-text extraction pipeline
+        planner: Query planner (API keys, page yields)
         query: Search query string
         from_date: Start date in YYYY-MM-DD format
-        api_key: NewsAPI API key
         min_length: Minimum text length for articles
         strict_filter: If True, both keywords must be in title/description
         existing_urls: Set of URLs already collected
-        max_pages: Maximum pages to fetch for this query (to distribute API limit)
+        max_pages: Maximum pages to fetch for this query (planner allocation)
+        journal: Run journal; journaled pages are replayed instead of fetched
         
     Returns:
         List of article metadata dictionaries with keywords
+        (still growing until the pipeline has drained)
     """
     if existing_urls is None:
         existing_urls = set()
     
     articles = []
-    page = 1
-    total_results = None
     processed = 0
     filtered_out = 0
     
     print(f"  Collecting articles for query: '{query}' (max {max_pages} pages)")
     
-    while page <= max_pages:
-        # Fetch one page
-        response_data = fetch_articles_page(query, page, from_date, api_key)
-        
-        if response_data is None:
-            break
-        
+    def long_enough(text: str) -> bool:
+        # If we have both keywords, be more lenient with length
+        if len(text) >= min_length:
+            return True
+        # If it's very short (< 200), definitely skip
+        if len(text) < 200:
+            return False
+        # If it's between 200-500, only skip if we already have many articles
+        return len(articles) <= 100
+    
+    def accept(metadata: Dict, ai_found: List[str], ce_found: List[str]):
+        metadata['ai_keywords_found'] = ai_found
+        metadata['ce_keywords_found'] = ce_found
+        metadata['has_both'] = True
+        articles.append(metadata)
+        if journal is not None:
+            journal.record_article(query, metadata)
+    
+    def check_full_text(metadata: Dict, title_desc: str):
+        """Build the pipeline callback: keywords must be found with the full text."""
+        def on_text(full_text: Optional[str]):
+            nonlocal filtered_out
+            if not full_text:
+                filtered_out += 1
+                return
+            combined_text = f"{title_desc} {full_text}".strip()
+            has_both, ai_found, ce_found = has_both_ai_and_ce(combined_text)
+            if not has_both or not long_enough(combined_text):
+                filtered_out += 1
+                return
+            if not strict_filter:
+                metadata['full_text'] = full_text
+            accept(metadata, ai_found, ce_found)
+        return on_text
+    
+    def total_of(response_data: Dict) -> Optional[int]:
+        if response_data.get("status") != "ok":
+            return None
+        total = response_data.get("totalResults", 0)
+        print(f"    Total results available: {total}")
+        planner.record_total(query, total)
+        return total
+    
+    def keep_paging(page: int, response_data: Dict) -> bool:
+        urls = [canonicalize_url(a.get("url", "")) for a in response_data.get("articles", [])]
+        replayed = journal is not None and journal.replayed(query, page)
+        return planner.record_page(query, page - 1, urls, existing_urls, replayed=replayed)
+    
+    def fetch_page(page: int):
+        fetch = lambda: fetch_articles_page(engine, planner, query, page, from_date)
+        if journal is None:
+            return fetch()
+        return journal.fetch_page(query, page, fetch,
+                                  is_complete=lambda data: bool(data) and data.get("status") == "ok")
+    
+    pages = await engine.fetch_pages(
+        fetch_page,
+        total_of,
+        first_page=1,
+        max_pages=max_pages,
+        page_size=PAGE_SIZE,
+        keep_paging=keep_paging
+    )
+    
+    for page, response_data in pages:
         # Check for API errors
         if response_data.get("status") != "ok":
             error_message = response_data.get("message", "Unknown error")
             print(f"    API Error: {error_message}")
-            if "rate limit" in error_message.lower() or "429" in str(response_data):
+            if "rate limit" in error_message.lower() or response_data.get("code") == "rateLimited":
                 print("    [RATE LIMIT] NewsAPI rate limit reached!")
-                break
             break
         
-        # Get total results (only available on first page)
-        if total_results is None:
-            total_results = response_data.get("totalResults", 0)
-            print(f"    Total results available: {total_results}")
-        
         # Extract articles from this page
         page_articles = response_data.get("articles", [])
         
@@ -381,9 +446,9 @@ def collect_articles_for_query(
             if not url:
                 continue
             
-            # Normalize URL for duplicate checking
-            normalized_url = normalize_url(url)
-            if normalized_url in existing_urls:
+            # Canonical URL for duplicate checking (tracking params, AMP and mobile copies)
+            canonical_url = canonicalize_url(url)
+            if canonical_url in existing_urls:
                 continue
             
             processed += 1
@@ -399,141 +464,35 @@ def collect_articles_for_query(
             # STRICT FILTERING: Check if title/description has both keywords (saves API calls)
             has_both_title_desc, ai_found_title, ce_found_title = has_both_ai_and_ce(title_desc)
             
-            if strict_filter:
-                # Strict mode: Both keywords must be in title/description/content
-                # Try content field first (faster than fetching full text)
-                if not has_both_title_desc:
-                    # Check content field if available
-                    content = metadata.get('content', '')
-                    if content:
-                        combined_check = f"{title_desc} {content}".strip()
-                        has_both_content, ai_content, ce_content = has_both_ai_and_ce(combined_check)
-                        if has_both_content:
-                            ai_found = ai_content
-                            ce_found = ce_content
-                            combined_text = combined_check
-                        else:
-                            # Try fetching full text for more articles (but limit to avoid slowness)
-                            # Only fetch if we haven't found many articles yet
-                            if len(articles) < 50 or processed <= 20:  # Fetch for first 20 articles or if we need more
-                                full_text = fetch_full_text(url)
-                                if full_text:
-                                    combined_text = f"{title_desc} {full_text}".strip()
-                                    has_both_full, ai_found, ce_found = has_both_ai_and_ce(combined_text)
-                                    if not has_both_full:
-                                        filtered_out += 1
-                                        continue
-                                else:
-                                    filtered_out += 1
-                                    continue
-                            else:
-                                filtered_out += 1
-                                continue
-                    else:
-                        # No content field, try fetching full text (but limit)
-                        if len(articles) < 50 or processed <= 20:
-                            full_text = fetch_full_text(url)
-                            if full_text:
-                                combined_text = f"{title_desc} {full_text}".strip()
-                                has_both_full, ai_found, ce_found = has_both_ai_and_ce(combined_text)
-                                if not has_both_full:
-                                    filtered_out += 1
-                                    continue
-                            else:
-                                filtered_out += 1
-                                continue
-                        else:
-                            filtered_out += 1
-                            continue
-                else:
-                    # Found in title/desc, use those keywords
-                    ai_found = ai_found_title
-                    ce_found = ce_found_title
-                    combined_text = title_desc
-            else:
-                # Flexible mode: Check full text if not in title/desc
-                has_both = has_both_title_desc
-                ai_found = ai_found_title
-                ce_found = ce_found_title
-                combined_text = title_desc
-                
-                if not has_both:
-                    # Try fetching full text if available
-                    full_text = fetch_full_text(url)
-                    if full_text:
-                        combined_text = f"{combined_text} {full_text}".strip()
-                        has_both, ai_found, ce_found = has_both_ai_and_ce(combined_text)
-                        metadata['full_text'] = full_text
-                    else:
-                        metadata['full_text'] = None
-                    
-                    if not has_both:
-                        filtered_out += 1
-                        continue
-            
-            # Check minimum length (more flexible)
-            # If we have both keywords, be more lenient with length
-            if len(combined_text) < min_length:
-                # If it's very short (< 200), definitely skip
-                if len(combined_text) < 200:
-                    filtered_out += 1
-                    continue
-                # If it's between 200-500, only skip if we already have many articles
-                elif len(combined_text) >= 200 and len(articles) > 100:
+            if not has_both_title_desc:
+                # Strict mode only fetches full text while we still need articles
+                # (first 20 articles or fewer than 50 found); flexible mode always does
+                if strict_filter and not (len(articles) < 50 or processed <= 20):
                     filtered_out += 1
                     continue
-                # Otherwise, accept it (we need more articles)
+                # Claim the URL now so other queries don't queue the same page
+                existing_urls.add(canonical_url)
+                await pipeline.submit(url, check_full_text(metadata, title_desc))
+                continue
             
-            # Add keyword information
-            metadata['ai_keywords_found'] = ai_found
-            metadata['ce_keywords_found'] = ce_found
-            metadata['has_both'] = True
+            # Check minimum length (more flexible)
+            if not long_enough(title_desc):
+                filtered_out += 1
+                continue
             
-            articles.append(metadata)
+            accept(metadata, ai_found_title, ce_found_title)
             # Add normalized URL to prevent duplicates
-            existing_urls.add(normalized_url)
+            existing_urls.add(canonical_url)
         
         print(f"    Page {page}: Processed {processed} articles, found {len(articles)} valid (filtered: {filtered_out})")
         
         # Check if we've reached the end
-        if len(page_articles) < 100:  # Last page has fewer than 100 articles
+        if len(page_articles) < PAGE_SIZE:  # Last page has fewer than 100 articles
             break
-        
-        page += 1
-        
-        # Rate limiting: delay between requests
-        time.sleep(REQUEST_DELAY)
     
     return articles
 
 
-def normalize_url(url: str) -> str:
-    """
-    Normalize URL for duplicate detection.
-    Removes trailing slashes, query parameters, fragments, and converts to lowercase.
-    
-    Args:
-        url: URL string to normalize
-        
-    Returns:
-        Normalized URL string
-    """
-    if not url:
-        return ""
-    
-    # Remove fragments and query parameters for duplicate detection
-    # (same article might have different tracking parameters)
-    url = url.split('#')[0].split('?')[0]
-    
-    # Remove trailing slash
-    url = url.rstrip('/')
-    
-    # Convert to lowercase for case-insensitive comparison
-    url = url.lower()
-    
-    return url
-
-
 def normalize_title(title: str) -> str:
     """
     Normalize title for duplicate detection.
@@ -563,46 +522,51 @@ def normalize_title(title: str) -> str:
 def remove_duplicates(articles: List[Dict]) -> List[Dict]:
     """
     Remove duplicate articles based on URL and title.
-    Uses normalized URLs and titles for better duplicate detection.
+    Uses normalized URLs and titles for better duplicate detection;
+    near-copies (syndicated text under another URL and title) are found by
+    MinHash similarity of title and text. All passes feed one DisjointSet,
+    and the first article of each resulting cluster is kept.
     
     Args:
         articles: List of article dictionaries
         
     Returns:
-        List of unique articles (by URL and title)
+        List of unique articles (by URL, title and text)
     """
-    seen_urls: Set[str] = set()
-    seen_titles: Set[str] = set()
-    unique_articles = []
-    duplicate_count = 0
+    clusters = DisjointSet(range(len(articles)))
+    first_by_url: Dict[str, int] = {}
+    first_by_title: Dict[str, int] = {}
+    near_dups = NearDuplicateIndex.memory()
     
-    for article in articles:
+    for i, article in enumerate(articles):
         url = article.get("url", "")
         title = article.get("title", "")
         
-        # Normalize for comparison
-        normalized_url = normalize_url(url)
+        # Canonical URL and normalized title for comparison
+        canonical_url = canonicalize_url(url)
         normalized_title = normalize_title(title)
         
-        # Check for duplicates by URL or title
-        is_duplicate = False
-        
-        if normalized_url and normalized_url in seen_urls:
-            is_duplicate = True
-        elif normalized_title and normalized_title in seen_titles:
-            # Only check title if URL is missing or very short
-            # (some articles might have same title but different URLs)
-            if not normalized_url or len(normalized_url) < 10:
-                is_duplicate = True
-        
-        if not is_duplicate:
-            if normalized_url:
-                seen_urls.add(normalized_url)
-            if normalized_title:
-                seen_titles.add(normalized_title)
-            unique_articles.append(article)
-        else:
-            duplicate_count += 1
+        # Same canonical URL
+        if canonical_url:
+            clusters.union(first_by_url.setdefault(canonical_url, i), i)
+        
+        # Same title: only if URL is missing or very short
+        # (some articles might have same title but different URLs)
+        if normalized_title:
+            first = first_by_title.setdefault(normalized_title, i)
+            if not canonical_url or len(canonical_url) < 10:
+                clusters.union(first, i)
+        
+        # Near-copy of an earlier article
+        text = article.get("full_text") or article.get("description") or ""
+        signature = minhash_signature(f"{title} {text}")
+        near_copy = near_dups.find(signature)
+        if near_copy:
+            clusters.union(near_copy[0], i)
+        near_dups.add(i, signature)
+    
+    unique_articles = [article for i, article in enumerate(articles) if clusters.is_representative(i)]
+    duplicate_count = len(articles) - len(unique_articles)
     
     if duplicate_count > 0:
         print(f"  Removed {duplicate_count} duplicate articles")
@@ -656,6 +620,73 @@ def save_to_csv(articles: List[Dict], output_path: Path):
         return False
 
 
+async def collect_all_queries(
+    queries: List[str],
+    from_date: str,
+    planner: QueryPlanner,
+    journal: Optional[RunJournal] = None
+) -> List[Dict]:
+    """
+    Run the planned search queries concurrently under the NewsAPI rate limit.
+    
+    The query planner decides which queries run and how many pages each may
+    use, spreading the daily budget of both API keys over the queries with
+    the highest expected yield of new articles. Pages already in the run
+    journal are replayed and cost no quota.
+    
+    Args:
+        queries: Candidate search queries
+        from_date: Start date in YYYY-MM-DD format
+        planner: Query planner holding the API keys and their budgets
+        journal: Run journal (progress is appended per page and per article)
+        
+    Returns:
+        Collected articles in query order
+    """
+    all_articles: List[Dict] = []
+    existing_urls: Set[str] = set()
+    
+    async with HttpClient(cache=ResponseCache()) as client, \
+            CollectionEngine("newsapi", rate=REQUESTS_PER_SECOND, client=client) as engine, \
+            ExtractionPipeline(timeout=10, client=client, seen=existing_urls) as pipeline:  # Short timeout to skip slow sites
+        async def run_query(i: int, query: str, max_pages: int) -> List[Dict]:
+            print(f"Query {i}/{len(queries)} ({max_pages} pages planned)")
+            articles = await collect_articles_for_query(
+                engine,
+                pipeline,
+                planner,
+                query, 
+                from_date, 
+                min_length=300,  # Reduced from 500 to get more articles
+                strict_filter=True,  # Strict filtreleme aktif
+                existing_urls=existing_urls,
+                max_pages=max_pages,
+                journal=journal
+            )
+            all_articles.extend(articles)
+            
+            print(f"  Total articles collected so far: {len(all_articles)}")
+            print(f"  Requests left today: {planner.remaining()}")
+            print()
+            return articles
+        
+        results = await engine.run_plan(
+            planner,
+            queries,
+            run_query,
+            max_parallel_queries=MAX_PARALLEL_QUERIES,
+            journal=journal
+        )
+        print("Waiting for full-text extraction to finish...")
+    print(pipeline.summary())
+    print(client.summary())
+    print(planner.summary())
+    if journal is not None:
+        print(journal.summary())
+    
+    return [article for articles in results for article in articles]
+
+
 # ============================================================================
 # MAIN FUNCTION
 # ============================================================================
@@ -664,6 +695,16 @@ def main():
     """
     Main function to orchestrate the article collection process.
     """
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Collect CE + AI articles from NewsAPI")
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="Start a new run instead of resuming an interrupted one"
+    )
+    args = parser.parse_args()
+    
     print("=" * 70)
     print("CE49X Final Project - Task 1: NewsAPI Article Collection")
     print("=" * 70)
@@ -682,10 +723,6 @@ def main():
         print("Get your free API key at: https://newsapi.org/register")
         return
     
-    print(f"Using API Key 1 for queries 1-{SWITCH_QUERY_NUMBER-1}")
-    print(f"Using API Key 2 for queries {SWITCH_QUERY_NUMBER}+")
-    print()
-    
     # Calculate date range (NewsAPI free tier: up to 1 month back)
     to_date = datetime.now()
     from_date = (to_date - timedelta(days=DAYS_BACK)).strftime("%Y-%m-%d")
@@ -697,143 +734,38 @@ def main():
     # Generate search queries
     all_queries = create_search_queries()
     
-    # Calculate how many pages per query based on API limit
-    # Free tier: 100 requests per day
-    # Each page = 1 request
-    # We want to distribute requests evenly across all queries
-    total_queries = len(all_queries)
-    available_requests = MAX_REQUESTS_PER_DAY - 5  # Reserve 5 requests for safety
-    
-    # Calculate pages per query
-    pages_per_query = max(
-        MIN_PAGES_PER_QUERY,
-        min(
-            MAX_PAGES_PER_QUERY,
-            available_requests // total_queries
-        )
+    # The query planner spreads both keys' remaining daily budget over the
+    # queries and pages with the highest expected yield of new articles
+    planner = QueryPlanner(
+        "newsapi",
+        API_KEYS,
+        daily_limit=MAX_REQUESTS_PER_DAY - SAFETY_RESERVE,
+        page_size=PAGE_SIZE,
+        max_pages=MAX_PAGES_PER_QUERY
     )
-    
-    # If we have too many queries, prioritize broader queries
-    if pages_per_query < MIN_PAGES_PER_QUERY:
-        # Too many queries, prioritize broader queries (they return more results)
-        broader_queries = [q for q in all_queries if '(' in q and 'OR' in q]
-        core_queries = [q for q in all_queries if q not in broader_queries]
-        
-        # Calculate how many queries we can handle
-        max_queries = available_requests // MIN_PAGES_PER_QUERY
-        queries = broader_queries[:max_queries] if len(broader_queries) >= max_queries else broader_queries
-        remaining_slots = max_queries - len(queries)
-        if remaining_slots > 0:
-            queries.extend(core_queries[:remaining_slots])
-        
-        pages_per_query = MIN_PAGES_PER_QUERY
-        print(f"⚠️  Too many queries ({total_queries}), prioritizing {len(queries)} queries")
-    else:
-        queries = all_queries
+    queries = all_queries
     
     print(f"Generated {len(queries)} search queries")
-    print(f"  API Limit: {MAX_REQUESTS_PER_DAY} requests/day")
-    print(f"  Available requests: {available_requests}")
-    print(f"  Pages per query: {pages_per_query}")
-    print(f"  Total requests to use: {len(queries) * pages_per_query}")
+    print(f"  API Limit: {MAX_REQUESTS_PER_DAY} requests/day per key ({len(API_KEYS)} keys)")
+    print(f"  Requests left today: {planner.remaining()}")
+    print(f"  Max pages per query: {MAX_PAGES_PER_QUERY}")
     print()
     
-    # Track API usage for both keys
-    requests_used_key1 = 0
-    requests_used_key2 = 0
-    all_articles = []
-    existing_urls = set()
-    current_api_key = API_KEY_1
-    current_key_name = "Key 1"
-    
-    for i, query in enumerate(queries, 1):
-        # Switch to second API key at SWITCH_QUERY_NUMBER
-        if i == SWITCH_QUERY_NUMBER:
-            print(f"\n{'='*70}")
-            print(f"🔄 Switching to API Key 2 (Query {i}+)")
-            print(f"{'='*70}\n")
-            current_api_key = API_KEY_2
-            current_key_name = "Key 2"
-            requests_used_key1 = 0  # Reset counter for new key
-            available_requests = MAX_REQUESTS_PER_DAY - 5  # Reset available requests
-        
-        # Check which key we're using and its limit
-        if i < SWITCH_QUERY_NUMBER:
-            # Using first key
-            if requests_used_key1 >= available_requests:
-                print(f"\n⚠️  API Key 1 limit reached! Switching to Key 2 at query {i}")
-                current_api_key = API_KEY_2
-                current_key_name = "Key 2"
-                requests_used_key1 = 0
-                available_requests = MAX_REQUESTS_PER_DAY - 5
-            current_requests_used = requests_used_key1
-        else:
-            # Using second key
-            if requests_used_key2 >= available_requests:
-                print(f"\n⚠️  API Key 2 limit reached! Stopping at query {i-1}/{len(queries)}")
-                print(f"   Requests used (Key 2): {requests_used_key2}/{available_requests}")
-                break
-            current_requests_used = requests_used_key2
-        
-        # Check if we've used too many requests
-        if current_requests_used >= available_requests:
-            print(f"\n⚠️  {current_key_name} limit reached! Stopping at query {i-1}/{len(queries)}")
-            print(f"   Requests used: {current_requests_used}/{available_requests}")
-            break
-        
-        print(f"Query {i}/{len(queries)} [{current_key_name}]")
-        articles = collect_articles_for_query(
-            query, 
-            from_date, 
-            current_api_key,  # Use current API key
-            min_length=300,  # Reduced from 500 to get more articles
-            strict_filter=True,  # Strict filtreleme aktif
-            existing_urls=existing_urls,
-            max_pages=pages_per_query  # Use calculated page limit
-        )
-        all_articles.extend(articles)
-        
-        # Update request counter for current key
-        if i < SWITCH_QUERY_NUMBER:
-            requests_used_key1 += pages_per_query
-            current_requests_used = requests_used_key1
-        else:
-            requests_used_key2 += pages_per_query
-            current_requests_used = requests_used_key2
-        
-        print(f"  Total articles collected so far: {len(all_articles)}")
-        print(f"  Requests used ({current_key_name}): {current_requests_used}/{available_requests}")
-        
-        # Auto-save every 5 queries to prevent data loss
-        if i % 5 == 0 or i == len(queries):
-            try:
-                # Prepare articles for CSV
-                unique_temp = remove_duplicates(all_articles)
-                csv_articles = []
-                for article in unique_temp:
-                    csv_article = {
-                        "title": article.get("title", ""),
-                        "publication_date": article.get("publication_date", ""),
-                        "source": article.get("source", ""),
-                        "url": article.get("url", ""),
-                        "description": article.get("description", ""),
-                        "ai_keywords_found": ", ".join(article.get("ai_keywords_found", [])),
-                        "ce_keywords_found": ", ".join(article.get("ce_keywords_found", []))
-                    }
-                    csv_articles.append(csv_article)
-                
-                # Save to temporary file
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                temp_output = OUTPUT_DIR_DATA / f"newsapi_articles_progress_{timestamp}.csv"
-                save_to_csv(csv_articles, temp_output)
-                print(f"  💾 Auto-saved: {len(unique_temp)} articles to {temp_output.name}")
-            except Exception as e:
-                print(f"  ⚠️  Auto-save failed: {str(e)[:50]}")
-        
+    # Resume an interrupted run with the same settings (journaled pages cost no quota)
+    journal = RunJournal(
+        "newsapi",
+        settings={"queries": queries, "language": LANGUAGE},
+        window={"from_date": from_date},
+        resume=not args.no_resume
+    )
+    if journal.resumed:
+        from_date = journal.window["from_date"]
+        print(f"Resuming interrupted run from {from_date} ({len(journal.articles())} articles recorded)")
         print()
-        
-        # Rate limiting between queries
-        time.sleep(REQUEST_DELAY)
+    
+    all_articles = asyncio.run(
+        collect_all_queries(queries, from_date, planner, journal=journal)
+    )
     
     # Remove duplicates
     print("Removing duplicate articles...")
@@ -865,19 +797,25 @@ def main():
     
     if not success:
         print("\n[ERROR] CSV dosyasına kaydedilemedi!")
+        print("     Run journal kept; re-run to resume without spending quota.")
     else:
         print(f"\n[OK] CSV kaydedildi: {output_path.name}")
         print(f"     Tam yol: {output_path.absolute()}")
+        if planner.remaining() > 0:
+            journal.finish()
+        else:
+            # Stopped by the daily quota: keep the run so tomorrow's run resumes it
+            print("     Daily quota used up; run journal kept, re-run to resume.")
+    journal.close()
     
     # Print summary statistics
     print("\n" + "=" * 70)
     print("Collection Summary")
     print("=" * 70)
     print(f"Total unique articles collected: {len(unique_articles)}")
-    if requests_used_key1 > 0:
-        print(f"API Key 1 requests used: {requests_used_key1}/{available_requests}")
-    if requests_used_key2 > 0:
-        print(f"API Key 2 requests used: {requests_used_key2}/{available_requests}")
+    for key_name in API_KEYS:
+        print(f"API {key_name} requests used today: {planner.used(key_name)}/{planner.daily_limit}")
+    planner.close()
     print(f"Output file: {output_path}")
     print()
     
@@ -7,11 +7,13 @@ Her sorgu en az 1 CE + 1 AI keyword içermeli.
 Requirements:
 - Python 3.8+
 - requests library
+- aiohttp library (concurrent API collection)
 - trafilatura library (full text için)
 - Valid NYTimes API key (get one free at https://developer.nytimes.com/)
 
 Usage:
     python collect_nytimes.py [--target 500] [--days-back 365] [--min-len 800]
+    python collect_nytimes.py --archive [--days-back 365]   # Archive API, 1 call per month
 
 Make sure to set your NYTIMES_API_KEY environment variable.
 """
@@ -19,9 +21,10 @@ Make sure to set your NYTIMES_API_KEY environment variable.
 import os
 import sys
 import re
+import json
+import asyncio
 from datetime import datetime, timedelta
-from typing import List, Dict, Set, Tuple, Optional
-import time
+from typing import Iterator, List, Dict, Set, Tuple, Optional
 from pathlib import Path
 
 # Add parent directory to path for database imports
@@ -29,21 +32,23 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 # Check and import required libraries
 try:
-    import requests
+    from scripts.collection_engine import CollectionEngine, TokenBucket
+    from scripts.extraction_pipeline import ExtractionPipeline
+    from scripts.http_client import HttpClient, SERVER_ERROR_STATUSES
+    from scripts.query_planner import QueryPlanner
+    from scripts.response_cache import ResponseCache
+    from scripts.run_journal import RunJournal
 except ImportError:
-    print("ERROR: 'requests' library is not installed.")
-    print("Please install it using: pip install requests")
+    print("ERROR: 'aiohttp' library is not installed.")
+    print("Please install it using: pip install aiohttp")
     sys.exit(1)
 
 try:
-    import trafilatura
-except ImportError:
-    print("ERROR: 'trafilatura' library is not installed.")
-    print("Please install it using: pip install trafilatura")
-    sys.exit(1)
-
-try:
-    from database.db_config import get_db_cursor, test_connection
+    from database.db_config import bulk_insert, get_db_cursor, test_connection
+    from scripts.keyword_matcher import find_keywords, find_keywords_batch
+    from scripts.near_duplicates import NearDuplicateIndex, minhash_signature
+    from scripts.url_canonical import resolve_canonical_url
+    from scripts.url_index import SeenUrlIndex
 except ImportError:
     print("ERROR: Database module not found.")
     print("Make sure you're running from the project root directory.")
@@ -56,6 +61,11 @@ except ImportError:
     print("CSV export will be disabled. Install with: pip install pandas")
     pd = None
 
+try:
+    import ijson  # Streaming JSON parser for Archive API months (optional)
+except ImportError:
+    ijson = None
+
 # ============================================================================
 # CONFIGURATION
 # ============================================================================
@@ -66,15 +76,27 @@ PROJECT_ROOT = SCRIPT_DIR.parent
 
 # NYTimes API key - can also be set via environment variable NYTIMES_API_KEY
 API_KEY = os.getenv("NYTIMES_API_KEY", "dLzrjIsGr2R4uGDnZLaGpp7vSoTAgaVaeoKb2wI7gHsSxenE")
+# Extra keys (comma-separated NYTIMES_API_KEYS) add their own daily budget
+API_KEYS = [key.strip() for key in os.getenv("NYTIMES_API_KEYS", "").split(",") if key.strip()] or [API_KEY]
 NYTIMES_API_ID = "6dffaad5-6c5b-41a1-bc5b-04f93689a53e"
 
 # NYTimes Article Search API endpoint
 NYTIMES_URL = "https://api.nytimes.com/svc/search/v2/articlesearch.json"
 
+# NYTimes Archive API (bulk month mode): {ARCHIVE_URL}/{year}/{month}.json
+# Point NYTIMES_ARCHIVE_URL at scripts/nytimes_archive_fixture.py for offline runs
+ARCHIVE_URL = os.getenv("NYTIMES_ARCHIVE_URL", "https://api.nytimes.com/svc/archive/v1")
+ARCHIVE_DIR = PROJECT_ROOT / "data" / "nytimes_archive"  # Downloaded months (YYYY-MM.json)
+ARCHIVE_TIMEOUT = 600  # A month is tens of MB (seconds)
+ARCHIVE_DOC_FIELDS = ("headline", "abstract", "lead_paragraph", "pub_date",
+                      "web_url", "section_name", "subsection_name")
+
 # Search parameters
-MAX_PAGES = 5  # Limit pages to save API quota (NYTimes API returns 10 articles per page)
-REQUEST_DELAY = 3  # Delay between requests to respect rate limits (seconds) - increased for safety
-RATE_LIMIT_WAIT = 3600  # Wait 1 hour if rate limit is hit (seconds)
+MAX_PAGES = 5  # Deepest page the query planner may allocate (NYTimes API returns 10 articles per page)
+PAGE_SIZE = 10  # NYTimes Article Search always returns 10 articles per page
+REQUESTS_PER_MINUTE = 5  # NYTimes quota: 5 requests/minute, 500 requests/day
+MAX_REQUESTS_PER_DAY = 500  # Daily quota per API key
+MAX_PARALLEL_QUERIES = 4  # Queries paginated concurrently (rate is still bounded by the quota)
 
 # ============================================================================
 # KEYWORD DEFINITIONS (same as collect_newsapi.py)
@@ -219,70 +241,76 @@ def create_search_queries() -> List[str]:
     return unique_queries
 
 
-def fetch_articles_page(query: str, page: int, begin_date: str, end_date: str, api_key: str) -> Dict:
+async def fetch_articles_page(
+    engine: CollectionEngine,
+    planner: QueryPlanner,
+    query: str,
+    page: int,
+    begin_date: str,
+    end_date: str
+) -> Optional[Dict]:
     """
-    Fetch a single page of articles from NYTimes API.
+    Fetch a single page of articles from NYTimes API through the collection engine.
+    
+    The API key is drawn from the query planner only if the request is not
+    served from cache.
     
     Args:
+        engine: Rate-limited collection engine for NYTimes
+        planner: Query planner handing out API keys within the daily budget
         query: Search query string
         page: Page number (0-indexed for NYTimes)
         begin_date: Start date in YYYYMMDD format
         end_date: End date in YYYYMMDD format
-        api_key: NYTimes API key
         
     Returns:
-        JSON response from NYTimes API as a dictionary
+        JSON response from NYTimes API as a dictionary, {"rate_limit": True}
+        when the daily quota of every key is exhausted, or None on error
     """
     params = {
         "q": query,
         "begin_date": begin_date,
         "end_date": end_date,
         "page": page,
-        "api-key": api_key,
         "sort": "newest"  # Sort by newest first
     }
+    key_used = []
     
-    try:
-        response = requests.get(NYTIMES_URL, params=params, timeout=30)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        if hasattr(e, 'response') and e.response is not None:
-            # Check for rate limit (429)
-            if e.response.status_code == 429:
-                try:
-                    error_data = e.response.json()
-                    fault = error_data.get("fault", {})
-                    if "QuotaViolation" in str(fault):
-                        print(f"    [RATE LIMIT] Günlük limit aşıldı!")
-                        print(f"    [INFO] Yarın tekrar deneyin veya NewsAPI kullanın")
-                        return {"rate_limit": True}
-                except:
-                    pass
-            try:
-                error_data = e.response.json()
-                print(f"    API Error: {error_data}")
-            except:
-                print(f"    HTTP Status: {e.response.status_code}")
-        else:
-            print(f"    Error fetching page {page} for query '{query}': {e}")
-        return None
-
-
-def find_keywords_in_text(text: str, keywords: List[str]) -> List[str]:
-    """Find which keywords appear in the text (case-insensitive)."""
-    if not text:
-        return []
-    
-    text_lower = text.lower()
-    found = []
+    def credentials() -> Optional[Dict[str, str]]:
+        grant = planner.acquire()
+        if grant is None:
+            return None
+        key_used.append(grant[0])
+        return {"api-key": grant[1]}
     
-    for keyword in keywords:
-        keyword_lower = keyword.lower()
-        if keyword_lower in text_lower:
-            found.append(keyword)
+    status, data = await engine.get_json(NYTIMES_URL, params, credentials)
+    if status is None:
+        if planner.remaining() <= 0:
+            if not engine.stopped:
+                print(f"    [RATE LIMIT] Günlük istek bütçesi doldu!")
+            engine.stop()
+            return {"rate_limit": True}
+        return None
+    if status == 200 and data is not None:
+        return data
     
-    return list(set(found))  # Remove duplicates
+    # Check for rate limit (429)
+    if status == 429 and "QuotaViolation" in str((data or {}).get("fault", {})):
+        if key_used:
+            # This key's daily quota is used up; retry with the next key if one is left
+            planner.exhaust(key_used[0])
+            if planner.remaining() > 0:
+                return await fetch_articles_page(engine, planner, query, page, begin_date, end_date)
+        if not engine.stopped:
+            print(f"    [RATE LIMIT] Günlük limit aşıldı!")
+            print(f"    [INFO] Yarın tekrar deneyin veya NewsAPI kullanın")
+        engine.stop()
+        return {"rate_limit": True}
+    if data is not None:
+        print(f"    API Error: {data}")
+    else:
+        print(f"    HTTP Status: {status}")
+    return None
 
 
 def has_both_ai_and_ce(text: str) -> Tuple[bool, List[str], List[str]]:
@@ -300,29 +328,14 @@ def has_both_ai_and_ce(text: str) -> Tuple[bool, List[str], List[str]]:
         return (False, [], [])
     
     # Use only base keywords for filtering (not synonyms)
-    ai_found = find_keywords_in_text(text, AI_KEYWORDS)
-    ce_found = find_keywords_in_text(text, CE_KEYWORDS)
+    ai_found = find_keywords(text, AI_KEYWORDS)
+    ce_found = find_keywords(text, CE_KEYWORDS)
     
     has_both = len(ai_found) >= 1 and len(ce_found) >= 1
     
     return (has_both, ai_found, ce_found)
 
 
-def fetch_full_text(url: str) -> Optional[str]:
-    """Fetch full text content from article URL using trafilatura."""
-    try:
-        html = requests.get(
-            url,
-            timeout=30,
-            headers={"user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
-        ).text
-        
-        full_text = trafilatura.extract(html, url=url, include_comments=False)
-        return full_text
-    except Exception as e:
-        return None
-
-
 def extract_article_metadata(article: Dict) -> Dict:
     """
     Extract relevant metadata from a NYTimes API article object.
@@ -367,48 +380,117 @@ def extract_article_metadata(article: Dict) -> Dict:
     }
 
 
-def collect_articles_for_query(
+async def collect_articles_for_query(
+    engine: CollectionEngine,
+    pipeline: ExtractionPipeline,
     query: str,
     begin_date: str,
     end_date: str,
-    api_key: str,
+    planner: QueryPlanner,
     min_length: int = 800,
     existing_urls: Set[str] = None,
-    strict_filter: bool = True
+    strict_filter: bool = True,
+    max_pages: int = MAX_PAGES,
+    journal: Optional[RunJournal] = None
 ) -> List[Dict]:
     """
     Collect all articles for a given search query, handling pagination.
     
+    Pages are fetched in order and every page's share of new URLs is
+    reported to the query planner; paging stops once it falls below the
+    planner's novelty threshold. Articles that need their full text are
+    handed to the extraction pipeline and appended to the returned list once
+    extracted, so paging never waits on page downloads.
+    
     Args:
+        engine: Rate-limited collection engine for NYTimes
+        pipeline: Full-text extraction pipeline
         query: Search query string
         begin_date: Start date in YYYYMMDD format
         end_date: End date in YYYYMMDD format
-        api_key: NYTimes API key
+        planner: Query planner (API keys, page yields)
         min_length: Minimum text length for articles
         existing_urls: Set of URLs already in database
+        strict_filter: If True, both keywords must be in title/description
+        max_pages: Maximum pages to fetch for this query (planner allocation)
+        journal: Run journal; journaled pages are replayed instead of fetched
         
     Returns:
         List of article dictionaries with full text and keyword matches
+        (still growing until the pipeline has drained)
     """
     if existing_urls is None:
         existing_urls = set()
     
     articles = []
-    page = 0  # NYTimes uses 0-indexed pages
-    total_results = None
     processed = 0
     filtered_out = 0
     
     print(f"  Collecting articles for query: '{query}'")
     
-    while page < MAX_PAGES:
-        # Fetch one page
-        response_data = fetch_articles_page(query, page, begin_date, end_date, api_key)
-        
-        if response_data is None:
-            break
-        
+    def accept(metadata: Dict, ai_found: List[str], ce_found: List[str]):
+        metadata['ai_keywords_found'] = ai_found
+        metadata['ce_keywords_found'] = ce_found
+        metadata['has_both'] = True
+        articles.append(metadata)
+        if journal is not None:
+            journal.record_article(query, metadata)
+        existing_urls.add(metadata['url'])
+    
+    def check_full_text(metadata: Dict, title_desc: str, keywords: Optional[Tuple[List[str], List[str]]] = None):
+        """Build the pipeline callback; keywords=None means they must be found in the full text."""
+        def on_text(full_text: Optional[str]):
+            nonlocal filtered_out
+            if not full_text:
+                filtered_out += 1
+                return
+            if keywords is None:
+                has_both, ai_found, ce_found = has_both_ai_and_ce(f"{title_desc} {full_text}".strip())
+                if not has_both:
+                    filtered_out += 1
+                    return
+            else:
+                ai_found, ce_found = keywords
+            if len(full_text) < min_length:
+                filtered_out += 1
+                return
+            metadata['full_text'] = full_text
+            accept(metadata, ai_found, ce_found)
+        return on_text
+    
+    def total_of(response_data: Dict) -> Optional[int]:
+        if "fault" in response_data or response_data.get("rate_limit"):
+            return None
+        total = response_data.get("response", {}).get("meta", {}).get("hits", 0)
+        print(f"    Total results available: {total}")
+        planner.record_total(query, total)
+        return total
+    
+    def keep_paging(page: int, response_data: Dict) -> bool:
+        docs = response_data.get("response", {}).get("docs", [])
+        replayed = journal is not None and journal.replayed(query, page)
+        return planner.record_page(query, page, [doc.get("web_url", "") for doc in docs], existing_urls,
+                                   replayed=replayed)
+    
+    def fetch_page(page: int):
+        fetch = lambda: fetch_articles_page(engine, planner, query, page, begin_date, end_date)
+        if journal is None:
+            return fetch()
+        return journal.fetch_page(query, page, fetch)
+    
+    pages = await engine.fetch_pages(
+        fetch_page,
+        total_of,
+        first_page=0,  # NYTimes uses 0-indexed pages
+        max_pages=max_pages,
+        page_size=PAGE_SIZE,
+        keep_paging=keep_paging
+    )
+    
+    for page, response_data in pages:
         # Check for API errors
+        if response_data.get("rate_limit"):
+            break
         if "fault" in response_data:
             error_message = response_data.get("fault", {}).get("faultstring", "Unknown error")
             print(f"    API Error: {error_message}")
@@ -417,12 +499,6 @@ def collect_articles_for_query(
         # Get response data
         response_obj = response_data.get("response", {})
         
-        # Get total results (only available on first page)
-        if total_results is None:
-            meta = response_obj.get("meta", {})
-            total_results = meta.get("hits", 0)
-            print(f"    Total results available: {total_results}")
-        
         # Extract articles from this page
         page_articles = response_obj.get("docs", [])
         
@@ -449,69 +525,284 @@ def collect_articles_for_query(
             # STRICT FILTERING: Check if title/description has both keywords (saves API calls)
             has_both_title_desc, ai_found_title, ce_found_title = has_both_ai_and_ce(title_desc)
             
-            if strict_filter:
-                # Strict mode: Both keywords must be in title/description
-                if not has_both_title_desc:
+            if not has_both_title_desc:
+                if strict_filter:
+                    # Strict mode: Both keywords must be in title/description
                     filtered_out += 1
                     continue
-                # If found in title/desc, use those keywords
-                ai_found = ai_found_title
-                ce_found = ce_found_title
-                combined_text = title_desc
-            else:
                 # Flexible mode: Check full text if not in title/desc
-                has_both = has_both_title_desc
-                ai_found = ai_found_title
-                ce_found = ce_found_title
-                combined_text = title_desc
-                
-                if not has_both:
-                    # Try fetching full text if available
-                    full_text = fetch_full_text(url)
-                    if full_text:
-                        combined_text = f"{combined_text} {full_text}".strip()
-                        has_both, ai_found, ce_found = has_both_ai_and_ce(combined_text)
-                        metadata['full_text'] = full_text
-                    else:
-                        metadata['full_text'] = None
-                    
-                    if not has_both:
-                        filtered_out += 1
-                        continue
+                existing_urls.add(url)
+                await pipeline.submit(url, check_full_text(metadata, title_desc))
+                continue
             
             # Check minimum length
-            if metadata.get('full_text'):
-                if len(metadata['full_text']) < min_length:
-                    filtered_out += 1
-                    continue
-            elif len(combined_text) < min_length:
-                # Try to fetch full text
-                full_text = fetch_full_text(url)
-                if full_text and len(full_text) >= min_length:
-                    metadata['full_text'] = full_text
-                else:
-                    filtered_out += 1
-                    continue
-            
-            # Add keyword information
-            metadata['ai_keywords_found'] = ai_found
-            metadata['ce_keywords_found'] = ce_found
-            metadata['has_both'] = has_both
+            if len(title_desc) < min_length:
+                # Too short on metadata alone, the full text decides
+                existing_urls.add(url)
+                await pipeline.submit(url, check_full_text(metadata, title_desc, (ai_found_title, ce_found_title)))
+                continue
             
-            articles.append(metadata)
-            existing_urls.add(url)
+            accept(metadata, ai_found_title, ce_found_title)
         
         print(f"    Page {page}: Processed {processed} articles, found {len(articles)} valid (filtered: {filtered_out})")
         
         # Check if we've reached the end
-        if len(page_articles) < 10:  # Last page has fewer than 10 articles
+        if len(page_articles) < PAGE_SIZE:  # Last page has fewer than 10 articles
             break
+    
+    return articles
+
+
+async def collect_all_queries(
+    queries: List[str],
+    begin_date: str,
+    end_date: str,
+    planner: QueryPlanner,
+    min_length: int,
+    existing_urls: Set[str],
+    strict_filter: bool,
+    target: Optional[int] = None,
+    journal: Optional[RunJournal] = None
+) -> List[Dict]:
+    """
+    Run the planned search queries concurrently under the NYTimes rate limit.
+    
+    The query planner decides which queries run and how many pages each may
+    use, spending the remaining daily budget on the queries with the highest
+    expected yield of new articles.
+    
+    Returns:
+        Collected articles in query order
+    """
+    query_articles: List[List[Dict]] = []
+    
+    def collected_count() -> int:
+        return sum(len(articles) for articles in query_articles)
+    
+    def target_reached() -> bool:
+        return bool(target) and collected_count() >= target
+    
+    async with HttpClient(cache=ResponseCache()) as client, \
+            CollectionEngine("nytimes", rate=REQUESTS_PER_MINUTE / 60, client=client) as engine, \
+            ExtractionPipeline(client=client, seen=existing_urls) as pipeline:
+        async def run_query(i: int, query: str, max_pages: int) -> List[Dict]:
+            print(f"Query {i}/{len(queries)} ({max_pages} pages planned)")
+            articles = await collect_articles_for_query(
+                engine,
+                pipeline,
+                query,
+                begin_date,
+                end_date,
+                planner,
+                min_length=min_length,
+                existing_urls=existing_urls,
+                strict_filter=strict_filter,
+                max_pages=max_pages,
+                journal=journal
+            )
+            query_articles.append(articles)
+            print(f"  Total articles collected so far: {collected_count()}")
+            print()
+            return articles
         
-        page += 1
+        results = await engine.run_plan(
+            planner,
+            queries,
+            run_query,
+            max_parallel_queries=MAX_PARALLEL_QUERIES,
+            should_stop=target_reached,
+            journal=journal
+        )
+        print(f"NYTimes API requests used: {engine.requests_made}")
+        print("Waiting for full-text extraction to finish...")
+    print(pipeline.summary())
+    print(client.summary())
+    print(planner.summary())
+    if journal is not None:
+        print(journal.summary())
+    
+    if target_reached():
+        print(f"\nHedef sayıya ulaşıldı: {collected_count()}/{target}")
+    return [article for articles in results for article in articles]
+
+
+# ============================================================================
+# ARCHIVE API (BULK MONTH MODE)
+# ============================================================================
+
+def archive_months(begin_date: str, end_date: str) -> List[Tuple[int, int]]:
+    """(year, month) pairs covering a YYYYMMDD date window, oldest first."""
+    start = datetime.strptime(begin_date, "%Y%m%d")
+    end = datetime.strptime(end_date, "%Y%m%d")
+    months = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def iter_archive_docs(path: Path) -> Iterator[Dict]:
+    """
+    Stream the docs of a downloaded Archive API month.
+    
+    With ijson installed the file is parsed incrementally, one doc at a
+    time; without it the whole file is decoded with json.
+    """
+    with open(path, "rb") as f:
+        if ijson is not None:
+            yield from ijson.items(f, "response.docs.item", use_float=True)
+        else:
+            yield from json.load(f).get("response", {}).get("docs", [])
+
+
+def load_archive_month(path: Path, begin_date: str, end_date: str) -> List[Dict]:
+    """
+    Read the docs of a month published inside the date window.
+    
+    Only the fields extract_article_metadata() uses are kept, so a month of
+    several thousand docs stays small in memory.
+    """
+    begin = f"{begin_date[:4]}-{begin_date[4:6]}-{begin_date[6:]}"
+    end = f"{end_date[:4]}-{end_date[4:6]}-{end_date[6:]}"
+    docs = []
+    for doc in iter_archive_docs(path):
+        day = (doc.get("pub_date") or "")[:10]
+        if begin <= day <= end:
+            docs.append({field: doc[field] for field in ARCHIVE_DOC_FIELDS if doc.get(field) is not None})
+    return docs
+
+
+def filter_archive_docs(docs: List[Dict]) -> List[Tuple[Dict, str, List[str], List[str]]]:
+    """
+    Apply has_both_ai_and_ce() to a month of docs in one batch.
+    
+    The title, abstract and lead paragraph of each doc form one text; both
+    keyword groups are matched against the batch with one compiled matcher
+    each (one pass per text, as in has_both_ai_and_ce()).
+    
+    Returns:
+        List of (metadata, title_desc, ai_keywords_found, ce_keywords_found)
+        for docs containing both keyword groups
+    """
+    metadata = [extract_article_metadata(doc) for doc in docs]
+    texts = [f"{m['title']} {m.get('abstract', '')} {m.get('lead_paragraph', '')}".strip() for m in metadata]
+    
+    ai_found = find_keywords_batch(texts, AI_KEYWORDS)
+    ce_found = find_keywords_batch(texts, CE_KEYWORDS)
+    
+    return [
+        (meta, text, ai, ce)
+        for meta, text, ai, ce in zip(metadata, texts, ai_found, ce_found)
+        if ai and ce
+    ]
+
+
+async def collect_archive(
+    months: List[Tuple[int, int]],
+    begin_date: str,
+    end_date: str,
+    planner: QueryPlanner,
+    min_length: int,
+    existing_urls: Set[str],
+    target: Optional[int] = None,
+    archive_url: str = ARCHIVE_URL,
+    archive_dir: Path = ARCHIVE_DIR
+) -> List[Dict]:
+    """
+    Bulk mode: one Archive API call per month, filtered locally.
+    
+    Each month is streamed to archive_dir and parsed from disk; a month file
+    that is already there is reused once the month is over (past months
+    never change), the current month is downloaded again. Keyword filtering
+    runs on title, abstract and lead paragraph (strict filter); matches whose
+    metadata is shorter than min_length go through the full-text pipeline
+    as in search mode.
+    
+    Args:
+        months: (year, month) pairs to ingest
+        begin_date: Start date in YYYYMMDD format
+        end_date: End date in YYYYMMDD format
+        planner: Query planner handing out API keys within the daily budget
+        min_length: Minimum text length for articles
+        existing_urls: Set of URLs already in database
+        target: Stop after this many articles
+        archive_url: Archive API base URL
+        archive_dir: Directory holding downloaded months
         
-        # Rate limiting: delay between requests
-        time.sleep(REQUEST_DELAY)
+    Returns:
+        Collected articles in month order
+    """
+    articles: List[Dict] = []
+    filtered_out = 0
+    bucket = TokenBucket(REQUESTS_PER_MINUTE / 60)
+    current_month = datetime.now().strftime("%Y-%m")
     
+    def accept(metadata: Dict, ai_found: List[str], ce_found: List[str]):
+        metadata['ai_keywords_found'] = ai_found
+        metadata['ce_keywords_found'] = ce_found
+        metadata['has_both'] = True
+        articles.append(metadata)
+        existing_urls.add(metadata['url'])
+    
+    def check_full_text(metadata: Dict, keywords: Tuple[List[str], List[str]]):
+        """Build the pipeline callback: the full text decides on length."""
+        def on_text(full_text: Optional[str]):
+            nonlocal filtered_out
+            if not full_text or len(full_text) < min_length:
+                filtered_out += 1
+                return
+            metadata['full_text'] = full_text
+            accept(metadata, *keywords)
+        return on_text
+    
+    async with HttpClient(cache=ResponseCache()) as client, \
+            ExtractionPipeline(client=client, seen=existing_urls) as pipeline:
+        for year, month in months:
+            if target and len(articles) >= target:
+                break
+            label = f"{year}-{month:02d}"
+            path = Path(archive_dir) / f"{label}.json"
+            
+            if not path.exists() or label >= current_month:
+                grant = planner.acquire()
+                if grant is None:
+                    print(f"  [RATE LIMIT] Günlük istek bütçesi doldu, {label} atlandı")
+                    break
+                await bucket.acquire()
+                print(f"Downloading archive {label}...")
+                status = await client.download(
+                    f"{archive_url.rstrip('/')}/{year}/{month}.json",
+                    path,
+                    params={"api-key": grant[1]},
+                    retry_statuses=SERVER_ERROR_STATUSES,
+                    timeout=ARCHIVE_TIMEOUT
+                )
+                if status == 429:
+                    planner.exhaust(grant[0])
+                if status != 200:
+                    print(f"  HTTP Status: {status} ({label} skipped)")
+                    continue
+            
+            docs = await asyncio.to_thread(load_archive_month, path, begin_date, end_date)
+            matches = await asyncio.to_thread(filter_archive_docs, docs)
+            print(f"  {label}: {len(docs)} articles in window, {len(matches)} with AI + CE keywords")
+            
+            for metadata, title_desc, ai_found, ce_found in matches:
+                url = metadata['url']
+                if not url or url in existing_urls:
+                    continue
+                if len(title_desc) < min_length:
+                    # Too short on metadata alone, the full text decides
+                    existing_urls.add(url)
+                    await pipeline.submit(url, check_full_text(metadata, (ai_found, ce_found)))
+                    continue
+                accept(metadata, ai_found, ce_found)
+        print("Waiting for full-text extraction to finish...")
+    print(pipeline.summary())
+    print(client.summary())
+    print(planner.summary())
+    print(f"Archive mode: {len(articles)} articles collected (filtered: {filtered_out})")
     return articles
 
 
@@ -556,104 +847,112 @@ def save_to_database(articles: List[Dict]) -> Tuple[int, int]:
     
     # Ensure filtered table exists
     create_filtered_table_if_not_exists()
-    
-    inserted_articles = 0
     inserted_filtered = 0
     skipped = 0
     
-    with get_db_cursor() as cur:
-        # Get existing URLs
-        cur.execute("SELECT url FROM articles")
-        existing_urls = {row['url'] for row in cur.fetchall()}
+    # Fingerprint index of the stored URLs instead of loading them all
+    existing_urls = SeenUrlIndex.postgres("articles")
+    # Pages fetched for full text are cached; their rel=canonical decides the canonical URL
+    cache = ResponseCache()
+    # Near-copies of stored stories are saved under the story's cluster id
+    near_dups = NearDuplicateIndex.postgres("articles")
+    
+    rows = []
+    details = []
+    for article in articles:
+        url = article.get("url", "")
+        if not url or url in existing_urls:
+            skipped += 1
+            continue
         
-        for i, article in enumerate(articles, 1):
-            url = article.get("url", "")
-            if not url or url in existing_urls:
-                skipped += 1
-                continue
-            
-            title = article.get("title", "")
-            description = article.get("description", "")
-            source = article.get("source", "")
-            published_at = article.get("publication_date", "")
-            full_text = article.get("full_text", "")
-            ai_keywords = article.get("ai_keywords_found", [])
-            ce_keywords = article.get("ce_keywords_found", [])
-            
-            # Parse published_at (NYTimes format: "2024-01-15T10:30:00+0000")
-            published_iso = None
-            if published_at:
+        title = article.get("title", "")
+        description = article.get("description", "")
+        source = article.get("source", "")
+        published_at = article.get("publication_date", "")
+        full_text = article.get("full_text", "")
+        
+        # Parse published_at (NYTimes format: "2024-01-15T10:30:00+0000")
+        published_iso = None
+        if published_at:
+            try:
+                dt_obj = datetime.fromisoformat(published_at.replace('+0000', '+00:00').replace('Z', '+00:00'))
+                published_iso = dt_obj.isoformat()
+            except Exception:
                 try:
-                    # Remove timezone info for parsing
-                    dt_str = published_at.split('+')[0].split('T')[0] + 'T' + published_at.split('T')[1].split('+')[0].split('-')[0]
-                    dt_obj = datetime.fromisoformat(published_at.replace('+0000', '+00:00').replace('Z', '+00:00'))
+                    dt_obj = datetime.fromisoformat(published_at.split('+')[0])
                     published_iso = dt_obj.isoformat()
                 except Exception:
-                    try:
-                        dt_obj = datetime.fromisoformat(published_at.split('+')[0])
-                        published_iso = dt_obj.isoformat()
-                    except Exception:
-                        pass
+                    pass
+        
+        rows.append((
+            title,
+            published_iso,
+            source,
+            url,
+            resolve_canonical_url(url, cache=cache),
+            full_text[:500] if full_text else None,
+            description,
+            full_text,
+            datetime.now().isoformat()
+        ))
+        details.append((article, published_iso, minhash_signature(f"{title} {full_text or description}")))
+    
+    # One COPY per table: articles first, then the filtered rows for the new article ids
+    try:
+        with get_db_cursor() as cur:
+            result = bulk_insert(
+                "articles",
+                ["title", "published_at", "source", "url", "canonical_url", "content",
+                 "description", "full_text", "retrieved_at"],
+                rows,
+                cur=cur
+            )
             
-            try:
-                # Insert into articles table
-                cur.execute("""
-                    INSERT INTO articles
-                    (title, published_at, source, url, content, description, full_text, retrieved_at)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (url) DO NOTHING
-                    RETURNING id
-                """, (
+            filtered_rows = []
+            for article_id, row, (article, published_iso, _) in zip(result.ids, rows, details):
+                if article_id is None:
+                    continue
+                title, _, source, url, _, content, description, full_text, _ = row
+                filtered_rows.append((
+                    article_id,
                     title,
-                    published_iso if published_iso else None,
-                    source,
-                    url,
-                    full_text[:500] if full_text else None,
+                    content,
                     description,
                     full_text,
-                    datetime.now().isoformat()
+                    source,
+                    url,
+                    published_iso,
+                    article.get("ai_keywords_found", []),
+                    article.get("ce_keywords_found", [])
                 ))
-                
-                result = cur.fetchone()
-                if result:
-                    article_id = result['id']
-                    inserted_articles += 1
-                    existing_urls.add(url)
-                    
-                    # Insert into filtered_ai_ce_articles table
-                    try:
-                        cur.execute("""
-                            INSERT INTO filtered_ai_ce_articles
-                            (article_id, title, content, description, full_text, source, url, published_at, ai_keywords_found, ce_keywords_found)
-                            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                            ON CONFLICT (article_id) DO NOTHING
-                        """, (
-                            article_id,
-                            title,
-                            full_text[:500] if full_text else None,
-                            description,
-                            full_text,
-                            source,
-                            url,
-                            published_iso if published_iso else None,
-                            ai_keywords,
-                            ce_keywords
-                        ))
-                        if cur.rowcount > 0:
-                            inserted_filtered += 1
-                    except Exception as e:
-                        print(f"  [WARNING] filtered_ai_ce_articles'a eklenemedi: {e}")
-                    
-                    if inserted_articles % 10 == 0 or inserted_articles == 1:
-                        print(f"  [{inserted_articles}/{len(articles)}] Database'e kaydedildi: {title[:60]}...")
-                else:
-                    skipped += 1
-                    
-            except Exception as e:
-                print(f"ERROR: {url} kaydedilemedi: {e}")
-                skipped += 1
-                continue
+            filtered = bulk_insert(
+                "filtered_ai_ce_articles",
+                ["article_id", "title", "content", "description", "full_text", "source", "url",
+                 "published_at", "ai_keywords_found", "ce_keywords_found"],
+                filtered_rows,
+                conflict_column="article_id",
+                cur=cur
+            )
+    except Exception as e:
+        print(f"ERROR: Makaleler kaydedilemedi: {e}")
+        cache.close()
+        return (0, 0)
+    
+    inserted_articles = result.inserted
+    inserted_filtered = filtered.inserted
+    skipped += result.skipped
+    print(f"  Database'e kaydedildi: {inserted_articles} yeni makale, {skipped} atlandı")
     
+    # Index the new articles in insertion order, so copies within the batch are found too
+    for article_id, row, (_, _, signature) in zip(result.ids, rows, details):
+        if article_id is None:
+            continue
+        existing_urls.add(row[3])
+        near_copy = near_dups.find(signature)
+        near_dups.add(article_id, signature, cluster_id=near_copy[1] if near_copy else None)
+    
+    print(near_dups.summary())
+    cache.close()
     return (inserted_articles, inserted_filtered)
 
 
@@ -760,6 +1059,34 @@ def main():
         default=True,  # Default olarak strict filtreleme
         help="Sıkı filtreleme: title/description'da her iki keyword grubu da olmalı (default: True)"
     )
+    parser.add_argument(
+        "--max-requests",
+        type=int,
+        default=None,
+        help="Bu çalışmada kullanılacak en fazla API isteği (default: günlük kalan bütçe)"
+    )
+    parser.add_argument(
+        "--archive",
+        action="store_true",
+        help="Archive API ile ay ay toplu indir ve yerelde filtrele (ayda 1 istek)"
+    )
+    parser.add_argument(
+        "--archive-url",
+        type=str,
+        default=ARCHIVE_URL,
+        help="Archive API base URL (test için: scripts/nytimes_archive_fixture.py)"
+    )
+    parser.add_argument(
+        "--archive-dir",
+        type=str,
+        default=str(ARCHIVE_DIR),
+        help="İndirilen ayların klasörü (default: data/nytimes_archive)"
+    )
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="Yarım kalan çalışmayı devam ettirme, yeni çalışma başlat"
+    )
     
     args = parser.parse_args()
     
@@ -777,7 +1104,7 @@ def main():
     print()
     
     # Check API key
-    if not API_KEY:
+    if not any(API_KEYS):
         print("ERROR: NYTimes API key not found!")
         print("Please set the NYTIMES_API_KEY environment variable.")
         print("Get your free API key at: https://developer.nytimes.com/")
@@ -806,49 +1133,78 @@ def main():
     # Get existing URLs from database
     existing_urls = set()
     if not args.no_db:
-        with get_db_cursor() as cur:
-            cur.execute("SELECT url FROM articles")
-            existing_urls = {row['url'] for row in cur.fetchall()}
+        existing_urls = SeenUrlIndex.postgres("articles")
         print(f"Mevcut database'de: {len(existing_urls)} makale var")
+        print(existing_urls.summary())
         print()
     
-    # Generate search queries (limit to save API quota)
-    all_queries = create_search_queries()
-    # Limit queries to save API quota - prioritize core combinations
-    # Take first 20 core queries (CE x AI combinations) + 5 broader queries
-    core_queries = [q for q in all_queries if ' AND "' in q or (' AND ' in q and not '(' in q)][:20]
-    broader_queries = [q for q in all_queries if q not in core_queries][:5]
-    queries = core_queries + broader_queries
-    
-    print(f"Generated {len(queries)} search queries (API limit koruması için {len(all_queries)}'den sınırlandırıldı)")
-    print(f"  Core queries: {len(core_queries)}")
-    print(f"  Broader queries: {len(broader_queries)}")
-    print()
-    
-    # Collect articles for each query
-    all_articles = []
+    planner = QueryPlanner(
+        "nytimes",
+        {f"Key {i}": key for i, key in enumerate(API_KEYS, 1)},
+        daily_limit=MAX_REQUESTS_PER_DAY,
+        page_size=PAGE_SIZE,
+        max_pages=MAX_PAGES,
+        max_requests=args.max_requests
+    )
+    journal = None
     
-    for i, query in enumerate(queries, 1):
-        if args.target and len(all_articles) >= args.target:
-            print(f"\nHedef sayıya ulaşıldı: {len(all_articles)}/{args.target}")
-            break
+    if args.archive:
+        # Bulk mode: one Archive API call per month instead of paging search queries
+        months = archive_months(begin_date, end_date)
+        print(f"Archive mode: {len(months)} ay ({months[0][0]}-{months[0][1]:02d} - "
+              f"{months[-1][0]}-{months[-1][1]:02d}), en fazla {len(months)} API isteği")
+        print(f"  Archive URL: {args.archive_url}")
+        if ijson is None:
+            print("  [INFO] 'ijson' yüklü değil, aylar tek seferde çözümlenecek (pip install ijson)")
+        print()
         
-        print(f"Query {i}/{len(queries)}")
-        articles = collect_articles_for_query(
-            query,
+        all_articles = asyncio.run(collect_archive(
+            months,
             begin_date,
             end_date,
-            API_KEY,
+            planner,
             min_length=args.min_len,
             existing_urls=existing_urls,
-            strict_filter=args.strict_filter
-        )
-        all_articles.extend(articles)
-        print(f"  Total articles collected so far: {len(all_articles)}")
+            target=args.target,
+            archive_url=args.archive_url,
+            archive_dir=Path(args.archive_dir)
+        ))
+    else:
+        # Generate search queries; the query planner spends the daily quota on
+        # the queries and pages that yielded the most new articles before
+        queries = create_search_queries()
+        
+        print(f"Generated {len(queries)} search queries")
+        print(f"  API keys: {len(API_KEYS)} ({MAX_REQUESTS_PER_DAY} requests/day each)")
+        print(f"  Requests available for this run: {planner.remaining()}")
         print()
         
-        # Rate limiting between queries
-        time.sleep(REQUEST_DELAY)
+        # Resume an interrupted run with the same settings (journaled pages cost no quota)
+        journal = RunJournal(
+            "nytimes",
+            settings={"queries": queries, "days_back": args.days_back,
+                      "min_length": args.min_len, "strict_filter": args.strict_filter},
+            window={"begin_date": begin_date, "end_date": end_date},
+            resume=not args.no_resume
+        )
+        if journal.resumed:
+            begin_date, end_date = journal.window["begin_date"], journal.window["end_date"]
+            print(f"Yarım kalan çalışma devam ettiriliyor: {begin_date} - {end_date} "
+                  f"({len(journal.articles())} makale kayıtlı)")
+            print()
+        
+        # Collect articles for all queries (concurrent, rate-limited)
+        all_articles = asyncio.run(collect_all_queries(
+            queries,
+            begin_date,
+            end_date,
+            planner,
+            min_length=args.min_len,
+            existing_urls=existing_urls,
+            strict_filter=args.strict_filter,
+            target=args.target,
+            journal=journal
+        ))
     
     # Remove duplicates (just in case)
     print("Removing duplicate articles...")
@@ -912,6 +1268,15 @@ def main():
         else:
             print("[WARNING] No articles to save to CSV")
             print()
+    
+    if journal is not None:
+        if planner.remaining() > 0:
+            journal.finish()
+        else:
+            # Stopped by the daily quota: keep the run so the next run resumes it
+            print("Daily quota used up; run journal kept, re-run to resume.")
+        journal.close()
+    planner.close()
 
 
 if __name__ == "__main__":
@@ -1,9 +1,17 @@
 """
 CE49X Final Project - RSS Feed Article Collector
 Enhanced version with more feeds and Excel output
+
+Feeds are polled through FeedPoller: conditional GETs, concurrent downloads,
+and only entries not seen on a previous run are reported.
+
+Usage:
+    python scripts/collect_rss.py            # one pass, new entries -> Excel
+    python scripts/collect_rss.py --daemon   # keep polling, one Excel per batch
 """
 
-import feedparser
+import argparse
+import asyncio
 import pandas as pd
 from pathlib import Path
 from datetime import datetime
@@ -14,6 +22,12 @@ import sys
 if sys.platform == "win32":
     sys.stdout.reconfigure(encoding='utf-8')
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scripts.feed_poller import FeedPoller
+from scripts.http_client import HttpClient
+from scripts.keyword_matcher import find_keywords
+
 # -----------------------------
 # 1. RSS FEED KAYNAKLARI (Genişletilmiş)
 # -----------------------------
@@ -47,6 +61,9 @@ RSS_FEEDS = {
     "IEEE": "https://spectrum.ieee.org/rss",
 }
 
+# Seen feed entries of this collector (not shared with the feed_poller.py daemon)
+FEED_STATE_PATH = Path(__file__).resolve().parents[1] / "data" / "feed_state_rss.sqlite"
+
 # -----------------------------
 # 2. KEYWORD LİSTESİ
 # (Civil Engineering + AI)
@@ -74,14 +91,6 @@ ALL_KEYWORDS = CE_KEYWORDS + AI_KEYWORDS
 # 3. HELPER FUNCTIONS
 # -----------------------------
 
-def find_keywords_in_text(text: str, keywords: list) -> list:
-    """Find which keywords appear in text."""
-    if not text:
-        return []
-    text_lower = text.lower()
-    found = [kw for kw in keywords if kw.lower() in text_lower]
-    return found
-
 def clean_html(text: str) -> str:
     """Remove HTML tags from text."""
     if not text:
@@ -111,145 +120,184 @@ def parse_date(date_str: str) -> str:
 # -----------------------------
 # 4. MAKALE TOPLAMA
 # -----------------------------
-print("=" * 70)
-print("RSS Feed'lerden Makale Çekiliyor...")
-print("=" * 70)
-print()
-
-articles = []
-total_entries = 0
-
-for source, url in RSS_FEEDS.items():
-    print(f"📡 {source}")
-    print(f"   URL: {url}")
-    try:
-        feed = feedparser.parse(url)
-        entries = feed.entries
+def filter_entries(source: str, entries: list) -> list:
+    """Keep entries with at least one CE and one AI keyword, as article rows."""
+    articles = []
+    for entry in entries:
+        title = clean_html(entry.get("title", ""))
+        summary = clean_html(entry.get("summary", "") or entry.get("description", ""))
+        link = entry.get("link", "")
+        published = entry.get("published", "") or entry.get("updated", "")
         
-        if not entries:
-            print(f"   ⚠️  Makale bulunamadı")
-            print()
+        if not title or not link:
             continue
         
-        count = 0
-        for entry in entries:
-            title = clean_html(entry.get("title", ""))
-            summary = clean_html(entry.get("summary", "") or entry.get("description", ""))
-            link = entry.get("link", "")
-            published = entry.get("published", "") or entry.get("updated", "")
-            
-            if not title or not link:
-                continue
-            
-            # Find keywords
-            combined_text = f"{title} {summary}".lower()
-            ce_found = find_keywords_in_text(combined_text, CE_KEYWORDS)
-            ai_found = find_keywords_in_text(combined_text, AI_KEYWORDS)
-            
-            # Must have at least one CE and one AI keyword (strict filtering)
-            if len(ce_found) == 0 or len(ai_found) == 0:
-                continue
-            
-            # Also check if summary is too short (might not be relevant)
-            if len(summary) < 100 and len(ce_found) == 0 and len(ai_found) == 0:
-                continue
-            
-            # Parse date
-            date_formatted = parse_date(published)
-            
-            articles.append({
-                "Title": title,
-                "Published Date": date_formatted,
-                "Source": source,
-                "URL": link,
-                "Summary": summary[:500] if summary else "",  # Limit summary length
-                "CE Keywords Found": ", ".join(ce_found),
-                "AI Keywords Found": ", ".join(ai_found),
-                "Total CE Keywords": len(ce_found),
-                "Total AI Keywords": len(ai_found),
-            })
-            count += 1
-            total_entries += 1
+        # Find keywords
+        combined_text = f"{title} {summary}".lower()
+        ce_found = find_keywords(combined_text, CE_KEYWORDS)
+        ai_found = find_keywords(combined_text, AI_KEYWORDS)
+        
+        # Must have at least one CE and one AI keyword (strict filtering)
+        if len(ce_found) == 0 or len(ai_found) == 0:
+            continue
+        
+        # Also check if summary is too short (might not be relevant)
+        if len(summary) < 100 and len(ce_found) == 0 and len(ai_found) == 0:
+            continue
         
-        print(f"   ✅ {count} relevant makale bulundu (toplam {len(entries)} entry)")
-        print()
+        # Parse date
+        date_formatted = parse_date(published)
         
-    except Exception as e:
-        print(f"   ❌ Hata: {str(e)}")
-        print()
+        articles.append({
+            "Title": title,
+            "Published Date": date_formatted,
+            "Source": source,
+            "URL": link,
+            "Summary": summary[:500] if summary else "",  # Limit summary length
+            "CE Keywords Found": ", ".join(ce_found),
+            "AI Keywords Found": ", ".join(ai_found),
+            "Total CE Keywords": len(ce_found),
+            "Total AI Keywords": len(ai_found),
+        })
+    return articles
 
-# -----------------------------
-# 5. DATAFRAME OLUŞTURMA
-# -----------------------------
-if not articles:
-    print("❌ Hiç makale bulunamadı!")
-    sys.exit(1)
 
-df = pd.DataFrame(articles)
+def filter_new_entries(new_entries: list) -> list:
+    """Group poller output by source, filter it and print per-source counts."""
+    by_source = {source: [] for source in RSS_FEEDS}
+    for source, entry in new_entries:
+        by_source[source].append(entry)
+    
+    articles = []
+    for source, entries in by_source.items():
+        if not entries:
+            continue
+        relevant = filter_entries(source, entries)
+        print(f"📡 {source}")
+        print(f"   ✅ {len(relevant)} relevant makale bulundu ({len(entries)} yeni entry)")
+        articles.extend(relevant)
+    return articles
 
-# Sort by date (newest first)
-df['Published Date'] = pd.to_datetime(df['Published Date'], errors='coerce')
-df = df.sort_values('Published Date', ascending=False, na_position='last')
-df['Published Date'] = df['Published Date'].dt.strftime('%Y-%m-%d').fillna('')
 
 # -----------------------------
-# 6. EXCEL KAYIT (Güzel formatlanmış)
+# 5-6. DATAFRAME + EXCEL KAYIT (Güzel formatlanmış)
 # -----------------------------
-SCRIPT_DIR = Path(__file__).parent.resolve()
-PROJECT_ROOT = SCRIPT_DIR.parent
-OUTPUT_DIR = PROJECT_ROOT / "data"
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-
-timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-output_file = OUTPUT_DIR / f"rss_articles_{timestamp}.xlsx"
-
-# Excel writer with formatting
-with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-    df.to_excel(writer, sheet_name='Articles', index=False)
+def save_to_excel(articles: list) -> Path:
+    """Write articles to a timestamped, formatted Excel file and print a summary."""
+    df = pd.DataFrame(articles)
     
-    # Get workbook and worksheet
-    workbook = writer.book
-    worksheet = writer.sheets['Articles']
+    # Sort by date (newest first)
+    df['Published Date'] = pd.to_datetime(df['Published Date'], errors='coerce')
+    df = df.sort_values('Published Date', ascending=False, na_position='last')
+    df['Published Date'] = df['Published Date'].dt.strftime('%Y-%m-%d').fillna('')
     
-    # Auto-adjust column widths
-    for idx, col in enumerate(df.columns, 1):
-        max_length = max(
-            df[col].astype(str).map(len).max(),
-            len(col)
-        )
-        # Set column width (with some padding)
-        worksheet.column_dimensions[chr(64 + idx)].width = min(max_length + 2, 50)
+    SCRIPT_DIR = Path(__file__).parent.resolve()
+    PROJECT_ROOT = SCRIPT_DIR.parent
+    OUTPUT_DIR = PROJECT_ROOT / "data"
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
     
-    # Freeze first row
-    worksheet.freeze_panes = 'A2'
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_file = OUTPUT_DIR / f"rss_articles_{timestamp}.xlsx"
     
-    # Make header row bold
-    from openpyxl.styles import Font, PatternFill, Alignment
+    # Excel writer with formatting
+    with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
+        df.to_excel(writer, sheet_name='Articles', index=False)
+        
+        # Get workbook and worksheet
+        workbook = writer.book
+        worksheet = writer.sheets['Articles']
+        
+        # Auto-adjust column widths
+        for idx, col in enumerate(df.columns, 1):
+            max_length = max(
+                df[col].astype(str).map(len).max(),
+                len(col)
+            )
+            # Set column width (with some padding)
+            worksheet.column_dimensions[chr(64 + idx)].width = min(max_length + 2, 50)
+        
+        # Freeze first row
+        worksheet.freeze_panes = 'A2'
+        
+        # Make header row bold
+        from openpyxl.styles import Font, PatternFill, Alignment
+        
+        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+        header_font = Font(bold=True, color="FFFFFF", size=11)
+        
+        for cell in worksheet[1]:
+            cell.font = header_font
+            cell.fill = header_fill
+            cell.alignment = Alignment(horizontal='center', vertical='center')
+        
+        # Wrap text for long columns
+        wrap_alignment = Alignment(wrap_text=True, vertical='top')
+        for row in worksheet.iter_rows(min_row=2, max_row=worksheet.max_row):
+            for cell in row:
+                if cell.column in [1, 4, 5]:  # Title, URL, Summary columns
+                    cell.alignment = wrap_alignment
     
-    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=11)
+    print("=" * 70)
+    print("✅ İşlem Tamamlandı!")
+    print("=" * 70)
+    print(f"📝 Keyword ile eşleşen makale: {len(df)}")
+    print(f"📁 Çıktı dosyası: {output_file.name}")
+    print(f"📂 Tam yol: {output_file.absolute()}")
+    print()
+    print("📈 Kaynaklara göre dağılım:")
+    source_counts = df['Source'].value_counts()
+    for source, count in source_counts.items():
+        print(f"   {source}: {count} makale")
+    return output_file
+
+
+async def collect(daemon: bool) -> int:
+    """Poll RSS_FEEDS once (or forever in daemon mode); return relevant article count."""
+    total = 0
+    
+    def handle(new_entries: list):
+        nonlocal total
+        articles = filter_new_entries(new_entries)
+        if articles:
+            save_to_excel(articles)
+            total += len(articles)
+    
+    async with HttpClient(max_connections=20) as client:
+        poller = FeedPoller(RSS_FEEDS, client, state_path=FEED_STATE_PATH)
+        try:
+            if daemon:
+                await poller.run(handle)
+            else:
+                new_entries = await poller.poll_once(force=True)
+                handle(new_entries)
+                poller.mark_seen(new_entries)
+        finally:
+            print(poller.summary())
+            poller.close()
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Collect CE + AI articles from RSS feeds.")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Keep polling with learned per-feed intervals instead of a single pass.")
+    args = parser.parse_args()
     
-    for cell in worksheet[1]:
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal='center', vertical='center')
+    print("=" * 70)
+    print("RSS Feed'lerden Makale Çekiliyor...")
+    print("=" * 70)
+    print()
     
-    # Wrap text for long columns
-    wrap_alignment = Alignment(wrap_text=True, vertical='top')
-    for row in worksheet.iter_rows(min_row=2, max_row=worksheet.max_row):
-        for cell in row:
-            if cell.column in [1, 4, 5]:  # Title, URL, Summary columns
-                cell.alignment = wrap_alignment
-
-print("=" * 70)
-print("✅ İşlem Tamamlandı!")
-print("=" * 70)
-print(f"📊 Toplam çekilen entry: {total_entries}")
-print(f"📝 Keyword ile eşleşen makale: {len(df)}")
-print(f"📁 Çıktı dosyası: {output_file.name}")
-print(f"📂 Tam yol: {output_file.absolute()}")
-print()
-print("📈 Kaynaklara göre dağılım:")
-source_counts = df['Source'].value_counts()
-for source, count in source_counts.items():
-    print(f"   {source}: {count} makale")
+    try:
+        total = asyncio.run(collect(args.daemon))
+    except KeyboardInterrupt:
+        print("Stopped.")
+        return
+    
+    if not total:
+        print("❌ Yeni makale bulunamadı!")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
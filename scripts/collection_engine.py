@@ -0,0 +1,312 @@
+"""
+Concurrent API collection engine for CE49X Final Project.
+
+The NYTimes, Guardian and NewsAPI collectors share this engine: search queries
+and result pages run concurrently over the shared HttpClient, while a
+per-provider token bucket keeps the request rate at the provider's real quota.
+Throughput is bounded by the quota instead of by fixed sleeps between calls.
+
+Each collector keeps its own fetch_articles_page() adapter, which builds the
+request parameters and interprets provider-specific errors. With a
+QueryPlanner, run_plan() decides which queries run and how deep they are
+paged, and API keys are drawn from the planner request by request.
+
+Usage:
+    async with HttpClient() as client, \
+            CollectionEngine("guardian", rate=1.0, client=client) as engine:
+        status, data = await engine.get_json(GUARDIAN_URL, params)
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from scripts.http_client import HttpClient, SERVER_ERROR_STATUSES
+from scripts.query_planner import QueryPlanner
+from scripts.run_journal import RunJournal
+
+
+class TokenBucket:
+    """
+    Asyncio token-bucket rate limiter.
+
+    Tokens refill continuously at `rate` tokens per second up to `capacity`.
+    Waiters are served in arrival order.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        """
+        Initialize token bucket.
+
+        Args:
+            rate: Tokens added per second (e.g. 5 / 60 for 5 calls per minute)
+            capacity: Maximum burst size
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0):
+        """Wait until `tokens` are available and consume them."""
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+
+class CollectionEngine:
+    """
+    Shared asyncio engine for paginated news API collection.
+
+    One instance per provider: it holds the provider's token bucket and a cap
+    on in-flight requests, and sends requests through an HttpClient (its own
+    one unless a shared client is passed in). Once a provider reports that its
+    daily quota is exhausted, the adapter calls stop() and every later request
+    is skipped.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        rate: float,
+        capacity: float = 1.0,
+        max_in_flight: int = 4,
+        client: Optional[HttpClient] = None
+    ):
+        """
+        Initialize collection engine.
+
+        Args:
+            provider: Provider name used in log messages ('nytimes', 'guardian', 'newsapi')
+            rate: Allowed requests per second
+            capacity: Token bucket burst size
+            max_in_flight: Maximum concurrent HTTP requests
+            client: Shared HTTP client (default: engine-owned client)
+        """
+        self.provider = provider
+        self.bucket = TokenBucket(rate, capacity)
+        self.max_in_flight = max_in_flight
+        self.requests_made = 0
+        self.client = client
+        self._owns_client = client is None
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        self._stopped = False
+
+    async def __aenter__(self):
+        if self._owns_client:
+            self.client = await HttpClient().__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self._owns_client and self.client is not None:
+            await self.client.__aexit__(exc_type, exc, tb)
+            self.client = None
+
+    @property
+    def stopped(self) -> bool:
+        return self._stopped
+
+    def stop(self):
+        """Stop issuing requests (e.g. daily quota exhausted)."""
+        self._stopped = True
+
+    async def get_json(
+        self,
+        url: str,
+        params: Dict[str, Any],
+        credentials: Optional[Callable[[], Optional[Dict[str, str]]]] = None
+    ) -> Tuple[Optional[int], Optional[Dict]]:
+        """
+        Rate-limited GET returning (status, decoded JSON).
+
+        Returns (None, None) if the engine is stopped or the request failed at
+        the network level. The body is decoded even for error statuses so that
+        adapters can inspect provider error messages. Responses already in the
+        client's cache are served without consuming quota. Only server errors are
+        retried; a 429 means different things per provider and is left to the
+        adapter.
+
+        `credentials` is called only when a request actually goes out; it
+        returns the auth parameters to add (e.g. {"apiKey": key}), or None when
+        no quota is left, in which case (None, None) is returned.
+        """
+        if self._stopped:
+            return None, None
+        # Cached pages cost no quota, so they skip the token bucket
+        response = self.client.cached(url, params)
+        if response is None:
+            await self.bucket.acquire()
+            if self._stopped:
+                return None, None
+            if credentials is not None:
+                auth = credentials()
+                if auth is None:
+                    return None, None
+                params = {**params, **auth}
+            async with self._in_flight:
+                self.requests_made += 1
+                response = await self.client.get(url, params=params, retry_statuses=SERVER_ERROR_STATUSES)
+        if response is None:
+            print(f"    [{self.provider}] Request failed: {url}")
+            return None, None
+        try:
+            data = response.json()
+        except ValueError:
+            data = None
+        return response.status, data
+
+    async def fetch_pages(
+        self,
+        fetch_page: Callable[[int], Awaitable[Optional[Dict]]],
+        total_of: Callable[[Dict], Optional[int]],
+        first_page: int,
+        max_pages: int,
+        page_size: int,
+        keep_paging: Optional[Callable[[int, Dict], bool]] = None
+    ) -> List[Tuple[int, Dict]]:
+        """
+        Fetch all pages of one query, first page alone and the rest concurrently.
+
+        The first page tells us how many results exist, so only pages that can
+        contain results are requested. With `keep_paging`, pages are fetched
+        one after another instead and paging stops after the first page for
+        which keep_paging(page, data) returns False (e.g. too few new URLs).
+
+        Args:
+            fetch_page: Adapter coroutine returning the JSON dict for a page (or None)
+            total_of: Returns the total hit count from a page dict, or None on API error
+            first_page: Index of the first page (0 for NYTimes, 1 for Guardian/NewsAPI)
+            max_pages: Maximum number of pages to fetch
+            page_size: Results per page
+            keep_paging: Optional novelty check called with each fetched page
+
+        Returns:
+            List of (page, response_data) tuples in page order, stopping at the
+            first failed page
+        """
+        first = await fetch_page(first_page)
+        if first is None:
+            return []
+        pages = [(first_page, first)]
+
+        total = total_of(first)
+        if not total:
+            return pages
+
+        page_count = min(max_pages, -(-total // page_size))
+        rest = list(range(first_page + 1, first_page + page_count))
+        if not rest:
+            return pages
+
+        if keep_paging is not None:
+            if not keep_paging(first_page, first):
+                return pages
+            for page in rest:
+                data = await fetch_page(page)
+                if data is None:
+                    break
+                pages.append((page, data))
+                if not keep_paging(page, data):
+                    break
+            return pages
+
+        results = await asyncio.gather(*(fetch_page(p) for p in rest))
+        for page, data in zip(rest, results):
+            if data is None:
+                break
+            pages.append((page, data))
+        return pages
+
+    async def run_queries(
+        self,
+        queries: Sequence[str],
+        run_query: Callable[[int, str], Awaitable[List[Dict]]],
+        max_parallel_queries: int = 4,
+        should_stop: Optional[Callable[[], bool]] = None
+    ) -> List[List[Dict]]:
+        """
+        Run `run_query(index, query)` for every query with bounded parallelism.
+
+        Queries start in order; no new query starts once `should_stop()` returns
+        True or the engine is stopped.
+
+        Returns:
+            Per-query results in query order (empty list for skipped queries)
+        """
+        slots = asyncio.Semaphore(max_parallel_queries)
+        results: List[List[Dict]] = [[] for _ in queries]
+
+        async def run(i: int, query: str):
+            async with slots:
+                if self._stopped or (should_stop and should_stop()):
+                    return
+                articles = await run_query(i, query)
+                if articles is not None:
+                    results[i - 1] = articles
+
+        await asyncio.gather(*(run(i, q) for i, q in enumerate(queries, 1)))
+        return results
+
+    async def run_plan(
+        self,
+        planner: QueryPlanner,
+        queries: Sequence[str],
+        run_query: Callable[[int, str, int], Awaitable[List[Dict]]],
+        max_parallel_queries: int = 4,
+        should_stop: Optional[Callable[[], bool]] = None,
+        journal: Optional[RunJournal] = None
+    ) -> List[List[Dict]]:
+        """
+        Run `run_query(index, query, max_pages)` in the planner's order.
+
+        The planner allocates the remaining budget to the queries and pages
+        with the highest expected yield. Budget left over once those queries
+        are done (paging stopped for low novelty, fewer results than planned,
+        pages served from cache) is planned again over the queries that have
+        not run yet.
+
+        Queries with pages in the run journal run first, with at least their
+        journaled pages, whatever the budget: replayed pages cost no quota, so
+        a run interrupted by the daily quota still replays on resume.
+
+        Returns:
+            Per-query results in execution order
+        """
+        results: List[List[Dict]] = []
+        pending = list(queries)
+        started = 0
+        while pending and not self._stopped and not (should_stop and should_stop()):
+            allocated = dict(planner.plan(pending))
+            journaled = journal.journaled_pages(pending) if journal is not None else {}
+            planned = {query: max(pages, allocated.get(query, 0)) for query, pages in journaled.items()}
+            planned.update((query, pages) for query, pages in allocated.items() if query not in planned)
+            if not planned:
+                break
+            offset = started
+            results.extend(await self.run_queries(
+                list(planned),
+                lambda i, query: run_query(offset + i, query, planned[query]),
+                max_parallel_queries=max_parallel_queries,
+                should_stop=should_stop
+            ))
+            started += len(planned)
+            pending = [query for query in pending if query not in planned]
+        return results
+
+
+async def run_blocking(func: Callable, *args):
+    """Run a blocking function (e.g. a full-text download) in the default thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, func, *args)
@@ -23,7 +23,7 @@ except ImportError:
     pass
 
 # Database connection
-from database.db_config import get_db_cursor, test_connection
+from database.db_config import BatchWriter, get_db_cursor, test_connection
 
 # Fix Windows encoding issue
 if sys.platform == 'win32':
@@ -102,14 +102,13 @@ Write only the abstract text, no explanations. The abstract can be in English or
         return None
 
 
-def update_abstract(article_id: int, abstract: str):
-    """Update abstract in database."""
-    with get_db_cursor() as cur:
-        cur.execute("""
-            UPDATE all_valid_articles 
-            SET abstract = %s 
-            WHERE id = %s
-        """, (abstract, article_id))
+def update_abstract(writer: BatchWriter, article_id: int, abstract: str):
+    """Update abstract in database (buffered in the writer's next batch)."""
+    writer.add("""
+        UPDATE all_valid_articles 
+        SET abstract = %s 
+        WHERE id = %s
+    """, (abstract, article_id))
 
 
 def renumber_ids():
@@ -237,27 +236,29 @@ def main():
         success_count = 0
         fail_count = 0
         
-        for i, article in enumerate(articles, 1):
-            article_id = article['id']
-            title = article.get('title') or "No title"
-            description = article.get('description')
-            text_content = article.get('text_content')
-            
-            print(f"[{i}/{missing_count}] Processing article ID {article_id}: {title[:60]}...")
-            
-            abstract = generate_abstract(title, description, text_content)
-            
-            if abstract:
-                update_abstract(article_id, abstract)
-                print(f"  ✓ Abstract generated ({len(abstract)} chars)")
-                success_count += 1
-            else:
-                print(f"  ✗ Failed to generate abstract")
-                fail_count += 1
-            
-            # Rate limiting - wait between API calls
-            if i < missing_count:
-                time.sleep(1)  # 1 second delay between calls
+        # Abstracts are committed in batches (every 20 or after 30 s)
+        with BatchWriter(flush_rows=20, flush_interval=30.0) as writer:
+            for i, article in enumerate(articles, 1):
+                article_id = article['id']
+                title = article.get('title') or "No title"
+                description = article.get('description')
+                text_content = article.get('text_content')
+                
+                print(f"[{i}/{missing_count}] Processing article ID {article_id}: {title[:60]}...")
+                
+                abstract = generate_abstract(title, description, text_content)
+                
+                if abstract:
+                    update_abstract(writer, article_id, abstract)
+                    print(f"  ✓ Abstract generated ({len(abstract)} chars)")
+                    success_count += 1
+                else:
+                    print(f"  ✗ Failed to generate abstract")
+                    fail_count += 1
+                
+                # Rate limiting - wait between API calls
+                if i < missing_count:
+                    time.sleep(1)  # 1 second delay between calls
         
         print(f"\n✓ Abstract generation complete:")
         print(f"  - Success: {success_count}")
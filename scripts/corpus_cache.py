@@ -0,0 +1,273 @@
+"""
+Persisted token-id corpus cache for CE49X Final Project text processing.
+
+Preprocessing (preprocess_newsapi.py), the preprocessing report
+(generate_preprocessing_report.py) and the cleaned dataset
+(create_cleaned_dataset.py) all need the same cleaned token stream of each
+article: lower-cased, URLs and e-mail addresses removed, split on anything
+but letters and digits, stopwords and words of up to two letters dropped.
+CorpusCache computes that stream once per article and keeps it on disk:
+- every distinct word gets a stable integer id (vocabulary.json, append-only)
+- token ids of all cached articles are appended to one uint32 file
+  (tokens.u32) that readers memory-map, so reading a cached article copies
+  nothing
+- index.npz maps the content hash of each article's source text to the
+  offset and length of its ids
+
+Caches live in one directory per preprocessing configuration (a hash of the
+stopword list, the minimum word length and the tokenizer version), so a
+config change never reads stale tokens. On each run only articles whose text
+changed since the last run are tokenized. Entries of edited or deleted
+articles stay in the files (consumers load different subsets of the corpus)
+until compact() rewrites the cache for the texts still in use.
+
+Usage:
+    corpus = CorpusCache().load(texts)   # tokenizes new or changed texts only
+    corpus.ids(0)                        # uint32 view into the memory map
+    corpus.text(0)                       # "engineers inspect bridge ..."
+    corpus.word_counts().most_common(20)
+"""
+
+import hashlib
+import json
+import os
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+CACHE_DIR = PROJECT_ROOT / "data" / "corpus_cache"
+TOKENIZER_VERSION = 1  # Bump when normalize_text() or clean_tokens() change
+MIN_WORD_LENGTH = 3
+
+URL_RE = re.compile(r"http\S+|www\.\S+")
+EMAIL_RE = re.compile(r"\S+@\S+")
+NON_WORD_RE = re.compile(r"[^a-z0-9\s]")
+
+# Used when the NLTK stopword corpus is not available
+BASIC_STOPWORDS = frozenset({
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
+    'of', 'with', 'by', 'from', 'as', 'is', 'was', 'are', 'were', 'be',
+    'been', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would',
+    'should', 'could', 'may', 'might', 'must', 'can', 'this', 'that',
+    'these', 'those', 'i', 'you', 'he', 'she', 'it', 'we', 'they'
+})
+
+# News-site noise words removed along with the English stopwords
+DOMAIN_STOPWORDS = frozenset({
+    'article', 'read', 'more', 'click', 'here', 'subscribe', 'newsletter',
+    'share', 'like', 'follow', 'comment', 'view', 'see', 'also', 'related',
+    'news', 'said', 'says', 'according', 'would', 'could', 'should'
+})
+
+
+def default_stopwords() -> FrozenSet[str]:
+    """NLTK English stopwords (or BASIC_STOPWORDS without NLTK) plus DOMAIN_STOPWORDS."""
+    try:
+        import nltk
+        from nltk.corpus import stopwords
+
+        try:
+            nltk.data.find('corpora/stopwords')
+        except LookupError:
+            nltk.download('stopwords', quiet=True)
+        english = frozenset(stopwords.words('english'))
+    except (ImportError, LookupError):
+        english = BASIC_STOPWORDS
+    return english | DOMAIN_STOPWORDS
+
+
+def normalize_text(text: str) -> str:
+    """Lower-case text without URLs, e-mail addresses and non-alphanumeric characters."""
+    if not isinstance(text, str) or not text:
+        return ""
+    text = URL_RE.sub('', text.lower())
+    text = EMAIL_RE.sub('', text)
+    return ' '.join(NON_WORD_RE.sub(' ', text).split())
+
+
+def clean_tokens(text: str, stop_words: FrozenSet[str], min_length: int = MIN_WORD_LENGTH) -> List[str]:
+    """Words of a normalized text without stopwords and short words."""
+    return [word for word in normalize_text(text).split()
+            if len(word) >= min_length and word not in stop_words]
+
+
+def content_hash(text: str) -> bytes:
+    """16-byte hash of a source text (missing texts hash as empty)."""
+    text = text if isinstance(text, str) else ""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class TokenCorpus:
+    """Token ids of a list of texts, as views into the cache's memory map."""
+
+    def __init__(self, tokens: np.ndarray, offsets: np.ndarray, lengths: np.ndarray, vocabulary: List[str]):
+        self.tokens = tokens
+        self.offsets = offsets
+        self.lengths = lengths
+        self.vocabulary = vocabulary
+        self.reused = 0  # Texts read from the cache
+        self.tokenized = 0  # Texts tokenized by this load
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def ids(self, i: int) -> np.ndarray:
+        """Token ids of text i (a read-only view, no copy)."""
+        return self.tokens[self.offsets[i]:self.offsets[i] + self.lengths[i]]
+
+    def words(self, i: int) -> List[str]:
+        vocabulary = self.vocabulary
+        return [vocabulary[token] for token in self.ids(i).tolist()]
+
+    def text(self, i: int) -> str:
+        """Cleaned text of text i (its words joined by spaces)."""
+        return ' '.join(self.words(i))
+
+    def stream(self) -> np.ndarray:
+        """Token ids of all texts in order, concatenated."""
+        if not len(self):
+            return np.empty(0, dtype=np.uint32)
+        return np.concatenate([self.ids(i) for i in range(len(self))])
+
+    def word_counts(self) -> Counter:
+        """Frequency of every word over all texts."""
+        counts = np.bincount(self.stream(), minlength=len(self.vocabulary))
+        return Counter({self.vocabulary[i]: int(counts[i]) for i in np.flatnonzero(counts)})
+
+    def bigram_counts(self) -> Counter:
+        """Frequency of every pair of consecutive words within a text."""
+        stream = self.stream().astype(np.int64)
+        if len(stream) < 2:
+            return Counter()
+        # Pairs that straddle two texts start at a text's last position
+        within = np.ones(len(stream) - 1, dtype=bool)
+        ends = np.cumsum(self.lengths)[:-1] - 1
+        within[ends[(ends >= 0) & (ends < len(within))]] = False
+        size = len(self.vocabulary)
+        codes, counts = np.unique(stream[:-1][within] * size + stream[1:][within], return_counts=True)
+        vocabulary = self.vocabulary
+        return Counter({f"{vocabulary[code // size]} {vocabulary[code % size]}": int(count)
+                        for code, count in zip(codes.tolist(), counts.tolist())})
+
+
+class CorpusCache:
+    """On-disk token-id cache of cleaned article texts for one preprocessing config."""
+
+    def __init__(self, directory: Path = CACHE_DIR, stop_words: Optional[Iterable[str]] = None,
+                 min_length: int = MIN_WORD_LENGTH):
+        """
+        Args:
+            directory: Parent directory of the per-config caches
+            stop_words: Words to drop (default: default_stopwords())
+            min_length: Shortest word kept
+        """
+        self.stop_words = frozenset(stop_words) if stop_words is not None else default_stopwords()
+        self.min_length = min_length
+        config = json.dumps({"version": TOKENIZER_VERSION, "min_length": min_length,
+                             "stop_words": sorted(self.stop_words)})
+        self.config_hash = hashlib.blake2b(config.encode("utf-8"), digest_size=8).hexdigest()
+        self.directory = Path(directory) / self.config_hash
+        self.tokens_path = self.directory / "tokens.u32"
+        self.vocabulary_path = self.directory / "vocabulary.json"
+        self.index_path = self.directory / "index.npz"
+
+        self.vocabulary: List[str] = []
+        self._word_ids: Dict[str, int] = {}
+        self._index: Dict[bytes, tuple] = {}  # content hash -> (offset, length)
+        self._read()
+
+    def _read(self):
+        if not self.index_path.exists():
+            return
+        self.vocabulary = json.loads(self.vocabulary_path.read_text(encoding="utf-8"))
+        self._word_ids = {word: i for i, word in enumerate(self.vocabulary)}
+        with np.load(self.index_path) as index:
+            self._index = {key: (offset, length) for key, offset, length in
+                           zip(index["hashes"].tolist(), index["offsets"].tolist(), index["lengths"].tolist())}
+
+    def _write_metadata(self):
+        """Write vocabulary and index (index last: it commits the appended tokens)."""
+        temp = self.vocabulary_path.with_name(self.vocabulary_path.name + ".tmp")
+        temp.write_text(json.dumps(self.vocabulary), encoding="utf-8")
+        os.replace(temp, self.vocabulary_path)
+
+        hashes = np.array(list(self._index), dtype="S16")
+        entries = np.array(list(self._index.values()), dtype=np.int64).reshape(-1, 2)
+        temp = self.index_path.with_name("index.tmp.npz")
+        np.savez(temp, hashes=hashes, offsets=entries[:, 0], lengths=entries[:, 1])
+        os.replace(temp, self.index_path)
+
+    def _token_count(self) -> int:
+        return self.tokens_path.stat().st_size // 4 if self.tokens_path.exists() else 0
+
+    def _memmap(self) -> np.ndarray:
+        if not self._token_count():
+            return np.empty(0, dtype=np.uint32)
+        return np.memmap(self.tokens_path, dtype=np.uint32, mode="r")
+
+    def compact(self, texts: Iterable[str]):
+        """Drop every cached entry except those of `texts` and rewrite the token file."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        keep = [key for key in dict.fromkeys(content_hash(text) for text in texts) if key in self._index]
+        tokens = self._memmap()
+        temp = self.tokens_path.with_name(self.tokens_path.name + ".tmp")
+        index = {}
+        offset = 0
+        with open(temp, "wb") as out:
+            for key in keep:
+                start, length = self._index[key]
+                tokens[start:start + length].tofile(out)
+                index[key] = (offset, length)
+                offset += length
+        del tokens
+        os.replace(temp, self.tokens_path)
+        self._index = index
+        self._write_metadata()
+
+    def load(self, texts: Sequence[str]) -> TokenCorpus:
+        """
+        Token ids of a list of texts, tokenizing only texts not cached yet.
+
+        New entries are persisted before returning.
+
+        Args:
+            texts: Source texts (None/NaN count as empty)
+
+        Returns:
+            TokenCorpus aligned with `texts`
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        keys = [content_hash(text) for text in texts]
+
+        new: Dict[bytes, List[int]] = {}
+        word_ids = self._word_ids
+        for key, text in zip(keys, texts):
+            if key in self._index or key in new:
+                continue
+            ids = []
+            for word in clean_tokens(text, self.stop_words, self.min_length):
+                word_id = word_ids.get(word)
+                if word_id is None:
+                    word_id = word_ids[word] = len(self.vocabulary)
+                    self.vocabulary.append(word)
+                ids.append(word_id)
+            new[key] = ids
+
+        if new:
+            offset = self._token_count()
+            with open(self.tokens_path, "ab") as out:
+                for key, ids in new.items():
+                    np.asarray(ids, dtype=np.uint32).tofile(out)
+                    self._index[key] = (offset, len(ids))
+                    offset += len(ids)
+            self._write_metadata()
+
+        entries = np.array([self._index[key] for key in keys], dtype=np.int64).reshape(-1, 2)
+        corpus = TokenCorpus(self._memmap(), entries[:, 0], entries[:, 1], self.vocabulary)
+        corpus.tokenized = len(new)
+        corpus.reused = len(keys) - sum(1 for key in keys if key in new)
+        return corpus
@@ -7,13 +7,14 @@ import os
 import sys
 from pathlib import Path
 import pandas as pd
-import re
 
 # Add project root to path
 SCRIPT_DIR = Path(__file__).parent.resolve()
 PROJECT_ROOT = SCRIPT_DIR.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
+from scripts.corpus_cache import CorpusCache
+
 # Fix Windows encoding issue
 if sys.platform == 'win32':
     sys.stdout.reconfigure(encoding='utf-8')
@@ -25,40 +26,6 @@ OUTPUT_DIR.mkdir(exist_ok=True)
 CLEANED_DATASET_CSV = OUTPUT_DIR / "cleaned_dataset.csv"
 
 
-def normalize_text(text: str) -> str:
-    """Normalize text: lowercase and remove special characters."""
-    if pd.isna(text) or not text:
-        return ""
-    
-    text = str(text).lower()
-    # Remove URLs
-    text = re.sub(r'http\S+|www\.\S+', '', text)
-    # Remove email addresses
-    text = re.sub(r'\S+@\S+', '', text)
-    # Remove special characters, keep only alphanumeric and spaces
-    text = re.sub(r'[^a-z0-9\s]', ' ', text)
-    # Remove extra whitespace
-    text = ' '.join(text.split())
-    return text
-
-
-def remove_stopwords(text: str) -> str:
-    """Remove common English stopwords."""
-    stop_words = {
-        'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
-        'of', 'with', 'by', 'from', 'as', 'is', 'was', 'are', 'were', 'be',
-        'been', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would',
-        'should', 'could', 'may', 'might', 'must', 'can', 'this', 'that',
-        'these', 'those', 'i', 'you', 'he', 'she', 'it', 'we', 'they',
-        'article', 'read', 'more', 'click', 'here', 'subscribe', 'newsletter',
-        'share', 'like', 'follow', 'comment', 'view', 'see', 'also', 'related'
-    }
-    
-    tokens = text.split()
-    filtered_tokens = [token for token in tokens if token not in stop_words and len(token) > 2]
-    return ' '.join(filtered_tokens)
-
-
 def get_all_valid_articles():
     """Get all valid articles from database."""
     try:
@@ -82,9 +49,8 @@ def get_all_valid_articles():
         return None
 
 
-def preprocess_article_text(row):
-    """Preprocess a single article's text."""
-    # Combine title, description, and abstract
+def combine_article_text(row) -> str:
+    """Title, description and abstract of an article, joined by spaces."""
     text_parts = []
     if pd.notna(row.get('title')):
         text_parts.append(str(row['title']))
@@ -93,15 +59,26 @@ def preprocess_article_text(row):
     if pd.notna(row.get('abstract')):
         text_parts.append(str(row['abstract']))
     
-    combined_text = ' '.join(text_parts)
-    
-    # Normalize
-    normalized = normalize_text(combined_text)
+    return ' '.join(text_parts)
+
+
+def preprocess_articles(df: pd.DataFrame) -> list:
+    """
+    Cleaned text (normalized, stopwords removed) of each article.
     
-    # Remove stopwords
-    cleaned = remove_stopwords(normalized)
+    Token ids come from the shared corpus cache, so only articles whose text
+    changed since the last run are tokenized again.
     
-    return cleaned
+    Args:
+        df: Articles with title, description and abstract columns
+        
+    Returns:
+        Cleaned text per row of df
+    """
+    texts = df.apply(combine_article_text, axis=1).tolist() if len(df) else []
+    corpus = CorpusCache().load(texts)
+    print(f"  Corpus cache: {corpus.reused} reused, {corpus.tokenized} tokenized")
+    return [corpus.text(i) for i in range(len(corpus))]
 
 
 def main():
@@ -123,7 +100,7 @@ def main():
     
     # Preprocess text
     print("Step 2: Preprocessing text (normalization, stopword removal)...")
-    df['cleaned_text'] = df.apply(preprocess_article_text, axis=1)
+    df['cleaned_text'] = preprocess_articles(df)
     print("[OK] Text preprocessing complete")
     print()
     
@@ -2,21 +2,35 @@
 LLM kullanarak newsapi_articles tablosundaki summary'lara bakıp
 birebir aynı konu olan duplicate'leri tespit eder.
 Veritabanını değiştirmez, sadece analiz yapar ve sonuçları CSV'ye kaydeder.
+
+LLM'e gidecek aday çiftler tüm çiftler taranmadan, summary/title kelime
+kümelerinin MinHash LSH indeksiyle (scripts/near_duplicates.py) bulunur.
 """
 
 import os
 import sys
 import json
-import time
 import csv
+import re
+import asyncio
+import itertools
 from pathlib import Path
-from typing import Optional, List, Dict, Tuple
-from itertools import combinations
+from typing import Optional, List, Dict, Set, Tuple
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from database.db_config import get_db_cursor, test_connection
+from scripts.collection_engine import TokenBucket
+from scripts.disjoint_set import DisjointSet
+from scripts.near_duplicates import MemoryLshStore, band_keys, signature_from_hashes, token_hashes
+
+# Load environment variables from .env file (once)
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
 
 # Fix Windows encoding issue
 if sys.platform == 'win32':
@@ -28,8 +42,31 @@ PROJECT_ROOT = SCRIPT_DIR.parent
 # Output CSV file
 OUTPUT_CSV = PROJECT_ROOT / "data" / "duplicate_articles_by_summary.csv"
 
+# LLM adjudication
+LLM_MODEL = "gpt-3.5-turbo"
+MAX_CLUSTER_SIZE = 12  # Articles per LLM prompt; larger clusters are split
+MAX_CONCURRENT_REQUESTS = 4
+
 # Rate limiting
-REQUEST_DELAY = 1.0  # Delay between API requests (seconds)
+REQUEST_DELAY = 1.0  # Minimum interval between API request starts (seconds)
+
+# Pre-filter thresholds (Jaccard similarity of word sets)
+SUMMARY_MIN_SIMILARITY = 0.3
+TITLE_MIN_SIMILARITY = 0.5
+OPENING_MIN_SIMILARITY = 0.4  # First OPENING_CHARS characters of the summaries
+OPENING_CHARS = 50
+MIN_LENGTH_RATIO = 0.7  # Summary length ratio required for the opening check
+
+# LSH band layouts (bands, rows) per field. A pair with similarity s becomes a
+# candidate with probability 1 - (1 - s**rows)**bands: 0.997 for summaries at
+# 0.3, 0.995 for titles at 0.5 and > 0.999 for openings at 0.4.
+LSH_BANDS = {
+    "summary": (60, 2),
+    "title": (40, 3),
+    "opening": (60, 2),
+}
+
+WORD_RE = re.compile(r'\w+')
 
 
 def get_all_articles_with_summary() -> List[Dict]:
@@ -45,252 +82,348 @@ def get_all_articles_with_summary() -> List[Dict]:
         return cur.fetchall()
 
 
-def compare_summaries_with_llm(summary1: str, summary2: str, title1: str, title2: str) -> Optional[Dict]:
-    """
-    İki summary'yi LLM ile karşılaştır ve aynı konu olup olmadığını belirle
-    Returns: {"is_same_topic": bool, "confidence": float, "reason": str} or None
-    """
-    prompt = f"""Compare these two article summaries and determine if they report the same news story or topic.
-
-Article 1:
-Title: {title1}
-Summary: {summary1}
+def create_cluster_prompt(articles: List[Dict]) -> str:
+    """Bir aday kümesindeki makaleleri tek bir partition isteği olarak LLM'e sor"""
+    blocks = []
+    for article in articles:
+        blocks.append(
+            f"Article {article['id']}:\n"
+            f"Title: {article.get('title') or 'No title'}\n"
+            f"Summary: {article['summary']}"
+        )
+    articles_text = "\n\n".join(blocks)
+    
+    return f"""The following {len(articles)} article summaries were flagged as possibly reporting the same news.
+Group together the articles that report the same news story or topic.
 
-Article 2:
-Title: {title2}
-Summary: {summary2}
+{articles_text}
 
-Are these two articles about the same news story or topic? Consider:
+Consider:
 - Same event, same facts, same main points
 - Different wording but same core story
 - Same topic even if from different sources
 
 Respond ONLY with valid JSON in this exact format:
 {{
-  "is_same_topic": true or false,
-  "confidence": 0.0 to 1.0,
-  "reason": "brief explanation in Turkish or English"
+  "groups": [
+    {{"ids": [article numbers of one story], "confidence": 0.0 to 1.0, "reason": "brief explanation in Turkish or English"}}
+  ]
 }}
 
+List only groups with two or more articles; articles that match no other article are left out.
 Do not include any text outside the JSON."""
 
+
+def parse_partition(result_text: str, article_ids: List[int]) -> Optional[List[Dict]]:
+    """
+    LLM cevabındaki partition'ı doğrula
+    Returns: [{"ids": [...], "confidence": float, "reason": str}, ...] or None
+    """
     try:
-        from openai import OpenAI
-        from dotenv import load_dotenv
-        load_dotenv()
-        
-        api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key:
-            print("  ERROR: OPENAI_API_KEY environment variable not set!")
-            return None
-        
-        client = OpenAI(api_key=api_key)
-        
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
+        result = json.loads(result_text)
+    except json.JSONDecodeError:
+        # Try to extract JSON from text if wrapped
+        start = result_text.find('{')
+        end = result_text.rfind('}') + 1
+        try:
+            result = json.loads(result_text[start:end]) if 0 <= start < end else None
+        except json.JSONDecodeError:
+            result = None
+    
+    if not isinstance(result, dict) or not isinstance(result.get('groups'), list):
+        print(f"    Warning: Invalid response structure: {result_text}")
+        return None
+    
+    known = set(article_ids)
+    assigned = set()
+    groups = []
+    for group in result['groups']:
+        if not isinstance(group, dict):
+            continue
+        try:
+            ids = [int(i) for i in group.get('ids', [])]
+            confidence = float(group.get('confidence', 0.0))
+        except (TypeError, ValueError):
+            continue
+        # Unknown ids and articles already placed in another group are ignored
+        ids = [i for i in dict.fromkeys(ids) if i in known and i not in assigned]
+        if len(ids) < 2:
+            continue
+        assigned.update(ids)
+        groups.append({'ids': ids, 'confidence': confidence, 'reason': str(group.get('reason', ''))})
+    return groups
+
+
+async def adjudicate_cluster_with_llm(client, articles: List[Dict], limiter: TokenBucket) -> Optional[List[Dict]]:
+    """
+    Aday kümesini tek bir LLM çağrısıyla gruplara ayır
+    Returns: parse_partition() groups or None
+    """
+    await limiter.acquire()
+    try:
+        response = await client.chat.completions.create(
+            model=LLM_MODEL,
             messages=[
-                {"role": "system", "content": "You are a helpful assistant that compares article summaries. Always respond with ONLY valid JSON, no other text."},
-                {"role": "user", "content": prompt}
+                {"role": "system", "content": "You are a helpful assistant that groups article summaries by news story. Always respond with ONLY valid JSON, no other text."},
+                {"role": "user", "content": create_cluster_prompt(articles)}
             ],
             temperature=0.2,
-            max_tokens=200,
+            max_tokens=150 + 60 * len(articles),
             response_format={"type": "json_object"}
         )
-        
-        result_text = response.choices[0].message.content.strip()
-        
-        # Parse JSON response
-        try:
-            result = json.loads(result_text)
-            # Validate structure
-            if "is_same_topic" in result and "confidence" in result:
-                return result
-            else:
-                print(f"    Warning: Invalid response structure: {result_text}")
-                return None
-        except json.JSONDecodeError as e:
-            print(f"    Warning: Failed to parse JSON: {result_text}")
-            # Try to extract JSON from text if wrapped
-            try:
-                # Find JSON object in text
-                start = result_text.find('{')
-                end = result_text.rfind('}') + 1
-                if start >= 0 and end > start:
-                    result = json.loads(result_text[start:end])
-                    if "is_same_topic" in result and "confidence" in result:
-                        return result
-            except:
-                pass
-            return None
-        
     except Exception as e:
         print(f"  ERROR: {e}")
         return None
+    
+    result_text = response.choices[0].message.content.strip()
+    return parse_partition(result_text, [article['id'] for article in articles])
+
+
+def words(text: str) -> Set[str]:
+    """Metnin kelime kümesi (lowercase, noktalama hariç)"""
+    return set(WORD_RE.findall(text.lower())) if text else set()
+
+
+def jaccard(words1: Set[str], words2: Set[str]) -> float:
+    """İki kelime kümesinin Jaccard similarity'si"""
+    if not words1 or not words2:
+        return 0.0
+    return len(words1 & words2) / len(words1 | words2)
 
 
 def simple_text_similarity(text1: str, text2: str) -> float:
     """Basit text similarity hesapla (Jaccard similarity)"""
-    if not text1 or not text2:
-        return 0.0
+    return jaccard(words(text1), words(text2))
+
+
+def tokenize_article(article: Dict) -> Dict:
+    """Pre-filter için makalenin kelime kümeleri (her makale için bir kez hesaplanır)"""
+    summary = article.get('summary', '') or ''
+    return {
+        'has_summary': bool(summary),
+        'length': len(summary),
+        'summary': words(summary),
+        'title': words(article.get('title', '') or ''),
+        'opening': words(summary[:OPENING_CHARS]),
+    }
+
+
+def prefilter_tokens(tokens1: Dict, tokens2: Dict, min_similarity: float = SUMMARY_MIN_SIMILARITY) -> bool:
+    """
+    tokenize_article() kümeleri üzerinde prefilter_candidates()
+    Returns: True if should compare with LLM, False otherwise
+    """
+    if not tokens1['has_summary'] or not tokens2['has_summary']:
+        return False
     
-    # Normalize: lowercase, remove punctuation
-    import re
-    words1 = set(re.findall(r'\w+', text1.lower()))
-    words2 = set(re.findall(r'\w+', text2.lower()))
+    # 1. Summary similarity (basit)
+    if jaccard(tokens1['summary'], tokens2['summary']) >= min_similarity:
+        return True
     
-    if not words1 or not words2:
-        return 0.0
+    # 2. Title similarity (Title'lar benzer ise kontrol et)
+    if jaccard(tokens1['title'], tokens2['title']) >= TITLE_MIN_SIMILARITY:
+        return True
     
-    intersection = len(words1 & words2)
-    union = len(words1 | words2)
+    # 3. Summary uzunlukları benzer ve ilk kelimeler benzer
+    len1, len2 = tokens1['length'], tokens2['length']
+    if min(len1, len2) / max(len1, len2) >= MIN_LENGTH_RATIO:
+        if jaccard(tokens1['opening'], tokens2['opening']) >= OPENING_MIN_SIMILARITY:
+            return True
     
-    return intersection / union if union > 0 else 0.0
+    return False
 
 
-def prefilter_candidates(article1: Dict, article2: Dict, min_similarity: float = 0.3) -> bool:
+def prefilter_candidates(article1: Dict, article2: Dict, min_similarity: float = SUMMARY_MIN_SIMILARITY) -> bool:
     """
     İki makalenin potansiyel duplicate olup olmadığını basit heuristics ile kontrol et
     Returns: True if should compare with LLM, False otherwise
     """
-    summary1 = article1.get('summary', '')
-    summary2 = article2.get('summary', '')
+    return prefilter_tokens(tokenize_article(article1), tokenize_article(article2), min_similarity)
+
+
+class SummaryCandidateIndex:
+    """
+    Summary, title ve summary başlangıçlarının MinHash LSH indeksi.
     
-    if not summary1 or not summary2:
-        return False
+    add() yeni makaleyi, indeksteki makalelerden yalnızca LSH bucket'larını
+    paylaştıklarıyla karşılaştırır (prefilter_tokens ile doğrular) ve sonra
+    indekse ekler; yeni summary'ler tüm çiftler taranmadan kontrol edilir.
+    """
     
-    # 1. Summary similarity (basit)
-    summary_sim = simple_text_similarity(summary1, summary2)
-    if summary_sim >= min_similarity:
-        return True
+    def __init__(self):
+        self._stores = {field: MemoryLshStore() for field in LSH_BANDS}
+        self._tokens: Dict[int, Dict] = {}
     
-    # 2. Title similarity
-    title1 = article1.get('title', '') or ''
-    title2 = article2.get('title', '') or ''
-    if title1 and title2:
-        title_sim = simple_text_similarity(title1, title2)
-        if title_sim >= 0.5:  # Title'lar benzer ise kontrol et
-            return True
+    def __len__(self) -> int:
+        return len(self._tokens)
     
-    # 3. Summary uzunlukları benzer ve ilk kelimeler benzer
-    len1, len2 = len(summary1), len(summary2)
-    if len1 > 0 and len2 > 0:
-        len_ratio = min(len1, len2) / max(len1, len2)
-        if len_ratio >= 0.7:  # Uzunluklar benzer
-            # İlk 50 karakteri karşılaştır
-            first_words1 = summary1[:50].lower()
-            first_words2 = summary2[:50].lower()
-            if simple_text_similarity(first_words1, first_words2) >= 0.4:
-                return True
+    def add(self, key: int, article: Dict) -> List[int]:
+        """
+        Makaleyi indekse ekle.
+        Returns: pre-filter'dan geçen, daha önce eklenmiş makalelerin key'leri
+        """
+        tokens = tokenize_article(article)
+        if not tokens['has_summary']:
+            return []
+        
+        entries = []
+        candidates = set()
+        for field, (bands, rows) in LSH_BANDS.items():
+            signature = signature_from_hashes(token_hashes(tokens[field]))
+            if signature is None:
+                continue
+            keys = band_keys(signature, bands, rows)
+            candidates.update(other for other, _, _ in self._stores[field].candidates(keys))
+            entries.append((field, signature, keys))
+        
+        matches = sorted(other for other in candidates if prefilter_tokens(self._tokens[other], tokens))
+        
+        for field, signature, keys in entries:
+            self._stores[field].add(key, key, signature, keys)
+        self._tokens[key] = tokens
+        return matches
+
+
+def covering_chunks(articles: List[Dict], size: int = MAX_CLUSTER_SIZE) -> List[List[Dict]]:
+    """
+    Her makale çiftinin en az bir prompt'ta birlikte bulunduğu parçalar
     
-    return False
+    En fazla `size` makale tek parçadır; daha fazlası size // 2'lik bloklara
+    bölünür ve her blok çifti bir parça olur (k blok için k*(k-1)/2 prompt).
+    """
+    if len(articles) <= size:
+        return [articles]
+    half = size // 2
+    blocks = [articles[start:start + half] for start in range(0, len(articles), half)]
+    return [first + second for first, second in itertools.combinations(blocks, 2)]
+
+
+async def adjudicate_components(components: List[List[Dict]], min_confidence: float) -> List[Dict]:
+    """
+    Bileşenleri eşzamanlı olarak LLM'e gönder (rate limiter altında)
+    
+    MAX_CLUSTER_SIZE'dan büyük bileşenler parçalara bölünür; parçalarda
+    bulunan grupların temsilcileri (ve tek kalan makaleler) ikinci bir turda
+    covering_chunks() ile her temsilci çifti en az bir kez aynı prompt'ta
+    olacak şekilde gruplanır, böylece parçalar arası duplicate'ler de birleşir.
+    
+    Returns: accepted groups [{"ids": [...], "confidence": float, "reason": str}, ...]
+    """
+    from openai import AsyncOpenAI
+    
+    limiter = TokenBucket(rate=1.0 / REQUEST_DELAY, capacity=MAX_CONCURRENT_REQUESTS)
+    slots = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    total = len(components)
+    done = 0
+    
+    async def partition(client, chunks: List[List[Dict]]) -> List[Dict]:
+        accepted = []
+        for chunk in chunks:
+            if len(chunk) < 2:
+                continue
+            async with slots:
+                groups = await adjudicate_cluster_with_llm(client, chunk, limiter)
+            for group in groups or []:
+                if group['confidence'] >= min_confidence:
+                    accepted.append(group)
+        return accepted
+    
+    async def run(client, articles: List[Dict]) -> List[Dict]:
+        nonlocal done
+        groups = await partition(client, [articles[start:start + MAX_CLUSTER_SIZE]
+                                          for start in range(0, len(articles), MAX_CLUSTER_SIZE)])
+        if len(articles) > MAX_CLUSTER_SIZE:
+            # Second round: one representative per group plus the unmatched
+            # articles, every pair of them together in at least one prompt
+            grouped = {i for group in groups for i in group['ids']}
+            firsts = {group['ids'][0] for group in groups}
+            representatives = [a for a in articles if a['id'] not in grouped or a['id'] in firsts]
+            groups += await partition(client, covering_chunks(representatives))
+            clusters = DisjointSet()
+            for group in groups:
+                for article_id in group['ids'][1:]:
+                    clusters.union(group['ids'][0], article_id)
+            merged: Dict[int, Dict] = {}
+            for group in groups:
+                entry = merged.setdefault(clusters.find(group['ids'][0]),
+                                          {'ids': set(), 'confidence': 1.0, 'reason': []})
+                entry['ids'].update(group['ids'])
+                entry['confidence'] = min(entry['confidence'], group['confidence'])
+                entry['reason'].append(group['reason'])
+            groups = [{'ids': sorted(entry['ids']), 'confidence': entry['confidence'],
+                       'reason': ' | '.join(entry['reason'])} for entry in merged.values()]
+        done += 1
+        found = sum(len(group['ids']) for group in groups)
+        print(f"[{done}/{total}] Cluster of {len(articles)} articles "
+              f"(IDs {', '.join(str(a['id']) for a in articles[:6])}{'...' if len(articles) > 6 else ''}): "
+              f"{len(groups)} duplicate groups, {found} articles")
+        return groups
+    
+    async with AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY')) as client:
+        results = await asyncio.gather(*(run(client, articles) for articles in components))
+    return [group for groups in results for group in groups]
 
 
 def find_duplicate_groups(articles: List[Dict], min_confidence: float = 0.8) -> Tuple[List[List[Dict]], List[Dict]]:
     """
     Articles listesindeki duplicate'leri bul ve grupla
+    
+    Aday çiftler bağlantılı bileşenlere ayrılır ve her bileşen tek bir LLM
+    çağrısıyla gruplanır (k makalelik bir küme için k(k-1)/2 yerine bir çağrı).
+    
     Returns: (duplicate_groups, duplicate_pairs)
     """
     print(f"\nPre-filtering {len(articles)} articles...")
     
-    # Pre-filter: Find candidate pairs
+    # Pre-filter: Find candidate pairs (each article against the ones indexed before it)
+    index = SummaryCandidateIndex()
     candidate_pairs = []
-    for i, article1 in enumerate(articles):
-        for j, article2 in enumerate(articles[i+1:], start=i+1):
-            if prefilter_candidates(article1, article2):
-                candidate_pairs.append((i, j))
+    for j, article in enumerate(articles):
+        candidate_pairs.extend((i, j) for i in index.add(j, article))
+    candidate_pairs.sort()
     
-    print(f"Found {len(candidate_pairs)} candidate pairs to check with LLM.")
-    print(f"(Reduced from {len(articles) * (len(articles) - 1) // 2} total pairs)\n")
+    print(f"Found {len(candidate_pairs)} candidate pairs.")
+    print(f"(Reduced from {len(articles) * (len(articles) - 1) // 2} total pairs)")
     
     if not candidate_pairs:
         print("No candidate pairs found. No duplicates detected.")
         return [], []
     
-    # Track which articles are duplicates
-    duplicate_pairs = []
-    processed = 0
+    if not os.getenv('OPENAI_API_KEY'):
+        print("  ERROR: OPENAI_API_KEY environment variable not set!")
+        return [], []
     
-    # Compare candidate pairs with LLM
+    # Connected components of the candidate graph
+    clusters = DisjointSet(range(len(articles)))
     for i, j in candidate_pairs:
-        article1 = articles[i]
-        article2 = articles[j]
-        processed += 1
-        
-        summary1 = article1['summary']
-        summary2 = article2['summary']
-        title1 = article1['title'] or 'No title'
-        title2 = article2['title'] or 'No title'
-        
-        print(f"[{processed}/{len(candidate_pairs)}] Comparing ID {article1['id']} vs {article2['id']}...", end=' ')
-        
-        # LLM comparison
-        result = compare_summaries_with_llm(summary1, summary2, title1, title2)
-        
-        if result and result.get('is_same_topic', False):
-            confidence = result.get('confidence', 0.0)
-            if confidence >= min_confidence:
-                duplicate_pairs.append({
-                    'article1_id': article1['id'],
-                    'article2_id': article2['id'],
-                    'confidence': confidence,
-                    'reason': result.get('reason', ''),
-                    'title1': title1,
-                    'title2': title2,
-                    'summary1': summary1[:200],
-                    'summary2': summary2[:200],
-                    'url1': article1.get('url', ''),
-                    'url2': article2.get('url', ''),
-                })
-                print(f"✓ DUPLICATE (confidence: {confidence:.2f})")
-            else:
-                print(f"✗ Not duplicate (confidence: {confidence:.2f} < {min_confidence})")
-        else:
-            print("✗ Not duplicate")
-        
-        # Rate limiting
-        time.sleep(REQUEST_DELAY)
+        clusters.union(i, j)
+    components = [[articles[i] for i in component] for component in clusters.groups(min_size=2)]
+    print(f"Grouped into {len(components)} candidate clusters to check with LLM.\n")
     
-    # Group duplicates using union-find approach
-    groups = []
-    article_to_group = {}
+    groups = asyncio.run(adjudicate_components(components, min_confidence))
     
-    for pair in duplicate_pairs:
-        id1 = pair['article1_id']
-        id2 = pair['article2_id']
-        
-        # Find or create groups
-        group1_idx = article_to_group.get(id1)
-        group2_idx = article_to_group.get(id2)
-        
-        if group1_idx is None and group2_idx is None:
-            # Create new group
-            new_group = [id1, id2]
-            groups.append(new_group)
-            article_to_group[id1] = len(groups) - 1
-            article_to_group[id2] = len(groups) - 1
-        elif group1_idx is not None and group2_idx is None:
-            # Add id2 to group1
-            groups[group1_idx].append(id2)
-            article_to_group[id2] = group1_idx
-        elif group1_idx is None and group2_idx is not None:
-            # Add id1 to group2
-            groups[group2_idx].append(id1)
-            article_to_group[id1] = group2_idx
-        else:
-            # Merge groups if different
-            if group1_idx != group2_idx:
-                groups[group1_idx].extend(groups[group2_idx])
-                for aid in groups[group2_idx]:
-                    article_to_group[aid] = group1_idx
-                groups[group2_idx] = []
-    
-    # Remove empty groups and convert IDs to full article objects
+    by_id = {article['id']: article for article in articles}
     duplicate_groups = []
+    duplicate_pairs = []
     for group in groups:
-        if group:
-            group_articles = [a for a in articles if a['id'] in group]
-            if len(group_articles) > 1:
-                duplicate_groups.append(group_articles)
+        group_articles = [by_id[article_id] for article_id in group['ids']]
+        duplicate_groups.append(group_articles)
+        
+        # Pairs of the group's first article with each other member (CSV output)
+        first = group_articles[0]
+        for other in group_articles[1:]:
+            duplicate_pairs.append({
+                'article1_id': first['id'],
+                'article2_id': other['id'],
+                'confidence': group['confidence'],
+                'reason': group['reason'],
+                'title1': first['title'] or 'No title',
+                'title2': other['title'] or 'No title',
+                'summary1': first['summary'][:200],
+                'summary2': other['summary'][:200],
+                'url1': first.get('url', ''),
+                'url2': other.get('url', ''),
+            })
     
     return duplicate_groups, duplicate_pairs
 
@@ -0,0 +1,97 @@
+"""
+Disjoint-set (union-find) structure for CE49X Final Project dedupe passes.
+
+The duplicate passes (URL, title, MinHash near-copies, LLM adjudication) each
+find pairs of articles that belong together. Feeding all pairs into one
+DisjointSet gives a single, consistent cluster assignment, near-linear in the
+number of articles and pairs:
+- keys (article ids, row positions) are mapped to dense integers; parents,
+  ranks and each cluster's first member live in flat integer arrays
+- find() compresses paths, union() links by rank
+- a cluster's representative is its first-added member, so "keep the first
+  copy" passes keep the same article as before
+
+Usage:
+    clusters = DisjointSet(article_ids)
+    clusters.union(id1, id2)
+    for group in clusters.groups(min_size=2):
+        ...
+"""
+
+from array import array
+from typing import Dict, Hashable, Iterable, List
+
+
+class DisjointSet:
+    """Union-find over hashable keys with path compression and union by rank."""
+
+    def __init__(self, keys: Iterable[Hashable] = ()):
+        self._index: Dict[Hashable, int] = {}
+        self._keys: List[Hashable] = []
+        self._parent = array("q")
+        self._rank = array("B")
+        self._first = array("q")  # Earliest-added member, valid at roots
+        for key in keys:
+            self.add(key)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._index
+
+    def add(self, key: Hashable) -> int:
+        """Add a key as its own cluster (no-op if present); returns its index."""
+        i = self._index.get(key)
+        if i is None:
+            i = self._index[key] = len(self._keys)
+            self._keys.append(key)
+            self._parent.append(i)
+            self._rank.append(0)
+            self._first.append(i)
+        return i
+
+    def _root(self, i: int) -> int:
+        parent = self._parent
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        while parent[i] != root:
+            parent[i], i = root, parent[i]
+        return root
+
+    def find(self, key: Hashable) -> Hashable:
+        """Representative (first-added member) of a key's cluster."""
+        return self._keys[self._first[self._root(self.add(key))]]
+
+    def union(self, a: Hashable, b: Hashable) -> Hashable:
+        """Merge the clusters of two keys (added if missing); returns the representative."""
+        ra, rb = self._root(self.add(a)), self._root(self.add(b))
+        if ra != rb:
+            if self._rank[ra] < self._rank[rb]:
+                ra, rb = rb, ra
+            self._parent[rb] = ra
+            if self._rank[ra] == self._rank[rb]:
+                self._rank[ra] += 1
+            self._first[ra] = min(self._first[ra], self._first[rb])
+        return self._keys[self._first[ra]]
+
+    def connected(self, a: Hashable, b: Hashable) -> bool:
+        if a not in self._index or b not in self._index:
+            return a == b
+        return self._root(self._index[a]) == self._root(self._index[b])
+
+    def is_representative(self, key: Hashable) -> bool:
+        """True for the first-added member of its cluster (the copy to keep)."""
+        return self.find(key) == key
+
+    def groups(self, min_size: int = 1) -> List[List[Hashable]]:
+        """Clusters with at least `min_size` members, in order of their first member; members in insertion order."""
+        members: Dict[int, List[Hashable]] = {}
+        for i, key in enumerate(self._keys):
+            members.setdefault(self._root(i), []).append(key)
+        return [group for group in members.values() if len(group) >= min_size]
+
+    def assignment(self) -> Dict[Hashable, Hashable]:
+        """{key: representative} for every key."""
+        return {key: self._keys[self._first[self._root(i)]] for i, key in enumerate(self._keys)}
@@ -0,0 +1,166 @@
+"""
+Full-text extraction stage for CE49X Final Project collectors.
+
+The API pagers no longer download article pages inline. They push candidate
+URLs onto a bounded queue; a pool of async downloaders fetches the HTML through
+the shared HttpClient and hands it to a process pool running trafilatura.
+Metadata collection therefore runs at API speed while extraction scales across
+cores. When the queue is full, submit() waits, so memory stays flat on large
+runs. Given the collector's seen-URL set, pages whose <link rel="canonical">
+points at an already seen URL (AMP, mobile and syndicated copies) are dropped
+before extraction.
+
+Usage:
+    async with ExtractionPipeline(client=client) as pipeline:
+        await pipeline.submit(url, on_text)   # on_text(full_text or None)
+    # leaving the block waits until every submitted URL has been handled
+"""
+
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Optional
+
+import trafilatura
+
+from scripts.http_client import HttpClient
+from scripts.url_canonical import canonicalize_url, find_canonical_link
+
+DEFAULT_DOWNLOADERS = 8
+DEFAULT_QUEUE_SIZE = 100
+
+
+def extract_text(html: str, url: str) -> Optional[str]:
+    """Extract main article text from HTML (runs in a worker process)."""
+    try:
+        return trafilatura.extract(html, url=url, include_comments=False)
+    except Exception:
+        return None
+
+
+class ExtractionPipeline:
+    """
+    Bounded download -> extract pipeline.
+
+    Each submitted URL is downloaded by one of `downloaders` async workers and
+    extracted in a process pool of `extract_workers` processes. The callback
+    receives the extracted text (or None on failure) on the event loop.
+    """
+
+    def __init__(
+        self,
+        downloaders: int = DEFAULT_DOWNLOADERS,
+        extract_workers: Optional[int] = None,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        timeout: int = 30,
+        client: Optional[HttpClient] = None,
+        seen=None
+    ):
+        """
+        Initialize extraction pipeline.
+
+        Args:
+            downloaders: Number of concurrent page downloads
+            extract_workers: Number of trafilatura processes (default: CPU count)
+            queue_size: Maximum URLs waiting for a downloader (backpressure bound)
+            timeout: Total download timeout in seconds
+            client: Shared HTTP client (default: pipeline-owned client)
+            seen: Set-like of canonical URLs already stored or collected
+                (e.g. SeenUrlIndex); enables rel=canonical deduplication
+        """
+        self.downloaders = downloaders
+        self.extract_workers = extract_workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.client = client
+        self.seen = seen
+        self.stats = {"submitted": 0, "downloaded": 0, "extracted": 0, "failed": 0, "copies": 0}
+        self._owns_client = client is None
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._workers = []
+
+    async def __aenter__(self):
+        if self._owns_client:
+            self.client = await HttpClient().__aenter__()
+        self._executor = ProcessPoolExecutor(max_workers=self.extract_workers)
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(self.downloaders)
+        ]
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            await self._queue.join()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._executor.shutdown(wait=True)
+        self._executor = None
+        if self._owns_client:
+            await self.client.__aexit__(exc_type, exc, tb)
+            self.client = None
+
+    async def submit(self, url: str, on_text: Callable[[Optional[str]], None]):
+        """
+        Queue a URL for download and extraction.
+
+        Waits while the queue is full. `on_text` is called once with the
+        extracted text, or None if download or extraction failed.
+        """
+        self.stats["submitted"] += 1
+        await self._queue.put((url, on_text))
+
+    async def fetch_html(self, url: str) -> Optional[str]:
+        """Download a page, returning None on any error or non-200 status."""
+        return await self.client.get_text(url, timeout=self.timeout)
+
+    def is_copy(self, url: str, html: str) -> bool:
+        """
+        True if the page declares another URL as canonical and that URL was
+        already seen; otherwise the canonical URL is marked as seen.
+        """
+        link = find_canonical_link(html, url)
+        if not link:
+            return False
+        canonical = canonicalize_url(link)
+        if canonical == canonicalize_url(url):
+            return False
+        if canonical in self.seen:
+            return True
+        self.seen.add(canonical)
+        return False
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            url, on_text = await self._queue.get()
+            try:
+                text = None
+                try:
+                    html = await self.fetch_html(url)
+                    if html:
+                        self.stats["downloaded"] += 1
+                        if self.seen is not None and self.is_copy(url, html):
+                            self.stats["copies"] += 1
+                            html = None
+                    if html:
+                        text = await loop.run_in_executor(self._executor, extract_text, html, url)
+                except Exception as e:
+                    # Timeouts, a broken process pool, ...: the URL fails, the worker lives on
+                    print(f"    [extraction] Failed {url}: {e}")
+                    text = None
+                if text:
+                    self.stats["extracted"] += 1
+                else:
+                    self.stats["failed"] += 1
+                try:
+                    on_text(text)
+                except Exception as e:
+                    print(f"    [extraction] Callback error for {url}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def summary(self) -> str:
+        s = self.stats
+        return (f"Full-text extraction: {s['submitted']} queued, {s['downloaded']} downloaded, "
+                f"{s['copies']} canonical copies skipped, {s['extracted']} extracted, {s['failed']} failed")
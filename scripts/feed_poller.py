@@ -0,0 +1,341 @@
+"""
+Conditional, adaptive-interval RSS/Atom feed poller for CE49X Final Project.
+
+Feeds are fetched concurrently through the shared HttpClient with
+If-None-Match / If-Modified-Since, parsed off the event loop, and only entries
+that were never handled before are returned. Each feed learns its own polling
+interval: feeds that change often are polled often, quiet feeds back off up to
+MAX_INTERVAL. Validators, intervals and seen entry ids persist in
+data/feed_state.sqlite (or the consumer's own state file), so restarts and
+one-shot runs share the same state.
+
+An entry only counts as seen once the consumer acknowledges it with
+mark_seen(), after saving it (or deciding to drop it). Entries that were
+emitted but not acknowledged (fetch failures, crashes, article caps) are
+emitted again by the next poll: a feed's validators are only stored once all
+of its emitted entries are acknowledged, so the next request is not answered
+with a 304.
+
+Usage:
+    # One pass over the feeds that are due (used by the harvesters)
+    poller = FeedPoller(FEEDS, client, state_path=FEED_STATE_PATH)
+    entries = await poller.poll_once()
+    ...  # save the entries
+    poller.mark_seen(saved_entries)
+
+    # Long-running daemon over every known feed list
+    python scripts/feed_poller.py
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+import feedparser
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scripts.http_client import HttpClient
+
+ROOT = Path(__file__).resolve().parents[1]
+STATE_PATH = ROOT / "data" / "feed_state.sqlite"
+ENTRIES_PATH = ROOT / "data" / "feed_entries.jsonl"
+
+MIN_INTERVAL = 5 * 60  # Never poll a feed more often than this (seconds)
+MAX_INTERVAL = 12 * 3600  # Quiet feeds are still polled at least this often (seconds)
+DEFAULT_INTERVAL = 30 * 60  # Starting interval for a new feed (seconds)
+BACKOFF_FACTOR = 1.5  # Interval growth after an unchanged poll
+SMOOTHING = 0.5  # Weight of the newest gap in the update-gap average
+
+FeedEntry = Tuple[str, "feedparser.FeedParserDict"]
+
+
+def entry_id(entry) -> Optional[str]:
+    """Stable identity of a feed entry (guid, then link, then title)."""
+    return entry.get("id") or entry.get("link") or entry.get("title")
+
+
+class FeedPoller:
+    """
+    Poll a set of feeds, emitting only entries not seen before.
+
+    Polling interval per feed: after a change, half the smoothed time between
+    observed changes; after an unchanged poll, the interval grows by
+    BACKOFF_FACTOR. Both are clamped to [MIN_INTERVAL, MAX_INTERVAL].
+    """
+
+    def __init__(
+        self,
+        feeds: Union[Dict[str, str], Iterable[str]],
+        client: HttpClient,
+        state_path: Path = STATE_PATH,
+        min_interval: float = MIN_INTERVAL,
+        max_interval: float = MAX_INTERVAL
+    ):
+        """
+        Initialize feed poller.
+
+        Args:
+            feeds: {name: url} mapping, or plain list of URLs (name = URL)
+            client: Shared HTTP client
+            state_path: SQLite file holding per-feed state and seen entry ids
+                (one per consumer: each consumer has its own seen entries)
+            min_interval: Lower bound on the polling interval in seconds
+            max_interval: Upper bound on the polling interval in seconds
+        """
+        self.feeds = dict(feeds) if isinstance(feeds, dict) else {url: url for url in feeds}
+        self.client = client
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.stats = {"polled": 0, "not_modified": 0, "changed": 0, "failed": 0, "new_entries": 0}
+        # url -> (validators to store, ids of emitted entries not acknowledged yet)
+        self._pending: Dict[str, Tuple[Dict, Set[str]]] = {}
+        Path(state_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(state_path)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS feeds (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                body_hash TEXT,
+                interval REAL NOT NULL,
+                avg_gap REAL,
+                last_change REAL,
+                next_poll REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS seen_entries (
+                feed_url TEXT NOT NULL,
+                entry_id TEXT NOT NULL,
+                first_seen REAL NOT NULL,
+                PRIMARY KEY (feed_url, entry_id)
+            );
+            """
+        )
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    def _state(self, url: str) -> Dict:
+        row = self._conn.execute(
+            "SELECT etag, last_modified, body_hash, interval, avg_gap, last_change, next_poll "
+            "FROM feeds WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return {"etag": None, "last_modified": None, "body_hash": None,
+                    "interval": DEFAULT_INTERVAL, "avg_gap": None, "last_change": None, "next_poll": 0.0}
+        keys = ("etag", "last_modified", "body_hash", "interval", "avg_gap", "last_change", "next_poll")
+        return dict(zip(keys, row))
+
+    def _save_validators(self, url: str, validators: Dict):
+        self._conn.execute(
+            "UPDATE feeds SET etag = ?, last_modified = ?, body_hash = ? WHERE url = ?",
+            (validators["etag"], validators["last_modified"], validators["body_hash"], url)
+        )
+
+    def _save_state(self, url: str, state: Dict):
+        self._conn.execute(
+            """
+            INSERT OR REPLACE INTO feeds
+            (url, etag, last_modified, body_hash, interval, avg_gap, last_change, next_poll)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (url, state["etag"], state["last_modified"], state["body_hash"], state["interval"],
+             state["avg_gap"], state["last_change"], state["next_poll"])
+        )
+
+    def _clamp(self, interval: float) -> float:
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def next_due(self) -> float:
+        """Timestamp of the earliest scheduled poll."""
+        return min(self._state(url)["next_poll"] for url in self.feeds.values())
+
+    def _unseen(self, url: str, entries: List) -> List:
+        """Entries whose ids were never acknowledged (first occurrence of each id)."""
+        seen = {eid for (eid,) in self._conn.execute(
+            "SELECT entry_id FROM seen_entries WHERE feed_url = ?", (url,)
+        )}
+        fresh = []
+        for entry in entries:
+            eid = entry_id(entry)
+            if eid and eid not in seen:
+                seen.add(eid)
+                fresh.append(entry)
+        return fresh
+
+    def mark_seen(self, entries: Iterable[FeedEntry]):
+        """
+        Acknowledge handled entries: they are never emitted again.
+
+        Call after the entries are saved (or deliberately dropped).
+
+        Args:
+            entries: (feed name, entry) pairs as returned by poll_once()
+        """
+        now = time.time()
+        for name, entry in entries:
+            url = self.feeds.get(name, name)
+            eid = entry_id(entry)
+            if not eid:
+                continue
+            self._conn.execute(
+                "INSERT OR IGNORE INTO seen_entries (feed_url, entry_id, first_seen) VALUES (?, ?, ?)",
+                (url, eid, now)
+            )
+            pending = self._pending.get(url)
+            if pending is not None:
+                validators, unacknowledged = pending
+                unacknowledged.discard(eid)
+                if not unacknowledged:
+                    self._save_validators(url, validators)
+                    del self._pending[url]
+        self._conn.commit()
+
+    async def _poll_feed(self, name: str, url: str) -> List[FeedEntry]:
+        state = self._state(url)
+        stored_validators = {key: state[key] for key in ("etag", "last_modified", "body_hash")}
+        headers = {}
+        if state["etag"]:
+            headers["If-None-Match"] = state["etag"]
+        if state["last_modified"]:
+            headers["If-Modified-Since"] = state["last_modified"]
+
+        self.stats["polled"] += 1
+        response = await self.client.get(url, headers=headers, revalidate=True)
+        now = time.time()
+        new_entries: List = []
+
+        if response is None or (response.status != 200 and not response.not_modified):
+            self.stats["failed"] += 1
+            changed = False
+        elif response.not_modified:
+            self.stats["not_modified"] += 1
+            changed = False
+        else:
+            body_hash = hashlib.sha256(response.body).hexdigest()
+            state["etag"] = response.headers.get("ETag")
+            state["last_modified"] = response.headers.get("Last-Modified")
+            if body_hash == state["body_hash"]:
+                # Server ignores conditional requests but the feed is unchanged
+                self.stats["not_modified"] += 1
+                changed = False
+            else:
+                state["body_hash"] = body_hash
+                parsed = await asyncio.to_thread(feedparser.parse, response.body)
+                new_entries = self._unseen(url, parsed.entries)
+                changed = bool(new_entries)
+                if changed:
+                    self.stats["changed"] += 1
+
+        if changed:
+            if state["last_change"] is not None:
+                gap = now - state["last_change"]
+                state["avg_gap"] = gap if state["avg_gap"] is None else (
+                    SMOOTHING * gap + (1 - SMOOTHING) * state["avg_gap"])
+                state["interval"] = self._clamp(state["avg_gap"] / 2)
+            state["last_change"] = now
+        else:
+            state["interval"] = self._clamp(state["interval"] * BACKOFF_FACTOR)
+        state["next_poll"] = now + state["interval"]
+        if new_entries:
+            # Keep the old validators until every emitted entry is acknowledged,
+            # so unacknowledged entries come back with the next full response
+            self._pending[url] = ({key: state[key] for key in stored_validators},
+                                  {entry_id(entry) for entry in new_entries})
+            state.update(stored_validators)
+        self._save_state(url, state)
+        self._conn.commit()
+
+        self.stats["new_entries"] += len(new_entries)
+        return [(name, entry) for entry in new_entries]
+
+    async def poll_once(self, force: bool = False) -> List[FeedEntry]:
+        """
+        Poll every due feed (all feeds if `force`) concurrently.
+
+        Returns:
+            (feed name, entry) pairs for entries not acknowledged before
+            (acknowledge them with mark_seen() once handled)
+        """
+        now = time.time()
+        due = [(name, url) for name, url in self.feeds.items()
+               if force or self._state(url)["next_poll"] <= now]
+        results = await asyncio.gather(*(self._poll_feed(name, url) for name, url in due))
+        return [item for items in results for item in items]
+
+    async def run(self, on_entries: Callable[[List[FeedEntry]], None], max_cycles: Optional[int] = None):
+        """
+        Poll forever (or for `max_cycles` cycles), sleeping until the next feed is due.
+
+        `on_entries` is called with the new entries of each cycle that found any;
+        they are acknowledged once it returns.
+        """
+        cycles = 0
+        while max_cycles is None or cycles < max_cycles:
+            new_entries = await self.poll_once()
+            if new_entries:
+                on_entries(new_entries)
+                self.mark_seen(new_entries)
+            cycles += 1
+            await asyncio.sleep(max(1.0, self.next_due() - time.time()))
+
+    def summary(self) -> str:
+        s = self.stats
+        return (f"Feeds: {s['polled']} polled, {s['not_modified']} unchanged, {s['changed']} changed, "
+                f"{s['failed']} failed, {s['new_entries']} new entries")
+
+
+def all_feeds() -> Dict[str, str]:
+    """Every feed list in the project, keyed by name (URL for unnamed feeds)."""
+    from scripts.collect_articles_advanced import FEEDS
+    from scripts.collect_rss import RSS_FEEDS
+
+    feeds = {url: url for url in FEEDS}
+    feeds.update(RSS_FEEDS)
+    return feeds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Poll RSS feeds continuously and append new entries to JSONL.")
+    parser.add_argument("--output", type=Path, default=ENTRIES_PATH, help="JSONL file new entries are appended to.")
+    parser.add_argument("--cycles", type=int, default=None, help="Stop after this many polling cycles.")
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent feed downloads.")
+    args = parser.parse_args()
+
+    def write_entries(entries: List[FeedEntry]):
+        with open(args.output, "a", encoding="utf-8") as f:
+            for name, entry in entries:
+                f.write(json.dumps({
+                    "feed": name,
+                    "title": entry.get("title", ""),
+                    "link": entry.get("link", ""),
+                    "summary": entry.get("summary", ""),
+                    "published": entry.get("published", "") or entry.get("updated", ""),
+                }, ensure_ascii=False) + "\n")
+        print(f"[{time.strftime('%H:%M:%S')}] {len(entries)} new entries -> {args.output.name}")
+
+    async def run():
+        async with HttpClient(max_connections=args.concurrency) as client:
+            poller = FeedPoller(all_feeds(), client)
+            try:
+                await poller.run(write_entries, max_cycles=args.cycles)
+            finally:
+                print(poller.summary())
+                poller.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print("Stopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,12 +6,13 @@ Bu makaleler için sonra abstract oluşturulacak.
 import os
 import sys
 from pathlib import Path
-from typing import List, Dict
+from typing import Dict
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from database.db_config import get_db_cursor, test_connection
+from database.db_config import BatchWriter, get_db_cursor, test_connection
+from scripts.keyword_matcher import find_keywords
 
 SCRIPT_DIR = Path(__file__).parent.resolve()
 PROJECT_ROOT = SCRIPT_DIR.parent
@@ -54,19 +55,6 @@ def create_filtered_table():
         print("[OK] filtered_ai_ce_articles tablosu hazir")
 
 
-def contains_keywords(text: str, keywords: List[str]) -> List[str]:
-    """Metinde hangi keyword'lerin geçtiğini bul"""
-    if not text:
-        return []
-    
-    text_lower = text.lower()
-    found = []
-    for keyword in keywords:
-        if keyword.lower() in text_lower:
-            found.append(keyword)
-    return found
-
-
 def filter_articles():
     """Hem AI hem CE keyword içeren makaleleri filtrele"""
     if not test_connection():
@@ -87,53 +75,52 @@ def filter_articles():
     
     print(f"\nToplam {len(all_articles)} makale kontrol ediliyor...")
     
-    filtered_count = 0
     processed = 0
     
-    for article in all_articles:
-        processed += 1
-        if processed % 100 == 0:
-            print(f"  Islenen: {processed}/{len(all_articles)}...")
-        
-        # Tüm metin alanlarını birleştir
-        title = article['title'] or ''
-        content = article.get('content') or ''
-        description = article.get('description') or ''
-        full_text = article.get('full_text') or ''
-        
-        combined_text = f"{title} {description} {content} {full_text}"
-        
-        # AI ve CE keyword'lerini kontrol et
-        ai_found = contains_keywords(combined_text, AI_KEYWORDS)
-        ce_found = contains_keywords(combined_text, CE_KEYWORDS)
-        
-        # Hem AI hem CE içeriyorsa kaydet
-        if ai_found and ce_found:
-            with get_db_cursor() as cur:
-                try:
-                    cur.execute("""
-                        INSERT INTO filtered_ai_ce_articles 
-                        (article_id, title, content, description, full_text, source, url, published_at, 
-                         ai_keywords_found, ce_keywords_found)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                        ON CONFLICT (article_id) DO NOTHING
-                    """, (
-                        article['id'],
-                        article['title'],
-                        article.get('content'),
-                        article.get('description'),
-                        article.get('full_text'),
-                        article.get('source'),
-                        article.get('url'),
-                        article.get('published_at'),
-                        ai_found,
-                        ce_found
-                    ))
-                    filtered_count += 1
-                except Exception as e:
-                    print(f"  HATA (ID {article['id']}): {e}")
-                    continue
+    def report_error(params, e):
+        print(f"  HATA (ID {params[0]}): {str(e).strip()}")
+    
+    # Matching articles are written in batches, not one transaction each
+    with BatchWriter(on_error=report_error) as writer:
+        for article in all_articles:
+            processed += 1
+            if processed % 100 == 0:
+                print(f"  Islenen: {processed}/{len(all_articles)}...")
+            
+            # Tüm metin alanlarını birleştir
+            title = article['title'] or ''
+            content = article.get('content') or ''
+            description = article.get('description') or ''
+            full_text = article.get('full_text') or ''
+            
+            combined_text = f"{title} {description} {content} {full_text}"
+            
+            # AI ve CE keyword'lerini kontrol et
+            ai_found = find_keywords(combined_text, AI_KEYWORDS)
+            ce_found = find_keywords(combined_text, CE_KEYWORDS)
+            
+            # Hem AI hem CE içeriyorsa kaydet
+            if ai_found and ce_found:
+                writer.add("""
+                    INSERT INTO filtered_ai_ce_articles 
+                    (article_id, title, content, description, full_text, source, url, published_at, 
+                     ai_keywords_found, ce_keywords_found)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (article_id) DO NOTHING
+                """, (
+                    article['id'],
+                    article['title'],
+                    article.get('content'),
+                    article.get('description'),
+                    article.get('full_text'),
+                    article.get('source'),
+                    article.get('url'),
+                    article.get('published_at'),
+                    ai_found,
+                    ce_found
+                ))
     
+    filtered_count = writer.written
     return filtered_count
 
 
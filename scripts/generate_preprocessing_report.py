@@ -7,14 +7,14 @@ import os
 import sys
 from pathlib import Path
 import pandas as pd
-from collections import Counter
-import re
 
 # Add project root to path
 SCRIPT_DIR = Path(__file__).parent.resolve()
 PROJECT_ROOT = SCRIPT_DIR.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
+from scripts.corpus_cache import CorpusCache, TokenCorpus
+
 # Fix Windows encoding issue
 if sys.platform == 'win32':
     sys.stdout.reconfigure(encoding='utf-8')
@@ -94,86 +94,12 @@ def get_all_valid_articles_text():
     return texts
 
 
-def normalize_text(text: str) -> str:
-    """Normalize text: lowercase and remove special characters."""
-    text = text.lower()
-    # Remove URLs
-    text = re.sub(r'http\S+|www\.\S+', '', text)
-    # Remove email addresses
-    text = re.sub(r'\S+@\S+', '', text)
-    # Remove special characters, keep only alphanumeric and spaces
-    text = re.sub(r'[^a-z0-9\s]', ' ', text)
-    # Remove extra whitespace
-    text = ' '.join(text.split())
-    return text
-
-
-def remove_stopwords(text: str) -> str:
-    """Remove common English stopwords."""
-    try:
-        import nltk
-        from nltk.corpus import stopwords
-        
-        # Download stopwords if needed
-        try:
-            nltk.data.find('corpora/stopwords')
-        except LookupError:
-            nltk.download('stopwords', quiet=True)
-        
-        stop_words = set(stopwords.words('english'))
-        
-        # Domain-specific stopwords
-        domain_stopwords = {
-            'article', 'read', 'more', 'click', 'here', 'subscribe', 'newsletter',
-            'share', 'like', 'follow', 'comment', 'view', 'see', 'also', 'related'
-        }
-        stop_words.update(domain_stopwords)
-        
-        tokens = text.split()
-        filtered_tokens = [token for token in tokens if token not in stop_words and len(token) > 2]
-        return ' '.join(filtered_tokens)
-    except ImportError:
-        # Fallback: simple stopword list
-        stop_words = {
-            'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
-            'of', 'with', 'by', 'from', 'as', 'is', 'was', 'are', 'were', 'be',
-            'been', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would',
-            'should', 'could', 'may', 'might', 'must', 'can', 'this', 'that',
-            'these', 'those', 'i', 'you', 'he', 'she', 'it', 'we', 'they',
-            'article', 'read', 'more', 'click', 'here'
-        }
-        tokens = text.split()
-        filtered_tokens = [token for token in tokens if token not in stop_words and len(token) > 2]
-        return ' '.join(filtered_tokens)
-
-
-def extract_bigrams(text: str) -> list:
-    """Extract bigrams from text."""
-    tokens = text.split()
-    if len(tokens) < 2:
-        return []
-    
-    bigrams = []
-    for i in range(len(tokens) - 1):
-        bigram = f"{tokens[i]} {tokens[i+1]}"
-        bigrams.append(bigram)
-    
-    return bigrams
-
-
-def calculate_top_words(texts: list, top_n: int = 20) -> pd.DataFrame:
+def calculate_top_words(corpus: TokenCorpus, top_n: int = 20) -> pd.DataFrame:
     """Calculate top N most frequent words."""
-    print(f"Processing {len(texts)} articles for word frequency...")
-    
-    all_words = []
-    for text in texts:
-        normalized = normalize_text(text)
-        no_stopwords = remove_stopwords(normalized)
-        words = no_stopwords.split()
-        all_words.extend(words)
+    print(f"Processing {len(corpus)} articles for word frequency...")
     
-    # Count word frequencies
-    word_counts = Counter(all_words)
+    # Count word frequencies (bincount over the cached token ids)
+    word_counts = corpus.word_counts()
     top_words = word_counts.most_common(top_n)
     
     # Create DataFrame
@@ -184,19 +110,12 @@ def calculate_top_words(texts: list, top_n: int = 20) -> pd.DataFrame:
     return df
 
 
-def calculate_top_bigrams(texts: list, top_n: int = 20) -> pd.DataFrame:
+def calculate_top_bigrams(corpus: TokenCorpus, top_n: int = 20) -> pd.DataFrame:
     """Calculate top N most frequent bigrams."""
-    print(f"Processing {len(texts)} articles for bigram frequency...")
+    print(f"Processing {len(corpus)} articles for bigram frequency...")
     
-    all_bigrams = []
-    for text in texts:
-        normalized = normalize_text(text)
-        no_stopwords = remove_stopwords(normalized)
-        bigrams = extract_bigrams(no_stopwords)
-        all_bigrams.extend(bigrams)
-    
-    # Count bigram frequencies
-    bigram_counts = Counter(all_bigrams)
+    # Count bigram frequencies (consecutive token id pairs within an article)
+    bigram_counts = corpus.bigram_counts()
     top_bigrams = bigram_counts.most_common(top_n)
     
     # Create DataFrame
@@ -278,17 +197,21 @@ def main():
         return
     
     print(f"[OK] Loaded {len(texts)} articles")
+    
+    # Tokenize through the shared corpus cache (only new or changed articles)
+    corpus = CorpusCache().load(texts)
+    print(f"[OK] Corpus cache: {corpus.reused} reused, {corpus.tokenized} tokenized")
     print()
     
     # Calculate top 20 words
     print("Step 2: Calculating top 20 most frequent words...")
-    words_df = calculate_top_words(texts, top_n=20)
+    words_df = calculate_top_words(corpus, top_n=20)
     print("[OK] Top 20 words calculated")
     print()
     
     # Calculate top 20 bigrams
     print("Step 3: Calculating top 20 bi-grams...")
-    bigrams_df = calculate_top_bigrams(texts, top_n=20)
+    bigrams_df = calculate_top_bigrams(corpus, top_n=20)
     print("[OK] Top 20 bigrams calculated")
     print()
     
@@ -0,0 +1,378 @@
+"""
+Shared pooled HTTP client for CE49X Final Project collectors.
+
+Every collector (API pagers, full-text extraction, RSS/sitemap/search
+harvesters) fetches through HttpClient instead of bare requests.get calls or
+ad-hoc aiohttp sessions:
+- keep-alive connection pool with cached DNS lookups
+- per-host concurrency caps, so one slow domain cannot take every slot
+- retries with jittered exponential backoff on 429/5xx (Retry-After honoured)
+- negative cache for URLs that failed permanently (404, 410, ...), so big runs
+  don't keep retrying them
+- optional on-disk ResponseCache: cached bodies are served without a network
+  round-trip, and revalidated with conditional GETs when asked to
+
+Usage:
+    async with HttpClient(max_connections=20, per_host=4, cache=ResponseCache()) as client:
+        html = await client.get_text(url)
+        response = await client.get(api_url, params=params)
+"""
+
+import asyncio
+import json
+import os
+import random
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+from multidict import CIMultiDict
+
+from scripts.response_cache import ResponseCache
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+
+# Statuses worth retrying, and statuses that will not change on retry
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+SERVER_ERROR_STATUSES = frozenset({500, 502, 503, 504})
+PERMANENT_FAILURE_STATUSES = frozenset({400, 401, 403, 404, 410, 451})
+
+NEGATIVE_CACHE_TTL = 24 * 3600  # Permanent failures (seconds)
+TRANSIENT_FAILURE_TTL = 15 * 60  # URLs that still failed after all retries (seconds)
+MAX_RETRY_AFTER = 60  # Never sleep longer than this on a Retry-After header (seconds)
+
+
+class HttpResponse:
+    """
+    Fully-read HTTP response (status, headers, body bytes).
+
+    `not_modified` is set when the server answered 304 to a conditional GET;
+    the body is then the cached one (or empty without a cache).
+    """
+
+    __slots__ = ("url", "status", "headers", "body", "not_modified")
+
+    def __init__(self, url: str, status: int, headers: CIMultiDict, body: bytes,
+                 not_modified: bool = False):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.not_modified = not_modified or status == 304
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+    def text(self) -> str:
+        """Decode the body using the charset from Content-Type (default utf-8)."""
+        charset = "utf-8"
+        content_type = self.headers.get("Content-Type", "")
+        if "charset=" in content_type:
+            charset = content_type.split("charset=")[-1].split(";")[0].strip() or charset
+        try:
+            return self.body.decode(charset, errors="replace")
+        except LookupError:
+            return self.body.decode("utf-8", errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+def host_of(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+class HttpClient:
+    """
+    Async HTTP client shared by all collectors.
+
+    Connections are pooled per host (aiohttp keep-alive) and DNS results are
+    cached. Each host gets its own semaphore, so `per_host` bounds concurrency
+    per domain while `max_connections` bounds the whole client.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 50,
+        per_host: int = 4,
+        timeout: int = 30,
+        retries: int = 3,
+        backoff: float = 1.0,
+        dns_ttl: int = 600,
+        user_agent: str = USER_AGENT,
+        cache: Optional[ResponseCache] = None,
+        cache_max_age: Optional[float] = None
+    ):
+        """
+        Initialize HTTP client.
+
+        Args:
+            max_connections: Total open connections across all hosts
+            per_host: Concurrent requests per host
+            timeout: Total timeout per attempt in seconds
+            retries: Retries after the first attempt on retryable failures
+            backoff: Base backoff in seconds (doubled each retry, jittered)
+            dns_ttl: DNS cache lifetime in seconds
+            user_agent: Default User-Agent header
+            cache: On-disk response cache to read through (default: no cache)
+            cache_max_age: Seconds a cached entry is served without revalidation
+                (default: forever)
+        """
+        self.max_connections = max_connections
+        self.per_host = per_host
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.dns_ttl = dns_ttl
+        self.user_agent = user_agent
+        self.cache = cache
+        self.cache_max_age = cache_max_age
+        self.stats = {"requests": 0, "retries": 0, "negative_hits": 0, "failures": 0,
+                      "cache_hits": 0, "revalidated": 0}
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        self._failed: Dict[str, float] = {}
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.max_connections,
+            limit_per_host=self.per_host,
+            ttl_dns_cache=self.dns_ttl,
+            use_dns_cache=True,
+            keepalive_timeout=30
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=self.timeout,
+            headers={"user-agent": self.user_agent}
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _slot(self, host: str) -> asyncio.Semaphore:
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = self._host_slots[host] = asyncio.Semaphore(self.per_host)
+        return slot
+
+    def is_known_failure(self, url: str) -> bool:
+        """True if the URL is in the negative cache and has not expired."""
+        expires = self._failed.get(url)
+        if expires is None:
+            return False
+        if expires < time.monotonic():
+            del self._failed[url]
+            return False
+        return True
+
+    def mark_failed(self, url: str, ttl: float = NEGATIVE_CACHE_TTL):
+        self._failed[url] = time.monotonic() + ttl
+
+    def cached(self, url: str, params: Optional[Dict[str, Any]] = None) -> Optional[HttpResponse]:
+        """Return a fresh cached response without touching the network, or None."""
+        if self.cache is None:
+            return None
+        entry = self.cache.get(url, params)
+        if entry is None or not self._is_fresh(entry.fetched_at):
+            return None
+        self.stats["cache_hits"] += 1
+        return HttpResponse(entry.url, entry.status, entry.headers, entry.body)
+
+    def _is_fresh(self, fetched_at: float) -> bool:
+        return self.cache_max_age is None or time.time() - fetched_at < self.cache_max_age
+
+    def _retry_delay(self, attempt: int, retry_after: Optional[str]) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), MAX_RETRY_AFTER)
+            except ValueError:
+                pass
+        return self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+    async def get(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        retry_statuses: Iterable[int] = RETRY_STATUSES,
+        timeout: Optional[float] = None,
+        revalidate: bool = False
+    ) -> Optional[HttpResponse]:
+        """
+        GET a URL and read the whole body.
+
+        Fresh cached responses are returned directly unless `revalidate` is
+        set; stale or revalidated entries are fetched with If-None-Match /
+        If-Modified-Since, and a 304 serves the cached body. Successful
+        responses are written back to the cache.
+
+        Retryable statuses and network errors are retried with jittered
+        backoff. Non-retryable error statuses are returned to the caller.
+        Only plain page URLs (no params) go into the negative cache; API
+        errors depend on the parameters.
+
+        Returns:
+            HttpResponse, or None if the URL is negative-cached or every attempt
+            failed at the network level
+        """
+        entry = None
+        if self.cache is not None:
+            entry = self.cache.get(url, params)
+            if entry is not None:
+                if not revalidate and self._is_fresh(entry.fetched_at):
+                    self.stats["cache_hits"] += 1
+                    return HttpResponse(entry.url, entry.status, entry.headers, entry.body)
+                headers = {**(headers or {}), **entry.validators()}
+
+        if self.is_known_failure(url):
+            self.stats["negative_hits"] += 1
+            return None
+
+        retry_statuses = frozenset(retry_statuses)
+        request_timeout = aiohttp.ClientTimeout(total=timeout) if timeout else None
+        slot = self._slot(host_of(url))
+        response = None
+
+        for attempt in range(self.retries + 1):
+            retry_after = None
+            async with slot:
+                self.stats["requests"] += 1
+                try:
+                    async with self._session.get(url, params=params, headers=headers,
+                                                 timeout=request_timeout) as resp:
+                        body = await resp.read()
+                        response = HttpResponse(str(resp.url), resp.status, CIMultiDict(resp.headers), body)
+                        retry_after = resp.headers.get("Retry-After")
+                except (aiohttp.ClientError, asyncio.TimeoutError, UnicodeError, ValueError):
+                    response = None
+
+            if response is not None and response.status not in retry_statuses:
+                break
+            if attempt < self.retries:
+                self.stats["retries"] += 1
+                await asyncio.sleep(self._retry_delay(attempt, retry_after))
+
+        if response is None:
+            self.stats["failures"] += 1
+            if not params:
+                self.mark_failed(url, TRANSIENT_FAILURE_TTL)
+        elif response.status == 304 and entry is not None:
+            self.stats["revalidated"] += 1
+            self.cache.touch(url, params)
+            return HttpResponse(entry.url, entry.status, entry.headers, entry.body, not_modified=True)
+        elif response.status == 200 and self.cache is not None:
+            self.cache.put(url, params, response.status, response.headers, response.body)
+        elif response.status in PERMANENT_FAILURE_STATUSES and not params:
+            self.mark_failed(url)
+        return response
+
+    async def download(
+        self,
+        url: str,
+        path: Path,
+        params: Optional[Dict[str, Any]] = None,
+        retry_statuses: Iterable[int] = RETRY_STATUSES,
+        timeout: Optional[float] = None,
+        chunk_size: int = 1 << 16
+    ) -> Optional[int]:
+        """
+        Stream a large response body to `path` without holding it in memory.
+
+        The body is written to a temporary file next to `path` in chunks and
+        moved into place only once it is complete, so an interrupted download
+        never leaves a truncated file behind. Downloads bypass the response
+        cache. Retries work as in get().
+
+        Returns:
+            HTTP status of the last attempt (the file exists only for 200), or
+            None if every attempt failed at the network level
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".part")
+        retry_statuses = frozenset(retry_statuses)
+        request_timeout = aiohttp.ClientTimeout(total=timeout) if timeout else None
+        slot = self._slot(host_of(url))
+        status = None
+
+        for attempt in range(self.retries + 1):
+            retry_after = None
+            async with slot:
+                self.stats["requests"] += 1
+                try:
+                    async with self._session.get(url, params=params, timeout=request_timeout) as resp:
+                        status = resp.status
+                        retry_after = resp.headers.get("Retry-After")
+                        if status == 200:
+                            with open(tmp, "wb") as f:
+                                async for chunk in resp.content.iter_chunked(chunk_size):
+                                    f.write(chunk)
+                            os.replace(tmp, path)
+                except (aiohttp.ClientError, asyncio.TimeoutError, OSError):
+                    status = None
+                    if tmp.exists():
+                        tmp.unlink()
+
+            if status is not None and status not in retry_statuses:
+                break
+            if attempt < self.retries:
+                self.stats["retries"] += 1
+                await asyncio.sleep(self._retry_delay(attempt, retry_after))
+
+        if status is None:
+            self.stats["failures"] += 1
+        return status
+
+    async def get_text(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        revalidate: bool = False
+    ) -> Optional[str]:
+        """GET a page and return its decoded text, or None unless the status is 200."""
+        response = await self.get(url, headers=headers, timeout=timeout, revalidate=revalidate)
+        if response is None or response.status != 200:
+            return None
+        return response.text()
+
+    async def get_bytes(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        revalidate: bool = False
+    ) -> Optional[bytes]:
+        """GET a resource and return the raw body, or None unless the status is 200."""
+        response = await self.get(url, headers=headers, revalidate=revalidate)
+        if response is None or response.status != 200:
+            return None
+        return response.body
+
+    async def get_json(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        retry_statuses: Iterable[int] = RETRY_STATUSES
+    ) -> Optional[Any]:
+        """GET a JSON API and return the decoded body, or None unless the status is 200."""
+        response = await self.get(url, params=params, retry_statuses=retry_statuses)
+        if response is None or response.status != 200:
+            return None
+        try:
+            return response.json()
+        except ValueError:
+            return None
+
+    def summary(self) -> str:
+        s = self.stats
+        return (f"HTTP: {s['requests']} requests, {s['retries']} retries, "
+                f"{s['failures']} failed URLs, {s['negative_hits']} skipped (negative cache), "
+                f"{s['cache_hits']} served from cache, {s['revalidated']} revalidated (304)"
+                + (f"\n{self.cache.summary()}" if self.cache is not None else ""))
@@ -15,7 +15,11 @@ SCRIPT_DIR = Path(__file__).parent.resolve()
 PROJECT_ROOT = SCRIPT_DIR.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
-from database.db_config import get_db_cursor, test_connection
+from database.db_config import bulk_insert, get_db_cursor, test_connection
+from scripts.near_duplicates import NearDuplicateIndex, minhash_signature
+from scripts.title_search import ensure_title_index, nearest_titles
+from scripts.url_canonical import canonicalize_url
+from scripts.url_index import SeenUrlIndex
 
 # Fix Windows encoding issue
 if sys.platform == 'win32':
@@ -25,25 +29,8 @@ if sys.platform == 'win32':
 INPUT_CSV = PROJECT_ROOT / "data" / "NewsAPI articles son.csv"
 OUTPUT_CSV = PROJECT_ROOT / "data" / "NewsAPI articles son_cleaned.csv"
 
-
-def normalize_url(url: str) -> str:
-    """
-    Normalize URL for duplicate detection.
-    Removes trailing slashes, query parameters, fragments, and converts to lowercase.
-    """
-    if not url:
-        return ""
-    
-    # Remove fragments and query parameters
-    url = url.split('#')[0].split('?')[0]
-    
-    # Remove trailing slash
-    url = url.rstrip('/')
-    
-    # Convert to lowercase
-    url = url.lower()
-    
-    return url
+# Trigram similarity above which an incoming title is a copy of a stored one
+TITLE_DUPLICATE_SIMILARITY = 0.9
 
 
 def normalize_title(title: str) -> str:
@@ -79,11 +66,11 @@ def remove_duplicates(df: pd.DataFrame) -> pd.DataFrame:
     print("Removing duplicates...")
     print(f"  Before: {len(df)} articles")
     
-    # Normalize URLs and titles
-    df['url_normalized'] = df['url'].apply(normalize_url)
+    # Canonical URLs and normalized titles
+    df['url_normalized'] = df['url'].apply(canonicalize_url)
     df['title_normalized'] = df['title'].apply(normalize_title)
     
-    # Remove duplicates based on normalized URL (priority)
+    # Remove duplicates based on canonical URL (priority)
     df_unique = df.drop_duplicates(subset=['url_normalized'], keep='first')
     
     # Also check for title-based duplicates (if URL is missing or similar)
@@ -109,6 +96,8 @@ def create_newsapi_table_if_not_exists():
                 published_at TIMESTAMP,
                 source TEXT,
                 url TEXT UNIQUE NOT NULL,
+                canonical_url TEXT,
+                url_hash BIGINT GENERATED ALWAYS AS (('x' || substr(md5(COALESCE(canonical_url, url)), 1, 16))::bit(64)::bigint) STORED,
                 description TEXT,
                 full_text TEXT,
                 ai_keywords_found TEXT[],
@@ -117,6 +106,7 @@ def create_newsapi_table_if_not_exists():
                 UNIQUE(url)
             )
         """)
+    ensure_title_index("newsapi_articles")
 
 
 def parse_date(date_str: str) -> str:
@@ -156,20 +146,25 @@ def save_to_database(df: pd.DataFrame) -> int:
     # Ensure newsapi_articles table exists
     create_newsapi_table_if_not_exists()
     
-    inserted_articles = 0
     skipped = 0
     
-    # Get existing URLs first (outside the loop)
-    with get_db_cursor() as cur:
-        cur.execute("SELECT url FROM newsapi_articles")
-        existing_urls = {row['url'] for row in cur.fetchall()}
+    # Fingerprint index of the stored URLs (outside the loop)
+    existing_urls = SeenUrlIndex.postgres("newsapi_articles")
     
     print(f"  Existing articles in newsapi_articles table: {len(existing_urls)}")
     
-    # Process each article in a separate transaction
-    for idx, row in df.iterrows():
+    # Near-copies of stored stories are saved under the story's cluster id
+    near_dups = NearDuplicateIndex.postgres("newsapi_articles")
+    
+    # Stored articles with (nearly) the same title, looked up in one batch
+    titles = [str(title) if pd.notna(title) else '' for title in df['title']]
+    title_matches = nearest_titles(titles, "newsapi_articles", min_similarity=TITLE_DUPLICATE_SIMILARITY, limit=1)
+    
+    rows = []
+    signatures = []
+    for position, (_, row) in enumerate(df.iterrows()):
         url = str(row.get('url', '')).strip()
-        if not url or url in existing_urls:
+        if not url or url in existing_urls or title_matches[position]:
             skipped += 1
             continue
         
@@ -189,41 +184,44 @@ def save_to_database(df: pd.DataFrame) -> int:
         # Use description as full_text (no full_text in CSV)
         full_text = description
         
-        # Each article in its own transaction
-        try:
-            with get_db_cursor() as cur:
-                # Insert into newsapi_articles table
-                cur.execute("""
-                    INSERT INTO newsapi_articles
-                    (title, published_at, source, url, description, full_text, 
-                     ai_keywords_found, ce_keywords_found)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (url) DO NOTHING
-                """, (
-                    title,
-                    published_at,
-                    source,
-                    url,
-                    description,
-                    full_text,
-                    ai_keywords,
-                    ce_keywords
-                ))
-                
-                if cur.rowcount > 0:
-                    inserted_articles += 1
-                else:
-                    skipped += 1
-                    
-        except Exception as e:
-            print(f"  Error inserting article '{title[:50]}...': {e}")
-            skipped += 1
+        rows.append((
+            title,
+            published_at,
+            source,
+            url,
+            canonicalize_url(url),
+            description,
+            full_text,
+            ai_keywords,
+            ce_keywords
+        ))
+        signatures.append(minhash_signature(f"{title} {description}"))
+    
+    # All articles in one COPY; URLs stored meanwhile are skipped by ON CONFLICT
+    try:
+        result = bulk_insert(
+            "newsapi_articles",
+            ["title", "published_at", "source", "url", "canonical_url", "description", "full_text",
+             "ai_keywords_found", "ce_keywords_found"],
+            rows
+        )
+    except Exception as e:
+        print(f"  Error inserting articles: {e}")
+        return 0
+    
+    inserted_articles = result.inserted
+    skipped += result.skipped
+    print(f"  Bulk insert: {result.inserted} inserted, {result.skipped} skipped")
+    
+    # Index the new articles in insertion order, so copies within the file are found too
+    for article_id, row, signature in zip(result.ids, rows, signatures):
+        if article_id is None:
             continue
-        
-        # Progress update every 100 articles
-        if (inserted_articles + skipped) % 100 == 0:
-            print(f"  Progress: {inserted_articles} inserted, {skipped} skipped")
+        existing_urls.add(row[3])
+        near_copy = near_dups.find(signature)
+        near_dups.add(article_id, signature, cluster_id=near_copy[1] if near_copy else None)
     
+    print(f"  {near_dups.summary()}")
     return inserted_articles
 
 
@@ -0,0 +1,300 @@
+"""
+Shared keyword matching for CE49X Final Project filters and classifiers.
+
+The collectors, filters and validators decide relevance by looking up the
+CE/AI keyword lists in article text. Scanning the text once per keyword
+costs O(keywords x text) per article, and substring checks match inside
+words ("ai" in "said", "ml" in "html"). KeywordMatcher compiles a keyword
+list or taxonomy into one Aho-Corasick automaton over words:
+- text is split into words (letters and digits) and lower-cased, so
+  keywords only match whole words and phrases match across any run of
+  spaces, hyphens or punctuation ("AI-powered" contains "ai")
+- each word is looked up once in the vocabulary of keyword words; the
+  automaton follows one transition per word and reports every keyword and
+  phrase ending there, so a text is matched in one pass whatever the
+  number of keywords
+- a taxonomy ({label: [terms...]}) reports the label for any of its terms,
+  which covers synonyms and category lists alike
+
+Compiled matchers are cached per keyword list (compile_keywords()), so the
+per-article helpers cost one pass over the text.
+
+Whole corpora go through label_matrix(): each text is tokenized once into a
+stream of word ids, and every keyword length n is matched for all texts at
+once by encoding the n-grams of the stream as integers and looking them up
+in a sorted table of keyword codes (numpy). The result is a multi-hot
+(texts x labels) matrix.
+
+Usage:
+    find_keywords("AI-powered bridge inspection", ["artificial intelligence", "AI", "bridge"])
+    # -> ["AI", "bridge"]
+
+    matcher = compile_keywords({"Computer Vision": ["computer vision", "lidar"], ...})
+    matcher.find_many(texts)          # -> [["Computer Vision", ...], ...]
+    list(matcher.finditer(text))      # -> [KeywordHit(keyword, term, start, end), ...]
+    matcher.label_matrix(df["text"])  # -> bool array, one column per label
+"""
+
+import re
+from collections import deque
+from typing import Dict, Hashable, Iterable, Iterator, List, Mapping, NamedTuple, Sequence, Tuple, Union
+
+import numpy as np
+
+WORD_RE = re.compile(r"[^\W_]+")
+
+# Keyword list, or taxonomy of labels with their terms (synonyms)
+Keywords = Union[Iterable[str], Mapping[str, Iterable[str]]]
+
+
+class KeywordHit(NamedTuple):
+    keyword: str  # Keyword (taxonomy label) that matched
+    term: str  # Term as listed in the keywords
+    start: int  # Span of the match in the text
+    end: int
+
+
+def words(text: str) -> List[str]:
+    """Lower-case words of a text, as the matcher sees them."""
+    return WORD_RE.findall(text.lower())
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over the words of a keyword list or taxonomy."""
+
+    def __init__(self, keywords: Keywords):
+        """
+        Args:
+            keywords: Keywords (each its own label), or {label: terms} where
+                any of the terms reports the label
+        """
+        if isinstance(keywords, Mapping):
+            entries = [(label, list(terms)) for label, terms in keywords.items()]
+        else:
+            entries = [(keyword, [keyword]) for keyword in keywords]
+
+        self.labels: List[str] = []  # Distinct labels in listing order
+        self.terms: List[str] = []
+        self.vocabulary: Dict[str, int] = {}  # Keyword word -> word id
+        self._goto: List[Dict[int, int]] = [{}]
+        self._output: List[List[Tuple[int, int, int]]] = [[]]  # (label, term, words) ending in a state
+        self._term_entries: List[Tuple[int, Tuple[int, ...]]] = []  # (label, word ids) per term
+        self.max_words = 1
+
+        label_ids: Dict[str, int] = {}
+        for label, terms in entries:
+            if label not in label_ids:
+                label_ids[label] = len(self.labels)
+                self.labels.append(label)
+            for term in terms:
+                term_words = words(term)
+                if not term_words:
+                    continue
+                state = 0
+                for word in term_words:
+                    word_id = self.vocabulary.setdefault(word, len(self.vocabulary))
+                    next_state = self._goto[state].get(word_id)
+                    if next_state is None:
+                        next_state = self._goto[state][word_id] = len(self._goto)
+                        self._goto.append({})
+                        self._output.append([])
+                    state = next_state
+                self._output[state].append((label_ids[label], len(self.terms), len(term_words)))
+                self._term_entries.append((label_ids[label], tuple(self.vocabulary[word] for word in term_words)))
+                self.terms.append(term)
+                self.max_words = max(self.max_words, len(term_words))
+
+        # Failure links, breadth first: the longest proper suffix of a state's
+        # phrase that is also a phrase prefix; outputs of the suffix are inherited
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word_id, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and word_id not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(word_id, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+        self._ngram_tables = self._build_ngram_tables()
+
+    def _build_ngram_tables(self) -> Dict[int, Tuple[np.ndarray, np.ndarray]]:
+        """
+        {words: (sorted n-gram codes, code x label bool matrix)} of the terms.
+
+        An n-gram of word ids is coded in base len(vocabulary) + 1; the extra
+        digit is the id of unknown words and text separators, which no term
+        contains. Empty if the longest term's codes would overflow int64.
+        """
+        base = len(self.vocabulary) + 1
+        if base ** self.max_words >= 2 ** 63:
+            return {}
+        codes_by_length: Dict[int, Dict[int, set]] = {}
+        for label_id, word_ids in self._term_entries:
+            code = 0
+            for word_id in word_ids:
+                code = code * base + word_id
+            codes_by_length.setdefault(len(word_ids), {}).setdefault(code, set()).add(label_id)
+        tables = {}
+        for length, label_sets in codes_by_length.items():
+            codes = np.array(sorted(label_sets), dtype=np.int64)
+            code_labels = np.zeros((len(codes), len(self.labels)), dtype=bool)
+            for row, code in enumerate(codes.tolist()):
+                code_labels[row, list(label_sets[code])] = True
+            tables[length] = (codes, code_labels)
+        return tables
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def _outputs(self, text) -> Iterator[Tuple[int, int, int]]:
+        """(label id, term id, words) of every match, in order of match end."""
+        if not isinstance(text, str) or not text:
+            return  # None, NaN and other missing values
+        vocabulary, goto, fail, output = self.vocabulary, self._goto, self._fail, self._output
+        state = 0
+        for word in WORD_RE.findall(text.lower()):
+            word_id = vocabulary.get(word)
+            if word_id is None:
+                state = 0  # No keyword contains this word
+                continue
+            while state and word_id not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(word_id, 0)
+            if output[state]:
+                yield from output[state]
+
+    def finditer(self, text: str) -> Iterator[KeywordHit]:
+        """Every keyword occurrence in a text with its span, overlapping phrases included."""
+        if not isinstance(text, str) or not text:
+            return
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # Lower-casing changed the length (rare letters): keep spans in `text`
+            tokens = ((m.group().lower(), m.start(), m.end()) for m in WORD_RE.finditer(text))
+        else:
+            tokens = ((m.group(), m.start(), m.end()) for m in WORD_RE.finditer(lowered))
+
+        vocabulary, goto, fail, output = self.vocabulary, self._goto, self._fail, self._output
+        starts = deque(maxlen=self.max_words)
+        state = 0
+        for word, start, end in tokens:
+            starts.append(start)
+            word_id = vocabulary.get(word)
+            if word_id is None:
+                state = 0
+                continue
+            while state and word_id not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(word_id, 0)
+            for label_id, term_id, length in output[state]:
+                yield KeywordHit(self.labels[label_id], self.terms[term_id], starts[-length], end)
+
+    def find(self, text: str) -> List[str]:
+        """Distinct keywords (labels) found in a text, in listing order."""
+        found = {label_id for label_id, _, _ in self._outputs(text)}
+        return [self.labels[label_id] for label_id in sorted(found)]
+
+    def find_many(self, texts: Iterable[str]) -> List[List[str]]:
+        """find() for each of a batch of texts."""
+        return [self.find(text) for text in texts]
+
+    def contains_any(self, text: str) -> bool:
+        """True if any keyword occurs in a text (stops at the first match)."""
+        return next(self._outputs(text), None) is not None
+
+    def token_ids(self, texts: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Word-id stream of a batch of texts.
+
+        Returns:
+            (ids, text_index): the word ids of all texts in order, each text
+            followed by one separator; unknown words and separators have id
+            len(vocabulary). text_index holds the text of every position.
+        """
+        unknown = len(self.vocabulary)
+        get = self.vocabulary.get
+        ids: List[int] = []
+        lengths: List[int] = []
+        for text in texts:
+            start = len(ids)
+            if isinstance(text, str):
+                ids.extend([get(word, unknown) for word in WORD_RE.findall(text.lower())])
+            ids.append(unknown)
+            lengths.append(len(ids) - start)
+        return np.array(ids, dtype=np.int64), np.repeat(np.arange(len(lengths)), lengths)
+
+    def label_matrix(self, texts: Iterable[str]) -> np.ndarray:
+        """
+        Multi-hot matrix of the labels found in a batch of texts.
+
+        Returns:
+            bool array of shape (texts, labels); column j is self.labels[j]
+        """
+        texts = list(texts)
+        if not self._ngram_tables:
+            matrix = np.zeros((len(texts), len(self.labels)), dtype=bool)
+            for row, text in enumerate(texts):
+                matrix[row, [label_id for label_id, _, _ in self._outputs(text)]] = True
+            return matrix
+
+        matrix = np.zeros((len(texts), len(self.labels)), dtype=bool)
+        ids, text_index = self.token_ids(texts)
+        base = len(self.vocabulary) + 1
+        for length, (codes, code_labels) in self._ngram_tables.items():
+            count = len(ids) - length + 1
+            if count <= 0:
+                continue
+            # Code of the n-gram starting at every position of the stream
+            grams = ids[:count].copy()
+            for offset in range(1, length):
+                grams = grams * base + ids[offset:offset + count]
+            rows = np.minimum(np.searchsorted(codes, grams), len(codes) - 1)
+            hit = codes[rows] == grams
+            hit_texts, hit_rows = text_index[:count][hit], rows[hit]
+            for label_id in range(len(self.labels)):
+                with_label = code_labels[hit_rows, label_id]
+                matrix[hit_texts[with_label], label_id] = True
+        return matrix
+
+    def terms_by_keyword(self, text: str) -> Dict[str, List[str]]:
+        """{label: matched terms in listing order} for the labels found in a text."""
+        found: Dict[int, set] = {}
+        for label_id, term_id, _ in self._outputs(text):
+            found.setdefault(label_id, set()).add(term_id)
+        return {self.labels[label_id]: [self.terms[term_id] for term_id in sorted(found[label_id])]
+                for label_id in sorted(found)}
+
+
+_matchers: Dict[Hashable, KeywordMatcher] = {}
+
+
+def compile_keywords(keywords: Keywords) -> KeywordMatcher:
+    """KeywordMatcher for a keyword list or taxonomy, compiled once per distinct list."""
+    if isinstance(keywords, KeywordMatcher):
+        return keywords
+    if isinstance(keywords, Mapping):
+        key: Hashable = tuple((label, tuple(terms)) for label, terms in keywords.items())
+    else:
+        key = tuple(keywords)
+    matcher = _matchers.get(key)
+    if matcher is None:
+        matcher = _matchers[key] = KeywordMatcher(dict(key) if isinstance(keywords, Mapping) else key)
+    return matcher
+
+
+def find_keywords(text: str, keywords: Union[Keywords, KeywordMatcher]) -> List[str]:
+    """Distinct keywords found in a text as whole words or phrases (case-insensitive)."""
+    return compile_keywords(keywords).find(text)
+
+
+def contains_any_keyword(text: str, keywords: Union[Keywords, KeywordMatcher]) -> bool:
+    """True if any of the keywords occurs in a text as a whole word or phrase."""
+    return compile_keywords(keywords).contains_any(text)
+
+
+def find_keywords_batch(texts: Sequence[str], keywords: Union[Keywords, KeywordMatcher]) -> List[List[str]]:
+    """find_keywords() for each of a batch of texts, sharing one compiled matcher."""
+    return compile_keywords(keywords).find_many(texts)
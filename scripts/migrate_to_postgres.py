@@ -12,7 +12,7 @@ from datetime import datetime
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from database.db_config import get_db_cursor, test_connection
+from database.db_config import bulk_insert, get_db_cursor, test_connection
 
 SCRIPT_DIR = Path(__file__).parent.resolve()
 PROJECT_ROOT = SCRIPT_DIR.parent
@@ -133,67 +133,63 @@ def migrate_dataframe(df: pd.DataFrame, source: str = "unknown") -> int:
         df['retrieved_at'] = pd.to_datetime(df['retrieved_at'], errors='coerce')
         df['retrieved_at'] = df['retrieved_at'].fillna(datetime.now())
     
-    migrated = 0
-    skipped = 0
+    def text_or_none(value):
+        return str(value) if pd.notna(value) else None
+    
+    rows = [
+        (
+            str(row['title']) if pd.notna(row['title']) else '',
+            row['published_at'] if pd.notna(row['published_at']) else None,
+            text_or_none(row['source']),
+            str(row['url']),
+            text_or_none(row['content']),
+            text_or_none(row['description']),
+            text_or_none(row['full_text']),
+            text_or_none(row['processed_text']),
+            row['retrieved_at']
+        )
+        for row in df.to_dict('records')
+    ]
     
+    # One COPY for all articles; URLs already stored are skipped
     with get_db_cursor() as cur:
-        for idx, row in df.iterrows():
-            try:
-                # Check if URL already exists
-                cur.execute("SELECT id FROM articles WHERE url = %s", (row['url'],))
-                existing = cur.fetchone()
-                
-                if existing:
-                    skipped += 1
+        result = bulk_insert(
+            "articles",
+            ["title", "published_at", "source", "url", "content", "description",
+             "full_text", "processed_text", "retrieved_at"],
+            rows,
+            cur=cur
+        )
+        
+        # If this is classified_articles.csv, also migrate classifications
+        if source == 'classified_articles' and 'ce_areas' in df.columns and 'ai_technologies' in df.columns:
+            classifications = []
+            for article_id, row in zip(result.ids, df.to_dict('records')):
+                if article_id is None:
                     continue
+                ce_areas = []
+                ai_techs = []
                 
-                # Insert article
-                cur.execute("""
-                    INSERT INTO articles 
-                    (title, published_at, source, url, content, description, full_text, processed_text, retrieved_at)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    RETURNING id
-                """, (
-                    str(row['title']) if pd.notna(row['title']) else '',
-                    row['published_at'] if pd.notna(row['published_at']) else None,
-                    str(row['source']) if pd.notna(row['source']) else None,
-                    str(row['url']),
-                    str(row['content']) if pd.notna(row['content']) else None,
-                    str(row['description']) if pd.notna(row['description']) else None,
-                    str(row['full_text']) if pd.notna(row['full_text']) else None,
-                    str(row['processed_text']) if pd.notna(row['processed_text']) else None,
-                    row['retrieved_at']
-                ))
-                
-                article_id = cur.fetchone()['id']
-                
-                # If this is classified_articles.csv, also migrate classifications
-                if source == 'classified_articles' and 'ce_areas' in row and 'ai_technologies' in row:
-                    ce_areas = []
-                    ai_techs = []
-                    
-                    if pd.notna(row['ce_areas']):
-                        ce_areas = [a.strip() for a in str(row['ce_areas']).split(',') if a.strip()]
-                    
-                    if pd.notna(row['ai_technologies']):
-                        ai_techs = [t.strip() for t in str(row['ai_technologies']).split(',') if t.strip()]
-                    
-                    if ce_areas or ai_techs:
-                        cur.execute("""
-                            INSERT INTO classifications 
-                            (article_id, ce_areas, ai_technologies, classification_method)
-                            VALUES (%s, %s, %s, 'keyword')
-                        """, (article_id, ce_areas, ai_techs))
+                if pd.notna(row['ce_areas']):
+                    ce_areas = [a.strip() for a in str(row['ce_areas']).split(',') if a.strip()]
                 
-                migrated += 1
+                if pd.notna(row['ai_technologies']):
+                    ai_techs = [t.strip() for t in str(row['ai_technologies']).split(',') if t.strip()]
                 
-                if (migrated + skipped) % 50 == 0:
-                    print(f"  Processed {migrated + skipped} articles... ({migrated} migrated, {skipped} skipped)")
-                    
-            except Exception as e:
-                print(f"Error migrating row {idx}: {e}")
-                skipped += 1
-                continue
+                if ce_areas or ai_techs:
+                    classifications.append((article_id, ce_areas, ai_techs, 'keyword'))
+            
+            if classifications:
+                bulk_insert(
+                    "classifications",
+                    ["article_id", "ce_areas", "ai_technologies", "classification_method"],
+                    classifications,
+                    conflict_column=None,
+                    cur=cur
+                )
+    
+    migrated = result.inserted
+    skipped = result.skipped
     
     print(f"\nMigration complete: {migrated} articles migrated, {skipped} skipped")
     return migrated
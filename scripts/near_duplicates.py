@@ -0,0 +1,287 @@
+"""
+Ingest-time near-duplicate detection for CE49X Final Project.
+
+Syndicated copies of a story (the same wire text on ENR, Construction Dive and
+the NewsAPI sources) have different URLs and often slightly different titles,
+so exact URL/title checks let them through and every copy is fetched,
+summarized and classified. This module gives each article a MinHash signature
+over word shingles of its title and body and keeps the signatures in an LSH
+index:
+- the signature (NUM_PERM 32-bit minimums) is cut into BANDS bands of ROWS
+  rows; each band is hashed to one 64-bit bucket key
+- articles sharing a bucket key with a new article are its candidates; a
+  candidate whose estimated Jaccard similarity (share of equal signature
+  slots) reaches the threshold makes the new article a near-copy
+- every stored article carries a cluster id (the id of the first article of
+  its story), so analyses can count stories rather than copies
+
+Looking up an article costs one indexed query on BANDS bucket keys, whatever
+the corpus size. The index is persisted next to the articles: tables
+<table>_minhash (article_id, cluster_id, signature) and <table>_lsh
+(band_key, article_id) in the same database. An in-memory index serves
+list-based passes such as collect_newsapi.remove_duplicates().
+
+Usage:
+    near_dups = NearDuplicateIndex.postgres("articles")
+    signature = minhash_signature(f"{title} {full_text}")
+    match = near_dups.find(signature)
+    if match is None:
+        article_id = ...                          # insert the article
+        near_dups.add(article_id, signature)
+"""
+
+import hashlib
+import re
+import sqlite3
+import zlib
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+NUM_PERM = 120  # Signature length
+BANDS = 24  # LSH bands (BANDS * ROWS == NUM_PERM)
+ROWS = 5  # Signature slots per band
+SHINGLE_SIZE = 3  # Words per shingle
+NEAR_DUP_THRESHOLD = 0.7  # Estimated Jaccard similarity of a near-copy
+
+# With 24 bands of 5 rows, pairs at Jaccard 0.7 become candidates with
+# probability 1 - (1 - 0.7**5)**24 = 0.99, pairs at 0.5 with 0.53 and pairs
+# at 0.3 with 0.06; the signature comparison then applies the threshold.
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_rng = np.random.RandomState(49)
+PERM_A = _rng.randint(1, (1 << 61) - 1, size=NUM_PERM, dtype=np.uint64)
+PERM_B = _rng.randint(0, (1 << 61) - 1, size=NUM_PERM, dtype=np.uint64)
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# (article id, cluster id, estimated similarity)
+Match = Tuple[int, int, float]
+
+
+def token_hashes(tokens: Iterable[str]) -> np.ndarray:
+    """32-bit hashes of a set of tokens (words, shingles)."""
+    tokens = set(tokens)
+    return np.fromiter((zlib.crc32(t.encode("utf-8")) for t in tokens), dtype=np.uint64, count=len(tokens))
+
+
+def shingle_hashes(text: str, size: int = SHINGLE_SIZE) -> np.ndarray:
+    """32-bit hashes of the distinct word `size`-grams of a text."""
+    tokens = TOKEN_RE.findall((text or "").lower())
+    if len(tokens) < size:
+        return np.empty(0, dtype=np.uint64)
+    return token_hashes(" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1))
+
+
+def minhash_signature(text: str) -> Optional[np.ndarray]:
+    """
+    MinHash signature of a text's shingles.
+
+    Returns:
+        uint32 array of NUM_PERM minimums, or None for texts shorter than a
+        shingle
+    """
+    return signature_from_hashes(shingle_hashes(text))
+
+
+def signature_from_hashes(hashes: np.ndarray) -> Optional[np.ndarray]:
+    """MinHash signature of a set of token_hashes(), or None for an empty set."""
+    if not len(hashes):
+        return None
+    # (a * x + b) mod p for every permutation and shingle, with a and b
+    # drawn from [0, p); the products wrap around in uint64 as in common
+    # MinHash implementations. Multipliers much smaller than p would leave
+    # the order of the hashes nearly unchanged across permutations.
+    permuted = (np.outer(PERM_A, hashes) + PERM_B[:, None]) % MERSENNE_PRIME
+    return (permuted.min(axis=1) & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+
+
+def band_keys(signature: np.ndarray, bands: int = BANDS, rows: int = ROWS) -> List[int]:
+    """
+    One signed 64-bit bucket key per band of a signature.
+
+    Other thresholds need other band layouts: two texts with Jaccard
+    similarity s share a bucket with probability 1 - (1 - s**rows)**bands
+    (bands * rows <= NUM_PERM).
+    """
+    keys = []
+    for band in range(bands):
+        band_rows = signature[band * rows:(band + 1) * rows].tobytes()
+        digest = hashlib.blake2b(band_rows, digest_size=8, person=band.to_bytes(2, "big")).digest()
+        keys.append(int.from_bytes(digest, "big", signed=True))
+    return keys
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+class MemoryLshStore:
+    """LSH buckets and signatures held in memory (one run, list-based passes)."""
+
+    def __init__(self):
+        self._buckets: Dict[int, List[int]] = {}
+        self._entries: Dict[int, Tuple[int, np.ndarray]] = {}
+
+    def candidates(self, keys: List[int]) -> List[Tuple[int, int, np.ndarray]]:
+        ids = {article_id for key in keys for article_id in self._buckets.get(key, ())}
+        return [(article_id, *self._entries[article_id]) for article_id in ids]
+
+    def add(self, article_id: int, cluster_id: int, signature: np.ndarray, keys: List[int]):
+        self._entries[article_id] = (cluster_id, signature)
+        for key in keys:
+            self._buckets.setdefault(key, []).append(article_id)
+
+    def count(self) -> int:
+        return len(self._entries)
+
+
+class SqlLshStore:
+    """
+    LSH buckets and signatures in <table>_minhash / <table>_lsh of the
+    database holding `table` (Postgres or SQLite).
+    """
+
+    def __init__(self, cursor: Callable, table: str, placeholder: str, blob_type: str):
+        """
+        Args:
+            cursor: Context manager factory yielding a DB-API cursor whose
+                work is committed on exit
+            table: Articles table the index belongs to
+            placeholder: Parameter placeholder of the driver ("%s" or "?")
+            blob_type: Binary column type ("BYTEA" or "BLOB")
+        """
+        self._cursor = cursor
+        self.table = table
+        self._p = placeholder
+        with self._cursor() as cur:
+            cur.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table}_minhash (
+                    article_id BIGINT PRIMARY KEY,
+                    cluster_id BIGINT NOT NULL,
+                    signature {blob_type} NOT NULL
+                )
+            """)
+            cur.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table}_lsh (
+                    band_key BIGINT NOT NULL,
+                    article_id BIGINT NOT NULL
+                )
+            """)
+            cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_lsh_band_key ON {table}_lsh(band_key)")
+            cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_minhash_cluster_id ON {table}_minhash(cluster_id)")
+
+    def candidates(self, keys: List[int]) -> List[Tuple[int, int, np.ndarray]]:
+        marks = ", ".join([self._p] * len(keys))
+        with self._cursor() as cur:
+            cur.execute(
+                f"SELECT article_id, cluster_id, signature FROM {self.table}_minhash WHERE article_id IN "
+                f"(SELECT article_id FROM {self.table}_lsh WHERE band_key IN ({marks}))",
+                keys
+            )
+            return [(article_id, cluster_id, np.frombuffer(bytes(signature), dtype=np.uint32))
+                    for article_id, cluster_id, signature in cur.fetchall()]
+
+    def add(self, article_id: int, cluster_id: int, signature: np.ndarray, keys: List[int]):
+        p = self._p
+        with self._cursor() as cur:
+            cur.execute(f"SELECT 1 FROM {self.table}_minhash WHERE article_id = {p}", (article_id,))
+            if cur.fetchone():
+                return  # Indexed already
+            cur.execute(
+                f"INSERT INTO {self.table}_minhash (article_id, cluster_id, signature) VALUES ({p}, {p}, {p})",
+                (article_id, cluster_id, signature.astype(np.uint32).tobytes())
+            )
+            cur.executemany(
+                f"INSERT INTO {self.table}_lsh (band_key, article_id) VALUES ({p}, {p})",
+                [(key, article_id) for key in keys]
+            )
+
+    def count(self) -> int:
+        with self._cursor() as cur:
+            cur.execute(f"SELECT COUNT(*) FROM {self.table}_minhash")
+            return cur.fetchone()[0]
+
+
+class NearDuplicateIndex:
+    """
+    MinHash LSH index of stored articles with story cluster ids.
+
+    find() returns the most similar stored article at or above the threshold;
+    add() stores an article, as a new story or under a given cluster.
+    """
+
+    def __init__(self, store, threshold: float = NEAR_DUP_THRESHOLD):
+        """
+        Args:
+            store: MemoryLshStore or SqlLshStore
+            threshold: Minimum estimated Jaccard similarity of a near-copy
+        """
+        self.store = store
+        self.threshold = threshold
+        self.stats = {"checked": 0, "near_copies": 0, "added": 0}
+
+    @classmethod
+    def memory(cls, **kwargs) -> "NearDuplicateIndex":
+        return cls(MemoryLshStore(), **kwargs)
+
+    @classmethod
+    def postgres(cls, table: str = "articles", **kwargs) -> "NearDuplicateIndex":
+        from database.db_config import get_db_cursor
+
+        return cls(SqlLshStore(lambda: get_db_cursor(dict_cursor=False), table, "%s", "BYTEA"), **kwargs)
+
+    @classmethod
+    def sqlite(cls, conn: sqlite3.Connection, table: str = "articles", **kwargs) -> "NearDuplicateIndex":
+        @contextmanager
+        def cursor():
+            cur = conn.cursor()
+            try:
+                yield cur
+                conn.commit()
+            finally:
+                cur.close()
+
+        return cls(SqlLshStore(cursor, table, "?", "BLOB"), **kwargs)
+
+    def find(self, signature: Optional[np.ndarray]) -> Optional[Match]:
+        """Most similar stored article at or above the threshold, or None."""
+        if signature is None:
+            return None
+        self.stats["checked"] += 1
+        best = None
+        for article_id, cluster_id, stored in self.store.candidates(band_keys(signature)):
+            score = similarity(signature, stored)
+            if score >= self.threshold and (best is None or score > best[2]):
+                best = (article_id, cluster_id, score)
+        if best is not None:
+            self.stats["near_copies"] += 1
+        return best
+
+    def add(self, article_id: int, signature: Optional[np.ndarray], cluster_id: Optional[int] = None) -> int:
+        """
+        Store an article's signature.
+
+        Args:
+            article_id: Row id of the stored article
+            signature: Its minhash_signature() (None: not indexed)
+            cluster_id: Story cluster, e.g. find()'s cluster for a near-copy
+                that is kept (default: a new story numbered by `article_id`)
+
+        Returns:
+            The article's cluster id
+        """
+        if cluster_id is None:
+            cluster_id = article_id
+        if signature is None:
+            return cluster_id
+        self.store.add(article_id, cluster_id, signature, band_keys(signature))
+        self.stats["added"] += 1
+        return cluster_id
+
+    def summary(self) -> str:
+        s = self.stats
+        return (f"Near-duplicates: {s['checked']} articles checked, {s['near_copies']} near-copies found, "
+                f"{s['added']} signatures added")
@@ -0,0 +1,67 @@
+"""
+Local NYTimes Archive API fixture server for CE49X Final Project.
+
+Serves recorded Archive API months (the YYYY-MM.json files that
+`collect_nytimes.py --archive` writes to data/nytimes_archive/) under the
+real API's URL layout, streamed in chunks like the real API. Bulk month mode
+can therefore be run and checked without network access or API quota.
+
+Usage:
+    python scripts/nytimes_archive_fixture.py --dir data/nytimes_archive --port 8808
+
+    # in another terminal (separate --archive-dir, so months are downloaded again)
+    python scripts/collect_nytimes.py --archive --no-db --days-back 60 \
+        --archive-url http://127.0.0.1:8808/svc/archive/v1 --archive-dir /tmp/nyt_months
+"""
+
+import argparse
+from pathlib import Path
+
+from aiohttp import web
+
+ROOT = Path(__file__).resolve().parents[1]
+FIXTURE_DIR = ROOT / "data" / "nytimes_archive"
+ARCHIVE_PATH = "/svc/archive/v1/{year}/{month}.json"
+
+
+def build_app(directory: Path) -> web.Application:
+    """Application serving `<directory>/<YYYY-MM>.json` at ARCHIVE_PATH."""
+    directory = Path(directory)
+
+    async def month(request: web.Request) -> web.StreamResponse:
+        if not request.query.get("api-key"):
+            # Same shape as the API gateway's answer to a missing key
+            return web.json_response(
+                {"fault": {"faultstring": "Failed to resolve API Key variable request.queryparam.api-key",
+                           "detail": {"errorcode": "steps.oauth.v2.FailedToResolveAPIKey"}}},
+                status=401
+            )
+        try:
+            year, month_number = int(request.match_info["year"]), int(request.match_info["month"])
+        except ValueError:
+            raise web.HTTPNotFound()
+        path = directory / f"{year}-{month_number:02d}.json"
+        if not path.exists():
+            raise web.HTTPNotFound(text=f"No recorded month {path.name}")
+        return web.FileResponse(path, chunk_size=64 * 1024, headers={"Content-Type": "application/json"})
+
+    app = web.Application()
+    app.router.add_get(ARCHIVE_PATH, month)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve recorded NYTimes Archive API months locally.")
+    parser.add_argument("--dir", type=Path, default=FIXTURE_DIR, help="Directory with recorded YYYY-MM.json months.")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on.")
+    parser.add_argument("--port", type=int, default=8808, help="Port to listen on.")
+    args = parser.parse_args()
+
+    months = sorted(path.stem for path in args.dir.glob("*.json"))
+    print(f"Serving {len(months)} recorded months from {args.dir}: {', '.join(months) or '-'}")
+    print(f"Archive URL: http://{args.host}:{args.port}/svc/archive/v1")
+    web.run_app(build_app(args.dir), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Ordered process-pool map over chunked corpora for CE49X Final Project.
+
+Classification and preprocessing read their input in chunks (e.g.
+pd.read_csv(..., chunksize=...)) and hand each chunk to a worker process.
+map_chunks() keeps the results in input order and reads at most `ahead`
+chunks per worker in advance, so memory is bounded by the chunk size and
+the pool never races ahead of the writer. Expensive per-process state
+(keyword automata, NLTK resources) is built once per worker by the pool
+initializer.
+
+Usage:
+    for chunk, result in map_chunks(process_chunk, pd.read_csv(path, chunksize=5000),
+                                    workers=4, initializer=load_resources):
+        ...  # write result, in input order
+"""
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, Optional, Tuple, TypeVar
+
+Chunk = TypeVar("Chunk")
+Result = TypeVar("Result")
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+
+def map_chunks(
+    func: Callable[[Chunk], Result],
+    chunks: Iterable[Chunk],
+    workers: int = DEFAULT_WORKERS,
+    initializer: Optional[Callable[[], None]] = None,
+    ahead: int = 2
+) -> Iterator[Tuple[Chunk, Result]]:
+    """
+    Apply `func` to a stream of chunks on a process pool, in input order.
+
+    Args:
+        func: Module-level function run on each chunk in a worker
+        chunks: Input chunks (consumed lazily)
+        workers: Worker processes; 1 runs `func` in this process (after
+            calling `initializer` once)
+        initializer: Called once in each worker before its first chunk
+        ahead: Chunks submitted per worker ahead of the one being yielded
+
+    Yields:
+        (chunk, func(chunk)) in input order
+    """
+    if workers <= 1:
+        if initializer is not None:
+            initializer()
+        for chunk in chunks:
+            yield chunk, func(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append((chunk, pool.submit(func, chunk)))
+            if len(pending) >= ahead * workers:
+                chunk, future = pending.popleft()
+                yield chunk, future.result()
+        while pending:
+            chunk, future = pending.popleft()
+            yield chunk, future.result()
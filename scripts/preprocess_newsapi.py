@@ -15,17 +15,17 @@ Course: CE49X - Introduction to Data Science for Civil Engineering
 Date: Fall 2025
 """
 
+import argparse
 import os
 import sys
 import pandas as pd
-import re
+from collections import Counter, deque
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional
 
 # Check and import required libraries
 try:
     import nltk
-    from nltk.corpus import stopwords
     from nltk.tokenize import word_tokenize, sent_tokenize
     from nltk.stem import WordNetLemmatizer
     from nltk.util import ngrams
@@ -69,58 +69,95 @@ PROJECT_ROOT = SCRIPT_DIR.parent
 INPUT_FILE = PROJECT_ROOT / "data_raw" / "newsapi_articles.csv"
 OUTPUT_FILE = PROJECT_ROOT / "data_raw" / "newsapi_articles.csv"  # Overwrite same file
 
+sys.path.insert(0, str(PROJECT_ROOT))
+from scripts.corpus_cache import CorpusCache, clean_tokens, default_stopwords
+from scripts.parallel_chunks import DEFAULT_WORKERS, map_chunks
+
+# Parallel preprocessing
+CHUNK_SIZE = 2000  # Articles per chunk handed to a worker
+WORKERS = DEFAULT_WORKERS  # Worker processes (1: preprocess in this process)
+TOP_NGRAMS = 10  # N-grams kept per article in the output columns
+
 # ============================================================================
 # PREPROCESSING FUNCTIONS
 # ============================================================================
 
-def combine_text_fields(row: pd.Series) -> str:
+def combine_text_fields(df: pd.DataFrame) -> pd.Series:
     """
     Combine title and description into a single text field.
     
     Args:
-        row: DataFrame row containing title and description
+        df: DataFrame containing title and description columns
         
     Returns:
-        Combined text string
+        Series of combined text strings (missing fields count as empty)
     """
-    title = str(row.get('title', ''))
-    description = str(row.get('description', ''))
-    
-    # Combine and handle NaN values
-    if pd.isna(title):
-        title = ''
-    if pd.isna(description):
-        description = ''
-    
-    return f"{title} {description}".strip()
+    title = df['title'].fillna('').astype(str) if 'title' in df else ''
+    description = df['description'].fillna('').astype(str) if 'description' in df else ''
+    return (title + ' ' + description).str.strip()
 
 
-def normalize_text(text: str) -> str:
+class TextPreprocessor:
     """
-    Normalize text: lowercase and remove special characters.
+    Preprocessing engine holding its NLTK resources.
     
-    Args:
-        text: Input text string
-        
-    Returns:
-        Normalized text string
+    Tokens follow the shared corpus cache rules (scripts/corpus_cache.py):
+    normalized words without stopwords and short words. The lemmatizer is
+    loaded once, lemmas are memoized per token type, and unigrams, bigrams
+    and trigrams come from the same lemma list.
     """
-    # Convert to lowercase
-    text = text.lower()
-    
-    # Remove URLs
-    text = re.sub(r'http\S+|www\S+|https\S+', '', text, flags=re.MULTILINE)
-    
-    # Remove email addresses
-    text = re.sub(r'\S+@\S+', '', text)
-    
-    # Remove special characters but keep spaces and alphanumeric
-    text = re.sub(r'[^a-zA-Z0-9\s]', ' ', text)
     
-    # Remove extra whitespace
-    text = re.sub(r'\s+', ' ', text)
-    
-    return text.strip()
+    def __init__(self):
+        self.stop_words = default_stopwords()
+        self.lemmatizer = WordNetLemmatizer()
+        self._lemmas: Dict[str, str] = {}
+    
+    def tokens(self, text: str) -> List[str]:
+        """Tokens of a text without stopwords and short words."""
+        return clean_tokens(text, self.stop_words)
+    
+    def lemmas(self, tokens: List[str]) -> List[str]:
+        """Lemmas of tokens, each token type lemmatized once."""
+        cache = self._lemmas
+        lemmas = []
+        for token in tokens:
+            lemma = cache.get(token)
+            if lemma is None:
+                lemma = cache[token] = self.lemmatizer.lemmatize(token)
+            lemmas.append(lemma)
+        return lemmas
+    
+    def process(self, text: str) -> dict:
+        """
+        Complete preprocessing pipeline for a single text.
+        
+        Returns:
+            Dictionary with processed text, lemma tokens, bigrams and trigrams
+        """
+        if not isinstance(text, str) or text == '':
+            return self.process_tokens([])
+        return self.process_tokens(self.tokens(text))
+    
+    def process_tokens(self, tokens: List[str]) -> dict:
+        """process() for an already tokenized text (e.g. from the corpus cache)."""
+        lemmas = self.lemmas(tokens)
+        return {
+            'processed_text': ' '.join(lemmas),
+            'tokens': lemmas,
+            'bigrams': [' '.join(gram) for gram in zip(lemmas, lemmas[1:])],
+            'trigrams': [' '.join(gram) for gram in zip(lemmas, lemmas[1:], lemmas[2:])]
+        }
+
+
+_preprocessor: Optional[TextPreprocessor] = None
+
+
+def get_preprocessor() -> TextPreprocessor:
+    """Preprocessing engine of this process, created on first use."""
+    global _preprocessor
+    if _preprocessor is None:
+        _preprocessor = TextPreprocessor()
+    return _preprocessor
 
 
 def remove_stopwords(text: str) -> str:
@@ -133,21 +170,7 @@ def remove_stopwords(text: str) -> str:
     Returns:
         Text with stopwords removed
     """
-    # Get English stopwords
-    stop_words = set(stopwords.words('english'))
-    
-    # Add domain-specific noise words
-    domain_stopwords = {
-        'subscribe', 'click', 'here', 'read', 'more', 'article', 'news',
-        'said', 'says', 'according', 'also', 'would', 'could', 'should'
-    }
-    stop_words.update(domain_stopwords)
-    
-    # Tokenize and remove stopwords
-    tokens = word_tokenize(text)
-    filtered_tokens = [word for word in tokens if word.lower() not in stop_words and len(word) > 2]
-    
-    return ' '.join(filtered_tokens)
+    return ' '.join(get_preprocessor().tokens(text))
 
 
 def lemmatize_text(text: str) -> str:
@@ -160,10 +183,7 @@ def lemmatize_text(text: str) -> str:
     Returns:
         Lemmatized text string
     """
-    lemmatizer = WordNetLemmatizer()
-    tokens = word_tokenize(text)
-    lemmatized_tokens = [lemmatizer.lemmatize(token) for token in tokens]
-    return ' '.join(lemmatized_tokens)
+    return ' '.join(get_preprocessor().lemmas(word_tokenize(text)))
 
 
 def extract_ngrams(text: str, n: int) -> List[str]:
@@ -192,68 +212,152 @@ def preprocess_text(text: str) -> dict:
     Returns:
         Dictionary with processed text and features
     """
-    if pd.isna(text) or text == '':
-        return {
-            'processed_text': '',
-            'bigrams': [],
-            'trigrams': []
-        }
-    
-    # Step 1: Normalize
-    normalized = normalize_text(text)
-    
-    # Step 2: Remove stopwords
-    no_stopwords = remove_stopwords(normalized)
+    result = get_preprocessor().process(text)
+    return {
+        'processed_text': result['processed_text'],
+        'bigrams': result['bigrams'],
+        'trigrams': result['trigrams']
+    }
+
+
+def preprocess_chunk(token_lists: List[List[str]]) -> pd.DataFrame:
+    """
+    Lemmatize and extract n-grams for one chunk of articles (run in a worker process).
     
-    # Step 3: Lemmatize
-    lemmatized = lemmatize_text(no_stopwords)
+    Args:
+        token_lists: Tokens of each article, from the corpus cache
+        
+    Returns:
+        DataFrame with one row per article: processed_text, bigrams and
+        trigrams (first TOP_NGRAMS, comma-separated) columns
+    """
+    preprocessor = get_preprocessor()
+    results = [preprocessor.process_tokens(tokens) for tokens in token_lists]
+    return pd.DataFrame({
+        'processed_text': [r['processed_text'] for r in results],
+        'bigrams': [', '.join(r['bigrams'][:TOP_NGRAMS]) for r in results],
+        'trigrams': [', '.join(r['trigrams'][:TOP_NGRAMS]) for r in results]
+    })
+
+
+def preprocess_csv(input_file: Path, output_file: Path, workers: int = WORKERS,
+                   chunksize: int = CHUNK_SIZE) -> Dict[str, Counter]:
+    """
+    Preprocess a CSV of articles chunk by chunk on a process pool.
     
-    # Step 4: Extract n-grams
-    bigrams = extract_ngrams(lemmatized, 2)
-    trigrams = extract_ngrams(lemmatized, 3)
+    Tokens are read from the corpus cache, which tokenizes only articles
+    whose text changed since the last run. Chunks are lemmatized in
+    parallel and written in input order to output_file, so memory stays
+    bounded by the chunk size.
     
-    return {
-        'processed_text': lemmatized,
-        'bigrams': bigrams,
-        'trigrams': trigrams
-    }
+    Returns:
+        {'articles', 'with_text', 'cached', 'tokenized'} counts and 'words' /
+        'bigrams' Counters of the processed texts (for the summary)
+    """
+    stats = {'articles': 0, 'with_text': 0, 'cached': 0, 'tokenized': 0,
+             'words': Counter(), 'bigrams': Counter()}
+    cache = CorpusCache()
+    pending = deque()  # (chunk, full_text) of the chunks handed to the pool, in order
+    
+    def token_lists():
+        for chunk in pd.read_csv(input_file, chunksize=chunksize):
+            full_text = combine_text_fields(chunk)
+            corpus = cache.load(full_text.tolist())
+            stats['cached'] += corpus.reused
+            stats['tokenized'] += corpus.tokenized
+            pending.append((chunk, full_text))
+            yield [corpus.words(i) for i in range(len(corpus))]
+    
+    header = True
+    for _, processed in map_chunks(preprocess_chunk, token_lists(), workers, initializer=get_preprocessor):
+        chunk, full_text = pending.popleft()
+        processed.index = chunk.index
+        chunk['full_text'] = full_text
+        for column, values in processed.items():
+            chunk[column] = values
+        chunk.to_csv(output_file, mode='w' if header else 'a', header=header, index=False, encoding='utf-8')
+        header = False
+        
+        stats['articles'] += len(chunk)
+        stats['with_text'] += int(processed['processed_text'].str.len().gt(0).sum())
+        for text in processed['processed_text']:
+            stats['words'].update(text.split())
+        for bigrams in processed['bigrams']:
+            if bigrams:
+                stats['bigrams'].update(bigrams.split(', '))
+        print(f"  Processed {stats['articles']} articles...")
+    if header:
+        pd.read_csv(input_file, nrows=0).to_csv(output_file, index=False, encoding='utf-8')
+    return stats
 
 
-def calculate_tfidf(df: pd.DataFrame, text_column: str = 'processed_text') -> pd.DataFrame:
+def fit_tfidf(texts: pd.Series) -> Optional[TfidfVectorizer]:
     """
-    Calculate TF-IDF scores for processed texts.
+    Fit the TF-IDF vectorizer on the non-empty processed texts.
     
     Args:
-        df: DataFrame with processed text column
-        text_column: Name of the column containing processed text
+        texts: Processed texts of all articles
         
     Returns:
-        DataFrame with TF-IDF scores added
+        Fitted vectorizer, or None if there are no valid texts
+        
+    Raises:
+        ValueError: if the vocabulary is empty after filtering
     """
-    # Filter out empty texts
-    texts = df[text_column].fillna('').astype(str)
+    texts = texts.fillna('').astype(str)
     non_empty = texts[texts.str.len() > 0]
     
     if len(non_empty) == 0:
         print("Warning: No valid texts for TF-IDF calculation")
-        return df
+        return None
     
-    # Calculate TF-IDF
     vectorizer = TfidfVectorizer(max_features=100, ngram_range=(1, 2), min_df=2)
-    try:
-        tfidf_matrix = vectorizer.fit_transform(non_empty)
-        feature_names = vectorizer.get_feature_names_out()
-        
-        # Get top TF-IDF terms for each document
-        df['top_tfidf_terms'] = ''
+    vectorizer.fit(non_empty)
+    return vectorizer
+
+
+def top_tfidf_terms(vectorizer: TfidfVectorizer, texts: pd.Series, top_n: int = 5) -> List[str]:
+    """
+    Top TF-IDF terms of each text, comma-separated ('' for empty texts).
+    
+    Args:
+        vectorizer: Vectorizer from fit_tfidf()
+        texts: Processed texts (any subset of the fitted corpus)
+        top_n: Terms per text
         
-        for idx, row_idx in enumerate(non_empty.index):
-            # Get top 5 terms for this document
-            tfidf_scores = tfidf_matrix[idx].toarray()[0]
-            top_indices = tfidf_scores.argsort()[-5:][::-1]
-            top_terms = [feature_names[i] for i in top_indices if tfidf_scores[i] > 0]
-            df.at[row_idx, 'top_tfidf_terms'] = ', '.join(top_terms)
+    Returns:
+        One string per text
+    """
+    texts = texts.fillna('').astype(str)
+    terms = [''] * len(texts)
+    positions = [i for i, text in enumerate(texts) if text]
+    if not positions:
+        return terms
+    
+    feature_names = vectorizer.get_feature_names_out()
+    tfidf_matrix = vectorizer.transform(texts.iloc[positions]).toarray()
+    for position, tfidf_scores in zip(positions, tfidf_matrix):
+        top_indices = tfidf_scores.argsort()[-top_n:][::-1]
+        terms[position] = ', '.join(feature_names[i] for i in top_indices if tfidf_scores[i] > 0)
+    return terms
+
+
+def calculate_tfidf(df: pd.DataFrame, text_column: str = 'processed_text') -> pd.DataFrame:
+    """
+    Calculate TF-IDF scores for processed texts.
+    
+    Args:
+        df: DataFrame with processed text column
+        text_column: Name of the column containing processed text
         
+    Returns:
+        DataFrame with TF-IDF scores added
+    """
+    try:
+        vectorizer = fit_tfidf(df[text_column])
+        if vectorizer is None:
+            return df
+        df['top_tfidf_terms'] = top_tfidf_terms(vectorizer, df[text_column])
     except ValueError as e:
         print(f"Warning: TF-IDF calculation failed: {e}")
         df['top_tfidf_terms'] = ''
@@ -269,6 +373,11 @@ def main():
     """
     Main function to process the newsapi_articles.csv file.
     """
+    parser = argparse.ArgumentParser(description="Preprocess newsapi_articles.csv (tokens, lemmas, n-grams, TF-IDF).")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Worker processes (1: no process pool).")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE, help="Articles per chunk.")
+    args = parser.parse_args()
+    
     print("=" * 70)
     print("CE49X Final Project - Task 2: Text Preprocessing & NLP")
     print("=" * 70)
@@ -279,46 +388,48 @@ def main():
         print(f"ERROR: Input file not found: {INPUT_FILE}")
         return
     
-    # Load data
-    print(f"Loading data from {INPUT_FILE}...")
+    # Output is streamed to temporary files; OUTPUT_FILE (the input file
+    # itself) is only replaced once everything is written
+    processed_file = OUTPUT_FILE.with_name(OUTPUT_FILE.name + '.processed.tmp')
+    tfidf_file = OUTPUT_FILE.with_name(OUTPUT_FILE.name + '.tfidf.tmp')
+    
+    # Preprocess articles in chunks, one process per core
+    print(f"Preprocessing articles from {INPUT_FILE} ({args.workers} workers, {args.chunksize} articles per chunk)...")
     try:
-        df = pd.read_csv(INPUT_FILE)
-        print(f"Loaded {len(df)} articles")
+        stats = preprocess_csv(INPUT_FILE, processed_file, args.workers, args.chunksize)
     except Exception as e:
-        print(f"ERROR: Failed to load CSV file: {e}")
+        print(f"ERROR: Failed to preprocess CSV file: {e}")
+        processed_file.unlink(missing_ok=True)
         return
     
-    # Combine title and description into full_text
-    print("\nCombining title and description fields...")
-    df['full_text'] = df.apply(combine_text_fields, axis=1)
-    
-    # Preprocess each article
-    print("Preprocessing articles (this may take a while)...")
-    processed_data = []
-    
-    for idx, row in df.iterrows():
-        if (idx + 1) % 100 == 0:
-            print(f"  Processed {idx + 1}/{len(df)} articles...")
-        
-        result = preprocess_text(row['full_text'])
-        processed_data.append(result)
-    
-    # Add processed columns to dataframe
-    df['processed_text'] = [d['processed_text'] for d in processed_data]
-    df['bigrams'] = [', '.join(d['bigrams'][:10]) for d in processed_data]  # Top 10 bigrams
-    df['trigrams'] = [', '.join(d['trigrams'][:10]) for d in processed_data]  # Top 10 trigrams
+    print(f"\n[OK] Preprocessing complete for {stats['articles']} articles "
+          f"({stats['cached']} from the corpus cache, {stats['tokenized']} tokenized)")
     
-    print(f"\n[OK] Preprocessing complete for {len(df)} articles")
-    
-    # Calculate TF-IDF
+    # Calculate TF-IDF: fit on the processed texts, then add the top terms chunk by chunk
     print("\nCalculating TF-IDF scores...")
-    df = calculate_tfidf(df, 'processed_text')
+    texts = pd.read_csv(processed_file, usecols=['processed_text'], keep_default_na=False)['processed_text']
+    try:
+        vectorizer = fit_tfidf(texts)
+        failed = False
+    except ValueError as e:
+        print(f"Warning: TF-IDF calculation failed: {e}")
+        vectorizer, failed = None, True
+    del texts
     
     # Save processed data
     print(f"\nSaving processed data to {OUTPUT_FILE}...")
     try:
-        df.to_csv(OUTPUT_FILE, index=False, encoding='utf-8')
-        print(f"[OK] Saved {len(df)} processed articles to {OUTPUT_FILE}")
+        if vectorizer is None and not failed:
+            processed_file.replace(OUTPUT_FILE)
+        else:
+            header = True
+            for chunk in pd.read_csv(processed_file, chunksize=args.chunksize, keep_default_na=False):
+                chunk['top_tfidf_terms'] = top_tfidf_terms(vectorizer, chunk['processed_text']) if vectorizer is not None else ''
+                chunk.to_csv(tfidf_file, mode='w' if header else 'a', header=header, index=False, encoding='utf-8')
+                header = False
+            tfidf_file.replace(OUTPUT_FILE)
+            processed_file.unlink()
+        print(f"[OK] Saved {stats['articles']} processed articles to {OUTPUT_FILE}")
     except Exception as e:
         print(f"ERROR: Failed to save file: {e}")
         return
@@ -327,30 +438,22 @@ def main():
     print("\n" + "=" * 70)
     print("Preprocessing Summary")
     print("=" * 70)
-    print(f"Total articles processed: {len(df)}")
-    print(f"Articles with processed text: {df['processed_text'].str.len().gt(0).sum()}")
+    print(f"Total articles processed: {stats['articles']}")
+    print(f"Articles with processed text: {stats['with_text']}")
     print()
     
     # Show top words (excluding stopwords)
     print("Top 20 most frequent words (excluding stopwords):")
-    all_words = ' '.join(df['processed_text'].fillna('')).split()
-    word_freq = pd.Series(all_words).value_counts().head(20)
-    for word, count in word_freq.items():
+    for word, count in stats['words'].most_common(20):
         print(f"  {word}: {count}")
     print()
     
     # Show top bigrams
     print("Top 20 bigrams:")
-    all_bigrams = []
-    for bigrams_str in df['bigrams'].fillna(''):
-        if bigrams_str:
-            all_bigrams.extend(bigrams_str.split(', '))
-    bigram_freq = pd.Series(all_bigrams).value_counts().head(20)
-    for bigram, count in bigram_freq.items():
+    for bigram, count in stats['bigrams'].most_common(20):
         print(f"  {bigram}: {count}")
     print()
 
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,325 @@
+"""
+Quota-aware query planner for CE49X Final Project API collectors.
+
+Every page a collector fetches is scored by its yield: how many of its URLs
+were new (not in the database, not collected earlier in the run and never
+returned to the planner before, so results the collector's filters keep
+rejecting stop counting as new after their first appearance). Yields
+are kept per provider, query and page depth in data/query_planner.sqlite, with
+older observations decaying, so the planner learns which queries still surface
+new articles and how deep paging them is worth it.
+
+Before a run the planner spends the remaining daily budget of all configured
+API keys greedily on the (query, page) pairs with the highest expected number
+of new URLs. During the run it hands out one key per request (the key with the
+most budget left), records each page's yield and tells the collector to stop
+paging a query once a page's novelty rate falls below the threshold. Queries
+never run before start from an optimistic prior, so they still get explored.
+Daily usage per key is persisted, so several runs on one day share the quota.
+
+Usage:
+    planner = QueryPlanner("newsapi", {"Key 1": KEY_1, "Key 2": KEY_2},
+                           daily_limit=95, page_size=100, max_pages=3)
+    for query, pages in planner.plan(queries):
+        ...                                       # fetch up to `pages` pages
+    key_name, api_key = planner.acquire()         # one request's worth of quota
+    if not planner.record_page(query, 0, urls, known_urls):
+        ...                                       # novelty too low, stop paging
+"""
+
+import hashlib
+import heapq
+import sqlite3
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+STATE_PATH = ROOT / "data" / "query_planner.sqlite"
+
+NOVELTY_THRESHOLD = 0.1  # Stop paging a query when less than 10% of a page's URLs are new
+PRIOR_NOVELTY = 0.5  # Assumed novelty of a page with no history
+PRIOR_WEIGHT = 1.0  # Weight of the prior, in pages, against observed yields
+DEPTH_DECAY = 0.7  # Assumed yield drop per page of depth when a depth has no history
+HISTORY_DECAY = 0.8  # Weight kept by older observations on each new one
+
+
+class QueryPlanner:
+    """
+    Allocate a provider's daily API budget to the queries and pages with the
+    highest expected yield of new URLs.
+
+    Expected yield of page p of a query is a smoothed average of the new URLs
+    that page returned in past runs; without history it falls back to the
+    yield expected for page p-1 times DEPTH_DECAY (page 0: PRIOR_NOVELTY of a
+    full page). Pages beyond the query's last reported result count yield 0.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        api_keys: Dict[str, str],
+        daily_limit: int,
+        page_size: int,
+        max_pages: int,
+        novelty_threshold: float = NOVELTY_THRESHOLD,
+        max_requests: Optional[int] = None,
+        state_path: Path = STATE_PATH
+    ):
+        """
+        Initialize query planner.
+
+        Args:
+            provider: Provider name ('nytimes', 'guardian', 'newsapi')
+            api_keys: {key name: API key}; every key has its own daily budget
+            daily_limit: Requests per key per (UTC) day
+            page_size: Results per page
+            max_pages: Maximum pages planned per query
+            novelty_threshold: Minimum share of new URLs for paging to continue
+            max_requests: Optional cap on requests made by this run
+            state_path: SQLite file holding yields and daily usage
+        """
+        self.provider = provider
+        self.api_keys = dict(api_keys)
+        self.daily_limit = daily_limit
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.novelty_threshold = novelty_threshold
+        self.max_requests = max_requests
+        self.stats = {"requests": 0, "pages": 0, "new_urls": 0, "low_novelty": 0}
+        self._exhausted: Set[str] = set()
+        Path(state_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(state_path)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS yields (
+                provider TEXT NOT NULL,
+                query TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                fetches REAL NOT NULL,
+                urls REAL NOT NULL,
+                new_urls REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (provider, query, page)
+            );
+            CREATE TABLE IF NOT EXISTS totals (
+                provider TEXT NOT NULL,
+                query TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (provider, query)
+            );
+            CREATE TABLE IF NOT EXISTS seen_urls (
+                provider TEXT NOT NULL,
+                url_hash INTEGER NOT NULL,
+                PRIMARY KEY (provider, url_hash)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS usage (
+                provider TEXT NOT NULL,
+                key_name TEXT NOT NULL,
+                day TEXT NOT NULL,
+                requests INTEGER NOT NULL,
+                PRIMARY KEY (provider, key_name, day)
+            );
+            """
+        )
+        self._conn.commit()
+        self._history: Dict[Tuple[str, int], Tuple[float, float, float]] = {
+            (query, page): (fetches, urls, new_urls)
+            for query, page, fetches, urls, new_urls in self._conn.execute(
+                "SELECT query, page, fetches, urls, new_urls FROM yields WHERE provider = ?", (provider,)
+            )
+        }
+        self._totals: Dict[str, int] = dict(self._conn.execute(
+            "SELECT query, total FROM totals WHERE provider = ?", (provider,)
+        ))
+
+    def close(self):
+        self._conn.close()
+
+    # ------------------------------------------------------------------
+    # Quota
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _today() -> str:
+        return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+    def used(self, key_name: str) -> int:
+        """Requests made today with a key (all runs)."""
+        row = self._conn.execute(
+            "SELECT requests FROM usage WHERE provider = ? AND key_name = ? AND day = ?",
+            (self.provider, key_name, self._today())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def _key_budget(self, key_name: str) -> int:
+        if key_name in self._exhausted:
+            return 0
+        return max(0, self.daily_limit - self.used(key_name))
+
+    def remaining(self) -> int:
+        """Requests this run may still make across all keys."""
+        left = sum(self._key_budget(name) for name in self.api_keys)
+        if self.max_requests is not None:
+            left = min(left, max(0, self.max_requests - self.stats["requests"]))
+        return left
+
+    def acquire(self) -> Optional[Tuple[str, str]]:
+        """
+        Reserve one request on the key with the most budget left.
+
+        Returns:
+            (key name, API key), or None when the budget is used up
+        """
+        if self.remaining() <= 0:
+            return None
+        key_name = max(self.api_keys, key=self._key_budget)
+        self._conn.execute(
+            """
+            INSERT INTO usage (provider, key_name, day, requests) VALUES (?, ?, ?, 1)
+            ON CONFLICT(provider, key_name, day) DO UPDATE SET requests = requests + 1
+            """,
+            (self.provider, key_name, self._today())
+        )
+        self._conn.commit()
+        self.stats["requests"] += 1
+        return key_name, self.api_keys[key_name]
+
+    def exhaust(self, key_name: str):
+        """Mark a key's daily quota as used up (the provider reported it)."""
+        self._exhausted.add(key_name)
+        self._conn.execute(
+            """
+            INSERT INTO usage (provider, key_name, day, requests) VALUES (?, ?, ?, ?)
+            ON CONFLICT(provider, key_name, day) DO UPDATE SET requests = MAX(requests, excluded.requests)
+            """,
+            (self.provider, key_name, self._today(), self.daily_limit)
+        )
+        self._conn.commit()
+
+    # ------------------------------------------------------------------
+    # Yield model
+    # ------------------------------------------------------------------
+
+    def expected_yield(self, query: str, page: int) -> float:
+        """Expected number of new URLs on `page` (0-based) of `query`."""
+        capacity = self.page_size
+        total = self._totals.get(query)
+        if total is not None:
+            capacity = min(capacity, total - page * self.page_size)
+            if capacity <= 0:
+                return 0.0
+        if page == 0:
+            prior = capacity * PRIOR_NOVELTY
+        else:
+            prior = min(capacity, self.expected_yield(query, page - 1) * DEPTH_DECAY)
+        fetches, _, new_urls = self._history.get((query, page), (0.0, 0.0, 0.0))
+        return (new_urls + PRIOR_WEIGHT * prior) / (fetches + PRIOR_WEIGHT)
+
+    def plan(self, queries: Sequence[str], budget: Optional[int] = None) -> List[Tuple[str, int]]:
+        """
+        Spend `budget` requests (default: remaining()) on the best pages.
+
+        Pages are taken greedily by expected yield; page p of a query is only
+        considered once page p-1 was taken.
+
+        Returns:
+            (query, pages to fetch) pairs, best first page first; queries that
+            get no budget are left out
+        """
+        budget = self.remaining() if budget is None else budget
+        heap = [(-self.expected_yield(query, 0), i, query, 0)
+                for i, query in enumerate(dict.fromkeys(queries))]
+        heapq.heapify(heap)
+        pages: Dict[str, int] = {}
+        while heap and budget > 0:
+            neg_yield, i, query, page = heapq.heappop(heap)
+            if neg_yield >= 0:
+                break
+            pages[query] = page + 1
+            budget -= 1
+            if page + 1 < self.max_pages:
+                heapq.heappush(heap, (-self.expected_yield(query, page + 1), i, query, page + 1))
+        return list(pages.items())
+
+    def record_total(self, query: str, total: int):
+        """Remember a query's result count (caps the pages worth planning)."""
+        self._totals[query] = total
+        self._conn.execute(
+            "INSERT OR REPLACE INTO totals (provider, query, total, updated_at) VALUES (?, ?, ?, ?)",
+            (self.provider, query, total, time.time())
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _url_hash(url: str) -> int:
+        return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+    def _seen_before(self, hashes: List[int]) -> Set[int]:
+        """Hashes of URLs some earlier page of this provider returned."""
+        seen: Set[int] = set()
+        for start in range(0, len(hashes), 500):  # Stay below SQLite's bound parameter limit
+            batch = hashes[start:start + 500]
+            seen.update(row[0] for row in self._conn.execute(
+                f"SELECT url_hash FROM seen_urls WHERE provider = ? AND url_hash IN ({','.join('?' * len(batch))})",
+                (self.provider, *batch)
+            ))
+        return seen
+
+    def record_page(self, query: str, page: int, urls: Iterable[str], known: Set[str], replayed: bool = False) -> bool:
+        """
+        Record the yield of a fetched page.
+
+        Args:
+            query: Search query
+            page: 0-based page index
+            urls: URLs on the page
+            known: URLs already stored or collected
+            replayed: The page was replayed from a run journal; its yield and
+                URLs were recorded when it was fetched, so only the paging
+                decision is made (against `known` alone)
+
+        Returns:
+            True if the page was novel enough to keep paging the query
+        """
+        urls = [url for url in dict.fromkeys(urls) if url]
+        if replayed:
+            new_urls = sum(1 for url in urls if url not in known)
+            return bool(urls) and new_urls / len(urls) >= self.novelty_threshold
+        hashes = [self._url_hash(url) for url in urls]
+        returned = self._seen_before(hashes)
+        new_urls = sum(1 for url, h in zip(urls, hashes) if h not in returned and url not in known)
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO seen_urls (provider, url_hash) VALUES (?, ?)",
+            [(self.provider, h) for h in hashes]
+        )
+        fetches, seen, fresh = self._history.get((query, page), (0.0, 0.0, 0.0))
+        entry = (fetches * HISTORY_DECAY + 1,
+                 seen * HISTORY_DECAY + len(urls),
+                 fresh * HISTORY_DECAY + new_urls)
+        self._history[(query, page)] = entry
+        self._conn.execute(
+            """
+            INSERT OR REPLACE INTO yields (provider, query, page, fetches, urls, new_urls, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (self.provider, query, page, *entry, time.time())
+        )
+        self._conn.commit()
+        self.stats["pages"] += 1
+        self.stats["new_urls"] += new_urls
+
+        if not urls or new_urls / len(urls) < self.novelty_threshold:
+            self.stats["low_novelty"] += 1
+            return False
+        return True
+
+    def summary(self) -> str:
+        s = self.stats
+        per_request = s["new_urls"] / s["requests"] if s["requests"] else 0.0
+        usage = ", ".join(f"{name} {self.used(name)}/{self.daily_limit}" for name in self.api_keys)
+        return (f"Query planner: {s['requests']} requests ({usage}), {s['pages']} pages scored, "
+                f"{s['new_urls']} new URLs ({per_request:.1f} per request), "
+                f"{s['low_novelty']} queries stopped for low novelty")
@@ -0,0 +1,254 @@
+"""
+Persistent on-disk HTTP response cache for CE49X Final Project collectors.
+
+Raw HTML, feeds and API JSON are stored once, content-addressed by the SHA-256
+of the body and zlib-compressed under data/http_cache/objects/. A small SQLite
+index maps each request (canonical URL + params, API keys excluded) to its body
+and keeps the ETag/Last-Modified validators, so stale entries are refreshed
+with conditional GETs. The cache is bounded in size; the least recently used
+entries are evicted first.
+
+HttpClient reads through the cache when one is passed in, so re-running a
+collector or re-extracting text costs no network round-trips for pages that
+were already downloaded.
+
+Usage:
+    async with HttpClient(cache=ResponseCache()) as client:
+        html = await client.get_text(url)               # served from disk if cached
+        feed = await client.get_bytes(feed_url, revalidate=True)  # conditional GET
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from multidict import CIMultiDict
+
+ROOT = Path(__file__).resolve().parents[1]
+CACHE_DIR = ROOT / "data" / "http_cache"
+
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3  # 2 GB of compressed bodies
+COMPRESSION_LEVEL = 6
+
+# Request parameters that carry credentials; never part of a cache key
+SECRET_PARAMS = frozenset({"api-key", "api_key", "apikey", "key", "token", "access_token"})
+
+
+def cache_key(url: str, params: Optional[Dict[str, Any]] = None) -> Tuple[str, str]:
+    """
+    Build the cache key for a request.
+
+    The URL is reduced to a canonical form (lower-case scheme and host, no
+    fragment, query parameters merged with `params` and sorted) and credential
+    parameters are dropped, so the same request made with another API key hits
+    the same entry.
+
+    Returns:
+        Tuple of (key digest, canonical URL)
+    """
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if params:
+        query.extend((k, str(v)) for k, v in params.items() if v is not None)
+    query = sorted((k, v) for k, v in query if k.lower() not in SECRET_PARAMS)
+    canonical = urlunsplit((
+        parts.scheme.lower(),
+        parts.netloc.lower(),
+        parts.path or "/",
+        urlencode(query),
+        ""
+    ))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest(), canonical
+
+
+class CachedResponse:
+    """Cached body plus the metadata needed to serve and revalidate it."""
+
+    __slots__ = ("url", "status", "headers", "body", "etag", "last_modified", "fetched_at")
+
+    def __init__(self, url: str, status: int, headers: CIMultiDict, body: bytes,
+                 etag: Optional[str], last_modified: Optional[str], fetched_at: float):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+
+    def validators(self) -> Dict[str, str]:
+        """Conditional request headers for revalidating this entry."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """
+    Content-addressed, size-bounded HTTP response cache.
+
+    Bodies live in `<directory>/objects/<aa>/<sha256>.z`; identical bodies
+    fetched under different URLs are stored once. The index is a SQLite
+    database in the same directory.
+    """
+
+    def __init__(self, directory: Path = CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Initialize response cache.
+
+        Args:
+            directory: Cache directory (created if missing)
+            max_bytes: Upper bound on the compressed size of stored bodies
+        """
+        self.directory = Path(directory)
+        self.objects_dir = self.directory / "objects"
+        self.max_bytes = max_bytes
+        self.stats = {"stores": 0, "evictions": 0}
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.directory / "index.sqlite")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries(accessed_at);
+            CREATE INDEX IF NOT EXISTS idx_entries_digest ON entries(digest);
+            CREATE TABLE IF NOT EXISTS blobs (
+                digest TEXT PRIMARY KEY,
+                size INTEGER NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+    def _object_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / f"{digest}.z"
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None) -> Optional[CachedResponse]:
+        """Return the cached response for a request, or None on a miss."""
+        key, _ = cache_key(url, params)
+        row = self._conn.execute(
+            "SELECT url, digest, status, headers, etag, last_modified, fetched_at "
+            "FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        stored_url, digest, status, headers, etag, last_modified, fetched_at = row
+        try:
+            body = zlib.decompress(self._object_path(digest).read_bytes())
+        except (OSError, zlib.error):
+            # Object file lost or corrupt: drop the entry and treat as a miss
+            self._delete_entries([key])
+            return None
+        self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        self._conn.commit()
+        return CachedResponse(stored_url, status, CIMultiDict(json.loads(headers or "{}")), body,
+                              etag, last_modified, fetched_at)
+
+    def put(self, url: str, params: Optional[Dict[str, Any]], status: int,
+            headers: Dict[str, str], body: bytes):
+        """Store a response body and its validators, then enforce the size bound."""
+        key, canonical = cache_key(url, params)
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest)
+        if not path.exists():
+            data = zlib.compress(body, COMPRESSION_LEVEL)
+            path.parent.mkdir(exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+            self._conn.execute("INSERT OR REPLACE INTO blobs (digest, size) VALUES (?, ?)",
+                               (digest, len(data)))
+            self._size += len(data)
+
+        previous = self._conn.execute("SELECT digest FROM entries WHERE key = ?", (key,)).fetchone()
+        lowered = {k.lower(): v for k, v in headers.items()}
+        kept = {k: lowered[k] for k in ("content-type", "etag", "last-modified") if k in lowered}
+        now = time.time()
+        self._conn.execute(
+            """
+            INSERT OR REPLACE INTO entries
+            (key, url, digest, status, headers, etag, last_modified, fetched_at, accessed_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (key, canonical, digest, status, json.dumps(kept),
+             lowered.get("etag"), lowered.get("last-modified"), now, now)
+        )
+        if previous and previous[0] != digest:
+            self._drop_orphans([previous[0]])
+        self._conn.commit()
+        self.stats["stores"] += 1
+        self._evict()
+
+    def touch(self, url: str, params: Optional[Dict[str, Any]] = None):
+        """Mark an entry as freshly validated (after a 304 Not Modified)."""
+        key, _ = cache_key(url, params)
+        now = time.time()
+        self._conn.execute("UPDATE entries SET fetched_at = ?, accessed_at = ? WHERE key = ?",
+                           (now, now, key))
+        self._conn.commit()
+
+    def size(self) -> int:
+        """Total compressed size of stored bodies in bytes."""
+        return self._size
+
+    def _delete_entries(self, keys: Iterable[str]):
+        keys = list(keys)
+        digests = [row[0] for row in self._conn.execute(
+            f"SELECT DISTINCT digest FROM entries WHERE key IN ({','.join('?' * len(keys))})", keys
+        )]
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k in keys])
+        self._drop_orphans(digests)
+        self._conn.commit()
+
+    def _drop_orphans(self, digests: Iterable[str]):
+        """Remove blobs no entry refers to any more."""
+        for digest in digests:
+            if self._conn.execute("SELECT 1 FROM entries WHERE digest = ? LIMIT 1", (digest,)).fetchone():
+                continue
+            row = self._conn.execute("SELECT size FROM blobs WHERE digest = ?", (digest,)).fetchone()
+            if row:
+                self._size -= row[0]
+            self._conn.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+            try:
+                self._object_path(digest).unlink()
+            except FileNotFoundError:
+                pass
+
+    def _evict(self, batch: int = 20):
+        """Evict least recently used entries until the cache fits max_bytes."""
+        while self.size() > self.max_bytes:
+            keys = [row[0] for row in self._conn.execute(
+                "SELECT key FROM entries ORDER BY accessed_at LIMIT ?", (batch,)
+            )]
+            if not keys:
+                break
+            self._delete_entries(keys)
+            self.stats["evictions"] += len(keys)
+
+    def summary(self) -> str:
+        s = self.stats
+        return (f"HTTP cache: {s['stores']} stored, {s['evictions']} evicted, "
+                f"{self.size() / 1024 ** 2:.1f} MB on disk")
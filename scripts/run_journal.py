@@ -0,0 +1,206 @@
+"""
+Append-only run journal for resumable API collection runs (CE49X Final Project).
+
+Every API page a collector fetches is appended to data/run_journal.sqlite as a
+(provider, query, page) cursor together with its compressed JSON response,
+and every accepted article is appended as it is produced. An interrupted run
+is resumed by opening the journal with the same provider and settings: the
+stored date window is reused, pages already in the journal are replayed from
+disk instead of being requested again, and only the missing pages spend
+quota. Progress writes are single-row appends, never full-file rewrites.
+
+Usage:
+    journal = RunJournal("guardian", settings={"queries": queries},
+                         window={"from_date": from_date, "to_date": to_date})
+    from_date = journal.window["from_date"]       # original window on resume
+    data = await journal.fetch_page(query, page, lambda: fetch_articles_page(...))
+    journal.record_article(query, article)
+    ...
+    journal.finish()
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+import uuid
+import zlib
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+JOURNAL_PATH = ROOT / "data" / "run_journal.sqlite"
+
+
+def page_complete(data: Optional[Dict]) -> bool:
+    """Default check for a journal-worthy page: a response that is not a rate-limit marker."""
+    return bool(data) and not data.get("rate_limit")
+
+
+class RunJournal:
+    """
+    Cursor + article journal for one collection run.
+
+    A run is identified by provider and a settings signature (queries, filter
+    options, ...). Opening a journal with resume=True picks up the latest
+    unfinished run with the same signature; otherwise a new run is started.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        settings: Dict[str, Any],
+        window: Dict[str, str],
+        path: Path = JOURNAL_PATH,
+        resume: bool = True
+    ):
+        """
+        Open or start a run.
+
+        Args:
+            provider: Provider name ('nytimes', 'guardian', 'newsapi')
+            settings: Everything that defines the run besides the date window
+            window: Date window of a new run (ignored when resuming)
+            path: SQLite journal file
+            resume: Resume the latest unfinished run with the same settings
+        """
+        self.provider = provider
+        self.signature = hashlib.sha256(
+            json.dumps(settings, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+        self.stats = {"replayed": 0, "fetched": 0, "articles": 0}
+        self._replayed: Set[Tuple[str, int]] = set()  # Pages served from the journal in this session
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                provider TEXT NOT NULL,
+                signature TEXT NOT NULL,
+                window TEXT NOT NULL,
+                started_at REAL NOT NULL,
+                finished_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS pages (
+                run_id TEXT NOT NULL,
+                query TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                payload BLOB NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (run_id, query, page)
+            );
+            CREATE TABLE IF NOT EXISTS articles (
+                run_id TEXT NOT NULL,
+                query TEXT NOT NULL,
+                url TEXT NOT NULL,
+                data TEXT NOT NULL,
+                recorded_at REAL NOT NULL,
+                PRIMARY KEY (run_id, url)
+            );
+            """
+        )
+
+        row = None
+        if resume:
+            row = self._conn.execute(
+                "SELECT run_id, window FROM runs WHERE provider = ? AND signature = ? "
+                "AND finished_at IS NULL ORDER BY started_at DESC LIMIT 1",
+                (provider, self.signature)
+            ).fetchone()
+        if row:
+            self.run_id, stored_window = row
+            self.window = json.loads(stored_window)
+            self.resumed = True
+        else:
+            self.run_id = uuid.uuid4().hex
+            self.window = dict(window)
+            self.resumed = False
+            self._conn.execute(
+                "INSERT INTO runs (run_id, provider, signature, window, started_at) VALUES (?, ?, ?, ?, ?)",
+                (self.run_id, provider, self.signature, json.dumps(self.window), time.time())
+            )
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    def pages_done(self, query: str) -> int:
+        """Number of pages of `query` already in the journal."""
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM pages WHERE run_id = ? AND query = ?", (self.run_id, query)
+        ).fetchone()[0]
+
+    def journaled_pages(self, queries: Sequence[str]) -> Dict[str, int]:
+        """{query: pages in the journal} for the queries with journaled pages."""
+        counts = dict(self._conn.execute(
+            "SELECT query, COUNT(*) FROM pages WHERE run_id = ? GROUP BY query", (self.run_id,)
+        ))
+        return {query: counts[query] for query in dict.fromkeys(queries) if counts.get(query)}
+
+    def replayed(self, query: str, page: int) -> bool:
+        """True if the page was served from the journal (its yield was already recorded)."""
+        return (query, page) in self._replayed
+
+    def recorded_page(self, query: str, page: int) -> Optional[Dict]:
+        row = self._conn.execute(
+            "SELECT payload FROM pages WHERE run_id = ? AND query = ? AND page = ?",
+            (self.run_id, query, page)
+        ).fetchone()
+        return json.loads(zlib.decompress(row[0])) if row else None
+
+    async def fetch_page(
+        self,
+        query: str,
+        page: int,
+        fetch: Callable[[], Awaitable[Optional[Dict]]],
+        is_complete: Callable[[Optional[Dict]], bool] = page_complete
+    ) -> Optional[Dict]:
+        """
+        Return a page from the journal, or fetch it and append it.
+
+        Only pages accepted by `is_complete` are journaled, so rate-limit
+        markers and API errors are retried on resume.
+        """
+        data = self.recorded_page(query, page)
+        if data is not None:
+            self.stats["replayed"] += 1
+            self._replayed.add((query, page))
+            return data
+        data = await fetch()
+        if is_complete(data):
+            self._conn.execute(
+                "INSERT OR IGNORE INTO pages (run_id, query, page, payload, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (self.run_id, query, page, zlib.compress(json.dumps(data).encode("utf-8")), time.time())
+            )
+            self._conn.commit()
+            self.stats["fetched"] += 1
+        return data
+
+    def record_article(self, query: str, article: Dict):
+        """Append an accepted article (once per URL per run)."""
+        cur = self._conn.execute(
+            "INSERT OR IGNORE INTO articles (run_id, query, url, data, recorded_at) VALUES (?, ?, ?, ?, ?)",
+            (self.run_id, query, article.get("url", ""), json.dumps(article, default=str), time.time())
+        )
+        self._conn.commit()
+        self.stats["articles"] += cur.rowcount
+
+    def articles(self) -> List[Dict]:
+        """Articles recorded so far in this run, in recording order."""
+        rows = self._conn.execute(
+            "SELECT data FROM articles WHERE run_id = ? ORDER BY recorded_at", (self.run_id,)
+        )
+        return [json.loads(data) for (data,) in rows]
+
+    def finish(self):
+        """Mark the run finished; the next run with these settings starts fresh."""
+        self._conn.execute("UPDATE runs SET finished_at = ? WHERE run_id = ?", (time.time(), self.run_id))
+        self._conn.commit()
+
+    def summary(self) -> str:
+        s = self.stats
+        state = "resumed" if self.resumed else "new"
+        return (f"Run journal ({state} run {self.run_id[:8]}): {s['replayed']} pages replayed, "
+                f"{s['fetched']} pages fetched, {s['articles']} articles recorded")
@@ -0,0 +1,299 @@
+"""
+Incremental sitemap crawler for CE49X Final Project.
+
+For each domain the crawler finds its sitemaps (robots.txt "Sitemap:" lines,
+then /sitemap.xml and /sitemap_index.xml), walks sitemap indexes recursively
+and parses every sitemap with a streaming parser (iterparse), so large
+sitemaps never become a full element tree. A per-domain lastmod watermark is
+persisted in data/sitemap_state.sqlite:
+- child sitemaps whose lastmod is older than the watermark are not fetched
+- only page URLs newer than the watermark that are not already known and
+  were not processed at that lastmod (or, undated, at all) are returned
+- the watermark only passes URLs that were committed as processed, so pages
+  that failed, were not stored or were left out by the per-crawl cap come
+  back on the next crawl
+
+Crawl cost is therefore proportional to new content rather than site size.
+
+Usage:
+    crawler = SitemapCrawler(client)
+    candidates = await crawler.crawl("www.enr.com", known_urls)
+    ...  # process the candidates
+    crawler.commit("www.enr.com", done)  # the candidates stored or rejected
+"""
+
+import asyncio
+import gzip
+import io
+import math
+import sqlite3
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from scripts.http_client import HttpClient
+
+ROOT = Path(__file__).resolve().parents[1]
+STATE_PATH = ROOT / "data" / "sitemap_state.sqlite"
+
+MAX_DEPTH = 3  # Sitemap index nesting followed
+MAX_SITEMAPS_PER_DOMAIN = 50  # Sitemap documents fetched per domain per crawl
+MAX_URLS_PER_DOMAIN = 200  # Candidate pages returned per domain per crawl (politeness)
+INITIAL_LOOKBACK_DAYS = 90  # Watermark for a domain crawled for the first time
+
+# (url, lastmod as UTC timestamp or None)
+SitemapEntry = Tuple[str, Optional[float]]
+
+
+def parse_lastmod(value: Optional[str]) -> Optional[float]:
+    """Parse a W3C datetime (2024-05-01, 2024-05-01T10:00:00Z, ...) to a UTC timestamp."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            parsed = datetime.strptime(value[:10], "%Y-%m-%d")
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def iter_sitemap(body: bytes) -> Iterator[Tuple[str, str, Optional[float]]]:
+    """
+    Stream (kind, loc, lastmod) from a sitemap or sitemap index.
+
+    `kind` is "sitemap" for children of a <sitemapindex> and "url" for pages of
+    a <urlset>. Gzipped sitemaps are decompressed on the fly. Elements are
+    cleared as soon as they are read.
+
+    Only <loc>/<lastmod> that are direct children of <url>/<sitemap> count,
+    so extension tags with the same local name (<image:loc>, <video:...>)
+    never replace the page URL:
+
+    >>> list(iter_sitemap(b'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9" '
+    ...     b'xmlns:image="http://www.google.com/schemas/sitemap-image/1.1">'
+    ...     b'<url><loc>https://ex.com/a</loc><image:image><image:loc>https://ex.com/a.jpg'
+    ...     b'</image:loc></image:image></url></urlset>'))
+    [('url', 'https://ex.com/a', None)]
+    """
+    stream = io.BytesIO(body)
+    if body[:2] == b"\x1f\x8b":
+        stream = gzip.GzipFile(fileobj=stream)
+
+    loc = lastmod = None
+    root = None
+    open_tags: List[str] = []  # Local names of the enclosing elements
+    try:
+        for event, elem in ET.iterparse(stream, events=("start", "end")):
+            tag = elem.tag.rsplit("}", 1)[-1]
+            if event == "start":
+                if root is None:
+                    root = elem
+                open_tags.append(tag)
+                continue
+            open_tags.pop()
+            parent = open_tags[-1] if open_tags else None
+            if tag == "loc" and parent in ("url", "sitemap"):
+                loc = (elem.text or "").strip()
+            elif tag == "lastmod" and parent in ("url", "sitemap"):
+                lastmod = parse_lastmod(elem.text)
+            elif tag in ("url", "sitemap"):
+                if loc:
+                    yield tag, loc, lastmod
+                loc = lastmod = None
+                root.clear()
+    except (ET.ParseError, OSError, EOFError):
+        return
+
+
+def parse_sitemap(body: bytes) -> List[Tuple[str, str, Optional[float]]]:
+    return list(iter_sitemap(body))
+
+
+class SitemapCrawler:
+    """Per-domain incremental sitemap crawler with persisted lastmod watermarks."""
+
+    def __init__(
+        self,
+        client: HttpClient,
+        state_path: Path = STATE_PATH,
+        max_depth: int = MAX_DEPTH,
+        max_sitemaps: int = MAX_SITEMAPS_PER_DOMAIN,
+        max_urls: int = MAX_URLS_PER_DOMAIN
+    ):
+        """
+        Initialize sitemap crawler.
+
+        Args:
+            client: Shared HTTP client
+            state_path: SQLite file holding watermarks and crawled URLs
+            max_depth: Maximum sitemap index nesting followed
+            max_sitemaps: Sitemap documents fetched per domain per crawl
+            max_urls: Candidate pages returned per domain per crawl
+        """
+        self.client = client
+        self.max_depth = max_depth
+        self.max_sitemaps = max_sitemaps
+        self.max_urls = max_urls
+        self.stats = {"sitemaps": 0, "skipped_sitemaps": 0, "urls_seen": 0, "candidates": 0}
+        Path(state_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(state_path)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS watermarks (
+                domain TEXT PRIMARY KEY,
+                lastmod REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS crawled_urls (
+                domain TEXT NOT NULL,
+                url TEXT NOT NULL,
+                lastmod REAL,
+                PRIMARY KEY (domain, url)
+            );
+            """
+        )
+        # State files from before crawled_urls kept the processed lastmod
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(crawled_urls)")}
+        if "lastmod" not in columns:
+            self._conn.execute("ALTER TABLE crawled_urls ADD COLUMN lastmod REAL")
+        self._conn.commit()
+        # Per domain: candidates of the last crawl not committed yet, their
+        # newest lastmod and the oldest lastmod left out by the max_urls cap
+        self._open: Dict[str, Dict[str, Optional[float]]] = {}
+        self._newest: Dict[str, Optional[float]] = {}
+        self._left_out: Dict[str, Optional[float]] = {}
+
+    def close(self):
+        self._conn.close()
+
+    def watermark(self, domain: str) -> float:
+        row = self._conn.execute("SELECT lastmod FROM watermarks WHERE domain = ?", (domain,)).fetchone()
+        if row:
+            return row[0]
+        return (datetime.now(timezone.utc) - timedelta(days=INITIAL_LOOKBACK_DAYS)).timestamp()
+
+    def _crawled(self, domain: str, url: str, lastmod: Optional[float]) -> bool:
+        """Whether a URL was processed before (at this lastmod or later, if dated)."""
+        row = self._conn.execute(
+            "SELECT lastmod FROM crawled_urls WHERE domain = ? AND url = ?", (domain, url)
+        ).fetchone()
+        if row is None:
+            return False
+        if lastmod is None:
+            return True
+        return row[0] is not None and lastmod <= row[0]
+
+    async def _fetch(self, url: str) -> Optional[bytes]:
+        return await self.client.get_bytes(url, revalidate=True)
+
+    async def root_sitemaps(self, domain: str) -> List[str]:
+        """Sitemaps declared in robots.txt, else the conventional locations."""
+        robots = await self.client.get_text(f"https://{domain}/robots.txt", revalidate=True)
+        declared = []
+        for line in (robots or "").splitlines():
+            if line.lower().startswith("sitemap:"):
+                declared.append(line.split(":", 1)[1].strip())
+        return declared or [f"https://{domain}/sitemap.xml", f"https://{domain}/sitemap_index.xml"]
+
+    async def crawl(self, domain: str, known_urls: Set[str]) -> List[SitemapEntry]:
+        """
+        Walk the domain's sitemaps and return URLs worth fetching.
+
+        Returns:
+            Up to max_urls (url, lastmod) pairs, oldest first, that are newer
+            than the domain's watermark (or undated), not in `known_urls` and
+            not processed at their lastmod before
+        """
+        mark = self.watermark(domain)
+        pending = [(url, 0) for url in await self.root_sitemaps(domain)]
+        visited: Set[str] = set()
+        found = {}
+
+        while pending and len(visited) < self.max_sitemaps:
+            sitemap_url, depth = pending.pop(0)
+            if sitemap_url in visited:
+                continue
+            visited.add(sitemap_url)
+            body = await self._fetch(sitemap_url)
+            if not body:
+                continue
+            self.stats["sitemaps"] += 1
+            entries = await asyncio.to_thread(parse_sitemap, body)
+            for kind, loc, lastmod in entries:
+                if kind == "sitemap":
+                    if depth >= self.max_depth:
+                        continue
+                    if lastmod is not None and lastmod <= mark:
+                        self.stats["skipped_sitemaps"] += 1
+                        continue
+                    pending.append((loc, depth + 1))
+                    continue
+                self.stats["urls_seen"] += 1
+                if loc in known_urls or loc in found:
+                    continue
+                if lastmod is not None and lastmod <= mark:
+                    continue
+                if not self._crawled(domain, loc, lastmod):
+                    found[loc] = lastmod
+
+        ordered = sorted(found.items(), key=lambda item: item[1] if item[1] is not None else time.time())
+        candidates = ordered[:self.max_urls]
+        dated = [lastmod for _, lastmod in candidates if lastmod is not None]
+        left_out = [lastmod for _, lastmod in ordered[self.max_urls:] if lastmod is not None]
+        self._open[domain] = dict(candidates)
+        self._newest[domain] = max(dated) if dated else None
+        self._left_out[domain] = min(left_out) if left_out else None
+        self.stats["candidates"] += len(candidates)
+        return candidates
+
+    def commit(self, domain: str, processed: List[SitemapEntry]):
+        """
+        Record processed candidates (stored or rejected) and advance the
+        domain's watermark.
+
+        May be called several times per crawl. The watermark moves just below
+        the oldest lastmod that is still open (a candidate not committed yet,
+        or the first URL left out by the max_urls cap), or to the newest
+        candidate lastmod once nothing is open; open URLs, including those
+        tied on lastmod with processed ones, are still newer than the
+        watermark on the next crawl. Processed URLs above the watermark are
+        skipped through crawled_urls.
+        """
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO crawled_urls (domain, url, lastmod) VALUES (?, ?, ?)",
+            [(domain, url, lastmod) for url, lastmod in processed]
+        )
+        candidates = self._open.setdefault(domain, {})
+        for url, _ in processed:
+            candidates.pop(url, None)
+        still_open = [lastmod for lastmod in candidates.values() if lastmod is not None]
+        if self._left_out.get(domain) is not None:
+            still_open.append(self._left_out[domain])
+        if still_open:
+            dated = [math.nextafter(min(still_open), -math.inf)]
+        else:
+            dated = [lastmod for _, lastmod in processed if lastmod is not None]
+            if self._newest.get(domain) is not None:
+                dated.append(self._newest[domain])
+        if dated:
+            self._conn.execute(
+                """
+                INSERT INTO watermarks (domain, lastmod, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(domain) DO UPDATE SET
+                    lastmod = MAX(lastmod, excluded.lastmod), updated_at = excluded.updated_at
+                """,
+                (domain, max(dated), time.time())
+            )
+        self._conn.commit()
+
+    def summary(self) -> str:
+        s = self.stats
+        return (f"Sitemaps: {s['sitemaps']} fetched, {s['skipped_sitemaps']} skipped (older than watermark), "
+                f"{s['urls_seen']} URLs listed, {s['candidates']} new candidates")
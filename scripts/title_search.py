@@ -0,0 +1,144 @@
+"""
+Fuzzy title search and dedupe inside Postgres for CE49X Final Project.
+
+Title-based duplicate checks used to pull whole tables into Python. With a
+GIN trigram index (pg_trgm) on the title column, Postgres answers "which
+stored titles are similar to this one" from the index:
+- nearest_titles() looks up a whole batch of incoming titles in one round
+  trip (unnest ... CROSS JOIN LATERAL), returning the closest stored titles
+  at or above a similarity threshold for each
+- similar_title_pairs() runs the dedupe of a stored table as an indexed
+  self-join, without shipping the corpus to the client
+
+pg_trgm lower-cases text and ignores punctuation when it extracts trigrams,
+so the index on the raw title column serves normalized-title comparisons;
+normalize_title() applies the same rules on the client.
+
+Usage:
+    matches = nearest_titles(["Engineers use AI to inspect bridges", ...],
+                             table="newsapi_articles", min_similarity=0.9)
+    # -> [[(id, title, similarity), ...], ...], one list per input title
+
+    python scripts/title_search.py --table articles --min-similarity 0.8
+"""
+
+import argparse
+import re
+import sys
+from pathlib import Path
+from typing import List, Sequence, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+TITLE_SIMILARITY = 0.8  # Default trigram similarity of two duplicate titles
+BATCH_SIZE = 1000  # Titles per round trip
+
+WORD_RE = re.compile(r"[^\W_]+")
+
+# (id, stored title, similarity)
+TitleMatch = Tuple[int, str, float]
+
+
+def normalize_title(title: str) -> str:
+    """Lower-case words of a title joined by single spaces (what pg_trgm compares)."""
+    return " ".join(WORD_RE.findall((title or "").lower()))
+
+
+def ensure_title_index(table: str):
+    """Enable pg_trgm and create the GIN trigram index on a table's titles."""
+    from database.db_config import get_db_cursor
+
+    with get_db_cursor(dict_cursor=False) as cur:
+        cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_title_trgm ON {table} USING GIN (title gin_trgm_ops)")
+
+
+def nearest_titles(
+    titles: Sequence[str],
+    table: str = "articles",
+    min_similarity: float = TITLE_SIMILARITY,
+    limit: int = 3
+) -> List[List[TitleMatch]]:
+    """
+    Closest stored titles for a batch of titles.
+
+    Args:
+        titles: Incoming titles
+        table: Table to search
+        min_similarity: Minimum trigram similarity (0-1)
+        limit: Maximum matches per title
+
+    Returns:
+        One list of (id, title, similarity) per input title, most similar
+        first; empty for titles without a match
+    """
+    from database.db_config import get_db_cursor
+
+    matches: List[List[TitleMatch]] = [[] for _ in titles]
+    normalized = [normalize_title(title) for title in titles]
+    with get_db_cursor(dict_cursor=False) as cur:
+        # `%` uses the session's similarity threshold; the GIN index answers it
+        cur.execute("SELECT set_config('pg_trgm.similarity_threshold', %s, true)", (str(min_similarity),))
+        for start in range(0, len(titles), BATCH_SIZE):
+            cur.execute(f"""
+                SELECT q.ord, m.id, m.title, m.sim
+                FROM unnest(%s::text[]) WITH ORDINALITY AS q(title, ord)
+                CROSS JOIN LATERAL (
+                    SELECT a.id, a.title, similarity(a.title, q.title) AS sim
+                    FROM {table} a
+                    WHERE a.title %% q.title
+                    ORDER BY sim DESC, a.id
+                    LIMIT %s
+                ) m
+                WHERE q.title <> ''
+            """, (normalized[start:start + BATCH_SIZE], limit))
+            for ord_, article_id, title, sim in cur.fetchall():
+                matches[start + ord_ - 1].append((article_id, title, float(sim)))
+    return matches
+
+
+def similar_title_pairs(table: str = "articles", min_similarity: float = TITLE_SIMILARITY) -> List[Tuple[int, int, float]]:
+    """
+    Pairs of stored articles with similar titles, found inside Postgres.
+
+    Returns:
+        (id, later id, similarity) pairs, most similar first
+    """
+    from database.db_config import get_db_cursor
+
+    with get_db_cursor(dict_cursor=False) as cur:
+        cur.execute("SELECT set_config('pg_trgm.similarity_threshold', %s, true)", (str(min_similarity),))
+        # No query parameters: psycopg2 sends `%` as is (no `%%` escaping)
+        cur.execute(f"""
+            SELECT a.id, b.id, similarity(a.title, b.title) AS sim
+            FROM {table} a
+            JOIN {table} b ON a.title % b.title AND a.id < b.id
+            ORDER BY sim DESC, a.id, b.id
+        """)
+        return [(a, b, float(sim)) for a, b, sim in cur.fetchall()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List stored articles with similar titles (pg_trgm).")
+    parser.add_argument("--table", default="articles", help="Table to dedupe ('articles' or 'newsapi_articles').")
+    parser.add_argument("--min-similarity", type=float, default=TITLE_SIMILARITY, help="Minimum trigram similarity.")
+    parser.add_argument("--show", type=int, default=20, help="Pairs to print.")
+    args = parser.parse_args()
+
+    ensure_title_index(args.table)
+    pairs = similar_title_pairs(args.table, args.min_similarity)
+
+    from scripts.disjoint_set import DisjointSet
+
+    clusters = DisjointSet()
+    for a, b, _ in pairs:
+        clusters.union(a, b)
+    groups = clusters.groups(min_size=2)
+    print(f"{len(pairs)} similar title pairs (similarity >= {args.min_similarity}) "
+          f"in {len(groups)} clusters, {len(clusters)} articles")
+    for a, b, sim in pairs[:args.show]:
+        print(f"  {sim:.2f}  ID {a} ~ ID {b}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+URL canonicalization for CE49X Final Project collectors and importers.
+
+The same story reaches the collectors under many URLs: with utm_*/fbclid
+tracking parameters, over http and https, with and without "www.", as AMP or
+mobile copies and through the AMP cache. canonicalize_url() maps these to one
+canonical form using string rules only:
+- scheme https, host lower-case without "www.", "m.", "mobile." or "amp."
+  prefixes and without default ports
+- AMP cache URLs (*.cdn.ampproject.org/c/s/...) unwrapped to the origin URL
+- AMP path markers (/amp, /amp/, .amp suffixes) removed, duplicate and
+  trailing slashes removed, percent-escapes upper-cased
+- known tracking parameters dropped; all other query parameters are kept
+  (sorted), since query-routed sites use them to address articles
+- fragment dropped
+
+When the page HTML is at hand (e.g. in the HTTP response cache), the page's
+own <link rel="canonical"> wins over the string rules, which also catches
+syndicated copies of a story on other hosts.
+
+Usage:
+    canonicalize_url("http://m.example.com/a/amp?utm_source=x&id=7")
+    # -> "https://example.com/a?id=7"
+    canonical = resolve_canonical_url(url, cache=ResponseCache())
+"""
+
+import re
+from html import unescape
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+# Query parameters that only track the visitor or the referring campaign
+TRACKING_PARAMS = frozenset({
+    "fbclid", "gclid", "dclid", "gclsrc", "msclkid", "yclid", "twclid", "igshid", "mc_cid", "mc_eid",
+    "_ga", "_gl", "_hsenc", "_hsmi", "ocid", "cmpid", "cmp", "smid", "smtyp", "ncid", "sr_share",
+    "ito", "guccounter", "guce_referrer", "guce_referrer_sig", "share", "spm", "ref_src", "ref_url",
+    "rss", "feedtype", "outputtype", "amp", "int_source", "int_medium", "int_campaign",
+})
+TRACKING_PREFIXES = ("utm_", "pk_", "mtm_", "hsa_", "__twitter", "at_")
+
+HOST_PREFIXES = ("www.", "m.", "mobile.", "amp.")
+DEFAULT_PORTS = {":80", ":443"}
+AMP_CACHE_SUFFIX = ".cdn.ampproject.org"
+AMP_PATH_RE = re.compile(r"/amp/?$|\.amp$|\.amp(?=\.html?$)", re.IGNORECASE)
+SLASHES_RE = re.compile(r"/{2,}")
+ESCAPE_RE = re.compile(r"%[0-9a-fA-F]{2}")
+
+HEAD_BYTES = 65536  # rel=canonical is looked up in the first 64 KB of a page
+LINK_TAG_RE = re.compile(r"<link\b[^>]*>", re.IGNORECASE)
+REL_CANONICAL_RE = re.compile(r"""\brel\s*=\s*["']?canonical\b""", re.IGNORECASE)
+HREF_RE = re.compile(r"""\bhref\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""", re.IGNORECASE)
+
+
+def is_tracking_param(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Canonical form of a URL for duplicate detection.
+
+    Args:
+        url: Absolute URL (a missing scheme is taken as https)
+
+    Returns:
+        Canonical URL, or "" for an empty input
+    """
+    url = (url or "").strip()
+    if not url:
+        return ""
+    if "://" not in url:
+        url = "https://" + url.lstrip("/")
+    parts = urlsplit(url)
+    if parts.scheme.lower() not in ("http", "https"):
+        return url
+
+    host = parts.netloc.lower().rsplit("@", 1)[-1]
+    for port in DEFAULT_PORTS:
+        if host.endswith(port):
+            host = host[:-len(port)]
+    path = parts.path
+
+    # https://www-example-com.cdn.ampproject.org/c/s/www.example.com/a -> https://www.example.com/a
+    if host.endswith(AMP_CACHE_SUFFIX):
+        segments = path.split("/")
+        if len(segments) > 3 and segments[1] in ("c", "v"):
+            offset = 3 if segments[2] == "s" else 2
+            host = segments[offset].lower()
+            path = "/" + "/".join(segments[offset + 1:])
+
+    for prefix in HOST_PREFIXES:
+        if host.startswith(prefix) and host.count(".") > 1:
+            host = host[len(prefix):]
+            break
+
+    path = SLASHES_RE.sub("/", path)
+    path = AMP_PATH_RE.sub("", path)
+    path = ESCAPE_RE.sub(lambda m: m.group(0).upper(), path).rstrip("/")
+
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if not is_tracking_param(k))
+    return urlunsplit(("https", host, path, urlencode(query), ""))
+
+
+def find_canonical_link(html: str, base_url: str) -> Optional[str]:
+    """
+    Absolute URL of a page's <link rel="canonical">, or None.
+
+    Canonicals pointing at a site's front page from an article page are
+    ignored (a common CMS misconfiguration).
+    """
+    if not html:
+        return None
+    for tag in LINK_TAG_RE.findall(html[:HEAD_BYTES]):
+        if not REL_CANONICAL_RE.search(tag):
+            continue
+        match = HREF_RE.search(tag)
+        href = next((group for group in match.groups() if group), "") if match else ""
+        href = unescape(href.strip())
+        if not href:
+            return None
+        canonical = urljoin(base_url, href)
+        if urlsplit(canonical).scheme not in ("http", "https"):
+            return None
+        if urlsplit(canonical).path.strip("/") == "" and urlsplit(base_url).path.strip("/") != "":
+            return None
+        return canonical
+    return None
+
+
+def resolve_canonical_url(url: str, html: Optional[str] = None, cache=None) -> str:
+    """
+    Canonical URL of a page, preferring its rel=canonical link.
+
+    Args:
+        url: Page URL
+        html: Page HTML, if already downloaded
+        cache: ResponseCache to read the page HTML from when `html` is not
+            given (no network request is made)
+
+    Returns:
+        canonicalize_url() of the page's rel=canonical link if found,
+        otherwise of `url`
+    """
+    if html is None and cache is not None and url:
+        entry = cache.get(url)
+        if entry is not None and entry.status == 200:
+            html = entry.body.decode("utf-8", errors="replace")
+    return canonicalize_url(find_canonical_link(html, url) or url)
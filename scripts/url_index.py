@@ -0,0 +1,395 @@
+"""
+Compact seen-URL index for CE49X Final Project collectors and importers.
+
+Instead of loading every stored URL string into a Python set, collectors keep
+one 64-bit fingerprint per stored canonical URL (scripts/url_canonical.py) in
+a sorted array, so tracking-parameter, AMP and mobile variants of a stored
+URL count as seen. The array is
+persisted under data/url_index/ as a .npy file that is memory-mapped on open,
+together with the highest row id it covers, so a run only reads the rows
+inserted since the last snapshot (16 bytes each in Postgres). A million
+articles take at most 16 MB. A directory of bucket offsets (top 16 bits of the
+fingerprint) narrows a lookup to a handful of array slots, so a check costs
+about a microsecond on top of canonicalizing the URL.
+
+Tables get a canonical_url column (the page's rel=canonical when collectors
+know it) and a url_key column (canonicalize_url() of the stored url, which
+is what lookups compute from an incoming URL), both backfilled for old rows
+on open. Both forms are fingerprinted, so a stored story is recognized from
+its own URL even when its rel=canonical differs; in Postgres the url_hash and
+url_key_hash columns are generated from them. A fingerprint miss means the
+URL is new. A fingerprint hit is confirmed against the table's canonical URLs
+once, which rules out hash collisions and rows deleted after the snapshot was
+written. URLs added during the run (inserted or just collected)
+are kept as fingerprints in memory.
+
+SeenUrlIndex supports the set operations the collectors use (`in`, add,
+update, len), so it replaces an `existing_urls` set as is.
+
+Usage:
+    seen = SeenUrlIndex.postgres("articles")
+    if url not in seen:
+        ...                                       # insert the article
+        seen.add(url)
+    new_urls = seen.filter_new(urls)              # batch check, one query for all hits
+"""
+
+import bisect
+import hashlib
+import json
+import os
+import sqlite3
+from pathlib import Path
+from typing import Iterable, Iterator, List, Set, Tuple
+
+import numpy as np
+
+from scripts.url_canonical import canonicalize_url
+
+ROOT = Path(__file__).resolve().parents[1]
+INDEX_DIR = ROOT / "data" / "url_index"
+
+BATCH_SIZE = 100_000  # Rows read per query when catching up with the table
+BUCKET_BITS = 16  # Top fingerprint bits indexed by the bucket directory
+SNAPSHOT_VERSION = 3  # Bumped when the fingerprinted URL forms change (3: canonical URL + url key)
+
+# Postgres expression computing url_hash() of a column: the first 16 hex
+# digits of its MD5 as a signed 64-bit integer
+URL_HASH_SQL = "('x' || substr(md5({column}), 1, 16))::bit(64)::bigint"
+CANONICAL_SQL = "COALESCE(canonical_url, url)"
+URL_KEY_SQL = "COALESCE(url_key, url)"
+
+
+def url_hash(url: str) -> int:
+    """64-bit fingerprint of a URL string, equal to URL_HASH_SQL in Postgres."""
+    return int.from_bytes(hashlib.md5(url.encode("utf-8")).digest()[:8], "big", signed=True)
+
+
+def ensure_canonical_urls(table: str):
+    """
+    Add canonical_url/url_key and their url_hash/url_key_hash columns to a
+    Postgres table and fill them for rows stored without them.
+    """
+    from psycopg2.extras import execute_values
+    from database.db_config import get_db_cursor
+
+    with get_db_cursor(dict_cursor=False) as cur:
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS canonical_url TEXT")
+        cur.execute(
+            "SELECT generation_expression FROM information_schema.columns "
+            "WHERE table_name = %s AND column_name = 'url_hash'", (table,)
+        )
+        row = cur.fetchone()
+        if row and "canonical_url" not in (row[0] or ""):
+            # url_hash of the raw url (older schema): regenerate it from the canonical URL
+            cur.execute(f"ALTER TABLE {table} DROP COLUMN url_hash")
+        cur.execute(f"""
+            ALTER TABLE {table} ADD COLUMN IF NOT EXISTS url_hash BIGINT
+            GENERATED ALWAYS AS ({URL_HASH_SQL.format(column=CANONICAL_SQL)}) STORED
+        """)
+        cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_url_hash ON {table}(url_hash)")
+        cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_canonical_url ON {table}(canonical_url)")
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS url_key TEXT")
+        cur.execute(f"""
+            ALTER TABLE {table} ADD COLUMN IF NOT EXISTS url_key_hash BIGINT
+            GENERATED ALWAYS AS ({URL_HASH_SQL.format(column=URL_KEY_SQL)}) STORED
+        """)
+        cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_url_key_hash ON {table}(url_key_hash)")
+
+    while True:
+        with get_db_cursor(dict_cursor=False) as cur:
+            cur.execute(
+                f"SELECT id, url FROM {table} WHERE canonical_url IS NULL OR url_key IS NULL "
+                f"ORDER BY id LIMIT %s", (BATCH_SIZE,)
+            )
+            rows = cur.fetchall()
+            if not rows:
+                return
+            execute_values(
+                cur,
+                f"UPDATE {table} SET canonical_url = COALESCE({table}.canonical_url, v.url_key), url_key = v.url_key "
+                f"FROM (VALUES %s) AS v(id, url_key) WHERE {table}.id = v.id",
+                [(row_id, canonicalize_url(url) or url) for row_id, url in rows]
+            )
+
+
+class PostgresUrlSource:
+    """Stored URLs of a Postgres table, looked up through its url_hash column."""
+
+    def __init__(self, table: str):
+        from database.db_config import DB_CONFIG, get_db_cursor
+
+        self.table = table
+        self.name = f"postgres-{DB_CONFIG['database']}-{table}"
+        self._cursor = get_db_cursor
+        # url_hash is a generated column: every insert gets its hash without code changes
+        ensure_canonical_urls(table)
+
+    def max_id(self) -> int:
+        with self._cursor(dict_cursor=False) as cur:
+            cur.execute(f"SELECT COALESCE(MAX(id), 0) FROM {self.table}")
+            return cur.fetchone()[0]
+
+    def iter_batches(self, after_id: int) -> Iterator[Tuple[int, np.ndarray]]:
+        """(last row id, hashes) per batch of rows with id > after_id (two hashes per row)."""
+        while True:
+            with self._cursor(dict_cursor=False) as cur:
+                cur.execute(
+                    f"SELECT id, url_hash, url_key_hash FROM {self.table} WHERE id > %s ORDER BY id LIMIT %s",
+                    (after_id, BATCH_SIZE)
+                )
+                rows = cur.fetchall()
+            if not rows:
+                return
+            after_id = rows[-1][0]
+            yield after_id, np.array([h for _, *hashes in rows for h in hashes], dtype=np.int64)
+
+    def contains(self, canonical: str) -> bool:
+        h = url_hash(canonical)
+        with self._cursor(dict_cursor=False) as cur:
+            cur.execute(
+                f"SELECT 1 FROM {self.table} WHERE (url_hash = %s AND {CANONICAL_SQL} = %s) "
+                f"OR (url_key_hash = %s AND {URL_KEY_SQL} = %s) LIMIT 1",
+                (h, canonical, h, canonical)
+            )
+            return cur.fetchone() is not None
+
+    def existing(self, canonicals: List[str]) -> Set[str]:
+        """The subset of canonical URLs stored in the table (as canonical URL or url key)."""
+        hashes = [url_hash(canonical) for canonical in canonicals]
+        with self._cursor(dict_cursor=False) as cur:
+            cur.execute(
+                f"SELECT {CANONICAL_SQL}, {URL_KEY_SQL} FROM {self.table} "
+                f"WHERE url_hash = ANY(%s) OR url_key_hash = ANY(%s)",
+                (hashes, hashes)
+            )
+            stored = {form for row in cur.fetchall() for form in row}
+        return stored.intersection(canonicals)
+
+
+class SqliteUrlSource:
+    """Stored URLs of a SQLite table (fingerprints computed from canonical_url and url_key)."""
+
+    def __init__(self, conn: sqlite3.Connection, table: str, db_path: Path):
+        self.conn = conn
+        self.table = table
+        self.name = f"sqlite-{Path(db_path).stem}-{table}"
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        for column in ("canonical_url", "url_key"):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} TEXT")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{column} ON {table}({column})")
+        rows = conn.execute(
+            f"SELECT rowid, url FROM {table} WHERE canonical_url IS NULL OR url_key IS NULL"
+        ).fetchall()
+        conn.executemany(
+            f"UPDATE {table} SET canonical_url = COALESCE(canonical_url, ?1), url_key = ?1 WHERE rowid = ?2",
+            [(canonicalize_url(url) or url, rowid) for rowid, url in rows]
+        )
+        conn.commit()
+
+    def max_id(self) -> int:
+        return self.conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {self.table}").fetchone()[0]
+
+    def iter_batches(self, after_id: int) -> Iterator[Tuple[int, np.ndarray]]:
+        while True:
+            rows = self.conn.execute(
+                f"SELECT rowid, {CANONICAL_SQL}, {URL_KEY_SQL} FROM {self.table} "
+                f"WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (after_id, BATCH_SIZE)
+            ).fetchall()
+            if not rows:
+                return
+            after_id = rows[-1][0]
+            yield after_id, np.array([url_hash(url) for _, *urls in rows for url in urls], dtype=np.int64)
+
+    def contains(self, canonical: str) -> bool:
+        return self.conn.execute(
+            f"SELECT 1 FROM {self.table} WHERE canonical_url = ? OR url_key = ? LIMIT 1", (canonical, canonical)
+        ).fetchone() is not None
+
+    def existing(self, canonicals: List[str]) -> Set[str]:
+        found = set()
+        for start in range(0, len(canonicals), 500):
+            chunk = canonicals[start:start + 500]
+            marks = ', '.join('?' * len(chunk))
+            for row in self.conn.execute(
+                f"SELECT canonical_url, url_key FROM {self.table} "
+                f"WHERE canonical_url IN ({marks}) OR url_key IN ({marks})", chunk + chunk
+            ):
+                found.update(row)
+        return found.intersection(canonicals)
+
+
+class SeenUrlIndex:
+    """
+    Set-like index of the URLs stored in a table plus those added in this run.
+
+    Stored URLs live in a memory-mapped sorted int64 array of fingerprints;
+    hits are confirmed against the table before they count as seen. The
+    snapshot is brought up to date with the rows inserted since it was
+    written each time the index is opened.
+    """
+
+    def __init__(self, source, index_dir: Path = INDEX_DIR, verify: bool = True):
+        """
+        Open the index of a URL source and catch up with new rows.
+
+        Args:
+            source: PostgresUrlSource or SqliteUrlSource
+            index_dir: Directory holding the persisted snapshots
+            verify: Confirm fingerprint hits against the table
+        """
+        self.source = source
+        self.verify = verify
+        self.stats = {"snapshot": 0, "caught_up": 0, "confirmed": 0, "false_hits": 0}
+        self._array_path = Path(index_dir) / f"{source.name}.npy"
+        self._meta_path = Path(index_dir) / f"{source.name}.json"
+        self._added: Set[int] = set()
+        self._added_in_snapshot = 0  # Added fingerprints the snapshot already counts
+        self._confirmed: Set[int] = set()
+        self._rows = 0  # Stored rows covered by the snapshot
+        self._hashes = self._load()
+        self._buckets = self._bucket_offsets(self._hashes)
+
+    @classmethod
+    def postgres(cls, table: str = "articles", **kwargs) -> "SeenUrlIndex":
+        return cls(PostgresUrlSource(table), **kwargs)
+
+    @classmethod
+    def sqlite(cls, conn: sqlite3.Connection, db_path: Path, table: str = "articles", **kwargs) -> "SeenUrlIndex":
+        return cls(SqliteUrlSource(conn, table, db_path), **kwargs)
+
+    # ------------------------------------------------------------------
+    # Snapshot
+    # ------------------------------------------------------------------
+
+    def _load(self) -> np.ndarray:
+        hashes = np.empty(0, dtype=np.int64)
+        last_id = 0
+        if self._array_path.exists() and self._meta_path.exists():
+            meta = json.loads(self._meta_path.read_text())
+            last_id = meta["max_id"]
+            if meta.get("version") == SNAPSHOT_VERSION and self.source.max_id() >= last_id:
+                # Plain ndarray view of the mapping: scalar access skips np.memmap overhead
+                hashes = np.asarray(np.load(self._array_path, mmap_mode="r"))
+                self._rows = meta["rows"]
+            else:
+                # Table was emptied or recreated, or older fingerprints: rebuild
+                last_id = 0
+        self.stats["snapshot"] = self._rows
+
+        batches = []
+        for last_id, batch in self.source.iter_batches(last_id):
+            batches.append(batch)
+            self.stats["caught_up"] += len(batch) // 2
+        self._rows += self.stats["caught_up"]
+        if not batches:
+            return hashes
+
+        hashes = np.union1d(hashes, np.concatenate(batches))
+        self._array_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._array_path.with_suffix(".npy.part")
+        with open(tmp_path, "wb") as f:
+            np.save(f, hashes)
+        os.replace(tmp_path, self._array_path)
+        self._meta_path.write_text(json.dumps({"max_id": last_id, "rows": self._rows, "count": len(hashes),
+                                               "version": SNAPSHOT_VERSION}))
+        return np.asarray(np.load(self._array_path, mmap_mode="r"))
+
+    @staticmethod
+    def _bucket_offsets(hashes: np.ndarray) -> List[int]:
+        """Start offset in `hashes` of every top-BUCKET_BITS prefix, plus the end."""
+        shift = 64 - BUCKET_BITS
+        prefixes = np.arange(1, 1 << BUCKET_BITS, dtype=np.int64) - (1 << (BUCKET_BITS - 1))
+        return [0] + np.searchsorted(hashes, prefixes << shift).tolist() + [len(hashes)]
+
+    def _in_snapshot(self, h: int) -> bool:
+        bucket = (h >> (64 - BUCKET_BITS)) + (1 << (BUCKET_BITS - 1))
+        lo, hi = self._buckets[bucket], self._buckets[bucket + 1]
+        i = bisect.bisect_left(self._hashes, h, lo, hi)
+        return i < hi and self._hashes[i] == h
+
+    # ------------------------------------------------------------------
+    # Set protocol
+    # ------------------------------------------------------------------
+
+    def __contains__(self, url) -> bool:
+        canonical = canonicalize_url(url)
+        if not canonical:
+            return False
+        h = url_hash(canonical)
+        if h in self._added or h in self._confirmed:
+            return True
+        if not self._in_snapshot(h):
+            return False
+        if self.verify and not self.source.contains(canonical):
+            self.stats["false_hits"] += 1
+            return False
+        self.stats["confirmed"] += 1
+        self._confirmed.add(h)
+        return True
+
+    def __len__(self) -> int:
+        """Stored rows plus URLs added in this run."""
+        return self._rows + len(self._added) - self._added_in_snapshot
+
+    def add(self, url: str):
+        """
+        Mark a URL as seen (inserted or collected in this run).
+
+        Fingerprints already in the snapshot are added too unless a hit was
+        confirmed: a stale snapshot or a fingerprint shared with another URL
+        would otherwise leave the URL unseen until it is stored.
+        """
+        canonical = canonicalize_url(url)
+        if not canonical:
+            return
+        h = url_hash(canonical)
+        if h in self._added or h in self._confirmed:
+            return
+        self._added.add(h)
+        if self._in_snapshot(h):
+            self._added_in_snapshot += 1
+
+    def update(self, urls: Iterable[str]):
+        for url in urls:
+            self.add(url)
+
+    def filter_new(self, urls: Iterable[str]) -> List[str]:
+        """
+        URLs not seen yet, in order, one per canonical URL.
+
+        Fingerprints are checked against the snapshot in one vectorized
+        search, and all hits are confirmed with a single query.
+        """
+        by_canonical = {}
+        for url in urls:
+            canonical = canonicalize_url(url)
+            if canonical and canonical not in by_canonical:
+                by_canonical[canonical] = url
+        canonicals = list(by_canonical)
+        if not canonicals:
+            return []
+        hashes = np.fromiter((url_hash(c) for c in canonicals), dtype=np.int64, count=len(canonicals))
+        positions = np.searchsorted(self._hashes, hashes)
+        hits = np.zeros(len(canonicals), dtype=bool)
+        inside = positions < len(self._hashes)
+        hits[inside] = self._hashes[positions[inside]] == hashes[inside]
+
+        hit_canonicals = [c for c, hit in zip(canonicals, hits) if hit]
+        stored = set(hit_canonicals)
+        if self.verify and hit_canonicals:
+            stored = self.source.existing(hit_canonicals)
+            self.stats["false_hits"] += len(hit_canonicals) - len(stored)
+        self.stats["confirmed"] += len(stored)
+        self._confirmed.update(url_hash(c) for c in stored)
+        return [by_canonical[c] for c, h in zip(canonicals, hashes.tolist())
+                if c not in stored and h not in self._added and h not in self._confirmed]
+
+    def summary(self) -> str:
+        s = self.stats
+        size_mb = self._hashes.nbytes / 1e6
+        return (f"URL index: {s['snapshot']} URLs in snapshot, {s['caught_up']} new rows read "
+                f"({len(self._hashes)} fingerprints, {size_mb:.1f} MB), {s['confirmed']} hits confirmed, "
+                f"{s['false_hits']} false hits")
@@ -8,7 +8,7 @@ import sys
 import json
 import time
 from pathlib import Path
-from typing import Dict, List, Set
+from typing import Dict, List
 import pandas as pd
 from openai import OpenAI
 
@@ -112,18 +112,6 @@ AI_TECHNOLOGIES = {
 }
 
 
-def check_keywords_in_text(text: str, keywords: List[str]) -> Set[str]:
-    """Check which keywords appear in text."""
-    if pd.isna(text):
-        text = ""
-    text_lower = str(text).lower()
-    found = set()
-    for keyword in keywords:
-        if keyword.lower() in text_lower:
-            found.add(keyword)
-    return found
-
-
 def validate_with_llm_comprehensive(title: str, description: str, ai_keywords: List[str], ce_keywords: List[str]) -> Dict:
     """
     Use LLM to validate if article has BOTH AI and CE keywords in relevant context.
@@ -8,7 +8,7 @@ import sys
 import json
 import time
 from pathlib import Path
-from typing import Dict, List, Set
+from typing import Dict, List
 import pandas as pd
 from openai import OpenAI
 
@@ -17,6 +17,8 @@ SCRIPT_DIR = Path(__file__).parent.resolve()
 PROJECT_ROOT = SCRIPT_DIR.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
+from scripts.keyword_matcher import compile_keywords
+
 # Load environment variables
 try:
     from dotenv import load_dotenv
@@ -116,18 +118,6 @@ for keywords in AI_KEYWORDS.values():
     ALL_AI_KEYWORDS.extend(keywords)
 
 
-def find_keywords_in_text(text: str, keywords: List[str]) -> Set[str]:
-    """Find which keywords appear in the text."""
-    if pd.isna(text):
-        return set()
-    text_lower = str(text).lower()
-    found = set()
-    for keyword in keywords:
-        if keyword.lower() in text_lower:
-            found.add(keyword)
-    return found
-
-
 def validate_with_llm(title: str, description: str, text: str, ce_keywords_found: List[str], ai_keywords_found: List[str]) -> Dict:
     """
     Use LLM to validate if article is valid (has both CE and AI relevance).
@@ -221,6 +211,10 @@ def main():
     valid_count = 0
     invalid_count = 0
     
+    # Both taxonomies compiled once for all articles
+    ce_matcher = compile_keywords(CE_KEYWORDS)
+    ai_matcher = compile_keywords(AI_KEYWORDS)
+    
     # Process each article
     for idx, row in df.iterrows():
         title = str(row.get('title', ''))
@@ -233,21 +227,9 @@ def main():
         # Combine all text for keyword search
         full_text = f"{title} {description} {text}".lower()
         
-        # Find CE keywords
-        ce_keywords_found = []
-        for area, keywords in CE_KEYWORDS.items():
-            for keyword in keywords:
-                if keyword.lower() in full_text:
-                    ce_keywords_found.append(keyword)
-                    break  # One keyword per area is enough
-        
-        # Find AI keywords
-        ai_keywords_found = []
-        for tech, keywords in AI_KEYWORDS.items():
-            for keyword in keywords:
-                if keyword.lower() in full_text:
-                    ai_keywords_found.append(keyword)
-                    break  # One keyword per tech is enough
+        # Find CE and AI keywords (one keyword per area / tech is enough)
+        ce_keywords_found = [terms[0] for terms in ce_matcher.terms_by_keyword(full_text).values()]
+        ai_keywords_found = [terms[0] for terms in ai_matcher.terms_by_keyword(full_text).values()]
         
         print(f"[{idx+1}/{len(df)}] {title[:60]}...")
         print(f"    CE keywords: {len(ce_keywords_found)}, AI keywords: {len(ai_keywords_found)}")
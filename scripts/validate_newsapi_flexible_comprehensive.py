@@ -9,7 +9,7 @@ import sys
 import json
 import time
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Optional
 import pandas as pd
 from openai import OpenAI
 
@@ -61,12 +61,6 @@ AI_TECHNOLOGIES = {
 }
 
 
-def check_keyword_presence(text: str, keywords: List[str]) -> bool:
-    """Check if any keyword appears in text (case-insensitive)."""
-    text_lower = text.lower()
-    return any(kw.lower() in text_lower for kw in keywords)
-
-
 def validate_with_llm_flexible(title: str, description: str, ai_keywords: str, ce_keywords: str) -> Dict:
     """
     Use LLM to validate if article has BOTH AI and CE keywords in relevant context.
@@ -4,6 +4,9 @@ import pandas as pd
 from pathlib import Path
 sys.stdout.reconfigure(encoding='utf-8')
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from scripts.keyword_matcher import find_keywords
+
 PROJECT_ROOT = Path(__file__).parent
 DATA_DIR = PROJECT_ROOT / "data"
 
@@ -29,20 +32,6 @@ AI_KEYWORDS = [
     "automation"
 ]
 
-def find_keywords_in_text(text: str, keywords: list) -> list:
-    """Metinde hangi keyword'lerin geçtiğini bul"""
-    if not text or pd.isna(text):
-        return []
-    
-    text_lower = str(text).lower()
-    found = []
-    
-    for keyword in keywords:
-        if keyword.lower() in text_lower:
-            found.append(keyword)
-    
-    return list(set(found))
-
 def has_both_ai_and_ce(title: str, description: str, ai_found_str: str, ce_found_str: str) -> tuple:
     """Makalenin hem AI hem CE keyword'leri içerip içermediğini kontrol et"""
     # Önce CSV'deki keyword kolonlarını kontrol et
@@ -56,8 +45,8 @@ def has_both_ai_and_ce(title: str, description: str, ai_found_str: str, ce_found
     # Eğer CSV'de keyword yoksa, title ve description'da kontrol et
     if not ai_valid or not ce_valid:
         combined_text = f"{title} {description}".lower()
-        ai_found_text = find_keywords_in_text(combined_text, AI_KEYWORDS)
-        ce_found_text = find_keywords_in_text(combined_text, CE_KEYWORDS)
+        ai_found_text = find_keywords(combined_text, AI_KEYWORDS)
+        ce_found_text = find_keywords(combined_text, CE_KEYWORDS)
         
         if ai_found_text:
             ai_valid = ai_found_text